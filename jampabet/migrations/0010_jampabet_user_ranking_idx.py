@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jampabet', '0009_add_require_2fa_config'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jampabetuser',
+            index=models.Index(fields=['is_active', 'is_verified', '-points', '-hits', 'name'], name='jampabet_us_is_acti_66fcaa_idx'),
+        ),
+    ]
@@ -56,6 +56,10 @@ class JampabetUser(models.Model):
         verbose_name = 'Usuário JampaBet'
         verbose_name_plural = 'Usuários JampaBet'
         ordering = ['-points', 'name']
+        indexes = [
+            # Ranking: filtro de participantes + ordenacao (pontos, acertos, nome)
+            models.Index(fields=['is_active', 'is_verified', '-points', '-hits', 'name']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.points} pts)"
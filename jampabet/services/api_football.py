@@ -3,10 +3,12 @@ Serviço de integração com API-Football
 """
 import os
 import logging
-import httpx
+import requests
 from datetime import datetime
 from django.conf import settings
 
+from nossopainel.services.clientes_http import obter_cliente
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,25 +56,25 @@ class APIFootballService:
         """Faz requisição à API-Football"""
         try:
             logger.debug(f"Requisição API: {endpoint} com params: {params}")
-            with httpx.Client(timeout=30.0) as client:
-                response = client.get(
-                    f"{cls.BASE_URL}/{endpoint}",
-                    params=params or {},
-                    headers=cls._get_headers()
-                )
-
-                if response.status_code != 200:
-                    logger.error(f"Erro na API: {response.status_code} - {response.text[:200]}")
-                    raise Exception(f"Erro na API: {response.status_code}")
-
-                data = response.json()
-                logger.debug(f"Resposta API: {len(data.get('response', []))} resultados")
-                return data
-
-        except httpx.TimeoutException:
+            response = obter_cliente("api_football").get(
+                f"{cls.BASE_URL}/{endpoint}",
+                params=params or {},
+                headers=cls._get_headers(),
+                timeout=30.0,
+            )
+
+            if response.status_code != 200:
+                logger.error(f"Erro na API: {response.status_code} - {response.text[:200]}")
+                raise Exception(f"Erro na API: {response.status_code}")
+
+            data = response.json()
+            logger.debug(f"Resposta API: {len(data.get('response', []))} resultados")
+            return data
+
+        except requests.Timeout:
             logger.error(f"Timeout ao consultar {endpoint}")
             raise Exception("Timeout ao consultar API externa")
-        except httpx.RequestError as e:
+        except requests.RequestException as e:
             logger.error(f"Erro de conexão: {str(e)}")
             raise Exception(f"Erro de conexão: {str(e)}")
 
@@ -1,11 +1,22 @@
 """
 Serviço de Apostas do JampaBet
 """
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import Rank
 from django.utils import timezone
 from datetime import timedelta
 from ..models import Bet, Match, JampabetUser, AuditLog, APIConfig
 
 
+RANKING_CACHE_KEY = 'jampabet:ranking:{versao}'
+# A chave inclui a versao lida do banco (ver _ranking_version), entao qualquer processo
+# (web ou scheduler) que altere pontos ou apostas invalida o cache de todos os workers;
+# o TTL apenas limita a memoria das versoes antigas
+RANKING_CACHE_TTL = 600
+RANKING_TOP = 10
+
+
 class BetService:
     """Serviço para operações relacionadas a apostas"""
 
@@ -270,6 +281,80 @@ class BetService:
 
         return match
 
+    @classmethod
+    def _ranking_queryset(cls):
+        """Participantes do ranking (ativos e verificados)"""
+        return JampabetUser.objects.filter(is_active=True, is_verified=True)
+
+    @classmethod
+    def get_leaderboard(cls):
+        """
+        Retorna o top do ranking serializado, usando o cache da versao atual quando disponivel.
+
+        A posicao e calculada no banco com RANK() (pontos, acertos, nome) e o total de
+        apostas vem anotado na mesma consulta.
+
+        Returns:
+            dict: {'leaders': [...], 'total_players': int}
+        """
+        cache_key = RANKING_CACHE_KEY.format(versao=cls._ranking_version())
+        data = cache.get(cache_key)
+        if data is not None:
+            return data
+
+        leaders = (
+            cls._ranking_queryset()
+            .annotate(
+                position=Window(
+                    expression=Rank(),
+                    order_by=[F('points').desc(), F('hits').desc(), F('name').asc()],
+                ),
+                total_bets=Count('bets'),
+            )
+            .order_by('position')
+            .values('id', 'name', 'points', 'hits', 'position', 'total_bets')[:RANKING_TOP]
+        )
+        data = {
+            'leaders': list(leaders),
+            'total_players': cls._ranking_queryset().count(),
+        }
+        cache.set(cache_key, data, timeout=RANKING_CACHE_TTL)
+        return data
+
+    @classmethod
+    def get_user_position(cls, user):
+        """
+        Posicao do usuario no ranking (mesma ordenacao de get_leaderboard).
+
+        Conta apenas os participantes a frente dele, usando o indice do ranking.
+        """
+        ahead = cls._ranking_queryset().filter(
+            Q(points__gt=user.points)
+            | Q(points=user.points, hits__gt=user.hits)
+            | Q(points=user.points, hits=user.hits, name__lt=user.name)
+        ).count()
+        return ahead + 1
+
+    @classmethod
+    def _ranking_version(cls):
+        """
+        Versao do ranking lida do banco (compartilhada entre os processos).
+
+        Muda quando um usuario ou aposta e salvo (updated_at), quando apostas sao
+        removidas e quando participantes sao ativados/verificados via update() no admin.
+        """
+        users = JampabetUser.objects.aggregate(
+            updated=Max('updated_at'),
+            players=Count('id', filter=Q(is_active=True, is_verified=True)),
+        )
+        bets = Bet.objects.aggregate(updated=Max('updated_at'), total=Count('id'))
+        return '{}:{}:{}:{}'.format(
+            users['updated'].timestamp() if users['updated'] else 0,
+            users['players'],
+            bets['updated'].timestamp() if bets['updated'] else 0,
+            bets['total'],
+        )
+
     @classmethod
     def _revert_points(cls, match):
         """Reverte pontos de uma partida (para recálculo)"""
@@ -782,62 +782,47 @@ def api_ranking(request):
     - current_user: Posicao do usuario logado (se fora do top 10)
     - total_players: Total de participantes
     """
-    from django.db.models import Count
-
-    # Busca todos os usuarios ativos
-    all_users = list(JampabetUser.objects.filter(
-        is_active=True,
-        is_verified=True
-    ).order_by('-points', '-hits', 'name'))
-
-    total_players = len(all_users)
+    leaderboard = BetService.get_leaderboard()
+    leaders = leaderboard['leaders']
 
     # Usuario atual (se logado)
-    current_user_id = None
+    current_user = getattr(request, 'jampabet_user', None)
+    current_user_id = current_user.id if current_user else None
     current_user_position = None
     current_user_data = None
 
-    if hasattr(request, 'jampabet_user') and request.jampabet_user:
-        current_user_id = request.jampabet_user.id
-        # Encontra posicao do usuario atual
-        for i, user in enumerate(all_users, 1):
-            if user.id == current_user_id:
-                current_user_position = i
-                if i > 10:
-                    # Usuario fora do top 10, inclui seus dados
-                    current_user_data = {
-                        'position': i,
-                        'id': user.id,
-                        'name': user.name,
-                        'points': user.points,
-                        'hits': user.hits,
-                        'total_bets': Bet.objects.filter(user=user).count()
-                    }
-                break
-
-    def serialize_user(user, position):
-        return {
-            'position': position,
-            'id': user.id,
-            'name': user.name,
-            'points': user.points,
-            'hits': user.hits,
-            'total_bets': Bet.objects.filter(user=user).count(),
-            'is_current_user': user.id == current_user_id
-        }
+    for leader in leaders:
+        if leader['id'] == current_user_id:
+            current_user_position = leader['position']
+            break
+    else:
+        if current_user and current_user.is_active and current_user.is_verified:
+            # Usuario fora do top 10, inclui seus dados
+            current_user_position = BetService.get_user_position(current_user)
+            current_user_data = {
+                'position': current_user_position,
+                'id': current_user.id,
+                'name': current_user.name,
+                'points': current_user.points,
+                'hits': current_user.hits,
+                'total_bets': Bet.objects.filter(user=current_user).count()
+            }
+
+    def serialize_user(leader):
+        return {**leader, 'is_current_user': leader['id'] == current_user_id}
 
     # Top 3 para o podio
-    top3 = [serialize_user(user, i+1) for i, user in enumerate(all_users[:3])]
+    top3 = [serialize_user(leader) for leader in leaders[:3]]
 
     # Posicoes 4-10
-    ranking_4_10 = [serialize_user(user, i+4) for i, user in enumerate(all_users[3:10])]
+    ranking_4_10 = [serialize_user(leader) for leader in leaders[3:10]]
 
     return JsonResponse({
         'top3': top3,
         'ranking': ranking_4_10,
         'current_user': current_user_data,
         'current_user_position': current_user_position,
-        'total_players': total_players
+        'total_players': leaderboard['total_players']
     })
 
 
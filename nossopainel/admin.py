@@ -19,6 +19,7 @@ from .models import (
     ContaDoAplicativo,
     MensagemEnviadaWpp,
     DominiosDNS,
+    MedicaoDominioDNS,
     TelefoneLeads,
     EnviosLeads,
     MensagensLeads,
@@ -354,6 +355,13 @@ class DominiosDNSAdmin(admin.ModelAdmin):
     ordering = ("-id",)
 
 
+class MedicaoDominioDNSAdmin(admin.ModelAdmin):
+    list_display = ("id", "dominio", "verificado_em", "online", "tentativas_ok", "tentativas_realizadas", "latencia_p50_ms", "latencia_p95_ms", "duracao_total_s")
+    list_filter = ("online", "dominio")
+    search_fields = ("dominio__dominio",)
+    ordering = ("-verificado_em",)
+
+
 class TelefoneLeadsAdmin(admin.ModelAdmin):
     list_display = ("id", "telefone", "usuario")
     list_filter = ("usuario",)
@@ -561,6 +569,7 @@ admin.site.register(DescontoProgressivoIndicacao, DescontoProgressivoIndicacaoAd
 admin.site.register(ContaDoAplicativo, ContaDoAplicativoAdmin)
 admin.site.register(MensagemEnviadaWpp, MensagemEnviadaWppAdmin)
 admin.site.register(DominiosDNS, DominiosDNSAdmin)
+admin.site.register(MedicaoDominioDNS, MedicaoDominioDNSAdmin)
 admin.site.register(TelefoneLeads, TelefoneLeadsAdmin)
 admin.site.register(EnviosLeads, EnviosLeadsAdmin)
 admin.site.register(MensagensLeads, MensagensLeadsAdmin)
@@ -0,0 +1,72 @@
+"""Management command para executar o backup online do banco SQLite."""
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nossopainel.services.backup_sqlite import (
+    BACKUP_DB_GERACOES,
+    DIR_BACKUP_DB,
+    PAGINAS_POR_PASSO,
+    BackupError,
+    caminho_banco_padrao,
+    executar_backup_sqlite,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa o backup online do SQLite (API de backup + integrity_check + rotação) "
+        "e, opcionalmente, compara com a cópia direta do arquivo (cp)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', default=DIR_BACKUP_DB, help=f'Diretório das gerações (padrão: {DIR_BACKUP_DB})')
+        parser.add_argument(
+            '--manter',
+            type=int,
+            default=BACKUP_DB_GERACOES,
+            help=f'Gerações mantidas (padrão: {BACKUP_DB_GERACOES})'
+        )
+        parser.add_argument(
+            '--paginas-por-passo',
+            type=int,
+            default=PAGINAS_POR_PASSO,
+            help=f'Páginas copiadas por passo (padrão: {PAGINAS_POR_PASSO})'
+        )
+        parser.add_argument(
+            '--comparar-cp',
+            action='store_true',
+            help='Também mede a cópia direta do arquivo (comportamento do antigo backup_db.sh)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            resultado = executar_backup_sqlite(
+                destino=options['destino'],
+                manter=options['manter'],
+                paginas_por_passo=options['paginas_por_passo'],
+            )
+        except BackupError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Backup online: {resultado['arquivo']} | {resultado['bytes_copiados'] / 1024 / 1024:.1f} MB | "
+            f"{resultado['paginas']} páginas em {resultado['passos']} passos ({resultado['modo']}, "
+            f"{resultado['reinicios']} reinício(s)) | {resultado['duracao']:.3f}s | "
+            f"integrity_check={resultado['integridade']} | gerações removidas: {len(resultado['removidos'])}"
+        ))
+
+        if options['comparar_cp']:
+            origem = caminho_banco_padrao()
+            with tempfile.TemporaryDirectory(dir=options['destino']) as diretorio:
+                inicio = time.monotonic()
+                copia = shutil.copyfile(origem, os.path.join(diretorio, 'cp.sqlite3'))
+                duracao = time.monotonic() - inicio
+                tamanho = os.path.getsize(copia)
+            self.stdout.write(
+                f"  - cp (arquivo em uso, sem verificação): {tamanho / 1024 / 1024:.1f} MB | {duracao:.3f}s"
+            )
@@ -0,0 +1,105 @@
+"""Management command para comparar a busca de cliente por variações de telefone com a chave canônica."""
+
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from nossopainel.models import Cliente, chave_telefone
+from nossopainel.utils import existe_cliente_variacoes, gerar_variacoes_telefone
+
+DDDS = ['11', '21', '31', '41', '61', '71', '81', '83', '84', '85']
+
+
+def _telefone_sintetico(indice: int) -> str:
+    """Telefone único no formato gravado pelo cadastro (+55DD9NNNNNNNN, parte sem o 9)."""
+    ddd = DDDS[indice % len(DDDS)]
+    numero = f'{indice:08d}'
+    return f'+55{ddd}9{numero}' if indice % 4 else f'+55{ddd}{numero}'
+
+
+def _filtro_variacoes(telefone: str) -> Q:
+    """Busca anterior: OR de ``telefone=`` sobre as variações (sem índice utilizável)."""
+    q = Q()
+    for var in gerar_variacoes_telefone(telefone):
+        q |= Q(telefone=var if var.startswith('+') else f'+{var}')
+    return q
+
+
+def _plano(filtro: Q, usuario) -> str:
+    """Plano de execução da busca no banco atual (EXPLAIN)."""
+    return Cliente.objects.filter(filtro, usuario=usuario).explain().replace('\n', '\n  ')
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria clientes sintéticos (100k por padrão, em transação desfeita ao final) e compara "
+        "a busca por variações de telefone (OR) com a igualdade em telefone_normalizado"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=100_000, help='Clientes sintéticos (padrão: 100000)')
+        parser.add_argument('--buscas', type=int, default=500, help='Buscas por cenário (padrão: 500)')
+        parser.add_argument('--lote', type=int, default=2000, help='Clientes por bulk_create (padrão: 2000)')
+
+    def handle(self, *args, **options):
+        total = options['clientes']
+        n = options['buscas']
+        lote = max(options['lote'], 1)
+        aleatorio = random.Random(42)
+
+        with transaction.atomic():
+            usuario = User.objects.create(username=f'benchmark-telefone-{int(time.time())}')
+
+            inicio = time.perf_counter()
+            for offset in range(0, total, lote):
+                clientes = []
+                for indice in range(offset, min(offset + lote, total)):
+                    cliente = Cliente(nome=f'Cliente {indice}', telefone=_telefone_sintetico(indice), usuario=usuario)
+                    cliente.preencher_campos_derivados()
+                    clientes.append(cliente)
+                Cliente.objects.bulk_create(clientes)
+            self.stdout.write(f"{total} clientes sintéticos criados em {time.perf_counter() - inicio:.1f}s")
+
+            # Mesmo número consultado em outra formatação (com/sem 9, sem +, com máscara)
+            consultas = []
+            for indice in aleatorio.sample(range(total), min(n, total)):
+                digitos = _telefone_sintetico(indice).lstrip('+')
+                if len(digitos) == 12:
+                    digitos = digitos[:4] + '9' + digitos[4:]
+                consultas.append(aleatorio.choice([digitos, f'+{digitos}', f'+{digitos[:2]} ({digitos[2:4]}) {digitos[4:]}']))
+            consultas.append('+5599900000000')  # inexistente
+
+            cenarios = [
+                ('variacoes (OR em telefone)', lambda telefone: Cliente.objects.filter(_filtro_variacoes(telefone), usuario=usuario).first()),
+                ('chave canônica (índice)', lambda telefone: existe_cliente_variacoes(gerar_variacoes_telefone(telefone), usuario)),
+            ]
+            encontrados_por_cenario = []
+            for nome, buscar in cenarios:
+                with CaptureQueriesContext(connection) as queries:
+                    inicio = time.perf_counter()
+                    encontrados = sum(1 for telefone in consultas if buscar(telefone))
+                    duracao = time.perf_counter() - inicio
+                encontrados_por_cenario.append(encontrados)
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ {nome}: {len(consultas)} buscas em {duracao:.3f}s | "
+                    f"{duracao / len(consultas) * 1000:.3f} ms/busca | {len(queries)} consultas | "
+                    f"{encontrados} encontrados"
+                ))
+
+            exemplo = consultas[0]
+            self.stdout.write("Plano (variações):")
+            self.stdout.write(f"  {_plano(_filtro_variacoes(exemplo), usuario)}")
+            self.stdout.write("Plano (chave canônica):")
+            self.stdout.write(f"  {_plano(Q(telefone_normalizado=chave_telefone(exemplo)), usuario)}")
+
+            if len(set(encontrados_por_cenario)) > 1:
+                self.stdout.write(self.style.WARNING("Os cenários encontraram quantidades diferentes de clientes"))
+
+            # Desfaz os clientes sintéticos
+            transaction.set_rollback(True)
+
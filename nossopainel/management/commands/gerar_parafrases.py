@@ -0,0 +1,73 @@
+"""Management command para gerar os pools de paráfrases das tarefas de envio."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nossopainel.models import TarefaEnvio
+from nossopainel.services.pool_parafrases import GERADORES, TAMANHO_POOL, PoolParafrases
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera (ou reaproveita) o pool de paráfrases das tarefas ativas e, opcionalmente, "
+        "simula sorteios para medir a vazão"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarefa', type=int, help='ID de uma tarefa específica')
+        parser.add_argument(
+            '--gerador',
+            choices=sorted(GERADORES),
+            help='Gerador de paráfrases (padrão: PARAFRASES_GERADOR ou chatgpt; "stub" não acessa a rede)'
+        )
+        parser.add_argument(
+            '--tamanho',
+            type=int,
+            default=TAMANHO_POOL,
+            help=f'Paráfrases por pool (padrão: {TAMANHO_POOL})'
+        )
+        parser.add_argument(
+            '--simular',
+            type=int,
+            default=0,
+            help='Sorteios simulados por tarefa após gerar o pool (mede vazão e reaproveitamento)'
+        )
+
+    def handle(self, *args, **options):
+        tarefas = TarefaEnvio.objects.filter(ativo=True).select_related('usuario')
+        if options['tarefa']:
+            tarefas = TarefaEnvio.objects.filter(id=options['tarefa']).select_related('usuario')
+            if not tarefas.exists():
+                raise CommandError(f"Tarefa {options['tarefa']} não encontrada.")
+
+        pool = PoolParafrases(gerador=options['gerador'], tamanho=options['tamanho'])
+
+        for tarefa in tarefas:
+            texto = tarefa.mensagem_plaintext or tarefa.mensagem
+            inicio = time.perf_counter()
+            quantidade = pool.aquecer(texto, tarefa.usuario, tarefa=tarefa)
+            self.stdout.write(
+                f"  - Tarefa {tarefa.id} ({tarefa.nome}): {quantidade} paráfrase(s) "
+                f"em {time.perf_counter() - inicio:.2f}s"
+            )
+
+            if options['simular']:
+                inicio = time.perf_counter()
+                distintas = {
+                    pool.sortear(texto, tarefa.usuario, tarefa=tarefa, saudacao='Bom dia', nome='Cliente')
+                    for _ in range(options['simular'])
+                }
+                duracao = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"    {options['simular']} sorteios em {duracao:.3f}s "
+                    f"({options['simular'] / duracao if duracao else 0:.0f}/s) | textos distintos: {len(distintas)}"
+                )
+
+        metricas = pool.metricas()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Gerador: {metricas['gerador']} | Pools gerados: {metricas['pools_gerados']} | "
+            f"Carregados do banco: {metricas['carregados_banco']} | Chamadas ao gerador: {metricas['chamadas_gerador']} | "
+            f"Descartadas: {metricas['descartadas']} | Sorteios: {metricas['sorteios']} | "
+            f"Acertos em memória: {metricas['acertos_memoria']}"
+        ))
@@ -0,0 +1,71 @@
+"""Management command para preencher ``Cliente.telefone_normalizado`` nos clientes existentes."""
+
+from django.core.management.base import BaseCommand
+
+from nossopainel.models import Cliente, chave_telefone
+
+
+def preencher_telefones_normalizados(modelo_cliente, lote=500, dry_run=False):
+    """
+    Recalcula ``telefone_normalizado`` e grava apenas os clientes cuja chave mudou.
+
+    Também usado pela migração 0141 (recebe o modelo histórico).
+
+    Args:
+        modelo_cliente: Classe ``Cliente`` (atual ou de ``apps.get_model``).
+        lote: Clientes por ``bulk_update``.
+        dry_run: Apenas conta, sem gravar.
+
+    Returns:
+        tuple: (clientes verificados, clientes alterados).
+    """
+    clientes = (
+        modelo_cliente.objects.only('id', 'telefone', 'telefone_normalizado')
+        .order_by('id')
+        .iterator(chunk_size=1000)
+    )
+
+    verificados = 0
+    alterados = 0
+    batch = []
+    for cliente in clientes:
+        verificados += 1
+        chave = chave_telefone(cliente.telefone)
+        if cliente.telefone_normalizado == chave:
+            continue
+        cliente.telefone_normalizado = chave
+        alterados += 1
+        if dry_run:
+            continue
+        batch.append(cliente)
+        if len(batch) >= lote:
+            modelo_cliente.objects.bulk_update(batch, ['telefone_normalizado'])
+            batch = []
+
+    # Atualiza o restante
+    if batch:
+        modelo_cliente.objects.bulk_update(batch, ['telefone_normalizado'])
+
+    return verificados, alterados
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche/corrige a chave canônica do telefone (telefone_normalizado) dos clientes "
+        "alterados sem passar pelo save() (ex.: update() em queryset)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Clientes por bulk_update (padrão: 500)')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta os clientes que seriam alterados')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        verificados, alterados = preencher_telefones_normalizados(
+            Cliente, lote=max(options['lote'], 1), dry_run=dry_run
+        )
+
+        acao = "seriam atualizados" if dry_run else "atualizados"
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {verificados} clientes verificados | {alterados} {acao}"
+        ))
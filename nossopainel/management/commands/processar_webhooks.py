@@ -0,0 +1,50 @@
+"""Management command para drenar a fila de webhooks (WPPConnect e PIX)."""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from nossopainel.models import EventoWebhook
+from nossopainel.services.fila_webhooks import MAX_WORKERS, processar_fila_webhooks
+
+
+class Command(BaseCommand):
+    help = "Processa os eventos pendentes da fila de webhooks e mostra o estado da fila"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=MAX_WORKERS,
+            help=f'Eventos processados simultaneamente (padrão: {MAX_WORKERS})'
+        )
+        parser.add_argument(
+            '--reprocessar-falhas',
+            action='store_true',
+            help='Devolve à fila os eventos marcados como falha antes de processar'
+        )
+
+    def handle(self, *args, **options):
+        if options['reprocessar_falhas']:
+            devolvidos = EventoWebhook.objects.filter(status=EventoWebhook.STATUS_FALHA).update(
+                status=EventoWebhook.STATUS_PENDENTE, tentativas=0, erro='',
+            )
+            self.stdout.write(f"Eventos com falha devolvidos à fila: {devolvidos}")
+
+        resumo = processar_fila_webhooks(max_workers=options['workers'])
+        if resumo is None:
+            self.stdout.write(self.style.WARNING("Fila já está em processamento neste processo."))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Processados: {resumo['processados']} | Ignorados: {resumo['ignorados']} | "
+            f"Reagendados: {resumo['repetidos']} | Falhas: {resumo['falhas']} | "
+            f"Removidos: {resumo['removidos']} | Duração: {resumo['duracao']}s"
+        ))
+
+        estado = (
+            EventoWebhook.objects.values('origem', 'status')
+            .annotate(total=Count('id'))
+            .order_by('origem', 'status')
+        )
+        for linha in estado:
+            self.stdout.write(f"  - {linha['origem']} / {linha['status']}: {linha['total']}")
@@ -0,0 +1,248 @@
+"""
+Management command que valida os planos de execução (EXPLAIN) das consultas quentes de Mensalidade.
+
+Executa EXPLAIN nas consultas do dashboard, notificações, jobs de vencimento, receita anual
+e relatório de pagamentos e falha (exit code 1) se alguma delas fizer full table scan em
+``cadastros_mensalidade`` ou não usar o índice esperado (ver ``INDICES_ESPERADOS``).
+Suporta SQLite e MySQL.
+
+Uso:
+    python manage.py verificar_planos_mensalidade
+    python manage.py verificar_planos_mensalidade --usuario 3 --verbose
+
+Observação: no MySQL o otimizador pode preferir full scan em tabelas quase vazias;
+execute contra uma base com volume real (ex.: cópia de produção).
+"""
+
+import json
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from nossopainel.models import Mensalidade, Tipos_pgto
+
+TABELA = Mensalidade._meta.db_table
+
+# Índices compostos de Mensalidade (ver Mensalidade.Meta.indexes)
+INDICES_COMPOSTOS = ("mens_usr_pgto_canc_venc_idx", "mens_usr_pgto_dtpag_idx")
+
+# Prefixos de nome de índice aceitos em cadastros_mensalidade para cada consulta.
+# O relatório filtra por cliente__usuario, então chega às mensalidades pela FK de cliente.
+INDICES_ESPERADOS = {
+    "notificacoes_vencidas": INDICES_COMPOSTOS,
+    "jobs_vencimento": INDICES_COMPOSTOS,
+    "dashboard_receber_mes": INDICES_COMPOSTOS,
+    "dashboard_pago_mes": INDICES_COMPOSTOS,
+    "receita_anual_pagas": INDICES_COMPOSTOS,
+    "relatorio_pagamentos_manuais": (f"{TABELA}_cliente_id",),
+}
+
+
+def consultas_mensalidade(usuario):
+    """
+    Retorna as consultas quentes de Mensalidade, espelhando os filtros usados nas views/jobs.
+
+    Returns:
+        list[tuple[str, QuerySet]]: Pares (nome, queryset).
+    """
+    hoje = timezone.localdate()
+    return [
+        (
+            "notificacoes_vencidas",
+            Mensalidade.objects.filter(
+                usuario=usuario,
+                pgto=False,
+                cancelado=False,
+                cliente__cancelado=False,
+                cliente__forma_pgto__nome__in=[Tipos_pgto.CARTAO, Tipos_pgto.BOLETO],
+                dt_vencimento__lt=hoje,
+            ).annotate(
+                dias_atraso=ExpressionWrapper(hoje - F("dt_vencimento"), output_field=DurationField())
+            ).order_by("dt_vencimento"),
+        ),
+        (
+            "jobs_vencimento",
+            Mensalidade.objects.filter(
+                usuario=usuario,
+                dt_vencimento=hoje + timedelta(days=2),
+                cliente__nao_enviar_msgs=False,
+                pgto=False,
+                cancelado=False,
+            ),
+        ),
+        (
+            "dashboard_receber_mes",
+            Mensalidade.objects.filter(
+                cancelado=False,
+                dt_vencimento__year=hoje.year,
+                dt_vencimento__month=hoje.month,
+                usuario=usuario,
+                pgto=False,
+            ).values("usuario").annotate(total=Sum("valor")),
+        ),
+        (
+            "dashboard_pago_mes",
+            Mensalidade.objects.filter(
+                cancelado=False,
+                dt_pagamento__year=hoje.year,
+                dt_pagamento__month=hoje.month,
+                usuario=usuario,
+                pgto=True,
+            ).values("usuario").annotate(total=Sum("valor")),
+        ),
+        (
+            "receita_anual_pagas",
+            Mensalidade.objects.filter(
+                usuario=usuario,
+                pgto=True,
+                dt_pagamento__year__in=[hoje.year - 1, hoje.year - 2],
+            ),
+        ),
+        (
+            "relatorio_pagamentos_manuais",
+            Mensalidade.objects.filter(
+                cliente__usuario=usuario,
+                pgto=True,
+                dt_pagamento__isnull=False,
+                dt_pagamento__gte=hoje - timedelta(days=30),
+                dt_pagamento__lte=hoje,
+            ).order_by("-dt_pagamento"),
+        ),
+    ]
+
+
+def _full_scan_sqlite(plano):
+    """Linhas do EXPLAIN QUERY PLAN com SCAN (sem SEARCH) na tabela de mensalidades."""
+    return [
+        linha.strip()
+        for linha in plano.splitlines()
+        if f"SCAN {TABELA}" in linha
+    ]
+
+
+def _indices_sqlite(plano):
+    """Índices usados na tabela de mensalidades segundo o EXPLAIN QUERY PLAN."""
+    return re.findall(rf"\b{TABELA} USING (?:COVERING )?INDEX (\w+)", plano)
+
+
+def _full_scan_mysql(plano):
+    """Nós do EXPLAIN FORMAT=JSON com access_type=ALL na tabela de mensalidades."""
+    encontrados = []
+
+    def _percorrer(no):
+        if isinstance(no, dict):
+            if no.get("table_name") == TABELA and no.get("access_type") == "ALL":
+                encontrados.append(f"{TABELA}: access_type=ALL rows={no.get('rows_examined_per_scan')}")
+            for valor in no.values():
+                _percorrer(valor)
+        elif isinstance(no, list):
+            for valor in no:
+                _percorrer(valor)
+
+    _percorrer(json.loads(plano))
+    return encontrados
+
+
+def _indices_mysql(plano):
+    """Índices (``key``) usados na tabela de mensalidades segundo o EXPLAIN FORMAT=JSON."""
+    encontrados = []
+
+    def _percorrer(no):
+        if isinstance(no, dict):
+            if no.get("table_name") == TABELA and no.get("key"):
+                encontrados.append(no["key"])
+            for valor in no.values():
+                _percorrer(valor)
+        elif isinstance(no, list):
+            for valor in no:
+                _percorrer(valor)
+
+    _percorrer(json.loads(plano))
+    return encontrados
+
+
+def indice_inesperado(nome, indices):
+    """
+    Verifica se a consulta deixou de usar o índice esperado em cadastros_mensalidade.
+
+    Args:
+        nome: Nome da consulta (chave de ``INDICES_ESPERADOS``).
+        indices: Índices usados na tabela segundo o EXPLAIN.
+
+    Returns:
+        bool: True se nenhum índice usado corresponde aos prefixos esperados.
+    """
+    esperados = INDICES_ESPERADOS[nome]
+    return not any(indice.startswith(esperados) for indice in indices)
+
+
+class Command(BaseCommand):
+    help = "Valida via EXPLAIN que as consultas quentes de Mensalidade usam os índices esperados"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            default=None,
+            help='ID do usuário usado nos filtros (padrão: primeiro usuário com mensalidades)'
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Exibe o plano completo de cada consulta'
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ("sqlite", "mysql"):
+            raise CommandError(f"Banco não suportado para esta verificação: {vendor}")
+
+        usuario = self._obter_usuario(options['usuario'])
+        falhas = 0
+
+        for nome, queryset in consultas_mensalidade(usuario):
+            if vendor == "mysql":
+                plano = queryset.explain(format="json")
+                scans = _full_scan_mysql(plano)
+                indices = _indices_mysql(plano)
+            else:
+                plano = queryset.explain()
+                scans = _full_scan_sqlite(plano)
+                indices = _indices_sqlite(plano)
+
+            if scans:
+                falhas += 1
+                self.stdout.write(self.style.ERROR(f"[FULL SCAN] {nome}"))
+                for linha in scans:
+                    self.stdout.write(f"    {linha}")
+            elif indice_inesperado(nome, indices):
+                falhas += 1
+                esperados = ", ".join(INDICES_ESPERADOS[nome])
+                usados = ", ".join(indices) or "nenhum"
+                self.stdout.write(self.style.ERROR(
+                    f"[ÍNDICE] {nome} | esperado={esperados} | usado={usados}"
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"[OK] {nome}"))
+
+            if options['verbose']:
+                self.stdout.write(plano)
+                self.stdout.write("")
+
+        if falhas:
+            raise CommandError(
+                f"{falhas} consulta(s) de Mensalidade com full table scan ou sem o índice esperado ({vendor})."
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Todas as consultas usam o índice esperado ({vendor})."))
+
+    def _obter_usuario(self, usuario_id):
+        if usuario_id:
+            return User.objects.get(id=usuario_id)
+        usuario = User.objects.filter(mensalidade__isnull=False).order_by('id').first()
+        return usuario or User(id=0)
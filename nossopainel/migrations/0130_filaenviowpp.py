@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-16 23:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0129_fix_padrao_features_all_plans'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilaEnvioWpp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessao', models.CharField(help_text='Nome da sessão no WPPConnect', max_length=255, verbose_name='Sessão WPP')),
+                ('destino', models.CharField(help_text='Telefone ou ID do grupo', max_length=100, verbose_name='Destino')),
+                ('is_group', models.BooleanField(default=False, verbose_name='Grupo')),
+                ('mensagem', models.TextField(blank=True, verbose_name='Mensagem')),
+                ('imagem_path', models.CharField(blank=True, help_text='Caminho da imagem a enviar (a mensagem vira legenda)', max_length=500, verbose_name='Imagem')),
+                ('tipo_envio', models.CharField(max_length=100, verbose_name='Tipo de envio')),
+                ('cliente_nome', models.CharField(blank=True, max_length=255, verbose_name='Cliente')),
+                ('origem', models.CharField(db_index=True, help_text='Função que enfileirou o envio', max_length=100, verbose_name='Origem')),
+                ('intervalo_min', models.FloatField(default=30, verbose_name='Intervalo mínimo (seg)')),
+                ('intervalo_max', models.FloatField(default=60, verbose_name='Intervalo máximo (seg)')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('enviado', 'Enviado'), ('falha', 'Falha')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('http_status', models.IntegerField(blank=True, null=True, verbose_name='HTTP status')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponível em')),
+                ('reservado_em', models.DateTimeField(blank=True, null=True, verbose_name='Reservado em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Envio WhatsApp na Fila',
+                'verbose_name_plural': 'Fila de Envios WhatsApp',
+                'db_table': 'cadastros_filaenviowpp',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'sessao', 'id'], name='fila_wpp_status_sessao_idx'), models.Index(fields=['usuario', 'status'], name='fila_wpp_usuario_status_idx')],
+            },
+        ),
+    ]
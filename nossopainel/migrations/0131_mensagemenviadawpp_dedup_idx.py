@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-16 23:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0130_filaenviowpp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensagemenviadawpp',
+            index=models.Index(fields=['usuario', 'tarefa', 'data_envio', 'telefone'], name='msg_wpp_dedup_periodo_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-16 23:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0131_mensagemenviadawpp_dedup_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensalidade',
+            index=models.Index(fields=['usuario', 'pgto', 'cancelado', 'dt_vencimento'], name='mens_usr_pgto_canc_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mensalidade',
+            index=models.Index(fields=['usuario', 'pgto', 'dt_pagamento'], name='mens_usr_pgto_dtpag_idx'),
+        ),
+    ]
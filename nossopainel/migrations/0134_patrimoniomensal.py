@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0133_dashboardmetrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatrimonioMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês (primeiro dia)')),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Patrimônio')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='patrimonio_mensal', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Patrimônio Mensal',
+                'verbose_name_plural': 'Patrimônio Mensal',
+                'db_table': 'cadastros_patrimoniomensal',
+                'ordering': ['usuario', 'mes'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'mes'), name='patrimonio_mensal_usuario_mes_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0134_patrimoniomensal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaImportacaoClientes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome_arquivo', models.CharField(blank=True, max_length=255, verbose_name='Arquivo')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('em_andamento', 'Em Andamento'), ('concluida', 'Concluída'), ('erro', 'Erro')], db_index=True, default='pendente', max_length=20)),
+                ('etapa_atual', models.CharField(default='leitura', help_text='leitura, referencias, validacao, gravacao, indicacoes, etiquetas ou concluida', max_length=30, verbose_name='Etapa Atual')),
+                ('mensagem_progresso', models.CharField(blank=True, max_length=255, verbose_name='Mensagem de Progresso')),
+                ('total_linhas', models.IntegerField(default=0, verbose_name='Total de Linhas')),
+                ('processados', models.IntegerField(default=0, verbose_name='Linhas Processadas')),
+                ('sucessos', models.IntegerField(default=0, verbose_name='Importados')),
+                ('falhas', models.IntegerField(default=0, verbose_name='Não Importados')),
+                ('resultado', models.JSONField(blank=True, default=dict, help_text='Listas clientes_existentes, clientes_invalidos_whatsapp e erros_importacao', verbose_name='Resultado')),
+                ('erro_geral', models.TextField(blank=True, verbose_name='Erro Geral')),
+                ('criada_em', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='Data de Início')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tarefas_importacao_clientes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Importação de Clientes',
+                'verbose_name_plural': 'Tarefas de Importação de Clientes',
+                'db_table': 'cadastros_tarefaimportacaoclientes',
+                'ordering': ['-criada_em'],
+                'indexes': [models.Index(fields=['usuario', '-criada_em'], name='tarefa_import_user_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0135_tarefaimportacaoclientes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contareseller',
+            name='indice_atualizado_em',
+            field=models.DateTimeField(blank=True, help_text='Última varredura completa de dispositivos/playlists no painel reseller', null=True, verbose_name='Índice de Dispositivos Atualizado em'),
+        ),
+        migrations.CreateModel(
+            name='DispositivoReseller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(help_text='ID numérico do dispositivo na API do painel', max_length=64, verbose_name='ID no Painel')),
+                ('mac', models.CharField(blank=True, db_index=True, max_length=100, verbose_name='MAC')),
+                ('nome_dispositivo', models.CharField(blank=True, max_length=255, verbose_name='Nome do Dispositivo')),
+                ('assinatura', models.CharField(blank=True, help_text='SHA-1 do registro bruto do dispositivo (detecta alterações)', max_length=40, verbose_name='Assinatura')),
+                ('playlists', models.JSONField(blank=True, default=list, help_text='Playlists com id, name, url, dominio, is_selected e deviceId', verbose_name='Playlists')),
+                ('playlists_atualizadas_em', models.DateTimeField(blank=True, help_text='Nulo quando as playlists precisam ser consultadas novamente', null=True, verbose_name='Playlists Atualizadas em')),
+                ('visto_em', models.DateTimeField(verbose_name='Visto em')),
+                ('conta_reseller', models.ForeignKey(help_text='Conta reseller à qual o dispositivo pertence', on_delete=django.db.models.deletion.CASCADE, related_name='dispositivos_indexados', to='nossopainel.contareseller')),
+            ],
+            options={
+                'verbose_name': 'Dispositivo Indexado (Reseller)',
+                'verbose_name_plural': 'Dispositivos Indexados (Reseller)',
+                'db_table': 'cadastros_dispositivoreseller',
+                'constraints': [models.UniqueConstraint(fields=('conta_reseller', 'device_id'), name='dispositivo_reseller_conta_device_uniq')],
+            },
+        ),
+    ]
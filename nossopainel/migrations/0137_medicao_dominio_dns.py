@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0136_indice_dispositivos_reseller'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicaoDominioDNS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verificado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('online', models.BooleanField()),
+                ('tentativas_realizadas', models.PositiveSmallIntegerField(default=0)),
+                ('tentativas_ok', models.PositiveSmallIntegerField(default=0)),
+                ('latencia_min_ms', models.FloatField(blank=True, null=True)),
+                ('latencia_p50_ms', models.FloatField(blank=True, null=True)),
+                ('latencia_p90_ms', models.FloatField(blank=True, null=True)),
+                ('latencia_p95_ms', models.FloatField(blank=True, null=True)),
+                ('latencia_max_ms', models.FloatField(blank=True, null=True)),
+                ('duracao_total_s', models.FloatField(default=0)),
+                ('status_codes', models.JSONField(blank=True, default=list)),
+                ('dominio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medicoes', to='nossopainel.dominiosdns')),
+            ],
+            options={
+                'verbose_name': 'Medição de Domínio DNS',
+                'verbose_name_plural': 'Medições de Domínios DNS',
+                'db_table': 'cadastros_medicaodominiodns',
+                'ordering': ['-verificado_em'],
+                'indexes': [models.Index(fields=['dominio', '-verificado_em'], name='medicao_dns_dom_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0137_medicao_dominio_dns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoWebhook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('wppconnect', 'WPPConnect'), ('pix', 'Pagamento PIX')], max_length=20, verbose_name='Origem')),
+                ('evento_id', models.CharField(help_text='Identificador do evento na origem (deduplicação)', max_length=128, verbose_name='ID do evento')),
+                ('tipo', models.CharField(blank=True, max_length=100, verbose_name='Tipo')),
+                ('chave_ordenacao', models.CharField(blank=True, help_text='Eventos com a mesma chave são processados um de cada vez, em ordem de chegada', max_length=255, verbose_name='Chave de ordenação')),
+                ('payload', models.JSONField(default=dict, verbose_name='Payload')),
+                ('headers', models.JSONField(blank=True, default=dict, verbose_name='Headers')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('processado', 'Processado'), ('ignorado', 'Ignorado'), ('falha', 'Falha')], default='pendente', max_length=20, verbose_name='Status')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponível em')),
+                ('reservado_em', models.DateTimeField(blank=True, null=True, verbose_name='Reservado em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('recebido_em', models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')),
+            ],
+            options={
+                'verbose_name': 'Evento de Webhook',
+                'verbose_name_plural': 'Eventos de Webhook',
+                'db_table': 'cadastros_eventowebhook',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'chave_ordenacao', 'id'], name='evento_wh_status_chave_idx'), models.Index(fields=['origem', 'tipo', 'chave_ordenacao', 'processado_em'], name='evento_wh_tipo_chave_idx')],
+                'constraints': [models.UniqueConstraint(fields=('origem', 'evento_id'), name='evento_webhook_origem_id_uniq')],
+            },
+        ),
+    ]
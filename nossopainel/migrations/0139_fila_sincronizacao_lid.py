@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0138_fila_eventos_webhook'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilaSincronizacaoLid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lid', models.CharField(max_length=50, unique=True, verbose_name='LID')),
+                ('sessao', models.CharField(max_length=255, verbose_name='Sessão')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('resolvido', 'Resolvido'), ('sem_cliente', 'Sem cliente'), ('falha', 'Falha')], default='pendente', max_length=20, verbose_name='Status')),
+                ('telefone', models.CharField(blank=True, max_length=30, verbose_name='Telefone')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.CharField(blank=True, max_length=255, verbose_name='Erro')),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponível em')),
+                ('consultado_em', models.DateTimeField(blank=True, null=True, verbose_name='Consultado em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='nossopainel.cliente')),
+            ],
+            options={
+                'verbose_name': 'LID em Sincronização',
+                'verbose_name_plural': 'Fila de Sincronização de LIDs',
+                'db_table': 'cadastros_filasincronizacaolid',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'disponivel_em'], name='fila_lid_status_disp_idx'), models.Index(fields=['consultado_em'], name='fila_lid_consultado_idx')],
+            },
+        ),
+    ]
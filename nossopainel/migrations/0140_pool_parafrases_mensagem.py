@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0139_fila_sincronizacao_lid'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParafraseMensagem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash_origem', models.CharField(help_text='SHA-256 do texto original que gerou o pool', max_length=64, verbose_name='Hash do Texto Original')),
+                ('indice', models.PositiveSmallIntegerField(verbose_name='Índice no Pool')),
+                ('texto', models.TextField(verbose_name='Paráfrase')),
+                ('gerador', models.CharField(choices=[('chatgpt', 'ChatGPT'), ('stub', 'Stub (offline)')], default='chatgpt', max_length=20, verbose_name='Gerador')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado Em')),
+                ('tarefa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='parafrases', to='nossopainel.tarefaenvio', verbose_name='Tarefa')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parafrases_mensagem', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Paráfrase de Mensagem',
+                'verbose_name_plural': 'Paráfrases de Mensagem',
+                'db_table': 'cadastros_parafrasemensagem',
+                'ordering': ['usuario', 'hash_origem', 'indice'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'hash_origem', 'indice'), name='parafrase_usuario_hash_indice_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-17 00:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+from nossopainel.management.commands.normalizar_telefones_clientes import preencher_telefones_normalizados
+
+
+def populate_telefone_normalizado(apps, schema_editor):
+    """Preenche a chave canônica dos clientes existentes (as buscas por telefone dependem dela)."""
+    Cliente = apps.get_model('nossopainel', 'Cliente')
+    preencher_telefones_normalizados(Cliente)
+
+
+def reverse_migration(apps, schema_editor):
+    """Nada a desfazer: o campo é removido pela operação anterior."""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0140_pool_parafrases_mensagem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_normalizado',
+            field=models.CharField(blank=True, editable=False, help_text='Chave canônica do telefone para busca (preenchido automaticamente)', max_length=21),
+        ),
+        migrations.RunPython(populate_telefone_normalizado, reverse_migration),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['usuario', 'telefone_normalizado'], name='cliente_usuario_tel_norm_idx'),
+        ),
+    ]
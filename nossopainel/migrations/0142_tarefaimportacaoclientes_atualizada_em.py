@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-17 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0141_cliente_telefone_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefaimportacaoclientes',
+            name='atualizada_em',
+            field=models.DateTimeField(auto_now=True, help_text='Avança a cada progresso gravado; tarefa parada há muito tempo teve a thread interrompida', verbose_name='Última Atualização'),
+        ),
+    ]
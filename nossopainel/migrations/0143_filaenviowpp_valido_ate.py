@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0142_tarefaimportacaoclientes_atualizada_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaenviowpp',
+            name='valido_ate',
+            field=models.DateTimeField(blank=True, help_text='Após esta data o envio é descartado sem ser enviado', null=True, verbose_name='Válido até'),
+        ),
+        migrations.AlterField(
+            model_name='filaenviowpp',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('enviado', 'Enviado'), ('falha', 'Falha'), ('descartado', 'Descartado')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+    ]
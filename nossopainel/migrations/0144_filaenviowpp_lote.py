@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nossopainel', '0143_filaenviowpp_valido_ate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='filaenviowpp',
+            name='exige_envio_no_lote',
+            field=models.BooleanField(default=False, help_text='Só envia se algum item anterior do mesmo lote foi enviado', verbose_name='Exige envio no lote'),
+        ),
+        migrations.AddField(
+            model_name='filaenviowpp',
+            name='lote',
+            field=models.CharField(blank=True, help_text='Agrupa envios relacionados (ex.: imagens e texto final de um grupo)', max_length=64, verbose_name='Lote'),
+        ),
+    ]
@@ -15,6 +15,7 @@ import uuid
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
 from django.db import models
 from django.utils import timezone
@@ -313,6 +314,67 @@ def extrair_pais_do_telefone(telefone: str) -> Optional[str]:
     return None
 
 
+def chave_telefone(telefone: str) -> str:
+    """
+    Retorna a chave canônica do telefone usada nas buscas (``Cliente.telefone_normalizado``).
+
+    Reduz as variações de formatação a um único valor ``+DIGITOS``: remove caracteres
+    especiais, corrige o DDI brasileiro duplicado e remove o 9º dígito de celulares
+    brasileiros (a mesma equivalência de ``gerar_variacoes_telefone``), de modo que a
+    busca por cliente seja uma igualdade indexada.
+
+    Args:
+        telefone: Número em qualquer formatação (com ou sem +, espaços, hífens, @c.us)
+
+    Returns:
+        Chave ``+DIGITOS`` ou string vazia quando não há dígitos
+
+    Exemplos:
+        chave_telefone('+55 (83) 99623-9140') → '+558396239140'
+        chave_telefone('558396239140') → '+558396239140'
+        chave_telefone('+55558396239140') → '+558396239140'
+        chave_telefone('+33751085604') → '+33751085604'
+    """
+    digitos = re.sub(r'\D', '', telefone or '')
+    if not digitos:
+        return ''
+
+    # DDI brasileiro duplicado (5555...), mesma regra de normalizar_telefone
+    if len(digitos) >= 14 and digitos.startswith('5555'):
+        digitos = digitos[2:]
+
+    # Celular brasileiro com 9º dígito: 55 + DDD(2) + 9 + número(8)
+    if len(digitos) == 13 and digitos.startswith('55') and digitos[4] == '9':
+        digitos = digitos[:4] + digitos[5:]
+
+    return '+' + digitos
+
+
+def chaves_telefone_sem_ddi(chave: str) -> list:
+    """
+    Chaves do mesmo número brasileiro quando cadastrado sem o DDI 55.
+
+    ``chave_telefone`` só reconhece o Brasil pelo DDI; um cliente salvo como
+    ``83996239140`` fica com a chave ``+83996239140``. Para uma chave brasileira
+    (``+55`` + DDD + 8 dígitos) retorna as duas formas locais: sem e com o 9º dígito.
+
+    Args:
+        chave: Chave retornada por ``chave_telefone``
+
+    Returns:
+        Lista de chaves locais (vazia se a chave não for brasileira)
+
+    Exemplos:
+        chaves_telefone_sem_ddi('+558396239140') → ['+8396239140', '+83996239140']
+        chaves_telefone_sem_ddi('+33751085604') → []
+    """
+    digitos = (chave or '').lstrip('+')
+    if len(digitos) != 12 or not digitos.startswith('55'):
+        return []
+    local = digitos[2:]
+    return ['+' + local, '+' + local[:2] + '9' + local[2:]]
+
+
 def default_vencimento():
     """Retorna a data de vencimento padrão: 30 dias a partir da data atual."""
     return timezone.now().date() + timedelta(days=30)
@@ -1093,6 +1155,12 @@ class Cliente(models.Model):
         help_text="Nome sem acentos para busca (preenchido automaticamente)"
     )
     telefone = models.CharField(max_length=20)
+    telefone_normalizado = models.CharField(
+        max_length=21,  # "+" e até os 20 caracteres de ``telefone``
+        blank=True,
+        editable=False,
+        help_text="Chave canônica do telefone para busca (preenchido automaticamente)"
+    )
     email = models.EmailField(max_length=255, blank=True, null=True)
     uf = models.CharField(max_length=2, blank=True, null=True)
     pais = models.CharField("País", max_length=2, blank=True, null=True)
@@ -1153,17 +1221,28 @@ class Cliente(models.Model):
     class Meta:
         db_table = 'cadastros_cliente'
         ordering = ['-data_adesao']
+        indexes = [
+            models.Index(fields=['usuario', 'telefone_normalizado'], name='cliente_usuario_tel_norm_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        """Garante vencimento inicial, normaliza nome e sincroniza UF/País."""
+        """Garante vencimento inicial, normaliza nome/telefone e sincroniza UF/País."""
+        self.preencher_campos_derivados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'telefone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'telefone_normalizado'}
+        super().save(*args, **kwargs)
+
+    def preencher_campos_derivados(self):
+        """Preenche os campos calculados no ``save()`` (usado também antes de ``bulk_create``)."""
         if self.data_adesao and self.data_vencimento is None:
             self.data_vencimento = self.data_adesao
 
         # Normaliza o nome para busca sem acentos
         self.normalizar_nome()
+        self.telefone_normalizado = chave_telefone(self.telefone)
         self.definir_uf()
         self.definir_pais()
-        super().save(*args, **kwargs)
 
     def normalizar_nome(self):
         """Preenche nome_normalizado removendo acentos e convertendo para minúsculas."""
@@ -1317,6 +1396,18 @@ class Mensalidade(models.Model):
 
     class Meta:
         db_table = 'cadastros_mensalidade'
+        indexes = [
+            # Em aberto/vencidas por vencimento: dashboard, notificações, jobs de vencimento
+            models.Index(
+                fields=['usuario', 'pgto', 'cancelado', 'dt_vencimento'],
+                name='mens_usr_pgto_canc_venc_idx',
+            ),
+            # Recebimentos por data de pagamento: dashboard, receita anual, relatórios
+            models.Index(
+                fields=['usuario', 'pgto', 'dt_pagamento'],
+                name='mens_usr_pgto_dtpag_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"[{self.dt_vencimento.strftime('%d/%m/%Y')}] {self.valor} - {self.cliente}"
@@ -1368,6 +1459,135 @@ class ClientePlanoHistorico(models.Model):
         return f"{self.cliente} - {self.plano_nome} ({self.valor_plano}) {self.inicio} -> {self.fim or '...'}"
 
 
+class PatrimonioMensal(models.Model):
+    """Patrimônio mensal materializado por dono (soma de ``valor_plano`` vigente no fim do mês).
+
+    As linhas são criadas sob demanda a partir de uma varredura do histórico de planos e
+    depois mantidas de forma incremental pelos signals de ``ClientePlanoHistorico``
+    (cada período aberto/encerrado soma ou subtrai seu valor nos meses afetados).
+    """
+
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='patrimonio_mensal')
+    mes = models.DateField("Mês (primeiro dia)")
+    valor = models.DecimalField("Patrimônio", max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'cadastros_patrimoniomensal'
+        verbose_name = "Patrimônio Mensal"
+        verbose_name_plural = "Patrimônio Mensal"
+        ordering = ['usuario', 'mes']
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'mes'], name='patrimonio_mensal_usuario_mes_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} - {self.mes:%m/%Y}: {self.valor}"
+
+
+class DashboardMetrics(models.Model):
+    """Snapshot materializado das métricas do dashboard por dono dos dados.
+
+    Os signals de ``Mensalidade``, ``Cliente`` e ``ClientePlanoHistorico`` aplicam no
+    snapshot apenas o delta do registro alterado; os de ``Plano`` marcam o snapshot
+    do dono como desatualizado e o próximo acesso recalcula as métricas daquele dono.
+    Enquanto válido (mesmo dia de referência e não desatualizado), o dashboard lê
+    tudo em uma única consulta.
+    """
+
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dashboard_metrics')
+    data_referencia = models.DateField("Data de referência")
+    desatualizado = models.BooleanField("Desatualizado", default=True)
+    dados = models.JSONField("Métricas", default=dict, encoder=DjangoJSONEncoder)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        db_table = 'cadastros_dashboardmetrics'
+        verbose_name = "Métricas do Dashboard"
+        verbose_name_plural = "Métricas do Dashboard"
+
+    def __str__(self):
+        return f"{self.usuario} - {self.data_referencia}{' (desatualizado)' if self.desatualizado else ''}"
+
+    def valido_para(self, data):
+        """Indica se o snapshot pode ser servido sem recálculo na data informada."""
+        return not self.desatualizado and self.data_referencia == data
+
+
+class TarefaImportacaoClientes(models.Model):
+    """
+    Acompanha uma importação de clientes por planilha executada em segundo plano.
+
+    A tela de importação consulta esta tarefa (polling) para exibir o andamento e,
+    ao final, o resumo com os clientes existentes, inválidos e erros de cada linha.
+    """
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_EM_ANDAMENTO = 'em_andamento'
+    STATUS_CONCLUIDA = 'concluida'
+    STATUS_ERRO = 'erro'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_EM_ANDAMENTO, 'Em Andamento'),
+        (STATUS_CONCLUIDA, 'Concluída'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tarefas_importacao_clientes')
+    nome_arquivo = models.CharField("Arquivo", max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE, db_index=True)
+    etapa_atual = models.CharField(
+        "Etapa Atual",
+        max_length=30,
+        default='leitura',
+        help_text='leitura, referencias, validacao, gravacao, indicacoes, etiquetas ou concluida'
+    )
+    mensagem_progresso = models.CharField("Mensagem de Progresso", max_length=255, blank=True)
+    total_linhas = models.IntegerField("Total de Linhas", default=0)
+    processados = models.IntegerField("Linhas Processadas", default=0)
+    sucessos = models.IntegerField("Importados", default=0)
+    falhas = models.IntegerField("Não Importados", default=0)
+    resultado = models.JSONField(
+        "Resultado",
+        default=dict,
+        blank=True,
+        help_text='Listas clientes_existentes, clientes_invalidos_whatsapp e erros_importacao'
+    )
+    erro_geral = models.TextField("Erro Geral", blank=True)
+    criada_em = models.DateTimeField("Data de Criação", auto_now_add=True)
+    iniciada_em = models.DateTimeField("Data de Início", null=True, blank=True)
+    concluida_em = models.DateTimeField("Data de Conclusão", null=True, blank=True)
+    atualizada_em = models.DateTimeField(
+        "Última Atualização",
+        auto_now=True,
+        help_text='Avança a cada progresso gravado; tarefa parada há muito tempo teve a thread interrompida'
+    )
+
+    class Meta:
+        db_table = 'cadastros_tarefaimportacaoclientes'
+        verbose_name = 'Tarefa de Importação de Clientes'
+        verbose_name_plural = 'Tarefas de Importação de Clientes'
+        ordering = ['-criada_em']
+        indexes = [
+            models.Index(fields=['usuario', '-criada_em'], name='tarefa_import_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Importação #{self.id} - {self.usuario} - {self.get_status_display()}"
+
+    def get_progresso_percentual(self):
+        """Retorna o progresso em percentual (0-100)."""
+        if self.status == self.STATUS_CONCLUIDA:
+            return 100
+        if self.total_linhas == 0:
+            return 0
+        return min(99, int((self.processados / self.total_linhas) * 100))
+
+    def esta_concluida(self):
+        """Verifica se a tarefa está em um estado final."""
+        return self.status in [self.STATUS_CONCLUIDA, self.STATUS_ERRO]
+
+
 class AssinaturaCliente(models.Model):
     """
     Gerencia a assinatura ativa do cliente com controle de recursos.
@@ -1870,10 +2090,14 @@ class ContaDoAplicativo(models.Model):
 
     def save(self, *args, **kwargs):
         """Normaliza o identificador do dispositivo para formato MAC quando necessário."""
+        self.normalizar_device_id()
+        super().save(*args, **kwargs)
+
+    def normalizar_device_id(self):
+        """Converte ``device_id`` longo para o formato MAC (usado também antes de ``bulk_create``)."""
         if self.device_id and not len(self.device_id) <= 10:
             raw = re.sub(r'[^A-Fa-f0-9]', '', self.device_id).upper()
             self.device_id = ':'.join(raw[i:i+2] for i in range(0, len(raw), 2))
-        super().save(*args, **kwargs)
 
     class Meta:
         db_table = 'cadastros_contadoaplicativo'
@@ -3786,12 +4010,205 @@ class MensagemEnviadaWpp(models.Model):
         verbose_name_plural = "Mensagens Enviadas ao WhatsApp"
         indexes = [
             models.Index(fields=['usuario', 'telefone', 'tarefa', 'data_envio']),
+            # Cobre a pré-carga do controle de duplicidade (range por usuário/tarefa/período)
+            models.Index(fields=['usuario', 'tarefa', 'data_envio', 'telefone'], name='msg_wpp_dedup_periodo_idx'),
         ]
 
     def __str__(self) -> str:
         return self.telefone
 
 
+class FilaEnvioWpp(models.Model):
+    """
+    Fila persistente de envios WhatsApp processada pelo motor de envio.
+
+    Cada registro é um envio (texto ou imagem) para um contato ou grupo de uma sessão
+    WPPConnect. O worker intercala as sessões respeitando o intervalo anti-ban de cada
+    uma (``intervalo_min``/``intervalo_max`` = espera após este envio na mesma sessão).
+    Itens não enviados até ``valido_ate`` são descartados (mensagem obsoleta), assim como
+    itens com ``exige_envio_no_lote`` quando nenhum item anterior do mesmo ``lote`` foi enviado.
+    """
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_ENVIADO = 'enviado'
+    STATUS_FALHA = 'falha'
+    STATUS_DESCARTADO = 'descartado'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_ENVIADO, 'Enviado'),
+        (STATUS_FALHA, 'Falha'),
+        (STATUS_DESCARTADO, 'Descartado'),
+    ]
+
+    sessao = models.CharField("Sessão WPP", max_length=255, help_text="Nome da sessão no WPPConnect")
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    destino = models.CharField("Destino", max_length=100, help_text="Telefone ou ID do grupo")
+    is_group = models.BooleanField("Grupo", default=False)
+    mensagem = models.TextField("Mensagem", blank=True)
+    imagem_path = models.CharField(
+        "Imagem",
+        max_length=500,
+        blank=True,
+        help_text="Caminho da imagem a enviar (a mensagem vira legenda)"
+    )
+    tipo_envio = models.CharField("Tipo de envio", max_length=100)
+    cliente_nome = models.CharField("Cliente", max_length=255, blank=True)
+    origem = models.CharField("Origem", max_length=100, db_index=True, help_text="Função que enfileirou o envio")
+    intervalo_min = models.FloatField("Intervalo mínimo (seg)", default=30)
+    intervalo_max = models.FloatField("Intervalo máximo (seg)", default=60)
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+    http_status = models.IntegerField("HTTP status", null=True, blank=True)
+    erro = models.TextField("Erro", blank=True)
+    disponivel_em = models.DateTimeField("Disponível em", default=timezone.now)
+    valido_ate = models.DateTimeField(
+        "Válido até",
+        null=True,
+        blank=True,
+        help_text="Após esta data o envio é descartado sem ser enviado"
+    )
+    lote = models.CharField("Lote", max_length=64, blank=True, help_text="Agrupa envios relacionados (ex.: imagens e texto final de um grupo)")
+    exige_envio_no_lote = models.BooleanField(
+        "Exige envio no lote",
+        default=False,
+        help_text="Só envia se algum item anterior do mesmo lote foi enviado"
+    )
+    reservado_em = models.DateTimeField("Reservado em", null=True, blank=True)
+    processado_em = models.DateTimeField("Processado em", null=True, blank=True)
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+
+    class Meta:
+        db_table = 'cadastros_filaenviowpp'
+        verbose_name = "Envio WhatsApp na Fila"
+        verbose_name_plural = "Fila de Envios WhatsApp"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'sessao', 'id'], name='fila_wpp_status_sessao_idx'),
+            models.Index(fields=['usuario', 'status'], name='fila_wpp_usuario_status_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.sessao}] {self.tipo_envio} -> {self.destino} ({self.status})"
+
+
+class EventoWebhook(models.Model):
+    """
+    Fila persistente de eventos de webhook (WPPConnect e PIX) recebidos.
+
+    A view apenas grava o evento bruto e responde; o worker da fila processa os
+    eventos em ordem de chegada por ``chave_ordenacao`` (sessão WPP ou transação PIX).
+    ``evento_id`` identifica o evento na origem e impede o reprocessamento de reenvios.
+    """
+
+    ORIGEM_WPPCONNECT = 'wppconnect'
+    ORIGEM_PIX = 'pix'
+
+    ORIGEM_CHOICES = [
+        (ORIGEM_WPPCONNECT, 'WPPConnect'),
+        (ORIGEM_PIX, 'Pagamento PIX'),
+    ]
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_PROCESSADO = 'processado'
+    STATUS_IGNORADO = 'ignorado'
+    STATUS_FALHA = 'falha'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_PROCESSADO, 'Processado'),
+        (STATUS_IGNORADO, 'Ignorado'),
+        (STATUS_FALHA, 'Falha'),
+    ]
+
+    origem = models.CharField("Origem", max_length=20, choices=ORIGEM_CHOICES)
+    evento_id = models.CharField("ID do evento", max_length=128, help_text="Identificador do evento na origem (deduplicação)")
+    tipo = models.CharField("Tipo", max_length=100, blank=True)
+    chave_ordenacao = models.CharField(
+        "Chave de ordenação",
+        max_length=255,
+        blank=True,
+        help_text="Eventos com a mesma chave são processados um de cada vez, em ordem de chegada"
+    )
+    payload = models.JSONField("Payload", default=dict)
+    headers = models.JSONField("Headers", default=dict, blank=True)
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+    erro = models.TextField("Erro", blank=True)
+    disponivel_em = models.DateTimeField("Disponível em", default=timezone.now)
+    reservado_em = models.DateTimeField("Reservado em", null=True, blank=True)
+    processado_em = models.DateTimeField("Processado em", null=True, blank=True)
+    recebido_em = models.DateTimeField("Recebido em", auto_now_add=True)
+
+    class Meta:
+        db_table = 'cadastros_eventowebhook'
+        verbose_name = "Evento de Webhook"
+        verbose_name_plural = "Eventos de Webhook"
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['origem', 'evento_id'], name='evento_webhook_origem_id_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'chave_ordenacao', 'id'], name='evento_wh_status_chave_idx'),
+            models.Index(fields=['origem', 'tipo', 'chave_ordenacao', 'processado_em'], name='evento_wh_tipo_chave_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.origem}] {self.tipo} {self.chave_ordenacao} ({self.status})"
+
+
+class FilaSincronizacaoLid(models.Model):
+    """
+    Fila persistente de LIDs do WhatsApp a resolver (LID -> telefone -> cliente).
+
+    Compartilhada entre os processos: ``lid`` é único (deduplicação) e o limite de
+    consultas à API é contado pelos registros consultados recentemente.
+    """
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_RESOLVIDO = 'resolvido'
+    STATUS_SEM_CLIENTE = 'sem_cliente'
+    STATUS_FALHA = 'falha'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_RESOLVIDO, 'Resolvido'),
+        (STATUS_SEM_CLIENTE, 'Sem cliente'),
+        (STATUS_FALHA, 'Falha'),
+    ]
+
+    lid = models.CharField("LID", max_length=50, unique=True)
+    sessao = models.CharField("Sessão", max_length=255)
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    telefone = models.CharField("Telefone", max_length=30, blank=True)
+    cliente = models.ForeignKey('Cliente', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+    erro = models.CharField("Erro", max_length=255, blank=True)
+    disponivel_em = models.DateTimeField("Disponível em", default=timezone.now)
+    consultado_em = models.DateTimeField("Consultado em", null=True, blank=True)
+    processado_em = models.DateTimeField("Processado em", null=True, blank=True)
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+
+    class Meta:
+        db_table = 'cadastros_filasincronizacaolid'
+        verbose_name = "LID em Sincronização"
+        verbose_name_plural = "Fila de Sincronização de LIDs"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'disponivel_em'], name='fila_lid_status_disp_idx'),
+            models.Index(fields=['consultado_em'], name='fila_lid_consultado_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.lid} ({self.status})"
+
+
 class ConteudoM3U8(models.Model):
     """Modela os conteúdos processados a partir de arquivos M3U8 (filmes, séries etc)."""
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -3838,6 +4255,39 @@ class DominiosDNS(models.Model):
         return self.dominio
 
 
+class MedicaoDominioDNS(models.Model):
+    """
+    Série temporal das verificações de um domínio DNS (uma linha por verificação).
+
+    Guarda o resultado e os percentis de latência das tentativas bem-sucedidas,
+    permitindo acompanhar degradação antes de o domínio ficar offline.
+    """
+    dominio = models.ForeignKey(DominiosDNS, on_delete=models.CASCADE, related_name='medicoes')
+    verificado_em = models.DateTimeField(default=timezone.now)
+    online = models.BooleanField()
+    tentativas_realizadas = models.PositiveSmallIntegerField(default=0)
+    tentativas_ok = models.PositiveSmallIntegerField(default=0)
+    latencia_min_ms = models.FloatField(null=True, blank=True)
+    latencia_p50_ms = models.FloatField(null=True, blank=True)
+    latencia_p90_ms = models.FloatField(null=True, blank=True)
+    latencia_p95_ms = models.FloatField(null=True, blank=True)
+    latencia_max_ms = models.FloatField(null=True, blank=True)
+    duracao_total_s = models.FloatField(default=0)
+    status_codes = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        db_table = 'cadastros_medicaodominiodns'
+        verbose_name = "Medição de Domínio DNS"
+        verbose_name_plural = "Medições de Domínios DNS"
+        ordering = ['-verificado_em']
+        indexes = [
+            models.Index(fields=['dominio', '-verificado_em'], name='medicao_dns_dom_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dominio_id} @ {self.verificado_em:%d/%m %H:%M} ({'online' if self.online else 'offline'})"
+
+
 class TelefoneLeads(models.Model):
     """Modela os números de telefone coletados como leads para futuras campanhas."""
     telefone = models.CharField(max_length=20, unique=True)
@@ -4183,6 +4633,12 @@ class ContaReseller(models.Model):
         auto_now=True,
         verbose_name='Última Atualização'
     )
+    indice_atualizado_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Índice de Dispositivos Atualizado em',
+        help_text='Última varredura completa de dispositivos/playlists no painel reseller'
+    )
 
     class Meta:
         db_table = 'cadastros_contareseller'
@@ -4198,6 +4654,61 @@ class ContaReseller(models.Model):
         return f"{self.usuario.username} - {self.aplicativo.nome} ({self.email_login})"
 
 
+class DispositivoReseller(models.Model):
+    """
+    Índice local dos dispositivos e playlists de uma conta reseller.
+
+    Preenchido pela varredura do painel (``services/indice_reseller.py``) e reaproveitado
+    pela listagem de domínios e pela migração DNS enquanto a conta estiver dentro do TTL.
+    ``assinatura`` guarda o hash do registro bruto do dispositivo: na atualização incremental
+    só têm as playlists consultadas de novo os dispositivos novos, alterados ou expirados.
+    """
+
+    conta_reseller = models.ForeignKey(
+        ContaReseller,
+        on_delete=models.CASCADE,
+        related_name='dispositivos_indexados',
+        help_text='Conta reseller à qual o dispositivo pertence'
+    )
+    device_id = models.CharField(
+        max_length=64,
+        verbose_name='ID no Painel',
+        help_text='ID numérico do dispositivo na API do painel'
+    )
+    mac = models.CharField(max_length=100, blank=True, db_index=True, verbose_name='MAC')
+    nome_dispositivo = models.CharField(max_length=255, blank=True, verbose_name='Nome do Dispositivo')
+    assinatura = models.CharField(
+        max_length=40,
+        blank=True,
+        verbose_name='Assinatura',
+        help_text='SHA-1 do registro bruto do dispositivo (detecta alterações)'
+    )
+    playlists = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='Playlists',
+        help_text='Playlists com id, name, url, dominio, is_selected e deviceId'
+    )
+    playlists_atualizadas_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Playlists Atualizadas em',
+        help_text='Nulo quando as playlists precisam ser consultadas novamente'
+    )
+    visto_em = models.DateTimeField(verbose_name='Visto em')
+
+    class Meta:
+        db_table = 'cadastros_dispositivoreseller'
+        verbose_name = 'Dispositivo Indexado (Reseller)'
+        verbose_name_plural = 'Dispositivos Indexados (Reseller)'
+        constraints = [
+            models.UniqueConstraint(fields=['conta_reseller', 'device_id'], name='dispositivo_reseller_conta_device_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.mac or self.device_id} - {self.nome_dispositivo}"
+
+
 class TarefaMigracaoDNS(models.Model):
     """
     Registra execuções de migração de domínios DNS para dispositivos IPTV.
@@ -5312,6 +5823,66 @@ class VarianteMensagem(models.Model):
         return round((self.total_envios / total_tarefa) * 100, 1)
 
 
+class ParafraseMensagem(models.Model):
+    """
+    Pool de paráfrases pré-geradas de um texto de envio (TarefaEnvio ou template).
+
+    Gerado uma vez por texto (identificado pelo hash do texto original); cada envio
+    sorteia uma paráfrase do pool em vez de consultar o ChatGPT por destinatário.
+    Alterar o texto gera um novo hash e, portanto, um novo pool.
+    """
+    GERADOR_CHATGPT = 'chatgpt'
+    GERADOR_STUB = 'stub'
+    GERADOR_CHOICES = [
+        (GERADOR_CHATGPT, 'ChatGPT'),
+        (GERADOR_STUB, 'Stub (offline)'),
+    ]
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='parafrases_mensagem',
+        verbose_name='Usuário'
+    )
+    tarefa = models.ForeignKey(
+        TarefaEnvio,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='parafrases',
+        verbose_name='Tarefa'
+    )
+    hash_origem = models.CharField(
+        max_length=64,
+        verbose_name='Hash do Texto Original',
+        help_text='SHA-256 do texto original que gerou o pool'
+    )
+    indice = models.PositiveSmallIntegerField(verbose_name='Índice no Pool')
+    texto = models.TextField(verbose_name='Paráfrase')
+    gerador = models.CharField(
+        max_length=20,
+        choices=GERADOR_CHOICES,
+        default=GERADOR_CHATGPT,
+        verbose_name='Gerador'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado Em')
+
+    class Meta:
+        db_table = 'cadastros_parafrasemensagem'
+        verbose_name = 'Paráfrase de Mensagem'
+        verbose_name_plural = 'Paráfrases de Mensagem'
+        ordering = ['usuario', 'hash_origem', 'indice']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'hash_origem', 'indice'],
+                name='parafrase_usuario_hash_indice_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario} - {self.hash_origem[:8]} #{self.indice}"
+
+
 class ConfiguracaoAgendamento(models.Model):
     """
     Configuração centralizada de agendamentos do sistema.
@@ -0,0 +1,195 @@
+"""
+Backup online do banco SQLite (substitui o ``cp -f`` do antigo backup_db.sh).
+
+Usa a API de backup online do sqlite3: as páginas são copiadas em passos pequenos a
+partir de uma conexão somente leitura, sem bloquear os processos que escrevem no banco
+(Django e threads do scheduler). Se escritas concorrentes reiniciarem a cópia mais de
+``MAX_REINICIOS`` vezes, ela é refeita em um único passo. A cópia é gravada em um arquivo temporário, validada
+com ``PRAGMA integrity_check`` e só então renomeada para a geração final; as gerações
+mais antigas além de ``BACKUP_DB_GERACOES`` são removidas.
+
+Uso:
+    from nossopainel.services.backup_sqlite import executar_backup_sqlite
+
+    resultado = executar_backup_sqlite()
+    resultado["duracao"], resultado["bytes_copiados"], resultado["arquivo"]
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DIR_BACKUP_DB = os.getenv("DIR_BACKUP_DB", "/home/django/database")
+BACKUP_DB_GERACOES = int(os.getenv("BACKUP_DB_GERACOES", "24"))  # job de hora em hora: 1 dia
+PAGINAS_POR_PASSO = 256  # ~1MB por passo com páginas de 4KB
+PAUSA_ENTRE_PASSOS = 0.005  # cede o banco aos escritores entre os passos (segundos)
+# Escritas de outras conexões reiniciam a cópia incremental; após este limite, a cópia
+# é refeita em um único passo (leitura consistente e curta, sem pausas)
+MAX_REINICIOS = 3
+PREFIXO_ARQUIVO = "db-"
+SUFIXO_ARQUIVO = ".sqlite3"
+
+
+class BackupError(Exception):
+    """Falha na cópia ou na verificação de integridade do backup."""
+
+
+class _ReiniciosExcedidos(Exception):
+    """Interrompe a cópia incremental que não converge por causa de escritas concorrentes."""
+
+
+def caminho_banco_padrao() -> Optional[str]:
+    """Caminho do banco SQLite configurado (None quando o banco padrão não é SQLite)."""
+    banco = settings.DATABASES["default"]
+    if banco["ENGINE"] != "django.db.backends.sqlite3":
+        return None
+    return str(banco["NAME"])
+
+
+def verificar_integridade(caminho: str) -> str:
+    """
+    Executa ``PRAGMA integrity_check`` no arquivo.
+
+    Returns:
+        str: "ok" quando íntegro; senão, as mensagens retornadas pelo SQLite.
+    """
+    conexao = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    try:
+        linhas = conexao.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conexao.close()
+    return "; ".join(str(linha[0]) for linha in linhas)
+
+
+def listar_geracoes(destino: str) -> List[str]:
+    """Backups existentes no diretório, do mais antigo para o mais recente."""
+    return sorted(glob.glob(os.path.join(destino, f"{PREFIXO_ARQUIVO}*{SUFIXO_ARQUIVO}")))
+
+
+def rotacionar_geracoes(destino: str, manter: int) -> List[str]:
+    """Remove as gerações mais antigas além de ``manter``. Retorna os arquivos removidos."""
+    geracoes = listar_geracoes(destino)
+    removidos = geracoes[:-manter] if manter > 0 else []
+    for arquivo in removidos:
+        try:
+            os.remove(arquivo)
+        except OSError as exc:
+            logger.warning("Falha ao remover geração antiga de backup | arquivo=%s erro=%s", arquivo, exc)
+    return removidos
+
+
+def executar_backup_sqlite(
+    origem: Optional[str] = None,
+    destino: Optional[str] = None,
+    manter: int = BACKUP_DB_GERACOES,
+    paginas_por_passo: int = PAGINAS_POR_PASSO,
+) -> dict:
+    """
+    Copia o banco com a API de backup online, valida e rotaciona as gerações.
+
+    Args:
+        origem: Arquivo SQLite de origem (padrão: banco ``default`` do Django).
+        destino: Diretório das gerações (padrão: ``DIR_BACKUP_DB``).
+        manter: Quantidade de gerações mantidas.
+        paginas_por_passo: Páginas copiadas por passo de ``sqlite3.Connection.backup``.
+
+    Returns:
+        dict: arquivo, duracao (s), bytes_copiados, paginas, passos, reinicios, modo
+        ("incremental" ou "passo_unico"), integridade e removidos.
+
+    Raises:
+        BackupError: Banco não é SQLite, cópia falhou ou a verificação de integridade não retornou "ok".
+    """
+    origem = origem or caminho_banco_padrao()
+    if not origem:
+        raise BackupError("Banco padrão não é SQLite; backup online não se aplica.")
+    if not os.path.exists(origem):
+        raise BackupError(f"Banco de origem não encontrado: {origem}")
+
+    destino = destino or DIR_BACKUP_DB
+    Path(destino).mkdir(parents=True, exist_ok=True)
+    nome = f"{PREFIXO_ARQUIVO}{timezone.localtime().strftime('%Y%m%d-%H%M%S')}{SUFIXO_ARQUIVO}"
+    arquivo = os.path.join(destino, nome)
+    temporario = f"{arquivo}.parcial"
+
+    passos = {"total": 0, "reinicios": 0, "restantes": None}
+
+    def progresso(status, restantes, total):
+        passos["total"] += 1
+        if passos["restantes"] is not None and restantes > passos["restantes"]:
+            # A origem foi alterada por outra conexão e o SQLite recomeçou a cópia
+            passos["reinicios"] += 1
+            if passos["reinicios"] > MAX_REINICIOS:
+                raise _ReiniciosExcedidos()
+        passos["restantes"] = restantes
+        if restantes:
+            # Pausa curta entre os passos para não monopolizar o banco de origem
+            time.sleep(PAUSA_ENTRE_PASSOS)
+
+    inicio = time.monotonic()
+    modo = "incremental"
+    conexao_origem = sqlite3.connect(f"file:{origem}?mode=ro", uri=True, timeout=30)
+    conexao_destino = sqlite3.connect(temporario)
+    try:
+        try:
+            conexao_origem.backup(conexao_destino, pages=paginas_por_passo, progress=progresso)
+        except _ReiniciosExcedidos:
+            modo = "passo_unico"
+            logger.warning(
+                "Backup incremental reiniciado %d vezes por escritas concorrentes - copiando em passo único",
+                passos["reinicios"] - 1,
+            )
+            conexao_origem.backup(conexao_destino, pages=-1)
+        paginas = conexao_destino.execute("PRAGMA page_count").fetchone()[0]
+        tamanho_pagina = conexao_destino.execute("PRAGMA page_size").fetchone()[0]
+    except sqlite3.Error as exc:
+        conexao_destino.close()
+        _remover(temporario)
+        raise BackupError(f"Falha na cópia do banco: {exc}") from exc
+    finally:
+        conexao_origem.close()
+    conexao_destino.close()
+
+    integridade = verificar_integridade(temporario)
+    if integridade != "ok":
+        _remover(temporario)
+        raise BackupError(f"Backup reprovado no integrity_check: {integridade[:500]}")
+
+    os.replace(temporario, arquivo)
+    duracao = time.monotonic() - inicio
+    removidos = rotacionar_geracoes(destino, manter)
+
+    resultado = {
+        "arquivo": arquivo,
+        "duracao": round(duracao, 3),
+        "bytes_copiados": paginas * tamanho_pagina,
+        "paginas": paginas,
+        "passos": passos["total"],
+        "reinicios": passos["reinicios"],
+        "modo": modo,
+        "integridade": integridade,
+        "removidos": removidos,
+    }
+    logger.info(
+        "Backup do DB realizado | arquivo=%s modo=%s bytes=%d paginas=%d passos=%d reinicios=%d duracao=%.3fs removidos=%d",
+        arquivo, modo, resultado["bytes_copiados"], paginas, passos["total"], passos["reinicios"], duracao, len(removidos),
+    )
+    return resultado
+
+
+def _remover(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
@@ -0,0 +1,195 @@
+"""
+Clientes HTTP compartilhados (pool de conexões com keep-alive, retry e métricas de latência).
+
+Cada integração obtém um cliente nomeado do registro do processo. O cliente mantém uma
+``requests.Session`` com pool de conexões por host (reaproveitando conexões TCP/TLS entre
+chamadas e threads), repete automaticamente falhas de conexão e respostas transitórias
+(com backoff exponencial; métodos não idempotentes só são repetidos quando a requisição
+nem chegou a ser enviada) e registra um histograma de latência por endpoint. Timeouts de
+leitura não são repetidos por padrão (``retries_leitura=0``): o servidor pode já ter
+processado a requisição e cada repetição somaria mais um ``timeout`` à espera.
+
+Uso:
+    from nossopainel.services.clientes_http import obter_cliente
+
+    response = obter_cliente("fastdepix").request("GET", url, headers=headers, timeout=30)
+    obter_cliente("fastdepix").metricas()
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Padrões (podem ser sobrescritos ao registrar o cliente)
+RETRIES_PADRAO = 2
+BACKOFF_PADRAO = 0.5  # segundos: 0.5, 1.0, 2.0...
+STATUS_RETRY_PADRAO = (429, 502, 503, 504)
+POOL_MAXSIZE_PADRAO = 20  # conexões mantidas por host
+
+# Limites superiores (ms) dos buckets do histograma de latência
+BUCKETS_LATENCIA_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_SEGMENTO_VARIAVEL = re.compile(r"\d|@|^[0-9a-f]{8}-[0-9a-f-]{27}$", re.IGNORECASE)
+
+
+def rotulo_por_caminho(url: str) -> str:
+    """Rótulo do endpoint a partir do caminho da URL, trocando segmentos variáveis por ``{id}``."""
+    caminho = urlsplit(url).path.strip("/")
+    segmentos = ["{id}" if _SEGMENTO_VARIAVEL.search(s) else s for s in caminho.split("/") if s]
+    return "/" + "/".join(segmentos)
+
+
+class HistogramaLatencia:
+    """Contagem de requisições por faixa de latência, com soma e máximo (thread-safe)."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_LATENCIA_MS) + 1)
+        self.total = 0
+        self.erros = 0
+        self.soma_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, duracao_ms: float, erro: bool = False) -> None:
+        with self._lock:
+            self.buckets[bisect_left(BUCKETS_LATENCIA_MS, duracao_ms)] += 1
+            self.total += 1
+            self.erros += int(erro)
+            self.soma_ms += duracao_ms
+            self.max_ms = max(self.max_ms, duracao_ms)
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Limite superior (ms) do bucket que contém o percentil ``p`` (0-100)."""
+        with self._lock:
+            if not self.total:
+                return None
+            alvo = p / 100 * self.total
+            acumulado = 0
+            for limite, quantidade in zip(BUCKETS_LATENCIA_MS + (self.max_ms,), self.buckets):
+                acumulado += quantidade
+                if acumulado >= alvo:
+                    return float(limite)
+            return self.max_ms
+
+    def resumo(self) -> Dict:
+        with self._lock:
+            buckets = {f"<={limite}ms": qtd for limite, qtd in zip(BUCKETS_LATENCIA_MS, self.buckets)}
+            buckets[f">{BUCKETS_LATENCIA_MS[-1]}ms"] = self.buckets[-1]
+            total, erros, soma, maximo = self.total, self.erros, self.soma_ms, self.max_ms
+        return {
+            "total": total,
+            "erros": erros,
+            "media_ms": round(soma / total, 1) if total else None,
+            "p50_ms": self.percentil(50),
+            "p95_ms": self.percentil(95),
+            "max_ms": round(maximo, 1),
+            "buckets": buckets,
+        }
+
+
+class ClienteHTTP:
+    """
+    Cliente HTTP com pool de conexões, retry com backoff e histograma por endpoint.
+
+    A ``requests.Session`` é compartilhada entre threads: o pool do urllib3 é
+    thread-safe e os clientes não dependem de cookies de sessão.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        retries: int = RETRIES_PADRAO,
+        retries_leitura: int = 0,
+        backoff: float = BACKOFF_PADRAO,
+        status_retry=STATUS_RETRY_PADRAO,
+        pool_maxsize: int = POOL_MAXSIZE_PADRAO,
+        rotulador: Optional[Callable[[str], str]] = None,
+    ):
+        self.nome = nome
+        self.rotulador = rotulador or rotulo_por_caminho
+        self._histogramas: Dict[str, HistogramaLatencia] = {}
+        self._histogramas_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries_leitura,  # opt-in: leitura expirada pode já ter sido processada
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=status_retry,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # POST só é repetido em falha de conexão
+            raise_on_status=False,  # após esgotar, devolve a última resposta (tratada pelo chamador)
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _histograma(self, rotulo: str) -> HistogramaLatencia:
+        with self._histogramas_lock:
+            histograma = self._histogramas.get(rotulo)
+            if histograma is None:
+                histograma = self._histogramas[rotulo] = HistogramaLatencia()
+            return histograma
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Executa a requisição (mesmos argumentos de ``requests.request``).
+
+        Args:
+            endpoint: Rótulo do histograma; por padrão derivado do caminho da URL.
+        """
+        rotulo = f"{method.upper()} {endpoint or self.rotulador(url)}"
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            erro = response.status_code >= 500
+            return response
+        finally:
+            self._histograma(rotulo).registrar((time.perf_counter() - inicio) * 1000, erro=erro)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def metricas(self) -> Dict[str, Dict]:
+        """Resumo do histograma de latência de cada endpoint."""
+        with self._histogramas_lock:
+            histogramas = dict(self._histogramas)
+        return {rotulo: histograma.resumo() for rotulo, histograma in sorted(histogramas.items())}
+
+
+_clientes: Dict[str, ClienteHTTP] = {}
+_clientes_lock = threading.Lock()
+
+
+def obter_cliente(nome: str, **config) -> ClienteHTTP:
+    """
+    Cliente único por ``nome`` no processo; ``config`` (retries, retries_leitura, backoff,
+    status_retry, pool_maxsize, rotulador) só é aplicada na primeira chamada.
+    """
+    with _clientes_lock:
+        cliente = _clientes.get(nome)
+        if cliente is None:
+            cliente = _clientes[nome] = ClienteHTTP(nome, **config)
+        return cliente
+
+
+def metricas_clientes() -> Dict[str, Dict]:
+    """Histogramas de latência de todos os clientes registrados no processo."""
+    with _clientes_lock:
+        clientes = dict(_clientes)
+    return {nome: cliente.metricas() for nome, cliente in clientes.items()}
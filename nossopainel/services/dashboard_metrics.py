@@ -0,0 +1,574 @@
+"""
+Snapshot materializado das métricas do dashboard (``DashboardMetrics``).
+
+O dashboard lia ~12 agregações sobre ``Cliente``/``Mensalidade`` a cada requisição, com
+custo proporcional à base do dono. Agora as métricas ficam em uma linha por dono:
+
+- leitura: uma consulta ao snapshot; se ausente, desatualizado ou de outro dia, as
+  métricas são recalculadas ao vivo e gravadas (o resultado do cálculo vira o cache);
+- escrita: os signals de ``Mensalidade``, ``Cliente`` e ``ClientePlanoHistorico``
+  capturam o estado do registro antes e depois do save/delete e aplicam no snapshot
+  apenas a diferença da contribuição daquele registro (``aplicar_delta_*``), como
+  ``PatrimonioMensal`` faz com os períodos do histórico.
+
+O recálculo completo fica restrito à virada do dia (``valor_total_receber_qtd`` e
+``clientes_em_atraso`` dependem da data), ao primeiro acesso do dono e às alterações
+de ``Plano`` (renomear ou mudar telas afeta todos os clientes do plano de uma vez,
+então o snapshot é marcado como desatualizado). ``queryset.update()`` e
+``bulk_create`` não disparam signals: o snapshot se corrige na próxima virada do dia.
+
+Uso:
+    from nossopainel.services.dashboard_metrics import obter_metricas_dashboard
+
+    metricas = obter_metricas_dashboard(owner)
+    metricas["clientes_em_atraso"]
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, ExtractYear, Trim, Upper
+from django.utils import timezone
+
+from nossopainel.models import (
+    Cliente,
+    ClientePlanoHistorico,
+    ContaBancaria,
+    DashboardMetrics,
+    Mensalidade,
+    Plano,
+    PlanoLinkPagamento,
+)
+
+logger = logging.getLogger(__name__)
+
+ORDEM_PLANOS = ['MENSAL', 'TRIMESTRAL', 'SEMESTRAL', 'ANUAL']
+LABEL_PLANOS = {'MENSAL': 'Mensal', 'TRIMESTRAL': 'Trimestral', 'SEMESTRAL': 'Semestral', 'ANUAL': 'Anual'}
+
+
+def calcular_metricas_dashboard(owner, hoje: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Calcula ao vivo as métricas agregadas do dashboard de um dono.
+
+    Args:
+        owner: Usuário dono dos dados.
+        hoje: Data de referência (padrão: data local atual).
+
+    Returns:
+        dict: Métricas serializáveis em JSON (valores monetários como ``Decimal``).
+    """
+    hoje = hoje or timezone.localdate()
+    ano_atual, mes_atual = hoje.year, hoje.month
+
+    clientes_em_atraso = Cliente.objects.filter(
+        cancelado=False,
+        mensalidade__cancelado=False,
+        mensalidade__dt_pagamento=None,
+        mensalidade__pgto=False,
+        mensalidade__dt_vencimento__lt=hoje,
+        usuario=owner,
+    ).count()
+
+    pagas_mes = Mensalidade.objects.filter(
+        cancelado=False,
+        dt_pagamento__year=ano_atual,
+        dt_pagamento__month=mes_atual,
+        usuario=owner,
+        pgto=True,
+    ).aggregate(valor_total=Sum("valor"), qtd=Count("id"))
+
+    receber_mes = Mensalidade.objects.filter(
+        cancelado=False,
+        dt_vencimento__year=ano_atual,
+        dt_vencimento__month=mes_atual,
+        usuario=owner,
+        pgto=False,
+    ).aggregate(valor_total=Sum("valor"))
+
+    total_receber_qtd = Mensalidade.objects.filter(
+        cancelado=False,
+        dt_vencimento__year=ano_atual,
+        dt_vencimento__month=mes_atual,
+        dt_vencimento__day__gte=hoje.day,
+        usuario=owner,
+        pgto=False,
+    ).count()
+
+    novos_clientes_qtd = Cliente.objects.filter(
+        cancelado=False,
+        data_adesao__year=ano_atual,
+        data_adesao__month=mes_atual,
+        usuario=owner,
+    ).count()
+
+    clientes_cancelados_qtd = Cliente.objects.filter(
+        cancelado=True,
+        data_cancelamento__year=ano_atual,
+        data_cancelamento__month=mes_atual,
+        usuario=owner,
+    ).count()
+
+    clientes_reativados_qtd = ClientePlanoHistorico.objects.filter(
+        usuario=owner,
+        motivo=ClientePlanoHistorico.MOTIVO_REACTIVATE,
+        inicio__year=ano_atual,
+        inicio__month=mes_atual,
+        cliente__cancelado=False,
+    ).values('cliente').distinct().count()
+
+    anos_adesao = list(
+        Cliente.objects.filter(usuario=owner)
+        .annotate(ano=ExtractYear('data_adesao'))
+        .values_list('ano', flat=True)
+        .distinct()
+        .order_by('-ano')
+    )
+
+    planos_adesao = (
+        Cliente.objects
+        .filter(usuario=owner, cancelado=False)
+        .annotate(nome_norm=Upper(Trim(F('plano__nome'))))
+        .values('nome_norm')
+        .annotate(qtd_adesoes=Count('id'))
+        .order_by('nome_norm')
+    )
+    planos_cadastrados_norm = set(
+        Plano.objects.filter(usuario=owner)
+        .annotate(nome_norm=Upper(Trim(F('nome'))))
+        .values_list('nome_norm', flat=True)
+        .distinct()
+    )
+    contagens = {row['nome_norm']: int(row['qtd_adesoes']) for row in planos_adesao}
+    planos_ordenados_norm = sorted(
+        planos_cadastrados_norm,
+        key=lambda n: (ORDEM_PLANOS.index(n) if n in ORDEM_PLANOS else len(ORDEM_PLANOS), n)
+    )
+
+    total_telas = (
+        Cliente.objects
+        .filter(usuario=owner, cancelado=False, plano__usuario=owner)
+        .aggregate(total=Coalesce(Sum("plano__telas"), 0))["total"]
+    )
+
+    clientes_sem_forma_pgto = Cliente.objects.filter(
+        usuario=owner,
+        cancelado=False,
+        forma_pgto__isnull=True
+    ).count()
+
+    return {
+        "clientes_em_atraso": clientes_em_atraso,
+        "valor_total_pago": pagas_mes["valor_total"] or Decimal("0"),
+        "valor_total_pago_qtd": pagas_mes["qtd"],
+        "valor_total_receber": receber_mes["valor_total"] or Decimal("0"),
+        "valor_total_receber_qtd": total_receber_qtd,
+        "novos_clientes_qtd": novos_clientes_qtd,
+        "clientes_cancelados_qtd": clientes_cancelados_qtd,
+        "clientes_reativados_qtd": clientes_reativados_qtd,
+        "clientes_sem_forma_pgto": clientes_sem_forma_pgto,
+        "total_telas_ativas": int(total_telas),
+        "anos_adesao": anos_adesao,
+        "planos_adesao": [[nome, contagens.get(nome, 0)] for nome in planos_ordenados_norm],
+    }
+
+
+def recalcular_metricas_dashboard(owner, hoje: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Recalcula e grava o snapshot do dono.
+
+    Todo delta aplicado (ou descartado, com o snapshot inválido) avança ``atualizado_em``.
+    A gravação só acontece se ``atualizado_em`` não mudou durante o cálculo; caso
+    contrário um save concorrente pode ter ficado fora da contagem, então o snapshot
+    continua desatualizado e o próximo acesso recalcula de novo.
+
+    Returns:
+        dict: Métricas recém-calculadas.
+    """
+    hoje = hoje or timezone.localdate()
+    snapshot, _ = DashboardMetrics.objects.get_or_create(
+        usuario=owner, defaults={'data_referencia': hoje, 'desatualizado': True}
+    )
+    marca = snapshot.atualizado_em
+
+    dados = calcular_metricas_dashboard(owner, hoje)
+
+    gravados = DashboardMetrics.objects.filter(usuario=owner, atualizado_em=marca).update(
+        dados=dados, data_referencia=hoje, desatualizado=False, atualizado_em=timezone.now()
+    )
+    if not gravados:
+        logger.info(
+            "Snapshot do dashboard alterado durante o recálculo | usuario=%s",
+            getattr(owner, 'pk', owner)
+        )
+
+    return dados
+
+
+def obter_metricas_dashboard(owner, hoje: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Retorna as métricas do dashboard lendo o snapshot em uma única consulta.
+
+    Recai no cálculo ao vivo (gravando o resultado) quando o snapshot não existe,
+    foi marcado como desatualizado ou é de outro dia.
+
+    Args:
+        owner: Usuário dono dos dados.
+        hoje: Data de referência (padrão: data local atual).
+
+    Returns:
+        dict: Métricas do dashboard. Valores monetários como ``Decimal``.
+    """
+    hoje = hoje or timezone.localdate()
+    snapshot = DashboardMetrics.objects.filter(usuario=owner).only(
+        'data_referencia', 'desatualizado', 'dados'
+    ).first()
+
+    if snapshot and snapshot.valido_para(hoje):
+        dados = dict(snapshot.dados)
+    else:
+        try:
+            dados = recalcular_metricas_dashboard(owner, hoje)
+        except Exception as exc:
+            logger.exception(
+                "Falha ao gravar snapshot do dashboard | usuario=%s erro=%s",
+                getattr(owner, 'pk', owner), exc
+            )
+            dados = calcular_metricas_dashboard(owner, hoje)
+
+    dados["valor_total_pago"] = Decimal(str(dados["valor_total_pago"]))
+    dados["valor_total_receber"] = Decimal(str(dados["valor_total_receber"]))
+    return dados
+
+
+def montar_planos_resumo(planos_adesao: List[List[Any]], total_clientes: int) -> List[Dict[str, Any]]:
+    """
+    Monta o resumo de adesões por plano usado no card do dashboard.
+
+    Args:
+        planos_adesao: Pares ``[nome_normalizado, qtd]`` do snapshot.
+        total_clientes: Total de clientes da listagem (base do percentual).
+
+    Returns:
+        list[dict]: Itens com ``nome``, ``qtd`` e ``pct``.
+    """
+    total = int(total_clientes) if total_clientes else 0
+    resumo = []
+    for nome_norm, qtd in planos_adesao:
+        pct = (qtd / total * 100) if total else 0
+        resumo.append({'nome': LABEL_PLANOS.get(nome_norm, nome_norm.title()), 'qtd': qtd, 'pct': pct})
+    return resumo
+
+
+def invalidar_metricas_dashboard(*usuario_ids: Optional[int]) -> None:
+    """Marca o snapshot do dono como desatualizado (recalculado no próximo acesso)."""
+    ids = [uid for uid in usuario_ids if uid]
+    if ids:
+        DashboardMetrics.objects.filter(usuario_id__in=ids).update(
+            desatualizado=True, atualizado_em=timezone.now()
+        )
+
+
+
+# ============================================================================
+# DELTAS POR EVENTO (signals de Mensalidade, Cliente e ClientePlanoHistorico)
+# ============================================================================
+
+def _no_mes(data: Optional[date], hoje: date) -> bool:
+    return data is not None and data.year == hoje.year and data.month == hoje.month
+
+
+def estado_mensalidade(pk: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Campos da mensalidade (e do cliente) que entram nas métricas, lidos do banco."""
+    if not pk:
+        return None
+    return Mensalidade.objects.filter(pk=pk).values(
+        'usuario_id', 'valor', 'pgto', 'cancelado', 'dt_pagamento', 'dt_vencimento',
+        'cliente_id', 'cliente__usuario_id', 'cliente__cancelado',
+    ).first()
+
+
+def estado_cliente(pk: Optional[int]) -> Optional[Dict[str, Any]]:
+    """Campos do cliente (e do plano) que entram nas métricas, lidos do banco."""
+    if not pk:
+        return None
+    return Cliente.objects.filter(pk=pk).annotate(
+        plano_nome_norm=Upper(Trim(F('plano__nome')))
+    ).values(
+        'usuario_id', 'cancelado', 'data_adesao', 'data_cancelamento', 'forma_pgto_id',
+        'plano_nome_norm', 'plano__telas', 'plano__usuario_id',
+    ).first()
+
+
+def pares_reativacao(historico, hoje: Optional[date] = None) -> set:
+    """
+    Pares ``(usuario_id, cliente_id)`` cuja contagem de reativados pode mudar com o registro.
+
+    Considera os valores em memória e os gravados (troca de motivo/início/cliente).
+    Registros que não são reativação do mês atual não afetam a métrica.
+    """
+    hoje = hoje or timezone.localdate()
+    registros = [(historico.usuario_id, historico.cliente_id, historico.motivo, historico.inicio)]
+    if historico.pk:
+        registros += list(
+            ClientePlanoHistorico.objects.filter(pk=historico.pk)
+            .values_list('usuario_id', 'cliente_id', 'motivo', 'inicio')
+        )
+    return {
+        (usuario_id, cliente_id)
+        for usuario_id, cliente_id, motivo, inicio in registros
+        if motivo == ClientePlanoHistorico.MOTIVO_REACTIVATE and _no_mes(inicio, hoje)
+    }
+
+
+def estado_reativacoes(pares, hoje: Optional[date] = None) -> Dict[tuple, int]:
+    """
+    Indica, para cada par ``(usuario_id, cliente_id)``, se o cliente conta como reativado no mês.
+
+    Args:
+        pares: Pares ``(usuario_id, cliente_id)`` afetados por um evento do histórico.
+        hoje: Data de referência (padrão: data local atual).
+
+    Returns:
+        dict: ``{(usuario_id, cliente_id): 0 ou 1}``.
+    """
+    hoje = hoje or timezone.localdate()
+    return {
+        (usuario_id, cliente_id): int(ClientePlanoHistorico.objects.filter(
+            usuario_id=usuario_id,
+            cliente_id=cliente_id,
+            motivo=ClientePlanoHistorico.MOTIVO_REACTIVATE,
+            inicio__year=hoje.year,
+            inicio__month=hoje.month,
+            cliente__cancelado=False,
+        ).exists())
+        for usuario_id, cliente_id in pares
+    }
+
+
+def _contribuicao_mensalidade(estado: Optional[Dict[str, Any]], hoje: date, sinal: int, deltas) -> None:
+    if not estado:
+        return
+    valor = estado['valor'] or Decimal('0')
+    metricas = deltas[estado['usuario_id']]
+    if not estado['cancelado']:
+        if estado['pgto'] and _no_mes(estado['dt_pagamento'], hoje):
+            metricas['valor_total_pago'] += valor * sinal
+            metricas['valor_total_pago_qtd'] += sinal
+        if not estado['pgto'] and _no_mes(estado['dt_vencimento'], hoje):
+            metricas['valor_total_receber'] += valor * sinal
+            if estado['dt_vencimento'].day >= hoje.day:
+                metricas['valor_total_receber_qtd'] += sinal
+    # clientes_em_atraso conta pares (cliente, mensalidade vencida) do dono do cliente
+    if (
+        not estado['cliente__cancelado'] and not estado['cancelado'] and not estado['pgto']
+        and estado['dt_pagamento'] is None and estado['dt_vencimento'] < hoje
+    ):
+        deltas[estado['cliente__usuario_id']]['clientes_em_atraso'] += sinal
+
+
+def _contribuicao_cliente(estado: Optional[Dict[str, Any]], hoje: date, sinal: int, deltas) -> None:
+    if not estado:
+        return
+    metricas = deltas[estado['usuario_id']]
+    metricas[('ano', estado['data_adesao'].year)] += sinal
+    if estado['cancelado']:
+        if _no_mes(estado['data_cancelamento'], hoje):
+            metricas['clientes_cancelados_qtd'] += sinal
+        return
+    if _no_mes(estado['data_adesao'], hoje):
+        metricas['novos_clientes_qtd'] += sinal
+    if estado['forma_pgto_id'] is None:
+        metricas['clientes_sem_forma_pgto'] += sinal
+    if estado['plano__usuario_id'] == estado['usuario_id']:
+        metricas['total_telas_ativas'] += (estado['plano__telas'] or 0) * sinal
+    if estado['plano_nome_norm']:
+        metricas[('plano', estado['plano_nome_norm'])] += sinal
+
+
+def aplicar_delta_mensalidade(anterior, atual, hoje: Optional[date] = None) -> None:
+    """
+    Aplica no snapshot a diferença entre o estado anterior e o atual de uma mensalidade.
+
+    Args:
+        anterior: ``estado_mensalidade`` antes do save/delete (``None`` na criação).
+        atual: ``estado_mensalidade`` depois do save (``None`` na exclusão).
+        hoje: Data de referência (padrão: data local atual).
+    """
+    hoje = hoje or timezone.localdate()
+    deltas = defaultdict(lambda: defaultdict(int))
+    _contribuicao_mensalidade(anterior, hoje, -1, deltas)
+    _contribuicao_mensalidade(atual, hoje, 1, deltas)
+    _aplicar_deltas(deltas, hoje)
+
+
+def aplicar_delta_cliente(cliente_id: int, anterior, atual, hoje: Optional[date] = None) -> None:
+    """
+    Aplica no snapshot a diferença entre o estado anterior e o atual de um cliente.
+
+    Cancelar ou reativar também muda ``clientes_em_atraso`` (mensalidades vencidas do
+    cliente) e ``clientes_reativados_qtd``; essas parcelas são consultadas só nessa troca.
+    Mover o cliente para outro dono marca os dois snapshots como desatualizados.
+
+    Args:
+        cliente_id: ID do cliente.
+        anterior: ``estado_cliente`` antes do save/delete (``None`` na criação).
+        atual: ``estado_cliente`` depois do save (``None`` na exclusão).
+        hoje: Data de referência (padrão: data local atual).
+    """
+    hoje = hoje or timezone.localdate()
+    if anterior and atual and anterior['usuario_id'] != atual['usuario_id']:
+        invalidar_metricas_dashboard(anterior['usuario_id'], atual['usuario_id'])
+        return
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    _contribuicao_cliente(anterior, hoje, -1, deltas)
+    _contribuicao_cliente(atual, hoje, 1, deltas)
+
+    ativo_antes = bool(anterior) and not anterior['cancelado']
+    ativo_depois = bool(atual) and not atual['cancelado']
+    if ativo_antes != ativo_depois:
+        sinal = 1 if ativo_depois else -1
+        usuario_id = (atual or anterior)['usuario_id']
+        vencidas = Mensalidade.objects.filter(
+            cliente_id=cliente_id,
+            cancelado=False,
+            dt_pagamento=None,
+            pgto=False,
+            dt_vencimento__lt=hoje,
+        ).count()
+        reativado = ClientePlanoHistorico.objects.filter(
+            usuario_id=usuario_id,
+            cliente_id=cliente_id,
+            motivo=ClientePlanoHistorico.MOTIVO_REACTIVATE,
+            inicio__year=hoje.year,
+            inicio__month=hoje.month,
+        ).exists()
+        deltas[usuario_id]['clientes_em_atraso'] += vencidas * sinal
+        deltas[usuario_id]['clientes_reativados_qtd'] += int(reativado) * sinal
+
+    _aplicar_deltas(deltas, hoje)
+
+
+def aplicar_delta_reativacoes(anterior: Dict[tuple, int], atual: Dict[tuple, int], hoje: Optional[date] = None) -> None:
+    """Aplica a diferença de ``estado_reativacoes`` antes/depois de um evento do histórico."""
+    hoje = hoje or timezone.localdate()
+    deltas = defaultdict(lambda: defaultdict(int))
+    for par in set(anterior) | set(atual):
+        deltas[par[0]]['clientes_reativados_qtd'] += atual.get(par, 0) - anterior.get(par, 0)
+    _aplicar_deltas(deltas, hoje)
+
+
+def _aplicar_deltas(deltas, hoje: date) -> None:
+    """
+    Soma os deltas no snapshot de cada dono (linha travada com ``select_for_update``).
+
+    Snapshot de outro dia ou desatualizado não recebe delta (será recalculado), mas tem
+    ``atualizado_em`` avançado para invalidar um recálculo concorrente.
+    """
+    for usuario_id, metricas in deltas.items():
+        metricas = {chave: valor for chave, valor in metricas.items() if valor}
+        if not usuario_id or not metricas:
+            continue
+
+        with transaction.atomic():
+            snapshot = DashboardMetrics.objects.select_for_update().filter(usuario_id=usuario_id).first()
+            if snapshot is None:
+                continue
+            if not snapshot.valido_para(hoje):
+                snapshot.save(update_fields=['atualizado_em'])
+                continue
+
+            dados = snapshot.dados
+            planos = dict(dados['planos_adesao'])
+            anos = set(dados['anos_adesao'])
+            for chave, valor in metricas.items():
+                if chave in ('valor_total_pago', 'valor_total_receber'):
+                    dados[chave] = Decimal(str(dados[chave])) + valor
+                elif isinstance(chave, str):
+                    dados[chave] += valor
+                elif chave[0] == 'plano':
+                    # Planos não cadastrados pelo dono não aparecem no card
+                    if chave[1] in planos:
+                        planos[chave[1]] += valor
+                elif valor > 0:
+                    anos.add(chave[1])
+                elif chave[1] in anos and not Cliente.objects.filter(
+                    usuario_id=usuario_id, data_adesao__year=chave[1]
+                ).exists():
+                    anos.discard(chave[1])
+
+            dados['planos_adesao'] = [[nome, planos[nome]] for nome, _ in dados['planos_adesao']]
+            dados['anos_adesao'] = sorted(anos, reverse=True)
+            snapshot.dados = dados
+            snapshot.save(update_fields=['dados', 'atualizado_em'])
+
+
+def montar_alertas_fastdepix(owner) -> Dict[str, Any]:
+    """
+    Monta os alertas de planos sem link ou com valor divergente nas contas FastDePix por link.
+
+    Consultas constantes (contas, planos e links de todas as contas de uma vez),
+    independentemente do número de contas.
+
+    Args:
+        owner: Usuário dono das contas bancárias.
+
+    Returns:
+        dict: ``planos_sem_link``, ``planos_valor_divergente`` e ``tem_alertas``.
+    """
+    alertas = {
+        'planos_sem_link': [],
+        'planos_valor_divergente': [],
+        'tem_alertas': False
+    }
+
+    contas = list(ContaBancaria.objects.filter(
+        usuario=owner,
+        instituicao__tipo_integracao='fastdepix',
+        tipo_cobranca_fastdepix='link_fastdepix',
+        ativo=True
+    ))
+    if not contas:
+        return alertas
+
+    planos_usuario = list(Plano.objects.filter(usuario=owner))
+    links_por_conta = defaultdict(list)
+    for link in PlanoLinkPagamento.objects.filter(conta_bancaria__in=contas).select_related('plano'):
+        links_por_conta[link.conta_bancaria_id].append(link)
+
+    for conta in contas:
+        links_conta = links_por_conta[conta.id]
+        planos_com_link = {link.plano_id for link in links_conta}
+
+        # Planos sem link
+        for plano in planos_usuario:
+            if plano.id not in planos_com_link:
+                alertas['planos_sem_link'].append({
+                    'plano_id': plano.id,
+                    'plano_nome': f"{plano.nome} ({plano.telas} tela(s))",
+                    'plano_valor': float(plano.valor),
+                    'conta_id': conta.id,
+                    'conta_nome': conta.nome_identificacao
+                })
+
+        # Planos com valor divergente
+        for link in links_conta:
+            if link.valor_divergente:
+                alertas['planos_valor_divergente'].append({
+                    'plano_id': link.plano.id,
+                    'plano_nome': f"{link.plano.nome} ({link.plano.telas} tela(s))",
+                    'valor_atual': float(link.plano.valor),
+                    'valor_configurado': float(link.valor_configurado),
+                    'conta_id': conta.id,
+                    'conta_nome': conta.nome_identificacao
+                })
+
+    alertas['tem_alertas'] = bool(alertas['planos_sem_link'] or alertas['planos_valor_divergente'])
+    return alertas
@@ -0,0 +1,239 @@
+"""
+Exportação de clientes (XLSX/CSV) com memória constante.
+
+Os clientes são lidos com ``.iterator(chunk_size=...)`` (prefetch das contas por lote)
+e escritos linha a linha: o CSV vai direto para um ``StreamingHttpResponse`` e o XLSX
+usa o modo ``write_only`` do openpyxl gravando em arquivo temporário, que depois é
+enviado em blocos. Para bases grandes há o modo em segundo plano, que grava o arquivo
+no storage de media e avisa o usuário por ``NotificacaoSistema`` quando fica pronto.
+
+Uso:
+    from nossopainel.services.exportacao_clientes import escrever_xlsx, iterar_linhas_csv
+
+    escrever_xlsx(usuario, arquivo)
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from typing import IO, Iterator, List
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Prefetch
+from django.urls import reverse
+from django.utils import timezone
+
+from nossopainel.models import Cliente, ContaDoAplicativo, DadosBancarios, NotificacaoSistema
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE_EXPORTACAO = 2000
+DIRETORIO_EXPORTACOES = "exportacoes/clientes"
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+COLUNAS_EXPORTACAO = [
+    'Servidor', 'Dispositivo', 'Aplicativo', 'Device ID', 'Email', 'Device Key',
+    'Nome', 'Telefone', 'Indicado Por', 'Data Vencimento', 'Forma Pgto',
+    'Tipo Plano', 'Plano Valor', 'Qtd. Telas', 'Data Adesão', 'Status'
+]
+
+
+def clientes_exportacao(usuario):
+    """Queryset dos clientes do usuário com os relacionamentos usados na planilha."""
+    return Cliente.objects.filter(usuario=usuario).select_related(
+        'servidor', 'dispositivo', 'sistema', 'plano', 'forma_pgto', 'indicado_por'
+    ).prefetch_related(
+        Prefetch('conta_aplicativo', queryset=ContaDoAplicativo.objects.select_related('app', 'dispositivo'))
+    ).order_by('id')
+
+
+def iterar_linhas_clientes(usuario, chunk_size: int = CHUNK_SIZE_EXPORTACAO) -> Iterator[List]:
+    """
+    Gera as linhas de dados (uma por cliente) na ordem das ``COLUNAS_EXPORTACAO``.
+
+    Usa ``.iterator(chunk_size)``: o prefetch das contas é feito por lote, sem carregar
+    todos os clientes em memória.
+    """
+    for cliente in clientes_exportacao(usuario).iterator(chunk_size=chunk_size):
+        contas = list(cliente.conta_aplicativo.all())
+
+        if contas:
+            # Concatenar dados de múltiplas contas (incluindo o nome do app)
+            aplicativos = " - ".join([c.app.nome for c in contas if c.app])
+            device_ids = " - ".join([c.device_id for c in contas if c.device_id])
+            emails = " - ".join([c.email for c in contas if c.email])
+            device_keys = " - ".join([c.device_key for c in contas if c.device_key])
+        else:
+            aplicativos = cliente.sistema.nome if cliente.sistema else ""
+            device_ids = ""
+            emails = ""
+            device_keys = ""
+
+        yield [
+            cliente.servidor.nome if cliente.servidor else "",
+            cliente.dispositivo.nome if cliente.dispositivo else "",
+            aplicativos,
+            device_ids,
+            emails,
+            device_keys,
+            cliente.nome,
+            cliente.telefone,
+            cliente.indicado_por.nome if cliente.indicado_por else "",
+            cliente.data_vencimento.strftime('%d/%m/%Y') if cliente.data_vencimento else "",
+            cliente.forma_pgto.nome if cliente.forma_pgto else "",
+            cliente.plano.nome if cliente.plano else "",
+            float(cliente.plano.valor) if cliente.plano else 0,
+            cliente.plano.telas if cliente.plano else 0,
+            cliente.data_adesao.strftime('%d/%m/%Y') if cliente.data_adesao else "",
+            "Cancelado" if cliente.cancelado else "Ativo",
+        ]
+
+
+def _cabecalho_usuario(usuario) -> List[str]:
+    dados_bancarios = DadosBancarios.objects.filter(usuario=usuario).first()
+    telefone_user = dados_bancarios.wpp if dados_bancarios else ""
+    return [
+        f"Nome: {usuario.first_name} {usuario.last_name}",
+        f"Usuário: {usuario.username}",
+        f"Telefone: {telefone_user}",
+        f"Total de Clientes: {Cliente.objects.filter(usuario=usuario).count()}",
+    ]
+
+
+def escrever_xlsx(usuario, destino: IO[bytes]) -> None:
+    """
+    Grava a planilha de clientes em ``destino`` usando o modo ``write_only`` do openpyxl.
+
+    O layout (cabeçalho do usuário nas linhas 1-5 e tabela a partir da linha 7) é o mesmo
+    da exportação anterior; as bordas por célula foram removidas, mantendo o destaque do
+    cabeçalho da tabela e a cor da coluna Status.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Clientes")
+
+    for col in range(1, len(COLUNAS_EXPORTACAO) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 15
+
+    titulo = WriteOnlyCell(ws, value="RELATÓRIO DE CLIENTES")
+    titulo.font = Font(bold=True, size=14)
+    ws.append([titulo])
+    for linha in _cabecalho_usuario(usuario):
+        ws.append([linha])
+    ws.append([])
+
+    table_header_font = Font(bold=True, color="FFFFFF")
+    table_header_fill = PatternFill(start_color="4A90D9", end_color="4A90D9", fill_type="solid")
+    centro = Alignment(horizontal='center')
+    cabecalho = []
+    for nome_coluna in COLUNAS_EXPORTACAO:
+        cell = WriteOnlyCell(ws, value=nome_coluna)
+        cell.font = table_header_font
+        cell.fill = table_header_fill
+        cell.alignment = centro
+        cabecalho.append(cell)
+    ws.append(cabecalho)
+
+    font_verde = Font(color="008000")  # Verde para Ativo
+    font_vermelha = Font(color="FF0000")  # Vermelho para Cancelado
+    for dados in iterar_linhas_clientes(usuario):
+        status = WriteOnlyCell(ws, value=dados[-1])
+        status.font = font_vermelha if dados[-1] == "Cancelado" else font_verde
+        ws.append(dados[:-1] + [status])
+
+    wb.save(destino)
+
+
+def iterar_xlsx_em_blocos(usuario, tamanho_bloco: int = 64 * 1024) -> Iterator[bytes]:
+    """Gera a planilha em arquivo temporário e a devolve em blocos (removendo o arquivo ao fim)."""
+    with tempfile.TemporaryFile(suffix=".xlsx") as arquivo:
+        escrever_xlsx(usuario, arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+
+
+class _Eco:
+    """Buffer mínimo para o ``csv.writer`` devolver cada linha formatada."""
+
+    def write(self, valor):
+        return valor
+
+
+def iterar_linhas_csv(usuario) -> Iterator[str]:
+    """Gera o CSV (separador ``;``, com BOM para o Excel) linha a linha."""
+    writer = csv.writer(_Eco(), delimiter=';')
+    yield "\ufeff"
+    for linha in _cabecalho_usuario(usuario):
+        yield writer.writerow([linha])
+    yield writer.writerow(COLUNAS_EXPORTACAO)
+    for dados in iterar_linhas_clientes(usuario):
+        yield writer.writerow(dados)
+
+
+##### EXPORTAÇÃO EM SEGUNDO PLANO #####
+
+def caminho_exportacao(usuario_id: int, nome_arquivo: str) -> str:
+    return f"{DIRETORIO_EXPORTACOES}/{usuario_id}/{nome_arquivo}"
+
+
+def _executar_exportacao_segundo_plano(usuario, nome_arquivo: str) -> None:
+    close_old_connections()
+    try:
+        with tempfile.TemporaryFile(suffix=".xlsx") as arquivo:
+            escrever_xlsx(usuario, arquivo)
+            arquivo.seek(0)
+            caminho = default_storage.save(caminho_exportacao(usuario.id, nome_arquivo), File(arquivo))
+
+        url = reverse('exportar_clientes_download', args=[os.path.basename(caminho)])
+        NotificacaoSistema.objects.create(
+            usuario=usuario,
+            tipo='info',
+            prioridade='media',
+            titulo="Exportação de clientes pronta",
+            mensagem=f"Sua planilha de clientes está pronta para download: {url}",
+            dados_extras={'url': url, 'arquivo': caminho},
+        )
+        logger.info("Exportação de clientes concluída | usuario=%s arquivo=%s", usuario.username, caminho)
+    except Exception as exc:
+        logger.exception("Falha na exportação de clientes em segundo plano | usuario=%s erro=%s", usuario.username, exc)
+        NotificacaoSistema.objects.create(
+            usuario=usuario,
+            tipo='aviso',
+            prioridade='alta',
+            titulo="Falha na exportação de clientes",
+            mensagem="Não foi possível gerar a planilha de clientes. Tente novamente mais tarde.",
+        )
+    finally:
+        close_old_connections()
+
+
+def iniciar_exportacao_segundo_plano(usuario) -> str:
+    """
+    Dispara a exportação XLSX em uma thread; o usuário é notificado ao final.
+
+    Returns:
+        str: Nome do arquivo que será gravado no storage.
+    """
+    nome_arquivo = f"clientes_{timezone.localtime():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.xlsx"
+    threading.Thread(
+        target=_executar_exportacao_segundo_plano,
+        args=(usuario, nome_arquivo),
+        name=f"ExportacaoClientes-{usuario.id}",
+        daemon=True,
+    ).start()
+    return nome_arquivo
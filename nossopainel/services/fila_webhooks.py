@@ -0,0 +1,333 @@
+"""
+Fila persistente de webhooks (WPPConnect e PIX) com confirmação imediata.
+
+As views de webhook apenas validam o payload, gravam o evento bruto em ``EventoWebhook``
+e respondem. O processamento (consultas, chamadas à API, ``mark_as_paid`` e seus signals)
+fica com o ``MotorWebhooks``, que drena a fila com um pool de threads:
+
+- reenvios do provedor são descartados pela unicidade de ``(origem, evento_id)``;
+- eventos com a mesma ``chave_ordenacao`` (sessão WPP / transação PIX) são processados um
+  de cada vez e em ordem de chegada; chaves diferentes rodam em paralelo;
+- falhas são repetidas com backoff exponencial até ``MAX_TENTATIVAS`` (os handlers são
+  idempotentes) e, enquanto o evento aguarda nova tentativa, a chave fica bloqueada.
+
+Após cada ``enfileirar_evento`` a view chama ``disparar_processamento``, que drena a fila em
+uma thread do próprio processo; o scheduler e o comando ``processar_webhooks`` drenam o que
+ficar pendente (reinícios, novas tentativas agendadas).
+
+Uso:
+    from nossopainel.services.fila_webhooks import enfileirar_evento, disparar_processamento
+
+    evento, criado = enfileirar_evento(
+        origem=EventoWebhook.ORIGEM_PIX, evento_id="transaction.paid:123:paid",
+        tipo="transaction.paid", chave_ordenacao="123", payload=payload,
+    )
+    disparar_processamento()
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from nossopainel.models import EventoWebhook
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+MAX_TENTATIVAS = 5
+BACKOFF_BASE = 10  # segundos: 10, 20, 40, 80...
+TEMPO_MAXIMO_PROCESSANDO = timedelta(minutes=10)
+RETENCAO_DIAS = 7
+
+# Handler por origem: recebe o ``EventoWebhook`` e retorna True (processado) ou
+# False (ignorado). Exceções agendam nova tentativa.
+HANDLERS = {
+    EventoWebhook.ORIGEM_WPPCONNECT: "nossopainel.views_webhook.processar_evento_wppconnect",
+    EventoWebhook.ORIGEM_PIX: "nossopainel.services.webhook_pix.processar_evento_pix",
+}
+
+
+##################################################
+##### INGESTÃO                               #####
+##################################################
+
+def enfileirar_evento(
+    *,
+    origem: str,
+    evento_id: str,
+    tipo: str,
+    chave_ordenacao: str,
+    payload,
+    headers: Optional[dict] = None,
+) -> Tuple[EventoWebhook, bool]:
+    """
+    Grava o evento na fila, descartando reenvios do mesmo ``evento_id``.
+
+    Returns:
+        tuple: ``(evento, criado)``; ``criado`` é False quando o evento já estava na fila.
+    """
+    try:
+        with transaction.atomic():
+            evento = EventoWebhook.objects.create(
+                origem=origem,
+                evento_id=evento_id[:128],
+                tipo=(tipo or "")[:100],
+                chave_ordenacao=(chave_ordenacao or "")[:255],
+                payload=payload,
+                headers=headers or {},
+            )
+        return evento, True
+    except IntegrityError:
+        existente = EventoWebhook.objects.filter(origem=origem, evento_id=evento_id[:128]).first()
+        logger.info("Evento de webhook duplicado ignorado | origem=%s evento_id=%s", origem, evento_id)
+        return existente, False
+
+
+##################################################
+##### WORKER                                 #####
+##################################################
+
+class MotorWebhooks:
+    """
+    Consome ``EventoWebhook`` com no máximo um evento em voo por ``chave_ordenacao``.
+
+    A seleção, a reserva e a finalização ficam na thread coordenadora; as threads do
+    pool executam os handlers. Como as chaves ocupadas são lidas do banco, a ordem por
+    chave vale também entre processos (web e scheduler drenando ao mesmo tempo).
+
+    Args:
+        max_workers: Quantidade máxima de eventos processados simultaneamente.
+        handlers: Mapa ``origem -> callable`` (padrão: ``HANDLERS``).
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, handlers: Optional[Dict[str, Callable]] = None) -> None:
+        self.max_workers = max_workers
+        self.handlers = dict(handlers or {})
+        self.stats = {"processados": 0, "ignorados": 0, "repetidos": 0, "falhas": 0}
+
+    def _handler(self, origem: str) -> Callable:
+        if origem not in self.handlers:
+            self.handlers[origem] = import_string(HANDLERS[origem])
+        return self.handlers[origem]
+
+    def _recuperar_travados(self) -> None:
+        """Devolve à fila eventos presos em 'processando' (worker interrompido)."""
+        limite = timezone.now() - TEMPO_MAXIMO_PROCESSANDO
+        travados = EventoWebhook.objects.filter(
+            status=EventoWebhook.STATUS_PROCESSANDO,
+            reservado_em__lt=limite,
+        )
+        esgotados = travados.filter(tentativas__gte=MAX_TENTATIVAS).update(
+            status=EventoWebhook.STATUS_FALHA,
+            erro="Processamento interrompido (worker reiniciado)",
+            processado_em=timezone.now(),
+        )
+        devolvidos = travados.update(status=EventoWebhook.STATUS_PENDENTE, disponivel_em=timezone.now())
+        if esgotados or devolvidos:
+            logger.warning(
+                "Eventos de webhook travados recuperados | devolvidos=%d falhas=%d", devolvidos, esgotados
+            )
+
+    def _proximos_por_chave(self) -> list:
+        """
+        Retorna o evento pendente mais antigo de cada chave livre, se já estiver disponível.
+
+        Uma chave está ocupada enquanto tiver evento em 'processando' (neste ou em outro
+        processo). O mais antigo é escolhido antes de filtrar ``disponivel_em``: um evento
+        aguardando nova tentativa segura os posteriores da mesma chave.
+        """
+        ocupadas = EventoWebhook.objects.filter(status=EventoWebhook.STATUS_PROCESSANDO).values("chave_ordenacao")
+        primeiros = (
+            EventoWebhook.objects.filter(status=EventoWebhook.STATUS_PENDENTE)
+            .exclude(chave_ordenacao__in=ocupadas)
+            .values("chave_ordenacao")
+            .annotate(primeiro_id=Min("id"))
+        )
+        ids = [linha["primeiro_id"] for linha in primeiros]
+        if not ids:
+            return []
+        return list(
+            EventoWebhook.objects.filter(id__in=ids, disponivel_em__lte=timezone.now()).order_by("id")
+        )
+
+    def _reivindicar(self, evento: EventoWebhook) -> bool:
+        """Reserva o evento atomicamente (protege contra outro worker/processo)."""
+        return bool(
+            EventoWebhook.objects.filter(id=evento.id, status=EventoWebhook.STATUS_PENDENTE).update(
+                status=EventoWebhook.STATUS_PROCESSANDO,
+                reservado_em=timezone.now(),
+                tentativas=F("tentativas") + 1,
+            )
+        )
+
+    def _processar(self, handler: Callable, evento: EventoWebhook) -> bool:
+        """Executado nas threads do pool."""
+        try:
+            return handler(evento) is not False
+        finally:
+            close_old_connections()
+
+    def _finalizar(self, evento: EventoWebhook, processado: bool) -> None:
+        status = EventoWebhook.STATUS_PROCESSADO if processado else EventoWebhook.STATUS_IGNORADO
+        EventoWebhook.objects.filter(id=evento.id).update(status=status, erro="", processado_em=timezone.now())
+        self.stats["processados" if processado else "ignorados"] += 1
+
+    def _registrar_erro(self, evento: EventoWebhook, erro: str) -> None:
+        """Agenda nova tentativa com backoff ou marca o evento como falha definitiva."""
+        tentativas = evento.tentativas + 1  # valor incrementado em _reivindicar
+        if tentativas >= MAX_TENTATIVAS:
+            EventoWebhook.objects.filter(id=evento.id).update(
+                status=EventoWebhook.STATUS_FALHA, erro=erro[:1000], processado_em=timezone.now(),
+            )
+            self.stats["falhas"] += 1
+            logger.error(
+                "Evento de webhook descartado após %d tentativas | id=%s origem=%s tipo=%s erro=%s",
+                tentativas, evento.id, evento.origem, evento.tipo, erro,
+            )
+            return
+        espera = BACKOFF_BASE * 2 ** (tentativas - 1)
+        EventoWebhook.objects.filter(id=evento.id).update(
+            status=EventoWebhook.STATUS_PENDENTE,
+            erro=erro[:1000],
+            disponivel_em=timezone.now() + timedelta(seconds=espera),
+        )
+        self.stats["repetidos"] += 1
+        logger.warning(
+            "Evento de webhook reagendado | id=%s origem=%s tipo=%s tentativa=%d espera=%ds erro=%s",
+            evento.id, evento.origem, evento.tipo, tentativas, espera, erro,
+        )
+
+    def executar(self) -> dict:
+        """
+        Processa os eventos disponíveis até esvaziar a fila.
+
+        Eventos reagendados para o futuro ficam para a próxima execução.
+
+        Returns:
+            dict: Estatísticas da execução (processados, ignorados, repetidos, falhas, duração).
+        """
+        inicio = time.monotonic()
+        self._recuperar_travados()
+        em_voo: Dict[Future, EventoWebhook] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="FilaWebhooks") as executor:
+            while True:
+                candidatos = []
+                if len(em_voo) < self.max_workers:
+                    candidatos = self._proximos_por_chave()
+
+                for evento in candidatos[: self.max_workers - len(em_voo)]:
+                    if not self._reivindicar(evento):
+                        continue
+                    try:
+                        handler = self._handler(evento.origem)
+                    except (KeyError, ImportError) as exc:
+                        self._registrar_erro(evento, f"Handler indisponível: {exc}")
+                        continue
+                    em_voo[executor.submit(self._processar, handler, evento)] = evento
+
+                if not em_voo:
+                    break
+
+                concluidos, _ = wait(list(em_voo), timeout=1.0, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    evento = em_voo.pop(futuro)
+                    try:
+                        self._finalizar(evento, futuro.result())
+                    except Exception as exc:
+                        logger.exception("Erro ao processar evento de webhook | id=%s erro=%s", evento.id, exc)
+                        self._registrar_erro(evento, str(exc))
+
+        duracao = time.monotonic() - inicio
+        resumo = {**self.stats, "duracao": round(duracao, 2)}
+        if any(self.stats.values()):
+            logger.info(
+                "Fila de webhooks processada | processados=%d ignorados=%d repetidos=%d falhas=%d duracao=%.2fs",
+                resumo["processados"], resumo["ignorados"], resumo["repetidos"], resumo["falhas"], duracao,
+            )
+        return resumo
+
+
+def limpar_eventos_antigos(dias: int = RETENCAO_DIAS) -> int:
+    """Remove eventos finalizados há mais de ``dias`` dias (mantém pendentes e falhas recentes)."""
+    limite = timezone.now() - timedelta(days=dias)
+    removidos, _ = EventoWebhook.objects.filter(
+        status__in=[EventoWebhook.STATUS_PROCESSADO, EventoWebhook.STATUS_IGNORADO, EventoWebhook.STATUS_FALHA],
+        processado_em__lt=limite,
+    ).delete()
+    return removidos
+
+
+##################################################
+##### EXECUÇÃO                               #####
+##################################################
+
+_execucao_lock = threading.Lock()
+_novos_eventos = threading.Event()
+
+
+def processar_fila_webhooks(**kwargs) -> Optional[dict]:
+    """
+    Drena a fila garantindo uma única instância por processo (uso no scheduler/comando).
+
+    Returns:
+        dict | None: Estatísticas, ou None se já houver um worker rodando no processo.
+    """
+    if not _execucao_lock.acquire(blocking=False):
+        logger.debug("Fila de webhooks já está em processamento; execução ignorada.")
+        return None
+    try:
+        resumo = MotorWebhooks(**kwargs).executar()
+        resumo["removidos"] = limpar_eventos_antigos()
+        return resumo
+    finally:
+        _execucao_lock.release()
+
+
+def _drenar() -> None:
+    try:
+        while True:
+            _novos_eventos.clear()
+            try:
+                MotorWebhooks().executar()
+            except Exception as exc:
+                logger.exception("Erro ao drenar fila de webhooks | erro=%s", exc)
+                break
+            if not _novos_eventos.is_set():
+                break
+    finally:
+        close_old_connections()
+        _execucao_lock.release()
+    # Evento enfileirado entre a última verificação e a liberação do lock
+    if _novos_eventos.is_set():
+        disparar_processamento()
+
+
+def disparar_processamento() -> bool:
+    """
+    Inicia a drenagem da fila em uma thread do processo, se ainda não houver uma ativa.
+
+    Se já houver, sinaliza para que ela faça mais uma passada ao terminar.
+
+    Returns:
+        bool: True se uma nova thread foi iniciada.
+    """
+    _novos_eventos.set()
+    if not _execucao_lock.acquire(blocking=False):
+        return False
+    try:
+        threading.Thread(target=_drenar, name="FilaWebhooks-drenagem", daemon=True).start()
+    except Exception:
+        _execucao_lock.release()
+        raise
+    return True
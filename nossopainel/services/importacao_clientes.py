@@ -0,0 +1,724 @@
+"""
+Importação de clientes por planilha em segundo plano.
+
+A view apenas lê o XLSX, cria a ``TarefaImportacaoClientes`` e dispara a thread; a tela
+acompanha o andamento por polling em ``importar-clientes/progresso/<id>/``. Etapas:
+
+1. leitura: campos obrigatórios, plano, valor, telas, datas e e-mail de cada linha
+   (sem rede e sem banco; linhas inválidas nem chegam à API do WhatsApp).
+2. validacao: os números distintos são conferidos no WhatsApp em paralelo, com um
+   limite de consultas por segundo compartilhado por sessão do WPPConnect e cache do
+   resultado por número. A duplicidade é conferida em memória contra as chaves
+   canônicas (``telefone_normalizado``) dos telefones já cadastrados.
+3. referencias: servidores, dispositivos, aplicativos, formas de pagamento e planos do
+   usuário são carregados uma vez em dicionários; só os ausentes são criados.
+4. gravacao: clientes, assinaturas, contas, mensalidades e históricos são gravados com
+   ``bulk_create`` em blocos, cada bloco em uma transação curta.
+5. indicacoes: ``indicado_por`` é associado via ``save()`` para manter os signals de
+   desconto progressivo. Depois da conclusão, as etiquetas do WhatsApp dos novos
+   clientes são sincronizadas (``bulk_create`` não dispara ``post_save``).
+
+Cada progresso gravado avança ``atualizada_em``; a consulta de progresso encerra com
+erro as tarefas paradas há mais de ``TEMPO_MAXIMO_SEM_PROGRESSO`` (thread interrompida).
+
+Uso:
+    from nossopainel.services.importacao_clientes import iniciar_importacao_segundo_plano, ler_planilha
+
+    tarefa = iniciar_importacao_segundo_plano(usuario, sessao, ler_planilha(arquivo), arquivo.name)
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, IO, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from nossopainel.models import (
+    Aplicativo,
+    AssinaturaCliente,
+    Cliente,
+    ClientePlanoHistorico,
+    ContaDoAplicativo,
+    Dispositivo,
+    Mensalidade,
+    Plano,
+    Servidor,
+    TarefaImportacaoClientes,
+    TelefoneLeads,
+    Tipos_pgto,
+    chave_telefone,
+)
+from nossopainel.services.limitador_taxa import LimitadorTaxa, limitador_compartilhado
+from nossopainel.utils import (
+    normalizar_aplicativo,
+    normalizar_dispositivo,
+    normalizar_servidor,
+    normalizar_telefone_br,
+    usuario_tem_funcionalidade,
+)
+from wpp.api_connection import check_number_status
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO_GRAVACAO = 500
+MAX_WORKERS_VALIDACAO = 4
+CONSULTAS_POR_SEGUNDO_SESSAO = 5
+CACHE_NUMERO_VALIDO_TTL = 60 * 60 * 24
+CACHE_NUMERO_INVALIDO_TTL = 60 * 60
+INTERVALO_ATUALIZACAO_PROGRESSO = 25
+# Sem progresso gravado por esse tempo, a thread morreu (ex.: reinício do processo)
+TEMPO_MAXIMO_SEM_PROGRESSO = timedelta(minutes=10)
+
+COLUNAS_PLANILHA = {
+    "servidor": str,
+    "dispositivo": str,
+    "sistema": str,
+    "device_id": str,
+    "email": str,
+    "device_key": str,
+    "nome": str,
+    "telefone": str,
+    "indicado_por": str,
+    "data_vencimento": str,
+    "forma_pgto": str,
+    "tipo_plano": str,
+    "plano_valor": float,
+    "telas": int,
+    "data_adesao": str,
+}
+
+
+@dataclass
+class LinhaImportacao:
+    """Linha da planilha já validada localmente (antes da consulta ao WhatsApp)."""
+
+    idx: int
+    servidor: str
+    dispositivo: str
+    sistema: str
+    device_id: str
+    email: str
+    senha: str
+    nome: str
+    telefone: str
+    indicado_por: str
+    forma_pgto: str
+    plano_nome: str
+    plano_valor: float
+    plano_telas: int
+    data_vencimento: Optional[date]
+    data_adesao: date
+    telefone_wpp: str = ""
+    relacionados: Optional[dict] = None
+
+
+##### LEITURA #####
+
+def ler_planilha(arquivo: IO[bytes]) -> List[Dict[str, str]]:
+    """
+    Lê o XLSX de importação (cabeçalho na linha 3) e devolve as linhas como texto limpo.
+
+    As linhas são ordenadas por ``data_adesao`` para que a numeração ("Linha N") das
+    mensagens siga a mesma ordem de processamento.
+    """
+    import pandas as pd
+
+    dados = pd.read_excel(arquivo, engine='openpyxl', header=2, dtype=COLUNAS_PLANILHA)
+    if "data_adesao" in dados.columns:
+        dados["data_adesao"] = pd.to_datetime(dados["data_adesao"], errors="coerce")
+        dados = dados.sort_values("data_adesao", ascending=True)
+
+    registros = []
+    for row in dados.to_dict('records'):
+        registros.append({
+            chave: "" if pd.isnull(valor) or valor is None else str(valor).strip()
+            for chave, valor in row.items()
+        })
+    return registros
+
+
+def _parse_data(valor: str) -> date:
+    if len(valor) > 10:
+        return datetime.strptime(valor, "%Y-%m-%d %H:%M:%S").date()
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def interpretar_linha(idx: int, row: Dict[str, str]) -> Tuple[Optional[LinhaImportacao], Optional[str]]:
+    """
+    Valida os campos de uma linha sem acessar rede ou banco.
+
+    Returns:
+        tuple: ``(linha, None)`` quando válida ou ``(None, mensagem_de_erro)``.
+    """
+    servidor = normalizar_servidor(row.get('servidor', ''))
+    dispositivo = normalizar_dispositivo(row.get('dispositivo', ''))
+    sistema = normalizar_aplicativo(row.get('sistema', ''))
+    nome = row.get('nome', '')
+    telefone = row.get('telefone', '')
+    data_vencimento_str = row.get('data_vencimento', '')
+    forma_pgto = row.get('forma_pgto', '')
+    plano_nome = row.get('tipo_plano', '')
+    plano_valor = row.get('plano_valor', '')
+    plano_telas = row.get('telas', '')
+    data_adesao_str = row.get('data_adesao', '')
+    email = row.get('email', '')
+
+    if not all([servidor, dispositivo, sistema, nome, telefone, data_vencimento_str, forma_pgto, plano_nome, plano_valor, plano_telas, data_adesao_str]):
+        return None, f"Linha {idx}: campos obrigatórios em branco"
+
+    # Normaliza o nome do plano (ex: "mensal" -> "Mensal", "MENSAL" -> "Mensal")
+    planos_validos = [plano[0] for plano in Plano.CHOICES]
+    plano_nome = plano_nome.strip().title()
+    if plano_nome not in planos_validos:
+        return None, f"Linha {idx}: plano '{plano_nome}' inválido. Deve ser um dos: {', '.join(planos_validos)}."
+
+    try:
+        plano_valor = float(str(plano_valor).replace(",", "."))
+    except Exception:
+        return None, f"Linha {idx}: valor do plano inválido."
+
+    try:
+        plano_telas = int(float(plano_telas))
+    except Exception:
+        return None, f"Linha {idx}: quantidade de telas inválida."
+
+    try:
+        data_vencimento = _parse_data(data_vencimento_str) if data_vencimento_str else None
+    except Exception:
+        return None, f"Linha {idx}: data de vencimento inválida."
+    try:
+        data_adesao = _parse_data(data_adesao_str)
+    except Exception:
+        return None, f"Linha {idx}: data de adesão inválida."
+
+    try:
+        if email:
+            validate_email(email)
+    except ValidationError:
+        return None, f"Linha {idx}: E-mail inválido."
+
+    return LinhaImportacao(
+        idx=idx,
+        servidor=servidor,
+        dispositivo=dispositivo,
+        sistema=sistema,
+        device_id=row.get('device_id', ''),
+        email=email,
+        senha=row.get('device_key', ''),
+        nome=nome,
+        telefone=telefone,
+        indicado_por=row.get('indicado_por', ''),
+        forma_pgto=forma_pgto,
+        plano_nome=plano_nome,
+        plano_valor=plano_valor,
+        plano_telas=plano_telas,
+        data_vencimento=data_vencimento,
+        data_adesao=data_adesao,
+    ), None
+
+
+##### REFERÊNCIAS #####
+
+class ReferenciasUsuario:
+    """
+    Servidores, dispositivos, aplicativos, formas de pagamento e planos do usuário em memória.
+
+    Segue as mesmas regras de ``get_or_create_*`` (busca case-insensitive pelo nome
+    normalizado, mantendo o registro mais antigo em caso de duplicata), mas com uma
+    consulta por tabela em vez de uma por linha.
+    """
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.servidores = self._por_nome(Servidor)
+        self.dispositivos = self._por_nome(Dispositivo)
+        self.aplicativos = self._por_nome(Aplicativo)
+        self.formas_pgto = self._por_nome(Tipos_pgto)
+        self.planos: Dict[Tuple[str, int, Decimal], Plano] = {}
+        for plano in Plano.objects.filter(usuario=usuario).order_by('pk'):
+            self.planos.setdefault((plano.nome, plano.telas, Decimal(plano.valor)), plano)
+
+    def _por_nome(self, modelo) -> Dict[str, object]:
+        objetos = {}
+        for obj in modelo.objects.filter(usuario=self.usuario).order_by('pk'):
+            objetos.setdefault(obj.nome.lower(), obj)
+        return objetos
+
+    def _obter(self, objetos: Dict[str, object], modelo, nome: str):
+        obj = objetos.get(nome.lower())
+        if obj is None:
+            obj = modelo.objects.create(nome=nome, usuario=self.usuario)
+            objetos[nome.lower()] = obj
+        return obj
+
+    def servidor(self, nome: str) -> Servidor:
+        return self._obter(self.servidores, Servidor, nome)
+
+    def dispositivo(self, nome: str) -> Dispositivo:
+        return self._obter(self.dispositivos, Dispositivo, nome)
+
+    def aplicativo(self, nome: str) -> Aplicativo:
+        return self._obter(self.aplicativos, Aplicativo, nome)
+
+    def forma_pgto(self, nome: str) -> Tipos_pgto:
+        return self._obter(self.formas_pgto, Tipos_pgto, nome)
+
+    def plano(self, nome: str, telas: int, valor: float) -> Plano:
+        chave = (nome, telas, Decimal(str(valor)))
+        plano = self.planos.get(chave)
+        if plano is None:
+            plano = Plano.objects.create(nome=nome, telas=telas, valor=valor, usuario=self.usuario)
+            self.planos[chave] = plano
+        return plano
+
+
+##### VALIDAÇÃO NO WHATSAPP #####
+
+def limitador_sessao(sessao: str) -> LimitadorTaxa:
+    """Limitador compartilhado por todas as importações da mesma sessão do WPPConnect."""
+    return limitador_compartilhado(f"wpp:{sessao}", CONSULTAS_POR_SEGUNDO_SESSAO)
+
+
+def checar_numero_whatsapp(telefone: str, token: str, sessao: str) -> dict:
+    """
+    ``check_number_status`` com cache por sessão/número e limite de taxa por sessão.
+
+    Apenas respostas conclusivas (sem ``error``) são guardadas; números válidos ficam
+    24h em cache e inválidos 1h.
+    """
+    chave = f"wpp:numero:{sessao}:{telefone}"
+    resultado = cache.get(chave)
+    if resultado is not None:
+        return resultado
+
+    limitador_sessao(sessao).aguardar()
+    try:
+        check = check_number_status(telefone, token, sessao)
+    except Exception as exc:
+        logger.error("Erro ao checar número no WhatsApp | sessao=%s telefone=%s erro=%s", sessao, telefone, exc)
+        return {'status': False, 'user': None, 'error': str(exc)}
+
+    if not isinstance(check, dict):
+        logger.error("Retorno inesperado ao checar número | sessao=%s telefone=%s retorno=%s", sessao, telefone, check)
+        return {'status': False, 'user': None, 'error': 'retorno inesperado'}
+
+    if not check.get('error'):
+        resultado = {'status': bool(check.get('status')), 'user': check.get('user')}
+        cache.set(chave, resultado, CACHE_NUMERO_VALIDO_TTL if resultado['status'] else CACHE_NUMERO_INVALIDO_TTL)
+    return check
+
+
+def _telefone_existente(telefone: str, telefones_cadastrados: dict) -> Optional[str]:
+    """Equivalente em memória de ``existe_cliente_variacoes`` (chave canônica -> telefone)."""
+    return telefones_cadastrados.get(chave_telefone(telefone))
+
+
+##### PIPELINE #####
+
+class ImportacaoClientes:
+    """Executa as etapas da importação atualizando a ``TarefaImportacaoClientes``."""
+
+    def __init__(self, tarefa: TarefaImportacaoClientes, sessao, registros: List[Dict[str, str]]):
+        self.tarefa = tarefa
+        self.usuario = tarefa.usuario
+        self.sessao = sessao
+        self.registros = registros
+        self.clientes_existentes: List[str] = []
+        self.clientes_invalidos_whatsapp: List[str] = []
+        self.erros_importacao: List[str] = []
+        self.clientes_criados: Dict[str, Cliente] = {}
+
+    # --- progresso ---
+
+    def _atualizar(self, **campos) -> None:
+        for campo, valor in campos.items():
+            setattr(self.tarefa, campo, valor)
+        self.tarefa.save(update_fields=[*campos, 'atualizada_em'])
+
+    def _falhar(self, lista: List[str], mensagem: str) -> None:
+        lista.append(mensagem)
+        self.tarefa.falhas += 1
+        self.tarefa.processados += 1
+
+    def _resultado(self) -> dict:
+        return {
+            'clientes_existentes': self.clientes_existentes,
+            'clientes_invalidos_whatsapp': self.clientes_invalidos_whatsapp,
+            'erros_importacao': self.erros_importacao,
+        }
+
+    # --- etapas ---
+
+    def executar(self) -> None:
+        self._atualizar(
+            status=TarefaImportacaoClientes.STATUS_EM_ANDAMENTO,
+            iniciada_em=timezone.now(),
+            total_linhas=len(self.registros),
+        )
+
+        linhas = self._etapa_leitura()
+        linhas = self._etapa_validacao(linhas)
+        linhas = self._etapa_referencias(linhas)
+        self._etapa_gravacao(linhas)
+        self._etapa_indicacoes()
+
+        self._invalidar_dados_materializados()
+        self._atualizar(
+            status=TarefaImportacaoClientes.STATUS_CONCLUIDA,
+            etapa_atual='concluida',
+            mensagem_progresso="Importação concluída!",
+            processados=self.tarefa.total_linhas,
+            falhas=self.tarefa.falhas,
+            sucessos=self.tarefa.sucessos,
+            resultado=self._resultado(),
+            concluida_em=timezone.now(),
+        )
+        logger.info(
+            "Importação de clientes concluída | usuario=%s tarefa=%s sucesso=%d falhas=%d existentes=%d whatsapp_invalido=%d",
+            self.usuario, self.tarefa.pk, self.tarefa.sucessos, self.tarefa.falhas,
+            len(self.clientes_existentes), len(self.clientes_invalidos_whatsapp),
+        )
+
+        self._etapa_etiquetas()
+
+    def _etapa_leitura(self) -> List[LinhaImportacao]:
+        self._atualizar(etapa_atual='leitura', mensagem_progresso="Conferindo os dados da planilha...")
+        linhas = []
+        for idx, row in enumerate(self.registros, 1):
+            linha, erro = interpretar_linha(idx, row)
+            if erro:
+                self._falhar(self.erros_importacao, erro)
+            else:
+                linhas.append(linha)
+        self._atualizar(processados=self.tarefa.processados, falhas=self.tarefa.falhas)
+        return linhas
+
+    def _etapa_validacao(self, linhas: List[LinhaImportacao]) -> List[LinhaImportacao]:
+        """Confere os números distintos em paralelo e descarta inválidos/duplicados."""
+        numeros = {normalizar_telefone_br(linha.telefone) for linha in linhas}
+        self._atualizar(
+            etapa_atual='validacao',
+            mensagem_progresso=f"Validando {len(numeros)} número(s) no WhatsApp...",
+        )
+
+        sessao_nome = str(self.sessao)
+        resultados: Dict[str, dict] = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_VALIDACAO, thread_name_prefix="ImportacaoWpp") as executor:
+            futuros = {
+                executor.submit(checar_numero_whatsapp, numero, self.sessao.token, sessao_nome): numero
+                for numero in numeros
+            }
+            for concluidos, futuro in enumerate(as_completed(futuros), 1):
+                resultados[futuros[futuro]] = futuro.result()
+                if concluidos % INTERVALO_ATUALIZACAO_PROGRESSO == 0:
+                    self._atualizar(mensagem_progresso=f"Validando números no WhatsApp ({concluidos}/{len(numeros)})...")
+
+        telefones_cadastrados = dict(
+            Cliente.objects.filter(usuario=self.usuario).values_list('telefone_normalizado', 'telefone')
+        )
+        aprovadas = []
+        for linha in linhas:
+            numero = normalizar_telefone_br(linha.telefone)
+            check = resultados.get(numero) or {}
+            if not check.get('status'):
+                self._falhar(self.clientes_invalidos_whatsapp, f"Linha {linha.idx}: {linha.telefone} (número não existe no WhatsApp)")
+                continue
+            existente = _telefone_existente(numero, telefones_cadastrados)
+            if existente:
+                self._falhar(self.clientes_existentes, f"Linha {linha.idx}: {linha.telefone} (já existe cliente com esse telefone)")
+                continue
+            validado = str(check.get('user') or numero)
+            linha.telefone_wpp = validado if validado.startswith('+') else f'+{validado}'
+            # Linhas seguintes com o mesmo número passam a ser duplicatas
+            telefones_cadastrados.setdefault(chave_telefone(numero), linha.telefone_wpp)
+            telefones_cadastrados.setdefault(chave_telefone(linha.telefone_wpp), linha.telefone_wpp)
+            aprovadas.append(linha)
+
+        self._atualizar(processados=self.tarefa.processados, falhas=self.tarefa.falhas)
+        return aprovadas
+
+    def _etapa_referencias(self, linhas: List[LinhaImportacao]) -> List[LinhaImportacao]:
+        """Resolve (fora das transações de gravação) os objetos relacionados de cada linha."""
+        self._atualizar(etapa_atual='referencias', mensagem_progresso="Preparando planos, servidores e aplicativos...")
+        referencias = ReferenciasUsuario(self.usuario)
+        resolvidas = []
+        for linha in linhas:
+            try:
+                linha.relacionados = {
+                    'servidor': referencias.servidor(linha.servidor),
+                    'dispositivo': referencias.dispositivo(linha.dispositivo),
+                    'sistema': referencias.aplicativo(linha.sistema),
+                    'forma_pgto': referencias.forma_pgto(linha.forma_pgto),
+                    'plano': referencias.plano(linha.plano_nome, linha.plano_telas, linha.plano_valor),
+                }
+            except Exception as exc:
+                logger.error("Falha ao preparar linha | usuario=%s linha=%d erro=%s", self.usuario, linha.idx, exc)
+                self._falhar(self.erros_importacao, f"Linha {linha.idx}: {exc}")
+                continue
+            resolvidas.append(linha)
+        return resolvidas
+
+    def _etapa_gravacao(self, linhas: List[LinhaImportacao]) -> None:
+        self._atualizar(etapa_atual='gravacao', mensagem_progresso=f"Gravando {len(linhas)} cliente(s)...")
+        for inicio in range(0, len(linhas), TAMANHO_BLOCO_GRAVACAO):
+            bloco = linhas[inicio:inicio + TAMANHO_BLOCO_GRAVACAO]
+            try:
+                self._gravar_bloco(bloco)
+            except Exception as exc:
+                # Regrava linha a linha para isolar a(s) linha(s) com problema
+                logger.warning(
+                    "Falha ao gravar bloco da importação, gravando linha a linha | usuario=%s tarefa=%s erro=%s",
+                    self.usuario, self.tarefa.pk, exc,
+                )
+                for linha in bloco:
+                    try:
+                        self._gravar_bloco([linha])
+                    except Exception as exc_linha:
+                        logger.error(
+                            "Falha ao importar linha | usuario=%s linha=%d erro=%s",
+                            self.usuario, linha.idx, exc_linha, exc_info=True,
+                        )
+                        self._falhar(self.erros_importacao, f"Linha {linha.idx}: {exc_linha}")
+            self._atualizar(
+                processados=self.tarefa.processados,
+                sucessos=self.tarefa.sucessos,
+                falhas=self.tarefa.falhas,
+                mensagem_progresso=f"Gravando clientes ({self.tarefa.sucessos}/{len(linhas)})...",
+            )
+
+    def _gravar_bloco(self, bloco: List[LinhaImportacao]) -> None:
+        usuario = self.usuario
+        with transaction.atomic():
+            clientes = []
+            for linha in bloco:
+                cliente = Cliente(
+                    nome=linha.nome,
+                    telefone=linha.telefone_wpp,
+                    data_vencimento=linha.data_vencimento,
+                    data_adesao=linha.data_adesao,
+                    usuario=usuario,
+                    **linha.relacionados,
+                )
+                cliente.preencher_campos_derivados()
+                clientes.append(cliente)
+
+            Cliente.objects.bulk_create(clientes)
+            if any(cliente.pk is None for cliente in clientes):
+                # Bancos sem RETURNING no bulk insert (MySQL): recupera os IDs pelo telefone
+                ids = dict(
+                    Cliente.objects.filter(usuario=usuario, telefone__in=[c.telefone for c in clientes])
+                    .order_by('id').values_list('telefone', 'id')
+                )
+                for cliente in clientes:
+                    cliente.pk = cliente.id = ids[cliente.telefone]
+
+            contas = []
+            for linha, cliente in zip(bloco, clientes):
+                device_id = re.sub(r'[^A-Fa-f0-9]', '', linha.device_id or '')
+                if device_id:
+                    conta = ContaDoAplicativo(
+                        device_id=device_id,
+                        email=linha.email,
+                        device_key=linha.senha,
+                        app=cliente.sistema,
+                        cliente=cliente,
+                        usuario=usuario,
+                    )
+                    conta.normalizar_device_id()
+                    contas.append(conta)
+            ContaDoAplicativo.objects.bulk_create(contas)
+            clientes_com_conta = {conta.cliente_id for conta in contas}
+
+            AssinaturaCliente.objects.bulk_create([
+                AssinaturaCliente(
+                    cliente=cliente,
+                    plano=cliente.plano,
+                    data_inicio_assinatura=cliente.data_adesao or timezone.localdate(),
+                    dispositivos_usados=1 if cliente.pk in clientes_com_conta else 0,
+                    ativo=True,
+                )
+                for cliente in clientes
+            ])
+            Mensalidade.objects.bulk_create([
+                Mensalidade(
+                    cliente=cliente,
+                    valor=cliente.plano.valor,
+                    dt_vencimento=cliente.data_vencimento,
+                    usuario=usuario,
+                    dados_historicos_verificados=False,
+                    valor_base_plano=cliente.plano.valor,
+                )
+                for cliente in clientes
+            ])
+            ClientePlanoHistorico.objects.bulk_create([
+                ClientePlanoHistorico(
+                    cliente=cliente,
+                    usuario=usuario,
+                    plano=cliente.plano,
+                    plano_nome=cliente.plano.nome,
+                    telas=cliente.plano.telas or 1,
+                    valor_plano=cliente.plano.valor or 0,
+                    inicio=cliente.data_adesao,
+                    motivo=ClientePlanoHistorico.MOTIVO_CREATE,
+                )
+                for cliente in clientes
+            ])
+
+            # Remove leads cujos telefones viraram clientes (formato do lead: +DIGITOS)
+            TelefoneLeads.objects.filter(
+                usuario=usuario,
+                telefone__in=['+' + re.sub(r'\D', '', cliente.telefone) for cliente in clientes],
+            ).delete()
+
+        for cliente in clientes:
+            self.clientes_criados[cliente.telefone] = cliente
+        self.tarefa.sucessos += len(clientes)
+        self.tarefa.processados += len(clientes)
+
+    def _etapa_indicacoes(self) -> None:
+        """Associa ``indicado_por`` (telefone do indicador, no mesmo padrão do campo telefone)."""
+        pendentes = [
+            (idx, row.get('telefone', ''), row.get('indicado_por', ''))
+            for idx, row in enumerate(self.registros, 1)
+            if row.get('indicado_por')
+        ]
+        if not pendentes:
+            return
+        self._atualizar(etapa_atual='indicacoes', mensagem_progresso="Associando indicações...")
+
+        for idx, telefone_raw, indicador_raw in pendentes:
+            try:
+                indicador_formatado = indicador_raw if indicador_raw.startswith('+') else f'+{indicador_raw}'
+                # Busca primeiro nos clientes recém-criados, depois no banco
+                indicador = (
+                    self.clientes_criados.get(indicador_formatado)
+                    or Cliente.objects.filter(usuario=self.usuario, telefone_normalizado=chave_telefone(indicador_formatado)).first()
+                )
+                if not indicador:
+                    continue
+                telefone_formatado = telefone_raw if telefone_raw.startswith('+') else f'+{telefone_raw}'
+                cliente = self.clientes_criados.get(telefone_formatado)
+                if cliente:
+                    cliente.indicado_por = indicador
+                    cliente.save(update_fields=['indicado_por'])
+                else:
+                    Cliente.objects.filter(usuario=self.usuario, telefone_normalizado=chave_telefone(telefone_formatado)).update(
+                        indicado_por=indicador
+                    )
+            except Exception as exc:
+                logger.warning("Falha ao associar indicador | usuario=%s linha=%d erro=%s", self.usuario, idx, exc)
+                self.tarefa.falhas += 1
+                self.erros_importacao.append(
+                    f"Linha {idx}: Não foi possível associar o Indicador ({indicador_raw}) ao Cliente ({telefone_raw})."
+                )
+
+    def _invalidar_dados_materializados(self) -> None:
+        """``bulk_create`` não dispara os signals que invalidam snapshots e caches do dono."""
+        if not self.clientes_criados:
+            return
+        from nossopainel.services.dashboard_metrics import invalidar_metricas_dashboard
+        from nossopainel.services.patrimonio import invalidar_patrimonio
+        from nossopainel.services.resumo_notificacoes import invalidar_resumo_notificacoes
+
+        invalidar_patrimonio(self.usuario.id)
+        invalidar_metricas_dashboard(self.usuario.id)
+        invalidar_resumo_notificacoes(self.usuario.id)
+
+    def _etapa_etiquetas(self) -> None:
+        """Aplica as etiquetas do WhatsApp dos novos clientes (após a tarefa ser concluída)."""
+        if not self.clientes_criados or not usuario_tem_funcionalidade(self.usuario, 'whatsapp_sessao'):
+            return
+        from nossopainel.signals import sincronizar_etiquetas_clientes_novos
+
+        # O pool de sincronização limita as chamadas por sessão (mesmo limite da validação)
+        enfileirados = sincronizar_etiquetas_clientes_novos(list(self.clientes_criados.values()), self.sessao)
+        logger.info("Etiquetas da importação enfileiradas | usuario=%s clientes=%d", self.usuario, enfileirados)
+
+
+def _executar_importacao(tarefa_id: int, sessao, registros: List[Dict[str, str]]) -> None:
+    close_old_connections()
+    tarefa = TarefaImportacaoClientes.objects.select_related('usuario').get(pk=tarefa_id)
+    importacao = ImportacaoClientes(tarefa, sessao, registros)
+    try:
+        importacao.executar()
+    except Exception as exc:
+        logger.exception("Falha na importação de clientes | usuario=%s tarefa=%s erro=%s", tarefa.usuario, tarefa_id, exc)
+        TarefaImportacaoClientes.objects.filter(pk=tarefa_id).exclude(
+            status=TarefaImportacaoClientes.STATUS_CONCLUIDA
+        ).update(
+            status=TarefaImportacaoClientes.STATUS_ERRO,
+            erro_geral=str(exc),
+            sucessos=tarefa.sucessos,
+            falhas=tarefa.falhas,
+            processados=tarefa.processados,
+            resultado=importacao._resultado(),
+            concluida_em=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+def marcar_importacoes_interrompidas(usuario=None) -> int:
+    """
+    Encerra com erro as tarefas sem progresso há mais de ``TEMPO_MAXIMO_SEM_PROGRESSO``.
+
+    A importação roda em uma thread daemon do processo web: se o processo reinicia, a
+    tarefa ficaria em andamento para sempre e a tela de progresso nunca terminaria.
+
+    Args:
+        usuario: Restringe às tarefas do usuário (padrão: todas).
+
+    Returns:
+        int: Quantidade de tarefas marcadas como erro.
+    """
+    agora = timezone.now()
+    tarefas = TarefaImportacaoClientes.objects.filter(
+        status__in=[TarefaImportacaoClientes.STATUS_PENDENTE, TarefaImportacaoClientes.STATUS_EM_ANDAMENTO],
+        atualizada_em__lt=agora - TEMPO_MAXIMO_SEM_PROGRESSO,
+    )
+    if usuario is not None:
+        tarefas = tarefas.filter(usuario=usuario)
+    interrompidas = tarefas.update(
+        status=TarefaImportacaoClientes.STATUS_ERRO,
+        erro_geral="Importação interrompida (processo reiniciado). Envie a planilha novamente.",
+        concluida_em=agora,
+        atualizada_em=agora,
+    )
+    if interrompidas:
+        logger.warning("Importações interrompidas marcadas como erro | usuario=%s tarefas=%d", usuario, interrompidas)
+    return interrompidas
+
+
+def iniciar_importacao_segundo_plano(usuario, sessao, registros: List[Dict[str, str]], nome_arquivo: str = "") -> TarefaImportacaoClientes:
+    """
+    Cria a tarefa e dispara a importação em uma thread.
+
+    Args:
+        usuario: Dono dos clientes importados.
+        sessao: ``SessaoWpp`` ativa usada na validação dos números.
+        registros: Linhas retornadas por ``ler_planilha``.
+        nome_arquivo: Nome do arquivo enviado (apenas informativo).
+    """
+    tarefa = TarefaImportacaoClientes.objects.create(
+        usuario=usuario,
+        nome_arquivo=(nome_arquivo or "")[:255],
+        total_linhas=len(registros),
+    )
+    threading.Thread(
+        target=_executar_importacao,
+        args=(tarefa.pk, sessao, registros),
+        name=f"ImportacaoClientes-{tarefa.pk}",
+        daemon=True,
+    ).start()
+    return tarefa
@@ -0,0 +1,285 @@
+"""
+Índice de dispositivos/playlists por conta reseller (Dream TV), com TTL e atualização incremental.
+
+A listagem de domínios e a migração DNS precisavam percorrer ``list_devices`` e chamar
+``list_playlists`` dispositivo a dispositivo (com ``sleep`` entre as chamadas). Agora as
+duas leem do índice em ``DispositivoReseller``:
+
+- dentro de ``INDICE_TTL`` desde a última varredura, o índice é servido sem chamar a API;
+- depois disso a varredura é incremental: as páginas de dispositivos são lidas em
+  paralelo e só têm as playlists consultadas de novo os dispositivos novos, com registro
+  alterado (``assinatura``) ou com playlists mais antigas que ``PLAYLISTS_TTL``;
+- as chamadas usam no máximo ``MAX_WORKERS`` threads e ``REQUISICOES_POR_SEGUNDO`` por
+  conta, e varreduras simultâneas da mesma conta esperam a que já está em andamento.
+
+Uso:
+    from nossopainel.services.indice_reseller import obter_indice_dispositivos
+
+    entradas = obter_indice_dispositivos(conta, lambda: DreamTVAPI(jwt=jwt))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from nossopainel.models import ContaReseller, DispositivoReseller
+from nossopainel.services.limitador_taxa import limitador_compartilhado
+from nossopainel.utils import extrair_dominio_de_url
+
+logger = logging.getLogger(__name__)
+
+INDICE_TTL = timedelta(minutes=15)
+PLAYLISTS_TTL = timedelta(hours=1)
+MAX_WORKERS = 8
+REQUISICOES_POR_SEGUNDO = 20
+LIMITE_PAGINA = 100
+
+_locks_conta: Dict[int, threading.Lock] = {}
+_locks_conta_guard = threading.Lock()
+
+
+def _lock_conta(conta_id: int) -> threading.Lock:
+    with _locks_conta_guard:
+        return _locks_conta.setdefault(conta_id, threading.Lock())
+
+
+def nome_do_dispositivo(device: dict) -> str:
+    """Nome exibido do dispositivo (comentário da ativação, nome, MAC ou ID)."""
+    return (
+        (device.get('reseller_activation') or {}).get('comment')
+        or device.get('comment')
+        or device.get('name')
+        or device.get('mac')
+        or str(device.get('id'))
+    )
+
+
+def estruturar_playlists(playlists: Iterable[dict]) -> List[dict]:
+    """Reduz as playlists da API aos campos usados, com o domínio já extraído."""
+    estruturadas = []
+    for playlist in playlists:
+        url = playlist.get('url', '')
+        estruturadas.append({
+            'id': playlist.get('id'),
+            'name': playlist.get('name', 'Sem nome'),
+            'url': url,
+            'dominio': extrair_dominio_de_url(url) if url else None,
+            'is_selected': playlist.get('is_selected', False),
+            'deviceId': playlist.get('deviceId'),  # deviceId numérico, usado nos updates
+        })
+    return estruturadas
+
+
+def _assinatura(device: dict) -> str:
+    return hashlib.sha1(json.dumps(device, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Varredura:
+    """Uma execução de varredura: clientes da API por thread e limite de taxa da conta."""
+
+    def __init__(self, conta: ContaReseller, api_factory: Callable, raw_logger=None):
+        self.conta = conta
+        self.api_factory = api_factory
+        self.raw_logger = raw_logger
+        self.limitador = limitador_compartilhado(f"reseller:{conta.pk}", REQUISICOES_POR_SEGUNDO)
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._local.api = self.api_factory()
+        return api
+
+    def listar_pagina(self, page: int) -> dict:
+        self.limitador.aguardar()
+        return self._api().list_devices(page=page, limit=LIMITE_PAGINA)
+
+    def listar_playlists(self, device: dict) -> Tuple[str, Optional[List[dict]]]:
+        self.limitador.aguardar()
+        try:
+            playlists = self._api().list_playlists(device_id=device.get('id'))
+        except Exception as exc:
+            logger.warning("Erro ao buscar playlists | conta=%s device=%s erro=%s", self.conta.pk, device.get('mac'), exc)
+            return str(device.get('id')), None
+        if self.raw_logger:
+            for playlist in playlists:
+                self.raw_logger.log_playlist_raw(
+                    device_id=device.get('id'),
+                    playlist_id=playlist.get('id'),
+                    playlist_name=playlist.get('name', 'Sem nome'),
+                    raw_data=playlist,
+                )
+        return str(device.get('id')), estruturar_playlists(playlists)
+
+    def listar_dispositivos(self, executor: ThreadPoolExecutor) -> Tuple[List[dict], bool]:
+        """
+        Lê todas as páginas (a primeira para descobrir o total, as demais em paralelo).
+
+        Returns:
+            tuple: ``(dispositivos, completa)``; ``completa`` é False se alguma página falhou.
+        """
+        primeira = self.listar_pagina(1)
+        dispositivos = list(primeira.get('rows', []))
+        total_paginas = math.ceil((primeira.get('count', 0) or 0) / LIMITE_PAGINA)
+
+        def pagina_segura(page):
+            try:
+                return self.listar_pagina(page)
+            except Exception as exc:
+                logger.error("Erro ao listar dispositivos | conta=%s pagina=%d erro=%s", self.conta.pk, page, exc)
+                return None
+
+        completa = True
+        for resultado in executor.map(pagina_segura, range(2, total_paginas + 1)):
+            if resultado is None:
+                completa = False
+                continue
+            dispositivos.extend(resultado.get('rows', []))
+        return dispositivos, completa
+
+
+def atualizar_indice(conta: ContaReseller, api_factory: Callable, forcar: bool = False, raw_logger=None) -> Dict[str, int]:
+    """
+    Atualiza o índice da conta consultando a API (incrementalmente, salvo ``forcar``).
+
+    Returns:
+        dict: Contadores ``dispositivos``, ``playlists_consultadas`` e ``removidos``.
+    """
+    agora = timezone.now()
+    varredura = _Varredura(conta, api_factory, raw_logger)
+    existentes = {d.device_id: d for d in DispositivoReseller.objects.filter(conta_reseller=conta)}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix=f"IndiceReseller-{conta.pk}") as executor:
+        dispositivos, completa = varredura.listar_dispositivos(executor)
+
+        pendentes = []
+        vistos: Dict[str, dict] = {}
+        for device in dispositivos:
+            device_id = str(device.get('id'))
+            vistos[device_id] = device
+            if raw_logger:
+                raw_logger.log_device_raw(
+                    device_id=device.get('id'),
+                    device_mac=device.get('mac') or device_id,
+                    device_name=nome_do_dispositivo(device),
+                    raw_data=device,
+                )
+            entrada = existentes.get(device_id)
+            if (
+                forcar
+                or entrada is None
+                or entrada.assinatura != _assinatura(device)
+                or entrada.playlists_atualizadas_em is None
+                or agora - entrada.playlists_atualizadas_em > PLAYLISTS_TTL
+            ):
+                pendentes.append(device)
+
+        playlists = dict(executor.map(varredura.listar_playlists, pendentes))
+
+    novos, alterados = [], []
+    for device_id, device in vistos.items():
+        entrada = existentes.get(device_id)
+        if entrada is None:
+            entrada = DispositivoReseller(conta_reseller=conta, device_id=device_id, playlists=[])
+            novos.append(entrada)
+        else:
+            alterados.append(entrada)
+        entrada.mac = device.get('mac') or ''
+        entrada.nome_dispositivo = (nome_do_dispositivo(device) or '')[:255]
+        entrada.assinatura = _assinatura(device)
+        entrada.visto_em = agora
+        if device_id in playlists:
+            if playlists[device_id] is None:
+                # Falha na consulta: mantém as playlists anteriores e tenta de novo na próxima
+                entrada.playlists_atualizadas_em = None
+            else:
+                entrada.playlists = playlists[device_id]
+                entrada.playlists_atualizadas_em = agora
+
+    DispositivoReseller.objects.bulk_create(novos, batch_size=500)
+    DispositivoReseller.objects.bulk_update(
+        alterados,
+        ['mac', 'nome_dispositivo', 'assinatura', 'playlists', 'playlists_atualizadas_em', 'visto_em'],
+        batch_size=500,
+    )
+    removidos = 0
+    if completa:
+        removidos = len(set(existentes) - set(vistos))
+        if removidos:
+            DispositivoReseller.objects.filter(conta_reseller=conta).exclude(device_id__in=list(vistos)).delete()
+        conta.indice_atualizado_em = agora
+        ContaReseller.objects.filter(pk=conta.pk).update(indice_atualizado_em=agora)
+
+    logger.info(
+        "Índice reseller atualizado | conta=%s dispositivos=%d playlists_consultadas=%d removidos=%d completa=%s",
+        conta.pk, len(vistos), len(pendentes), removidos, completa,
+    )
+    return {'dispositivos': len(vistos), 'playlists_consultadas': len(pendentes), 'removidos': removidos}
+
+
+def obter_indice_dispositivos(
+    conta: ContaReseller,
+    api_factory: Callable,
+    forcar: bool = False,
+    raw_logger=None,
+) -> List[DispositivoReseller]:
+    """
+    Retorna os dispositivos indexados da conta, atualizando o índice se expirado.
+
+    Args:
+        conta: Conta reseller.
+        api_factory: Função sem argumentos que cria um cliente ``DreamTVAPI`` (um por thread).
+        forcar: Ignora o TTL e consulta novamente as playlists de todos os dispositivos.
+        raw_logger: ``APIRawLogger`` opcional para registrar os dados brutos consultados.
+    """
+    with _lock_conta(conta.pk):
+        atualizado_em = ContaReseller.objects.filter(pk=conta.pk).values_list('indice_atualizado_em', flat=True).first()
+        if forcar or not atualizado_em or timezone.now() - atualizado_em > INDICE_TTL:
+            atualizar_indice(conta, api_factory, forcar=forcar, raw_logger=raw_logger)
+    return list(DispositivoReseller.objects.filter(conta_reseller=conta).order_by('id'))
+
+
+def invalidar_dispositivos(conta: ContaReseller, device_ids: Iterable) -> None:
+    """
+    Marca as playlists dos dispositivos para nova consulta (ex.: após migração DNS).
+
+    Aceita o ID numérico ou o MAC (dispositivos vindos do cache do frontend só têm o MAC).
+    """
+    ids = [str(device_id) for device_id in device_ids]
+    if conta and ids:
+        DispositivoReseller.objects.filter(
+            Q(device_id__in=ids) | Q(mac__in=ids), conta_reseller=conta,
+        ).update(playlists_atualizadas_em=None)
+        ContaReseller.objects.filter(pk=conta.pk).update(indice_atualizado_em=None)
+
+
+def resumir_dominios(entradas: Iterable[DispositivoReseller]) -> List[dict]:
+    """Domínios únicos com a quantidade de playlists, do mais usado para o menos usado."""
+    contagem = Counter(
+        playlist['dominio']
+        for entrada in entradas
+        for playlist in entrada.playlists
+        if playlist.get('dominio')
+    )
+    return [{'dominio': dominio, 'count': count} for dominio, count in contagem.most_common()]
+
+
+def dispositivo_para_migracao(entrada: DispositivoReseller) -> dict:
+    """Converte a entrada do índice para a estrutura de dispositivo usada na migração."""
+    return {
+        'id': int(entrada.device_id) if entrada.device_id.isdigit() else entrada.device_id,
+        'mac': entrada.mac,
+        'reseller_activation': {'comment': entrada.nome_dispositivo},
+        'playlists': entrada.playlists,
+    }
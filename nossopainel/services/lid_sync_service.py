@@ -6,28 +6,33 @@ busca o número de telefone correspondente e atualiza o campo whatsapp_lid
 do cliente no banco de dados.
 
 Características:
-- Processamento em fila (queue) para evitar sobrecarga
-- Rate limiting: máximo 5 requisições por minuto à API
+- Fila persistente em ``FilaSincronizacaoLid``, compartilhada entre processos
+  (workers do gunicorn e scheduler) e preservada em caso de restart
+- Deduplicação por conjunto: o LID é único na tabela; o enfileiramento em lote
+  descarta com uma consulta os LIDs já vinculados a clientes
+- Rate limiting global: máximo de 5 requisições por minuto à API somando todos os
+  processos (contadas pelo ``consultado_em`` dos itens)
+- Processamento em lotes: cada passada reserva até o limite disponível, resolve os
+  LIDs com o token da sessão de cada um e grava os vínculos com um único bulk_update
 - Timeout para database lock (20 segundos)
 - Worker em thread separada para não bloquear o webhook
-- Singleton para garantir uma única instância
+- Singleton para garantir uma única instância por processo
 
 Configurações:
-- MAX_QUEUE_SIZE: 50 itens
-- RATE_LIMIT: 5 requisições por minuto
+- RATE_LIMIT: 5 requisições por minuto (global)
+- MAX_TENTATIVAS: 3 consultas com falha antes de desistir do LID
+- REENFILEIRAR_APOS: LIDs sem cliente ou com falha voltam à fila após 1 dia
 - DB_LOCK_TIMEOUT: 20 segundos
-- Sem persistência de fila em caso de restart
-- Sem cache em memória (usa índice do banco)
 """
 
-import logging
 import threading
 import time
-from collections import deque
-from typing import Optional
+from datetime import timedelta
+from typing import Iterable, Optional, Tuple
 
 from django.db import OperationalError, transaction
-from django.db.models.signals import post_save
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
 
 from nossopainel.services.logging_config import get_logger
 
@@ -41,18 +46,23 @@ class LidSyncService:
 
     Uso:
         service = LidSyncService()
-        service.enqueue(lid="277742767599622@lid", session="jrg", token="...")
+        service.enqueue(lid="277742767599622@lid", session="jrg")
+        service.enqueue_many(["277742767599622@lid", "82549456040174@lid"], session="jrg")
     """
 
     _instance = None
     _lock = threading.Lock()
 
     # ==================== CONFIGURAÇÕES ====================
-    MAX_QUEUE_SIZE = 50         # Limite máximo da fila
-    RATE_LIMIT = 5              # Requisições por minuto
+    RATE_LIMIT = 5              # Requisições por minuto (somando todos os processos)
     RATE_WINDOW = 60            # Janela de tempo em segundos
+    MAX_TENTATIVAS = 3          # Consultas com falha antes de marcar o LID como falha
+    BACKOFF_FALHA = 300         # Segundos até nova consulta de um LID que falhou
+    TEMPO_MAXIMO_PROCESSANDO = timedelta(minutes=10)  # Reserva abandonada (processo encerrado)
+    REENFILEIRAR_APOS = timedelta(days=1)
     DB_LOCK_TIMEOUT = 20        # Timeout para lock do banco em segundos
-    PROCESS_INTERVAL = 1        # Intervalo entre processamentos em segundos
+    PROCESS_INTERVAL = 1        # Intervalo entre verificações com a fila vazia
+    IDLE_TIMEOUT = 30           # Encerra o worker após N segundos sem itens
     # ========================================================
 
     def __new__(cls):
@@ -69,79 +79,113 @@ class LidSyncService:
         if self._initialized:
             return
 
-        self.queue = deque(maxlen=self.MAX_QUEUE_SIZE)
-        self.request_times = deque()  # Timestamps das requisições para rate limiting
         self.worker_thread: Optional[threading.Thread] = None
         self.running = False
+        self._stats_lock = threading.Lock()
+        self.process_stats = {
+            'enqueued': 0,
+            'api_requests': 0,
+            'resolved': 0,
+            'without_client': 0,
+            'failed': 0,
+            'batches': 0,
+        }
         self._initialized = True
 
         logger.info(
             "[LidSyncService] Serviço inicializado | "
-            f"max_queue={self.MAX_QUEUE_SIZE} rate_limit={self.RATE_LIMIT}/min "
-            f"db_timeout={self.DB_LOCK_TIMEOUT}s"
+            f"rate_limit={self.RATE_LIMIT}/min db_timeout={self.DB_LOCK_TIMEOUT}s"
         )
 
-    def enqueue(self, lid: str, session: str, token: str) -> bool:
+    def _contar(self, **valores):
+        with self._stats_lock:
+            for chave, valor in valores.items():
+                self.process_stats[chave] += valor
+
+    # ==================== ENFILEIRAMENTO ====================
+
+    def enqueue(self, lid: str, session: str, token: Optional[str] = None) -> bool:
         """
         Adiciona um LID à fila para processamento.
 
         Args:
             lid: O LID completo (ex: "277742767599622@lid")
             session: Nome da sessão WhatsApp
-            token: Token de autenticação da sessão
+            token: Ignorado; o token é lido da ``SessaoWpp`` no processamento
+                (não é persistido na fila)
+
+        Returns:
+            True se adicionado à fila, False se LID inválido, já vinculado ou já enfileirado
+        """
+        return self.enqueue_many([lid], session) > 0
+
+    def enqueue_many(self, lids: Iterable[str], session: str) -> int:
+        """
+        Adiciona vários LIDs à fila com deduplicação por conjunto.
+
+        Descarta com uma consulta os LIDs já vinculados a clientes e com outra os que
+        já estão na fila; LIDs sem cliente ou com falha há mais de ``REENFILEIRAR_APOS``
+        voltam a ficar pendentes.
 
         Returns:
-            True se adicionado à fila, False se fila cheia ou LID inválido
+            Quantidade de LIDs efetivamente (re)enfileirados
         """
         self._initialize()
 
-        # Validar LID
-        if not lid or '@lid' not in lid:
-            logger.debug(f"[LidSyncService] LID inválido ignorado: {lid}")
-            return False
-
-        # Verificar se já está no banco (evita requisição desnecessária)
-        if self._lid_exists_in_db(lid):
-            logger.debug(f"[LidSyncService] LID já existe no banco: {lid}")
-            return False
-
-        # Verificar se já está na fila
-        for item in self.queue:
-            if item['lid'] == lid:
-                logger.debug(f"[LidSyncService] LID já está na fila: {lid}")
-                return False
-
-        # Adicionar à fila
-        item = {
-            'lid': lid,
-            'session': session,
-            'token': token,
-            'enqueued_at': time.time()
-        }
+        from nossopainel.models import Cliente, FilaSincronizacaoLid
+
+        validos = {lid.strip() for lid in lids if lid and '@lid' in lid}
+        if not validos:
+            logger.debug(f"[LidSyncService] Nenhum LID válido para enfileirar | session={session}")
+            return 0
 
         try:
-            self.queue.append(item)
-            logger.info(
-                f"[LidSyncService] LID enfileirado | lid={lid} "
-                f"queue_size={len(self.queue)}/{self.MAX_QUEUE_SIZE}"
+            vinculados = set(
+                Cliente.objects.filter(whatsapp_lid__in=validos).values_list('whatsapp_lid', flat=True)
+            )
+            candidatos = validos - vinculados
+            if not candidatos:
+                logger.debug(f"[LidSyncService] LIDs já existem no banco | total={len(validos)}")
+                return 0
+
+            agora = timezone.now()
+            reabertos = FilaSincronizacaoLid.objects.filter(
+                lid__in=candidatos,
+                status__in=[FilaSincronizacaoLid.STATUS_SEM_CLIENTE, FilaSincronizacaoLid.STATUS_FALHA],
+                processado_em__lt=agora - self.REENFILEIRAR_APOS,
+            ).update(
+                status=FilaSincronizacaoLid.STATUS_PENDENTE,
+                sessao=session,
+                tentativas=0,
+                erro='',
+                disponivel_em=agora,
+            )
+            enfileirados = set(
+                FilaSincronizacaoLid.objects.filter(lid__in=candidatos).values_list('lid', flat=True)
             )
+            novos = [
+                FilaSincronizacaoLid(lid=lid, sessao=session)
+                for lid in sorted(candidatos - enfileirados)
+            ]
+            # ignore_conflicts: outro processo pode ter enfileirado o mesmo LID em paralelo
+            FilaSincronizacaoLid.objects.bulk_create(novos, ignore_conflicts=True)
         except Exception as e:
-            logger.error(f"[LidSyncService] Erro ao enfileirar LID {lid}: {e}")
-            return False
+            logger.error(f"[LidSyncService] Erro ao enfileirar LIDs | session={session} erro={e}")
+            return 0
 
-        # Iniciar worker se não estiver rodando
-        self._ensure_worker_running()
+        total = len(novos) + reabertos
+        if total:
+            self._contar(enqueued=total)
+            logger.info(
+                f"[LidSyncService] LIDs enfileirados | session={session} "
+                f"novos={len(novos)} reabertos={reabertos} descartados={len(validos) - total}"
+            )
+            # Iniciar worker se não estiver rodando
+            self._ensure_worker_running()
 
-        return True
+        return total
 
-    def _lid_exists_in_db(self, lid: str) -> bool:
-        """Verifica se o LID já existe no banco de dados (usa índice)."""
-        try:
-            from nossopainel.models import Cliente
-            return Cliente.objects.filter(whatsapp_lid=lid).exists()
-        except Exception as e:
-            logger.error(f"[LidSyncService] Erro ao verificar LID no banco: {e}")
-            return False
+    # ==================== WORKER ====================
 
     def _ensure_worker_running(self):
         """Garante que o worker thread está rodando."""
@@ -157,235 +201,332 @@ class LidSyncService:
                 logger.info("[LidSyncService] Worker thread iniciado")
 
     def _worker_loop(self):
-        """Loop principal do worker que processa a fila."""
-        logger.info("[LidSyncService] Worker loop iniciado")
+        """Loop principal do worker: drena a fila até ficar ocioso por IDLE_TIMEOUT."""
+        from django.db import close_old_connections
 
-        while self.running:
-            try:
-                # Verificar se há itens na fila
-                if not self.queue:
-                    # Fila vazia - aguardar e verificar novamente
-                    time.sleep(self.PROCESS_INTERVAL)
-
-                    # Se fila continua vazia por 30 segundos, encerrar worker
-                    empty_count = 0
-                    while not self.queue and empty_count < 30:
-                        time.sleep(1)
-                        empty_count += 1
+        logger.info("[LidSyncService] Worker loop iniciado")
+        ocioso_desde = None
 
-                    if not self.queue:
-                        logger.info("[LidSyncService] Fila vazia por 30s, encerrando worker")
+        try:
+            self._recover_stale()
+            while self.running:
+                try:
+                    processados = self.process_batch()
+                    if processados is None:
+                        # Rate limit atingido - aguardar liberação da janela
+                        _, wait_time = self._rate_budget()
+                        logger.debug(f"[LidSyncService] Rate limit atingido, aguardando {wait_time:.1f}s")
+                        time.sleep(wait_time)
+                        continue
+
+                    if processados:
+                        ocioso_desde = None
+                        continue
+
+                    ocioso_desde = ocioso_desde or time.monotonic()
+                    if time.monotonic() - ocioso_desde >= self.IDLE_TIMEOUT:
+                        logger.info(f"[LidSyncService] Fila vazia por {self.IDLE_TIMEOUT}s, encerrando worker")
                         break
+                    time.sleep(self.PROCESS_INTERVAL)
 
-                    continue
-
-                # Verificar rate limit
-                if not self._check_rate_limit():
-                    wait_time = self._get_wait_time()
-                    logger.debug(
-                        f"[LidSyncService] Rate limit atingido, aguardando {wait_time:.1f}s"
-                    )
-                    time.sleep(wait_time)
-                    continue
+                except Exception as e:
+                    logger.error(f"[LidSyncService] Erro no worker loop: {e}", exc_info=True)
+                    time.sleep(5)  # Aguardar antes de continuar após erro
+        finally:
+            self.running = False
+            close_old_connections()
+            logger.info("[LidSyncService] Worker loop encerrado")
 
-                # Pegar próximo item da fila
-                try:
-                    item = self.queue.popleft()
-                except IndexError:
-                    continue
-
-                # Processar o item
-                self._process_item(item)
+    def _rate_budget(self) -> Tuple[int, float]:
+        """
+        Consultas disponíveis na janela atual (global, via banco).
 
-                # Intervalo entre processamentos
-                time.sleep(self.PROCESS_INTERVAL)
+        Returns:
+            Tupla (consultas disponíveis, segundos até liberar a próxima quando 0)
+        """
+        from nossopainel.models import FilaSincronizacaoLid
 
-            except Exception as e:
-                logger.error(f"[LidSyncService] Erro no worker loop: {e}", exc_info=True)
-                time.sleep(5)  # Aguardar antes de continuar após erro
+        agora = timezone.now()
+        recentes = list(
+            FilaSincronizacaoLid.objects.filter(consultado_em__gt=agora - timedelta(seconds=self.RATE_WINDOW))
+            .order_by('consultado_em')
+            .values_list('consultado_em', flat=True)[:self.RATE_LIMIT]
+        )
+        disponiveis = self.RATE_LIMIT - len(recentes)
+        if disponiveis > 0:
+            return disponiveis, 0.0
+        liberacao = recentes[0] + timedelta(seconds=self.RATE_WINDOW)
+        return 0, max((liberacao - agora).total_seconds(), self.PROCESS_INTERVAL)
+
+    def _recover_stale(self):
+        """Devolve à fila itens presos em 'processando' (processo encerrado no meio do lote)."""
+        from nossopainel.models import FilaSincronizacaoLid
+
+        devolvidos = FilaSincronizacaoLid.objects.filter(
+            status=FilaSincronizacaoLid.STATUS_PROCESSANDO,
+            consultado_em__lt=timezone.now() - self.TEMPO_MAXIMO_PROCESSANDO,
+        ).update(status=FilaSincronizacaoLid.STATUS_PENDENTE)
+        if devolvidos:
+            logger.warning(f"[LidSyncService] Itens travados devolvidos à fila | quantidade={devolvidos}")
+
+    def _claim_batch(self, limite: int) -> list:
+        """
+        Reserva até ``limite`` itens pendentes (reserva atômica por item, segura entre processos).
 
-        self.running = False
-        logger.info("[LidSyncService] Worker loop encerrado")
+        A reserva grava ``consultado_em``, que é o que conta no rate limit global.
+        """
+        from nossopainel.models import FilaSincronizacaoLid
+
+        agora = timezone.now()
+        ids = list(
+            FilaSincronizacaoLid.objects.filter(
+                status=FilaSincronizacaoLid.STATUS_PENDENTE,
+                disponivel_em__lte=agora,
+            ).order_by('id').values_list('id', flat=True)[:limite]
+        )
+        reservados = [
+            item_id for item_id in ids
+            if FilaSincronizacaoLid.objects.filter(
+                id=item_id, status=FilaSincronizacaoLid.STATUS_PENDENTE,
+            ).update(
+                status=FilaSincronizacaoLid.STATUS_PROCESSANDO,
+                consultado_em=agora,
+                tentativas=F('tentativas') + 1,
+            )
+        ]
+        return list(FilaSincronizacaoLid.objects.filter(id__in=reservados).order_by('id'))
 
-    def _check_rate_limit(self) -> bool:
+    def process_batch(self) -> Optional[int]:
         """
-        Verifica se podemos fazer uma nova requisição (rate limiting).
+        Processa um lote do tamanho do orçamento disponível no rate limit.
 
         Returns:
-            True se podemos fazer requisição, False se limite atingido
+            Quantidade de itens processados, ou None se o rate limit está esgotado
         """
-        now = time.time()
-        window_start = now - self.RATE_WINDOW
-
-        # Remover timestamps antigos
-        while self.request_times and self.request_times[0] < window_start:
-            self.request_times.popleft()
+        self._initialize()
 
-        # Verificar se está dentro do limite
-        return len(self.request_times) < self.RATE_LIMIT
+        orcamento, _ = self._rate_budget()
+        if not orcamento:
+            return None
 
-    def _get_wait_time(self) -> float:
-        """Calcula quanto tempo aguardar até poder fazer nova requisição."""
-        if not self.request_times:
+        itens = self._claim_batch(orcamento)
+        if not itens:
             return 0
 
-        oldest_request = self.request_times[0]
-        wait_until = oldest_request + self.RATE_WINDOW
-        return max(0, wait_until - time.time())
+        inicio = time.monotonic()
+        self._resolve_batch(itens)
+        self._apply_batch(itens)
+        self._contar(batches=1)
 
-    def _record_request(self):
-        """Registra uma requisição para o rate limiting."""
-        self.request_times.append(time.time())
+        logger.info(
+            f"[LidSyncService] Lote processado | itens={len(itens)} "
+            f"resolvidos={sum(1 for i in itens if i.status == i.STATUS_RESOLVIDO)} "
+            f"duracao={time.monotonic() - inicio:.2f}s"
+        )
+        return len(itens)
 
-    def _process_item(self, item: dict):
+    def _resolve_batch(self, itens: list):
         """
-        Processa um item da fila: busca telefone do LID e atualiza o cliente.
+        Busca o telefone de cada LID do lote via API (um token por sessão).
 
-        Args:
-            item: Dicionário com 'lid', 'session', 'token'
+        Preenche ``telefone`` nos itens resolvidos; os demais recebem status/erro.
         """
-        lid = item['lid']
-        session = item['session']
-        token = item['token']
+        from nossopainel.models import FilaSincronizacaoLid, SessaoWpp
+        from wpp.api_connection import get_phone_from_pn_lid
 
-        logger.info(f"[LidSyncService] Processando LID: {lid}")
+        sessoes = {item.sessao for item in itens}
+        tokens = dict(
+            SessaoWpp.objects.filter(usuario__in=sessoes, is_active=True).values_list('usuario', 'token')
+        )
 
-        try:
-            # 1. Buscar número de telefone do LID via API
-            from wpp.api_connection import get_phone_from_pn_lid
+        for item in itens:
+            token = tokens.get(item.sessao)
+            if not token:
+                self._mark_failure(item, "Sessão inativa ou inexistente")
+                continue
 
-            self._record_request()
-            phone, status = get_phone_from_pn_lid(session, token, lid)
+            logger.info(f"[LidSyncService] Processando LID: {item.lid}")
+            try:
+                self._contar(api_requests=1)
+                phone, status = get_phone_from_pn_lid(item.sessao, token, item.lid)
+            except Exception as e:
+                logger.error(f"[LidSyncService] Erro ao consultar LID {item.lid}: {e}", exc_info=True)
+                self._mark_failure(item, str(e))
+                continue
 
             if status != 200 or not phone:
                 logger.warning(
                     f"[LidSyncService] Falha ao obter telefone do LID | "
-                    f"lid={lid} status={status} phone={phone}"
+                    f"lid={item.lid} status={status} phone={phone}"
                 )
-                return
+                self._mark_failure(item, f"HTTP {status}" if status != 200 else "Telefone não retornado")
+                continue
+
+            item.telefone = phone.replace('+', '').replace('@c.us', '').strip()
+            item.status = FilaSincronizacaoLid.STATUS_RESOLVIDO
+            logger.debug(f"[LidSyncService] Telefone obtido: {item.lid} -> {item.telefone}")
+
+    def _mark_failure(self, item, erro: str):
+        """Agenda nova consulta do item ou o marca como falha após MAX_TENTATIVAS."""
+        from nossopainel.models import FilaSincronizacaoLid
+
+        item.erro = erro[:255]
+        if item.tentativas >= self.MAX_TENTATIVAS:
+            item.status = FilaSincronizacaoLid.STATUS_FALHA
+            item.processado_em = timezone.now()
+            self._contar(failed=1)
+        else:
+            item.status = FilaSincronizacaoLid.STATUS_PENDENTE
+            item.disponivel_em = timezone.now() + timedelta(seconds=self.BACKOFF_FALHA)
+
+    def _apply_batch(self, itens: list):
+        """
+        Vincula os LIDs resolvidos aos clientes e atualiza os itens da fila.
 
-            logger.debug(f"[LidSyncService] Telefone obtido: {lid} -> {phone}")
+        Uma consulta busca os clientes de todos os telefones do lote pela chave canônica
+        (``telefone_normalizado``, índice com o dono da sessão; cliente mais recente) e um
+        único ``bulk_update`` grava ``whatsapp_lid`` (bulk_update não dispara o signal de
+        sincronização de labels). Clientes cadastrados sem o DDI 55 são encontrados pelas
+        chaves locais do número (``chaves_telefone_sem_ddi``) na mesma consulta.
+        """
+        from nossopainel.models import (
+            Cliente,
+            FilaSincronizacaoLid,
+            SessaoWpp,
+            chave_telefone,
+            chaves_telefone_sem_ddi,
+        )
 
-            # 2. Buscar cliente pelo telefone no banco
-            self._update_client_lid(phone, lid)
+        resolvidos = [item for item in itens if item.status == FilaSincronizacaoLid.STATUS_RESOLVIDO]
 
-        except Exception as e:
-            logger.error(
-                f"[LidSyncService] Erro ao processar LID {lid}: {e}",
-                exc_info=True
+        # Sessões sem usuário Django vinculado (None) buscam em todos os clientes
+        donos = dict(
+            SessaoWpp.objects.filter(usuario__in={item.sessao for item in resolvidos}).values_list('usuario', 'user_id')
+        )
+        # Chave canônica primeiro; as formas sem DDI são o fallback
+        chaves_item = {}
+        chaves_por_dono = {}
+        for item in resolvidos:
+            chave = chave_telefone(item.telefone)
+            chaves_item[item.pk] = [chave, *chaves_telefone_sem_ddi(chave)]
+            chaves_por_dono.setdefault(donos.get(item.sessao), set()).update(chaves_item[item.pk])
+
+        por_chave = {}
+        if chaves_por_dono:
+            filtro = Q()
+            for dono, chaves in chaves_por_dono.items():
+                filtro |= Q(telefone_normalizado__in=chaves, **({'usuario_id': dono} if dono else {}))
+            clientes = Cliente.objects.filter(filtro).only('id', 'nome', 'telefone', 'telefone_normalizado', 'usuario_id', 'whatsapp_lid')
+            for cliente in clientes:
+                por_chave.setdefault((cliente.usuario_id, cliente.telefone_normalizado), cliente)
+                por_chave.setdefault((None, cliente.telefone_normalizado), cliente)
+
+        agora = timezone.now()
+        alterados = {}
+        for item in resolvidos:
+            item.processado_em = agora
+            item.erro = ''
+            dono = donos.get(item.sessao)
+            cliente = next(
+                (por_chave[(dono, chave)] for chave in chaves_item[item.pk] if (dono, chave) in por_chave),
+                None,
             )
+            if not cliente:
+                logger.debug(f"[LidSyncService] Cliente não encontrado para telefone: {item.telefone}")
+                item.status = FilaSincronizacaoLid.STATUS_SEM_CLIENTE
+                continue
+            item.cliente = cliente
+            if cliente.whatsapp_lid != item.lid:
+                logger.info(
+                    f"[LidSyncService] LID atualizado | "
+                    f"cliente={cliente.nome} (ID={cliente.pk}) | "
+                    f"telefone={cliente.telefone} | "
+                    f"old_lid={cliente.whatsapp_lid} -> new_lid={item.lid}"
+                )
+                cliente.whatsapp_lid = item.lid
+                alterados[cliente.pk] = cliente
+
+        def gravar():
+            with transaction.atomic():
+                Cliente.objects.bulk_update(list(alterados.values()), ['whatsapp_lid'])
+                FilaSincronizacaoLid.objects.bulk_update(
+                    itens,
+                    ['status', 'telefone', 'cliente', 'erro', 'disponivel_em', 'processado_em'],
+                )
 
-    def _update_client_lid(self, phone: str, lid: str):
-        """
-        Atualiza o campo whatsapp_lid do cliente.
-
-        Implementa retry com timeout para lidar com database lock.
-        OTIMIZAÇÃO: Desconecta o signal cliente_post_save durante o save
-        para evitar sincronização de labels desnecessária.
+        if self._with_lock_retry(gravar):
+            sem_cliente = sum(1 for item in resolvidos if item.status == FilaSincronizacaoLid.STATUS_SEM_CLIENTE)
+            self._contar(resolved=len(resolvidos) - sem_cliente, without_client=sem_cliente)
 
-        Args:
-            phone: Número de telefone do cliente
-            lid: LID a ser salvo
+    def _with_lock_retry(self, func) -> bool:
         """
-        from nossopainel.models import Cliente
-        from nossopainel.signals import cliente_post_save
-
-        # Normalizar telefone para busca (remover + e @c.us se houver)
-        phone_normalized = phone.replace('+', '').replace('@c.us', '').strip()
-
-        # Tentar diferentes formatos de telefone
-        phone_variants = [
-            phone_normalized,                    # 554588334558
-            f"+{phone_normalized}",              # +554588334558
-            phone_normalized[2:] if phone_normalized.startswith('55') else phone_normalized,  # 4588334558
-        ]
+        Executa ``func`` repetindo em caso de database lock (backoff exponencial).
 
+        Returns:
+            True se executou; False após esgotar tentativas/timeout
+        """
         start_time = time.time()
         retry_count = 0
         max_retries = 5
 
         while time.time() - start_time < self.DB_LOCK_TIMEOUT:
             try:
-                with transaction.atomic():
-                    # Tentar encontrar cliente com diferentes formatos de telefone
-                    cliente = None
-                    for phone_variant in phone_variants:
-                        cliente = Cliente.objects.filter(telefone__endswith=phone_variant[-10:]).first()
-                        if cliente:
-                            break
-
-                    if not cliente:
-                        logger.debug(
-                            f"[LidSyncService] Cliente não encontrado para telefone: {phone_normalized}"
-                        )
-                        return
-
-                    # Verificar se já tem o LID correto
-                    if cliente.whatsapp_lid == lid:
-                        logger.debug(
-                            f"[LidSyncService] Cliente {cliente.nome} já possui este LID"
-                        )
-                        return
-
-                    # Atualizar o LID
-                    old_lid = cliente.whatsapp_lid
-                    cliente.whatsapp_lid = lid
-
-                    # OTIMIZAÇÃO: Desconectar signal para evitar sincronização de labels
-                    # A atualização de whatsapp_lid não deve disparar labels sync
-                    post_save.disconnect(cliente_post_save, sender=Cliente)
-                    try:
-                        cliente.save(update_fields=['whatsapp_lid'])
-                    finally:
-                        # Sempre reconectar o signal, mesmo em caso de erro
-                        post_save.connect(cliente_post_save, sender=Cliente)
-
-                    logger.info(
-                        f"[LidSyncService] LID atualizado com sucesso | "
-                        f"cliente={cliente.nome} (ID={cliente.pk}) | "
-                        f"telefone={cliente.telefone} | "
-                        f"old_lid={old_lid} -> new_lid={lid}"
-                    )
-                    return
-
+                func()
+                return True
             except OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    retry_count += 1
-                    wait_time = min(2 ** retry_count, 5)  # Exponential backoff, max 5s
-                    logger.warning(
-                        f"[LidSyncService] Database locked, tentativa {retry_count}/{max_retries} | "
-                        f"aguardando {wait_time}s..."
-                    )
-                    time.sleep(wait_time)
-
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"[LidSyncService] Timeout ao atualizar LID após {max_retries} tentativas | "
-                            f"phone={phone_normalized} lid={lid}"
-                        )
-                        return
-                else:
+                if "database is locked" not in str(e).lower():
                     raise
-
-            except Exception as e:
-                logger.error(
-                    f"[LidSyncService] Erro ao atualizar cliente: {e}",
-                    exc_info=True
+                retry_count += 1
+                if retry_count >= max_retries:
+                    break
+                wait_time = min(2 ** retry_count, 5)  # Exponential backoff, max 5s
+                logger.warning(
+                    f"[LidSyncService] Database locked, tentativa {retry_count}/{max_retries} | "
+                    f"aguardando {wait_time}s..."
                 )
-                return
+                time.sleep(wait_time)
 
         logger.error(
-            f"[LidSyncService] Timeout geral ({self.DB_LOCK_TIMEOUT}s) ao atualizar LID | "
-            f"phone={phone_normalized} lid={lid}"
+            f"[LidSyncService] Timeout ao gravar lote após {retry_count} tentativas "
+            f"({self.DB_LOCK_TIMEOUT}s); itens voltarão à fila"
         )
+        return False
+
+    # ==================== MONITORAMENTO ====================
 
     def get_stats(self) -> dict:
-        """Retorna estatísticas do serviço para monitoramento."""
+        """Retorna estatísticas da fila (global) e do processo para monitoramento."""
+        self._initialize()
+
+        from nossopainel.models import FilaSincronizacaoLid
+
+        agora = timezone.now()
+        por_status = dict(
+            FilaSincronizacaoLid.objects.values_list('status').annotate(total=Count('id')).order_by()
+        )
+        ultima_hora = FilaSincronizacaoLid.objects.filter(processado_em__gte=agora - timedelta(hours=1))
+        processados_hora = dict(ultima_hora.values_list('status').annotate(total=Count('id')).order_by())
+        pendente_mais_antigo = FilaSincronizacaoLid.objects.filter(
+            status=FilaSincronizacaoLid.STATUS_PENDENTE,
+        ).aggregate(criado=Min('criado_em'))['criado']
+        disponiveis, _ = self._rate_budget()
+
+        with self._stats_lock:
+            process_stats = dict(self.process_stats)
+
         return {
-            'queue_size': len(self.queue),
-            'max_queue_size': self.MAX_QUEUE_SIZE,
+            'queue_size': por_status.get(FilaSincronizacaoLid.STATUS_PENDENTE, 0),
+            'processing': por_status.get(FilaSincronizacaoLid.STATUS_PROCESSANDO, 0),
+            'by_status': por_status,
+            'oldest_pending_age_s': (
+                round((agora - pendente_mais_antigo).total_seconds()) if pendente_mais_antigo else None
+            ),
+            'processed_last_hour': sum(processados_hora.values()),
+            'resolved_last_hour': processados_hora.get(FilaSincronizacaoLid.STATUS_RESOLVIDO, 0),
+            'throughput_per_min': round(sum(processados_hora.values()) / 60, 2),
             'rate_limit': self.RATE_LIMIT,
-            'requests_in_window': len(self.request_times),
+            'requests_in_window': self.RATE_LIMIT - disponiveis,
+            'process': process_stats,
             'worker_running': self.worker_thread.is_alive() if self.worker_thread else False,
         }
 
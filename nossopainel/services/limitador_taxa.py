@@ -0,0 +1,50 @@
+"""
+Limite de requisições por segundo para chamadas a APIs externas feitas em paralelo.
+
+Uso:
+    from nossopainel.services.limitador_taxa import limitador_compartilhado
+
+    limitador_compartilhado("wpp:sessao", 5).aguardar()
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict
+
+
+class LimitadorTaxa:
+    """Token bucket thread-safe: no máximo ``taxa`` chamadas por segundo (com rajada de ``taxa``)."""
+
+    def __init__(self, taxa: float):
+        self.taxa = float(taxa)
+        self.capacidade = max(1.0, self.taxa)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def aguardar(self) -> None:
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+_limitadores: Dict[str, LimitadorTaxa] = {}
+_limitadores_lock = threading.Lock()
+
+
+def limitador_compartilhado(chave: str, taxa: float) -> LimitadorTaxa:
+    """Limitador único por ``chave`` no processo (ex.: sessão do WPPConnect, conta reseller)."""
+    with _limitadores_lock:
+        limitador = _limitadores.get(chave)
+        if limitador is None:
+            limitador = _limitadores[chave] = LimitadorTaxa(taxa)
+        return limitador
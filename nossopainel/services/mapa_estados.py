@@ -0,0 +1,123 @@
+"""
+Camada geográfica dos estados brasileiros para o mapa de clientes do dashboard.
+
+O GeoJSON de ``archives/brasil_estados.geojson`` é lido uma única vez por processo (no
+primeiro uso) e convertido em um template compacto: para cada UF guardamos o trecho
+já serializado da feature (geometria + ``name``/``sigla``), faltando apenas as
+propriedades por requisição (``clientes`` e ``porcentagem``). Assim a view não depende
+de geopandas/pandas/shapely e não re-serializa a geometria a cada chamada.
+
+Uso:
+    from nossopainel.services.mapa_estados import montar_features_json
+
+    features_json, max_clientes = montar_features_json({"PB": 10}, total_geral=10)
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+ARQUIVO_GEOJSON_ESTADOS = Path(settings.BASE_DIR) / "archives" / "brasil_estados.geojson"
+
+SIGLAS_ESTADOS = {
+    "acre": "AC",
+    "alagoas": "AL",
+    "amapa": "AP",
+    "amazonas": "AM",
+    "bahia": "BA",
+    "ceara": "CE",
+    "distrito federal": "DF",
+    "espirito santo": "ES",
+    "goias": "GO",
+    "maranhao": "MA",
+    "mato grosso": "MT",
+    "mato grosso do sul": "MS",
+    "minas gerais": "MG",
+    "para": "PA",
+    "paraiba": "PB",
+    "parana": "PR",
+    "pernambuco": "PE",
+    "piaui": "PI",
+    "rio de janeiro": "RJ",
+    "rio grande do norte": "RN",
+    "rio grande do sul": "RS",
+    "rondonia": "RO",
+    "roraima": "RR",
+    "santa catarina": "SC",
+    "sao paulo": "SP",
+    "sergipe": "SE",
+    "tocantins": "TO",
+}
+
+_template_estados: Optional[List[Tuple[str, str]]] = None
+_template_lock = threading.Lock()
+
+
+def _normalizar_estado(nome) -> str:
+    if not isinstance(nome, str):
+        return ""
+    return unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def _carregar_template(caminho: Path = ARQUIVO_GEOJSON_ESTADOS) -> List[Tuple[str, str]]:
+    """
+    Lê o GeoJSON e monta a lista ``(sigla, prefixo_json)`` na ordem do arquivo.
+
+    O prefixo é a feature serializada até a abertura das propriedades dinâmicas, ex.:
+    ``{"id":"0","type":"Feature","properties":{"name":"Acre","sigla":"AC",``.
+    Estados sem sigla reconhecida são descartados.
+    """
+    with open(caminho, encoding="utf-8") as arquivo:
+        geojson = json.load(arquivo)
+
+    template = []
+    for indice, feature in enumerate(geojson.get("features", [])):
+        nome = (feature.get("properties") or {}).get("name")
+        sigla = SIGLAS_ESTADOS.get(_normalizar_estado(nome))
+        if not sigla:
+            continue
+        geometria = json.dumps(feature.get("geometry"), separators=(",", ":"))
+        prefixo = (
+            '{"id":' + json.dumps(str(indice))
+            + ',"type":"Feature","geometry":' + geometria
+            + ',"properties":{"name":' + json.dumps(nome) + ',"sigla":' + json.dumps(sigla) + ","
+        )
+        template.append((sigla, prefixo))
+    return template
+
+
+def obter_template_estados() -> List[Tuple[str, str]]:
+    """Retorna o template das features (carregado no primeiro uso e mantido em memória)."""
+    global _template_estados
+    if _template_estados is None:
+        with _template_lock:
+            if _template_estados is None:
+                _template_estados = _carregar_template()
+    return _template_estados
+
+
+def montar_features_json(clientes_por_uf: Dict[str, int], total_geral: int) -> Tuple[str, int]:
+    """
+    Injeta as contagens por UF no template e devolve o array de features serializado.
+
+    Args:
+        clientes_por_uf: Quantidade de clientes ativos por sigla de UF.
+        total_geral: Total de clientes ativos (base do percentual).
+
+    Returns:
+        tuple[str, int]: JSON do array ``features`` e o maior número de clientes em um estado.
+    """
+    partes = []
+    max_clientes = 0
+    for sigla, prefixo in obter_template_estados():
+        clientes = int(clientes_por_uf.get(sigla, 0) or 0)
+        porcentagem = float(round((clientes / total_geral) * 100, 1)) if total_geral > 0 else 0.0
+        max_clientes = max(max_clientes, clientes)
+        partes.append(f'{prefixo}"clientes":{clientes},"porcentagem":{json.dumps(porcentagem)}}}}}')
+    return "[" + ",".join(partes) + "]", max_clientes
@@ -385,6 +385,9 @@ class ClientMigrationService:
             cliente.save()
             stats['clientes_migrados'] += 1
 
+        # Os updates em massa acima não disparam signals: descarta os dados materializados
+        self._invalidar_dados_materializados()
+
         return {
             'success': True,
             'stats': stats,
@@ -392,6 +395,18 @@ class ClientMigrationService:
             'warnings': self.validation_warnings,
         }
 
+    def _invalidar_dados_materializados(self) -> None:
+        """Invalida snapshots/caches por dono (origem e destino) afetados pela migração."""
+        from nossopainel.services.dashboard_metrics import invalidar_metricas_dashboard
+        from nossopainel.services.patrimonio import invalidar_patrimonio
+        from nossopainel.services.resumo_notificacoes import invalidar_resumo_notificacoes
+
+        usuarios_ids = (self.usuario_origem.id, self.usuario_destino.id)
+        invalidar_patrimonio(*usuarios_ids)
+        for usuario_id in usuarios_ids:
+            invalidar_metricas_dashboard(usuario_id)
+            invalidar_resumo_notificacoes(usuario_id)
+
     def _create_missing_entities(self) -> Dict[str, Dict[int, int]]:
         """
         Cria entidades faltantes no usuário destino.
@@ -0,0 +1,151 @@
+"""
+Série mensal de patrimônio (soma de ``valor_plano`` vigente no último dia de cada mês).
+
+Um período de ``ClientePlanoHistorico`` conta no mês ``m`` quando ``inicio <= ref`` e
+(``fim`` nulo ou ``fim >= ref``), sendo ``ref`` o último dia de ``m``. Logo cada período
+contribui em um intervalo contíguo de meses, e a série sai de uma única varredura
+ordenada do histórico (linha de varredura com soma acumulada por mês).
+
+Os valores ficam materializados em ``PatrimonioMensal``: meses ausentes são calculados
+pela varredura e gravados; depois disso os signals do histórico aplicam apenas o delta
+de cada período aberto, alterado, encerrado ou removido nos meses já materializados.
+
+Uso:
+    from nossopainel.services.patrimonio import obter_serie_patrimonio
+
+    valores = obter_serie_patrimonio(owner, meses)  # Decimal por mês, na ordem de ``meses``
+"""
+
+from __future__ import annotations
+
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import F
+
+from nossopainel.models import ClientePlanoHistorico, PatrimonioMensal
+
+logger = logging.getLogger(__name__)
+
+Periodo = Tuple[date, Optional[date]]
+
+
+def _indice_mes(d: date) -> int:
+    return d.year * 12 + (d.month - 1)
+
+
+def _mes_do_indice(indice: int) -> date:
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def meses_vigentes(inicio: date, fim: Optional[date]) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Intervalo de meses (índices inclusivos) em que o período conta no patrimônio.
+
+    Returns:
+        tuple | None: ``(primeiro, ultimo)`` com ``ultimo`` None para período em aberto,
+        ou None se o período não atravessa nenhum fim de mês.
+    """
+    primeiro = _indice_mes(inicio)
+    if fim is None:
+        return primeiro, None
+    ultimo = _indice_mes(fim)
+    if fim.day != calendar.monthrange(fim.year, fim.month)[1]:
+        ultimo -= 1
+    if ultimo < primeiro:
+        return None
+    return primeiro, ultimo
+
+
+def calcular_serie(periodos: Iterable[Tuple[date, Optional[date], Decimal]], primeiro: int, ultimo: int) -> List[Decimal]:
+    """
+    Soma os períodos por mês em ``[primeiro, ultimo]`` com uma linha de varredura.
+
+    Args:
+        periodos: Tuplas ``(inicio, fim, valor_plano)``.
+        primeiro: Índice do primeiro mês da série.
+        ultimo: Índice do último mês da série.
+    """
+    deltas: Dict[int, Decimal] = defaultdict(Decimal)
+    for inicio, fim, valor in periodos:
+        intervalo = meses_vigentes(inicio, fim)
+        if intervalo is None:
+            continue
+        de, ate = intervalo
+        if (ate is not None and ate < primeiro) or de > ultimo:
+            continue
+        deltas[max(de, primeiro)] += valor or 0
+        if ate is not None and ate < ultimo:
+            deltas[ate + 1] -= valor or 0
+
+    serie = []
+    acumulado = Decimal("0")
+    for indice in range(primeiro, ultimo + 1):
+        acumulado += deltas.get(indice, 0)
+        serie.append(acumulado)
+    return serie
+
+
+def obter_serie_patrimonio(owner, meses: List[date]) -> List[Decimal]:
+    """
+    Retorna o patrimônio de cada mês (primeiro dia) da lista, na mesma ordem.
+
+    Lê os meses já materializados em uma consulta; os ausentes são calculados com uma
+    varredura do histórico do dono e gravados para as próximas chamadas.
+    """
+    if not meses:
+        return []
+
+    gravados = dict(
+        PatrimonioMensal.objects.filter(usuario=owner, mes__in=meses).values_list('mes', 'valor')
+    )
+    faltantes = [m for m in meses if m not in gravados]
+
+    if faltantes:
+        primeiro = _indice_mes(min(faltantes))
+        ultimo = _indice_mes(max(faltantes))
+        periodos = (
+            ClientePlanoHistorico.objects
+            .filter(usuario=owner, inicio__lte=_mes_do_indice(ultimo + 1))
+            .order_by('inicio')
+            .values_list('inicio', 'fim', 'valor_plano')
+            .iterator(chunk_size=5000)
+        )
+        serie = calcular_serie(periodos, primeiro, ultimo)
+        novos = {}
+        for m in faltantes:
+            novos[m] = serie[_indice_mes(m) - primeiro]
+        PatrimonioMensal.objects.bulk_create(
+            [PatrimonioMensal(usuario=owner, mes=m, valor=v) for m, v in novos.items()],
+            ignore_conflicts=True,
+        )
+        gravados.update(novos)
+
+    return [gravados[m] for m in meses]
+
+
+def aplicar_periodo(usuario_id: Optional[int], periodo: Optional[Periodo], valor, sinal: int) -> None:
+    """
+    Soma (``sinal=1``) ou subtrai (``sinal=-1``) ``valor`` nos meses materializados do período.
+    """
+    if not usuario_id or periodo is None or not valor:
+        return
+    intervalo = meses_vigentes(*periodo)
+    if intervalo is None:
+        return
+    de, ate = intervalo
+    filtros = {'usuario_id': usuario_id, 'mes__gte': _mes_do_indice(de)}
+    if ate is not None:
+        filtros['mes__lte'] = _mes_do_indice(ate)
+    PatrimonioMensal.objects.filter(**filtros).update(valor=F('valor') + (Decimal(valor) * sinal))
+
+
+def invalidar_patrimonio(*usuario_ids: Optional[int]) -> None:
+    """Descarta a série materializada (recalculada no próximo acesso)."""
+    ids = [uid for uid in usuario_ids if uid]
+    if ids:
+        PatrimonioMensal.objects.filter(usuario_id__in=ids).delete()
@@ -20,6 +20,8 @@ from decimal import Decimal
 from datetime import datetime, timedelta
 from django.utils import timezone as tz
 
+from nossopainel.services.clientes_http import obter_cliente
+
 # FastDePix retorna timestamps em horário local de Recife (UTC-3) sem indicador de fuso
 _FASTDEPIX_TZ = pytz.timezone("America/Recife")
 from typing import Optional, Dict, Any, Tuple
@@ -181,7 +183,7 @@ class FastDePixIntegration(BasePaymentIntegration):
         try:
             logger.info(f"[FastDePix] {method} {url}")
 
-            response = requests.request(
+            response = obter_cliente("fastdepix").request(
                 method=method,
                 url=url,
                 headers=headers,
@@ -329,8 +331,19 @@ class FastDePixIntegration(BasePaymentIntegration):
         response = self._make_request("GET", f"/transactions/{transaction_id}")
 
         data = response.get("data", response)
-        status_str = data.get("status", "pending").lower()
+        return self.map_status(data.get("status"))
+
+    @staticmethod
+    def map_status(status_str: Optional[str]) -> PaymentStatus:
+        """
+        Converte o status textual do FastDePix em PaymentStatus.
 
+        Args:
+            status_str: Status retornado pela API (ex: "paid", "canceled")
+
+        Returns:
+            PaymentStatus correspondente (ERROR se desconhecido)
+        """
         status_map = {
             "pending": PaymentStatus.PENDING,
             "paid": PaymentStatus.PAID,
@@ -340,7 +353,7 @@ class FastDePixIntegration(BasePaymentIntegration):
             "refunded": PaymentStatus.REFUNDED,
         }
 
-        return status_map.get(status_str, PaymentStatus.ERROR)
+        return status_map.get((status_str or "pending").lower(), PaymentStatus.ERROR)
 
     def get_charge_details(self, transaction_id: str) -> Dict:
         """
@@ -0,0 +1,340 @@
+"""
+Pool de paráfrases pré-geradas para os envios em massa (TarefaEnvio e templates de leads).
+
+Em vez de uma consulta bloqueante ao ChatGPT por destinatário, cada texto de envio ganha
+um pool de ``TAMANHO_POOL`` paráfrases, gerado uma única vez e gravado em
+``ParafraseMensagem`` (junto das ``VarianteMensagem`` da tarefa). Cada envio sorteia uma
+paráfrase do pool e preenche os placeholders ({saudacao}, {nome}) localmente.
+
+- O pool é identificado pelo hash do texto original: editar a mensagem gera outro pool.
+- Paráfrases que perdem placeholders ou links do original são descartadas.
+- Sem paráfrases válidas (ex.: API indisponível), envia o texto original e só tenta gerar
+  de novo após ``TTL_FALLBACK`` segundos.
+- ``gerar_parafrases_stub`` é um gerador offline e determinístico, usado em testes de
+  vazão e em ambientes sem acesso à API (``PARAFRASES_GERADOR=stub``).
+
+Uso:
+    from nossopainel.services.pool_parafrases import pool_parafrases
+
+    pool_parafrases.aquecer(texto, usuario, tarefa=tarefa)
+    mensagem = pool_parafrases.sortear(texto, usuario, tarefa=tarefa, nome="João")
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from nossopainel.models import ParafraseMensagem
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_POOL = 8
+TTL_CACHE = 3600  # pool válido em memória (o banco é a fonte da verdade)
+TTL_FALLBACK = 300  # espera antes de tentar gerar de novo um pool que falhou
+
+RE_PLACEHOLDER = re.compile(r"\{(saudacao|nome)\}")
+RE_LINK = re.compile(r"https?://\S+|www\.\S+")
+
+PROMPT_PARAFRASE = (
+    "Você é um redator especialista em marketing pelo WhatsApp. "
+    "Reescreva o texto abaixo mantendo a mesma intenção e informações, "
+    "mas com frases ligeiramente diferentes, trocando algumas palavras por sinônimos, "
+    "variando a ordem quando possível, e ajustando emojis se houver. "
+    "O texto deve parecer natural, envolvente e adequado para WhatsApp. "
+    "IMPORTANTE: Mantenha todos os dados importantes (valores, datas, nomes, links) exatamente como estão, "
+    "e mantenha os marcadores entre chaves (ex: {nome}, {saudacao}) sem alteração. "
+    "Responda APENAS com o texto reescrito, sem explicações.\n\n"
+)
+
+
+#####################################################
+##### GERADORES DE PARÁFRASES                   #####
+#####################################################
+
+def gerar_parafrases_chatgpt(texto: str, quantidade: int, usuario=None) -> List[str]:
+    """
+    Gera paráfrases via ChatGPT (uma consulta por paráfrase, apenas na criação do pool).
+
+    Returns:
+        list: Textos retornados pela API (validados por quem chama).
+    """
+    from integracoes.openai_chat import consultar_chatgpt
+
+    user = getattr(usuario, "username", usuario)
+    return [consultar_chatgpt(pergunta=PROMPT_PARAFRASE + texto, user=user) for _ in range(quantidade)]
+
+
+SINONIMOS_STUB = {
+    "olá": ["oi", "e aí", "olá"],
+    "oi": ["olá", "oi", "e aí"],
+    "promoção": ["oferta", "condição especial", "promoção"],
+    "oferta": ["promoção", "oportunidade", "oferta"],
+    "aproveite": ["garanta", "não perca", "aproveite"],
+    "agora": ["já", "hoje mesmo", "agora"],
+    "hoje": ["ainda hoje", "hoje", "nesse dia"],
+    "cliente": ["assinante", "cliente"],
+    "obrigado": ["valeu", "agradecemos", "obrigado"],
+    "rápido": ["ágil", "veloz", "rápido"],
+    "novidade": ["lançamento", "novidade"],
+    "contato": ["retorno", "contato"],
+    "chame": ["fale com a gente", "chame"],
+    "melhor": ["mais vantajoso", "melhor"],
+}
+ABERTURAS_STUB = ["", "", "📢 ", "✨ ", "👋 "]
+FECHAMENTOS_STUB = ["", "", " 😉", " 🙌", " 🚀"]
+RE_PALAVRA = re.compile(r"\w+", re.UNICODE)
+
+
+def gerar_parafrases_stub(texto: str, quantidade: int, usuario=None) -> List[str]:
+    """
+    Gerador offline e determinístico: troca sinônimos e emojis de abertura/fechamento.
+
+    O mesmo texto sempre gera as mesmas paráfrases (semente = hash do texto + índice);
+    placeholders e links não são alterados.
+    """
+    semente_base = hash_texto(texto)
+    protegidos = [(m.start(), m.end()) for m in RE_PLACEHOLDER.finditer(texto)]
+    protegidos += [(m.start(), m.end()) for m in RE_LINK.finditer(texto)]
+
+    parafrases = []
+    for indice in range(quantidade):
+        rng = random.Random(f"{semente_base}:{indice}")
+
+        def trocar(match, rng=rng):
+            if any(inicio <= match.start() < fim for inicio, fim in protegidos):
+                return match.group(0)
+            palavra = match.group(0)
+            opcoes = SINONIMOS_STUB.get(palavra.lower())
+            if not opcoes:
+                return palavra
+            escolha = rng.choice(opcoes)
+            return escolha[:1].upper() + escolha[1:] if palavra[:1].isupper() else escolha
+
+        corpo = RE_PALAVRA.sub(trocar, texto)
+        parafrases.append(f"{rng.choice(ABERTURAS_STUB)}{corpo}{rng.choice(FECHAMENTOS_STUB)}")
+    return parafrases
+
+
+GERADORES: Dict[str, Callable[..., List[str]]] = {
+    ParafraseMensagem.GERADOR_CHATGPT: gerar_parafrases_chatgpt,
+    ParafraseMensagem.GERADOR_STUB: gerar_parafrases_stub,
+}
+
+
+#####################################################
+##### FUNÇÕES AUXILIARES                        #####
+#####################################################
+
+def hash_texto(texto: str) -> str:
+    """SHA-256 do texto original (chave do pool)."""
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def parafrase_valida(original: str, parafrase: Optional[str]) -> bool:
+    """
+    Verifica se a paráfrase pode substituir o original.
+
+    Rejeita textos vazios, mensagens de erro da integração, paráfrases que perderam
+    placeholders ou links e respostas desproporcionalmente longas.
+    """
+    if not parafrase or not parafrase.strip() or parafrase.lstrip().startswith("❌"):
+        return False
+    if set(RE_PLACEHOLDER.findall(original)) != set(RE_PLACEHOLDER.findall(parafrase)):
+        return False
+    if any(link not in parafrase for link in RE_LINK.findall(original)):
+        return False
+    return len(parafrase) <= max(3 * len(original), len(original) + 200)
+
+
+def preencher_placeholders(texto: str, **valores) -> str:
+    """Substitui apenas os placeholders conhecidos com valor informado (demais chaves ficam intactas)."""
+    return RE_PLACEHOLDER.sub(
+        lambda m: str(valores[m.group(1)]) if valores.get(m.group(1)) is not None else m.group(0),
+        texto,
+    )
+
+
+#####################################################
+##### POOL                                      #####
+#####################################################
+
+class PoolParafrases:
+    """
+    Pools de paráfrases por (usuário, texto), com cache em memória sobre ``ParafraseMensagem``.
+
+    Args:
+        gerador: Nome do gerador em ``GERADORES`` (padrão: ``PARAFRASES_GERADOR`` ou chatgpt).
+        tamanho: Paráfrases geradas por pool.
+    """
+
+    def __init__(self, gerador: Optional[str] = None, tamanho: int = TAMANHO_POOL) -> None:
+        self.gerador = gerador or os.getenv("PARAFRASES_GERADOR", ParafraseMensagem.GERADOR_CHATGPT)
+        if self.gerador not in GERADORES:
+            raise ValueError(f"Gerador de paráfrases desconhecido: {self.gerador}")
+        self.tamanho = tamanho
+        self._lock = threading.Lock()
+        self._locks_chave: Dict[Tuple[int, str], threading.Lock] = {}
+        self._cache: Dict[Tuple[int, str], Tuple[float, List[str]]] = {}
+        self._stats = {
+            "sorteios": 0, "acertos_memoria": 0, "carregados_banco": 0,
+            "pools_gerados": 0, "chamadas_gerador": 0, "descartadas": 0, "fallbacks": 0,
+        }
+
+    def _lock_chave(self, chave):
+        with self._lock:
+            return self._locks_chave.setdefault(chave, threading.Lock())
+
+    def _do_cache(self, chave) -> Optional[List[str]]:
+        with self._lock:
+            item = self._cache.get(chave)
+            if item and item[0] > time.monotonic():
+                return item[1]
+        return None
+
+    def _guardar(self, chave, textos: List[str], ttl: float) -> None:
+        with self._lock:
+            self._cache[chave] = (time.monotonic() + ttl, textos)
+
+    def _incrementar(self, contador: str, valor: int = 1) -> None:
+        with self._lock:
+            self._stats[contador] += valor
+
+    def obter_pool(self, texto: str, usuario, tarefa=None) -> List[str]:
+        """
+        Retorna as paráfrases do texto, gerando e gravando o pool na primeira vez.
+
+        Args:
+            texto: Texto original (plaintext, com placeholders).
+            usuario: Dono do envio.
+            tarefa: TarefaEnvio de origem (opcional; pools antigos da tarefa são removidos).
+
+        Returns:
+            list: Paráfrases válidas, ou ``[texto]`` quando não foi possível gerar.
+        """
+        hash_origem = hash_texto(texto)
+        chave = (usuario.pk, hash_origem)
+
+        pool = self._do_cache(chave)
+        if pool is not None:
+            self._incrementar("acertos_memoria")
+            return pool
+
+        # Uma única geração por pool no processo; as demais threads aguardam o resultado
+        with self._lock_chave(chave):
+            pool = self._do_cache(chave)
+            if pool is not None:
+                self._incrementar("acertos_memoria")
+                return pool
+
+            pool = list(
+                ParafraseMensagem.objects.filter(usuario=usuario, hash_origem=hash_origem)
+                .order_by("indice").values_list("texto", flat=True)
+            )
+            if pool:
+                self._incrementar("carregados_banco")
+                self._guardar(chave, pool, TTL_CACHE)
+                return pool
+
+            pool = self._gerar(texto, hash_origem, usuario, tarefa)
+            if not pool:
+                self._incrementar("fallbacks")
+                self._guardar(chave, [texto], TTL_FALLBACK)
+                return [texto]
+
+            self._guardar(chave, pool, TTL_CACHE)
+            return pool
+
+    def _gerar(self, texto: str, hash_origem: str, usuario, tarefa=None) -> List[str]:
+        inicio = time.monotonic()
+        try:
+            candidatas = GERADORES[self.gerador](texto, self.tamanho, usuario=usuario)
+        except Exception as exc:
+            logger.exception("Erro ao gerar paráfrases | usuario=%s gerador=%s erro=%s", usuario, self.gerador, exc)
+            candidatas = []
+        self._incrementar("chamadas_gerador", self.tamanho)
+
+        validas = []
+        for candidata in candidatas:
+            candidata = (candidata or "").strip()
+            if parafrase_valida(texto, candidata) and candidata not in validas:
+                validas.append(candidata)
+        self._incrementar("descartadas", len(candidatas) - len(validas))
+        if not validas:
+            logger.warning("Nenhuma paráfrase válida gerada - usando texto original | usuario=%s gerador=%s", usuario, self.gerador)
+            return []
+
+        ParafraseMensagem.objects.bulk_create(
+            [
+                ParafraseMensagem(
+                    usuario=usuario, tarefa=tarefa, hash_origem=hash_origem,
+                    indice=indice, texto=parafrase, gerador=self.gerador,
+                )
+                for indice, parafrase in enumerate(validas)
+            ],
+            ignore_conflicts=True,
+        )
+        if tarefa is not None:
+            # Pools de versões anteriores da mensagem da tarefa
+            ParafraseMensagem.objects.filter(tarefa=tarefa).exclude(hash_origem=hash_origem).delete()
+
+        # Relê do banco: outro processo pode ter gravado o pool ao mesmo tempo
+        pool = list(
+            ParafraseMensagem.objects.filter(usuario=usuario, hash_origem=hash_origem)
+            .order_by("indice").values_list("texto", flat=True)
+        )
+        self._incrementar("pools_gerados")
+        logger.info(
+            "Pool de paráfrases gerado | usuario=%s tarefa=%s gerador=%s parafrases=%d duracao=%.2fs",
+            usuario, getattr(tarefa, "pk", None), self.gerador, len(pool), time.monotonic() - inicio,
+        )
+        return pool
+
+    def aquecer(self, texto: str, usuario, tarefa=None) -> int:
+        """Garante o pool antes do loop de envios. Retorna a quantidade de paráfrases."""
+        if not texto or not texto.strip():
+            return 0
+        return len(self.obter_pool(texto, usuario, tarefa=tarefa))
+
+    def sortear(self, texto: str, usuario, tarefa=None, **placeholders) -> str:
+        """
+        Sorteia uma paráfrase do pool do texto e preenche os placeholders.
+
+        Args:
+            texto: Texto original.
+            usuario: Dono do envio.
+            tarefa: TarefaEnvio de origem (opcional).
+            **placeholders: Valores de {saudacao} e {nome}.
+
+        Returns:
+            str: Paráfrase preenchida (ou o texto original, se não houver pool).
+        """
+        if not texto or not texto.strip():
+            return texto
+        self._incrementar("sorteios")
+        escolhida = random.choice(self.obter_pool(texto, usuario, tarefa=tarefa))
+        return preencher_placeholders(escolhida, **placeholders)
+
+    def limpar_cache(self) -> None:
+        """Descarta os pools em memória (recarregados do banco no próximo sorteio)."""
+        with self._lock:
+            self._cache.clear()
+
+    def metricas(self) -> dict:
+        """Contadores do processo (sorteios, reaproveitamento do pool e chamadas ao gerador)."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pools_em_memoria"] = len(self._cache)
+        stats["gerador"] = self.gerador
+        stats["tamanho_pool"] = self.tamanho
+        return stats
+
+
+# Instância compartilhada pelo processo
+pool_parafrases = PoolParafrases()
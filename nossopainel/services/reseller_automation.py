@@ -36,6 +36,11 @@ from nossopainel.models import (
 )
 from nossopainel.utils import decrypt_password, validar_formato_dominio, substituir_dominio_em_url, extrair_dominio_de_url
 from nossopainel.services.capsolver_integration import CapSolver, CapSolverException
+from nossopainel.services.indice_reseller import (
+    dispositivo_para_migracao,
+    invalidar_dispositivos,
+    obter_indice_dispositivos,
+)
 from nossopainel.services.lib import logger, jwt_utils, api_client, credentials_manager, dream_tv_api
 
 
@@ -941,8 +946,6 @@ class DreamTVSeleniumAutomation:
         self.log.info("[API] Cache não disponível, obtendo dispositivos via API...")
 
         dispositivos = []
-        page = 1
-        limit = 100
 
         try:
             # Se MAC específico, buscar apenas ele
@@ -962,64 +965,27 @@ class DreamTVSeleniumAutomation:
 
                 return dispositivos
 
-            # Listar todos os dispositivos e filtrar por domínio origem
+            # Demais casos: ler do índice de dispositivos da conta (atualizado de forma
+            # incremental e concorrente quando expirado) e filtrar por domínio origem
             self.log.info(f"Listando dispositivos com domínio origem: {tarefa.dominio_origem}")
 
-            dispositivos_filtrados = []
-            total_listados = 0
-
-            while True:
-                self.log.debug(f"Buscando página {page} (limit={limit})...")
-                result = api.list_devices(page=page, limit=limit)
-
-                if not result.get('rows'):
-                    break
-
-                total_listados += len(result['rows'])
-
-                # Filtrar: Verificar se dispositivo possui playlist com dominio_origem
-                for device in result['rows']:
-                    device_id = device.get('id')
-                    device_mac = device.get('mac', 'N/A')
-
-                    try:
-                        # Listar playlists do dispositivo
-                        playlists = api.list_playlists(device_id=device_id)
-
-                        # Verificar se alguma playlist possui o dominio_origem
-                        tem_dominio_origem = False
-                        for playlist in playlists:
-                            url = playlist.get('url', '')
-                            if url:
-                                dominio = extrair_dominio_de_url(url)
-                                if dominio and dominio.lower() == tarefa.dominio_origem.lower():
-                                    tem_dominio_origem = True
-                                    break
-
-                        # Adicionar dispositivo apenas se tiver domínio origem
-                        if tem_dominio_origem:
-                            dispositivos_filtrados.append(device)
-                            self.log.debug(f"✓ Dispositivo {device_mac} possui domínio origem, adicionado")
-                        else:
-                            self.log.debug(f"✗ Dispositivo {device_mac} não possui domínio origem, ignorado")
-
-                    except Exception as e:
-                        self.log.warning(f"Erro ao verificar playlists do dispositivo {device_mac}: {e}")
-                        # Em caso de erro, incluir dispositivo (será tratado no processamento)
-                        dispositivos_filtrados.append(device)
-
-                    # Rate limiting entre verificações (reduzido de 0.2 para 0.05)
-                    time.sleep(0.05)
-
-                # Verificar se há mais páginas
-                total_count = result.get('count', 0)
-                if total_listados >= total_count:
-                    break
+            conta = tarefa.conta_reseller or self.conta_reseller
+            entradas = obter_indice_dispositivos(
+                conta,
+                lambda: dream_tv_api.DreamTVAPI(jwt=self.jwt, logger=self.log),
+            )
 
-                page += 1
-                time.sleep(0.1)  # Rate limiting entre páginas (reduzido de 0.5 para 0.1)
+            dominio_origem = tarefa.dominio_origem.lower()
+            dispositivos_filtrados = []
+            for entrada in entradas:
+                if entrada.playlists_atualizadas_em is None and not entrada.playlists:
+                    # Playlists não puderam ser consultadas: incluir (serão buscadas no processamento)
+                    dispositivos_filtrados.append(dispositivo_para_migracao(entrada))
+                    continue
+                if any((p.get('dominio') or '').lower() == dominio_origem for p in entrada.playlists):
+                    dispositivos_filtrados.append(dispositivo_para_migracao(entrada))
 
-            self.log.info(f"Total de dispositivos listados: {total_listados}")
+            self.log.info(f"Total de dispositivos listados: {len(entradas)}")
             self.log.info(f"Dispositivos com domínio origem '{tarefa.dominio_origem}': {len(dispositivos_filtrados)}")
             return dispositivos_filtrados
 
@@ -1051,15 +1017,10 @@ class DreamTVSeleniumAutomation:
         self.log.info(f"Processando dispositivo: MAC={mac}, ID={device_id}")
 
         try:
-            # Listar playlists do dispositivo (priorizar cache, fallback para API)
-            if 'playlists' in dispositivo and dispositivo.get('playlists'):
-                # Usar playlists do cache (já disponíveis)
-                playlists = dispositivo['playlists']
-                self.log.debug(f"[Cache] Usando {len(playlists)} playlists do cache para device {device_id}")
-            else:
-                # Buscar playlists da API (comportamento original)
-                self.log.debug(f"[API] Listando playlists do dispositivo {device_id} via API...")
-                playlists = api.list_playlists(device_id=device_id)
+            # Playlists atuais direto da API: o índice/cache só seleciona os dispositivos
+            # (pode ter até PLAYLISTS_TTL) e a URL gravada deve partir do valor vigente
+            self.log.debug(f"[API] Listando playlists do dispositivo {device_id} via API...")
+            playlists = api.list_playlists(device_id=device_id)
 
             # DNS inicial será capturado dentro do loop (primeira playlist a ser migrada)
             dns_inicial = None
@@ -1144,6 +1105,8 @@ class DreamTVSeleniumAutomation:
 
             # Atualizar status do dispositivo
             if playlists_atualizadas > 0:
+                # Playlists alteradas: o índice da conta precisa consultá-las de novo
+                invalidar_dispositivos(tarefa.conta_reseller or self.conta_reseller, [device_id])
                 disp_migracao.status = 'sucesso'
                 disp_migracao.processado_em = timezone.now()
                 disp_migracao.save()
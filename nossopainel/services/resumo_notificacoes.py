@@ -0,0 +1,184 @@
+"""
+Resumo em cache das notificações exibidas no sino do cabeçalho.
+
+O context processor ``notifications`` roda em toda renderização de template. Em vez de
+consultar mensalidades vencidas e ``NotificacaoSistema`` a cada página, o resumo
+(contagem + IDs dos primeiros itens) é guardado no cache por dono/leitor e só é lido
+quando o template de fato usa as variáveis (``ResumoNotificacoes`` é avaliado sob demanda).
+
+Invalidação: cada dono tem um número de versão no cache, incrementado pelos signals de
+``Mensalidade``, ``Cliente``, ``NotificationRead`` e ``NotificacaoSistema`` e pelas views
+que marcam notificações em massa (``bulk_create``/``update`` não disparam signals). O TTL
+curto limita a defasagem entre workers quando o cache é local ao processo.
+
+Uso:
+    from nossopainel.services.resumo_notificacoes import ResumoNotificacoes
+
+    resumo = ResumoNotificacoes(owner, request.user)
+    resumo.contagem()
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db.models import DurationField, ExpressionWrapper, F
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from nossopainel.models import Mensalidade, NotificacaoSistema, Tipos_pgto
+
+NOTIFICACOES_CACHE_TTL = 60
+LIMITE_ITENS_MENSALIDADE = 20
+LIMITE_ITENS_SISTEMA = 10
+
+
+def _chave_versao(owner_id: int) -> str:
+    return f"notif:versao:{owner_id}"
+
+
+def _versao_atual(owner_id: int) -> int:
+    versao = cache.get(_chave_versao(owner_id))
+    if versao is None:
+        versao = 1
+        cache.add(_chave_versao(owner_id), versao, None)
+    return versao
+
+
+def invalidar_resumo_notificacoes(owner_id: Optional[int]) -> None:
+    """Descarta os resumos em cache do dono (todos os leitores)."""
+    if not owner_id:
+        return
+    try:
+        cache.incr(_chave_versao(owner_id))
+    except ValueError:
+        cache.set(_chave_versao(owner_id), 2, None)
+
+
+def mensalidades_vencidas_nao_lidas(owner, leitor, hoje=None):
+    """
+    Queryset das mensalidades vencidas (cartão/boleto) ainda não lidas pelo leitor.
+
+    Args:
+        owner: Usuário dono dos dados.
+        leitor: Usuário logado (owner ou atendente) cujas leituras são excluídas.
+        hoje: Data de referência (padrão: data local atual).
+    """
+    hoje = hoje or timezone.localdate()
+    return (
+        Mensalidade.objects.select_related("cliente", "cliente__forma_pgto", "cliente__plano")
+        .filter(
+            usuario=owner,
+            pgto=False,
+            cancelado=False,
+            cliente__cancelado=False,
+            cliente__forma_pgto__nome__in=[Tipos_pgto.CARTAO, Tipos_pgto.BOLETO],
+            dt_vencimento__lt=hoje,
+        )
+        .exclude(notifications_read__usuario=leitor)
+        .annotate(
+            dias_atraso=ExpressionWrapper(
+                hoje - F("dt_vencimento"),
+                output_field=DurationField(),
+            )
+        )
+        .order_by("dt_vencimento")
+    )
+
+
+def obter_resumo_notificacoes(owner, leitor) -> Dict[str, Any]:
+    """
+    Retorna o resumo das notificações do dono para o leitor, usando o cache.
+
+    Returns:
+        dict: ``count`` (mensalidades + sistema), ``mensalidade_ids`` (até 20, por
+        vencimento) e ``sistema_ids`` (até 10, mais recentes).
+    """
+    hoje = timezone.localdate()
+    chave = f"notif:resumo:{owner.pk}:{leitor.pk}:{hoje.isoformat()}:{_versao_atual(owner.pk)}"
+    resumo = cache.get(chave)
+    if resumo is not None:
+        return resumo
+
+    vencidas = mensalidades_vencidas_nao_lidas(owner, leitor, hoje)
+    sistema = NotificacaoSistema.objects.filter(usuario=owner, lida=False)
+
+    mensalidade_ids = list(vencidas.values_list("id", flat=True)[:LIMITE_ITENS_MENSALIDADE])
+    sistema_ids = list(sistema.order_by("-criada_em").values_list("id", flat=True)[:LIMITE_ITENS_SISTEMA])
+    qtd_vencidas = len(mensalidade_ids)
+    if qtd_vencidas == LIMITE_ITENS_MENSALIDADE:
+        qtd_vencidas = vencidas.count()
+    qtd_sistema = len(sistema_ids)
+    if qtd_sistema == LIMITE_ITENS_SISTEMA:
+        qtd_sistema = sistema.count()
+
+    resumo = {
+        "count": qtd_vencidas + qtd_sistema,
+        "mensalidade_ids": mensalidade_ids,
+        "sistema_ids": sistema_ids,
+    }
+    cache.set(chave, resumo, NOTIFICACOES_CACHE_TTL)
+    return resumo
+
+
+class ResumoNotificacoes:
+    """
+    Acesso preguiçoso ao resumo de notificações.
+
+    Os métodos podem ser passados diretamente ao contexto do template: o Django só os
+    chama quando a variável é usada, então páginas sem o dropdown não tocam no cache
+    nem no banco.
+    """
+
+    def __init__(self, owner, leitor):
+        self.owner = owner
+        self.leitor = leitor
+
+    @cached_property
+    def resumo(self) -> Dict[str, Any]:
+        return obter_resumo_notificacoes(self.owner, self.leitor)
+
+    def contagem(self) -> int:
+        return self.resumo["count"]
+
+    def itens(self, limite: int = LIMITE_ITENS_MENSALIDADE) -> List[Mensalidade]:
+        """Mensalidades vencidas (com ``dias_atraso``) na ordem de vencimento."""
+        ids = self.resumo["mensalidade_ids"][:limite]
+        if not ids:
+            return []
+        hoje = timezone.localdate()
+        return list(
+            Mensalidade.objects.select_related("cliente", "cliente__forma_pgto", "cliente__plano")
+            .filter(id__in=ids)
+            .annotate(
+                dias_atraso=ExpressionWrapper(
+                    hoje - F("dt_vencimento"),
+                    output_field=DurationField(),
+                )
+            )
+            .order_by("dt_vencimento")
+        )
+
+    def notificacoes_sistema(self, limite: int = LIMITE_ITENS_SISTEMA) -> List[NotificacaoSistema]:
+        """Notificações do sistema não lidas, mais recentes primeiro."""
+        ids = self.resumo["sistema_ids"][:limite]
+        if not ids:
+            return []
+        return list(NotificacaoSistema.objects.filter(id__in=ids).order_by("-criada_em"))
+
+    @cached_property
+    def _itens_contexto(self) -> List[Mensalidade]:
+        return self.itens()
+
+    @cached_property
+    def _sistema_contexto(self) -> List[NotificacaoSistema]:
+        return self.notificacoes_sistema()
+
+    def contexto(self) -> Dict[str, Any]:
+        """Variáveis do context processor, avaliadas apenas quando o template as usa."""
+        return {
+            "notif_items": lambda: self._itens_contexto,
+            "notif_count": self.contagem,
+            "notificacoes_sistema": lambda: self._sistema_contexto,
+        }
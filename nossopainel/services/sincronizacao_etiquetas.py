@@ -0,0 +1,186 @@
+"""
+Pool de sincronização de etiquetas (labels) do WhatsApp com fila por sessão e coalescência.
+
+O ``cliente_post_save`` (e a importação em lote) apenas enfileiram o estado desejado do
+contato; um pool limitado de threads executa a sincronização com o WPPConnect:
+
+- no máximo ``MAX_WORKERS`` sincronizações no processo e ``MAX_WORKERS_POR_SESSAO`` por
+  sessão, com o mesmo limite de requisições por sessão usado na importação;
+- alterações pendentes do mesmo cliente são coalescidas no estado final (uma única
+  sincronização com a última etiqueta, removendo as etiquetas do telefone original);
+- um cliente nunca é sincronizado por duas threads ao mesmo tempo.
+
+A fila fica em memória (como as threads que substitui): alterações pendentes se perdem
+se o processo reiniciar.
+
+Uso:
+    from nossopainel.services.sincronizacao_etiquetas import sincronizador_etiquetas
+
+    sincronizador_etiquetas.enfileirar(sessao="jrg", cliente_pk=10, dados={...})
+    sincronizador_etiquetas.metricas()
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from django.db import close_old_connections
+
+from nossopainel.services.limitador_taxa import limitador_compartilhado
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 8
+MAX_WORKERS_POR_SESSAO = 2
+REQUISICOES_POR_SEGUNDO_SESSAO = 5  # mesmo limite da validação de números na importação
+
+
+class SincronizadorEtiquetas:
+    """
+    Fila por sessão (chave = cliente) drenada por um pool de threads limitado.
+
+    Args:
+        max_workers: Sincronizações simultâneas no processo.
+        max_por_sessao: Sincronizações simultâneas por sessão do WPPConnect.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_por_sessao: int = MAX_WORKERS_POR_SESSAO) -> None:
+        self.max_workers = max_workers
+        self.max_por_sessao = max_por_sessao
+        self._lock = threading.Lock()
+        self._ocioso = threading.Condition(self._lock)
+        self._pendentes: Dict[str, "OrderedDict[int, dict]"] = {}
+        self._em_execucao: Dict[str, set] = defaultdict(set)
+        self._drenos: Dict[str, int] = defaultdict(int)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"enfileirados": 0, "coalescidos": 0, "processados": 0, "falhas": 0, "duracao_total": 0.0}
+
+    def enfileirar(self, *, sessao: str, cliente_pk: int, dados: dict) -> bool:
+        """
+        Registra o estado desejado da etiqueta do cliente.
+
+        Args:
+            sessao: Nome da sessão do WPPConnect.
+            cliente_pk: Cliente (chave da coalescência).
+            dados: Argumentos de ``_sincronizar_etiqueta_async``.
+
+        Returns:
+            bool: False quando coalescido com uma alteração ainda pendente do cliente.
+        """
+        with self._lock:
+            fila = self._pendentes.setdefault(sessao, OrderedDict())
+            pendente = fila.get(cliente_pk)
+            if pendente is None:
+                fila[cliente_pk] = dict(dados)
+                self._stats["enfileirados"] += 1
+                novo = True
+            else:
+                # O telefone anterior a limpar é o de antes da primeira alteração pendente
+                telefone_anterior = pendente.get("telefone_anterior") or dados.get("telefone_anterior")
+                if telefone_anterior == dados.get("chat_id"):
+                    telefone_anterior = None
+                fila[cliente_pk] = {**dados, "telefone_anterior": telefone_anterior}
+                self._stats["coalescidos"] += 1
+                novo = False
+            self._agendar(sessao)
+        if not novo:
+            logger.debug("Etiqueta coalescida | sessao=%s cliente=%s label=%s", sessao, cliente_pk, dados.get("label_desejada"))
+        return novo
+
+    def _agendar(self, sessao: str) -> None:
+        """Inicia drenos da sessão até o limite (chamado com o lock adquirido)."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="LabelSync")
+        em_execucao = self._em_execucao[sessao]
+        executaveis = sum(1 for cliente_pk in self._pendentes.get(sessao, ()) if cliente_pk not in em_execucao)
+        while self._drenos[sessao] < min(self.max_por_sessao, len(em_execucao) + executaveis):
+            self._drenos[sessao] += 1
+            self._executor.submit(self._drenar, sessao)
+
+    def _proximo(self, sessao: str):
+        """Retira o cliente pendente mais antigo que não está em execução (com o lock)."""
+        fila = self._pendentes.get(sessao)
+        if fila:
+            for cliente_pk in fila:
+                if cliente_pk not in self._em_execucao[sessao]:
+                    self._em_execucao[sessao].add(cliente_pk)
+                    return cliente_pk, fila.pop(cliente_pk)
+        return None
+
+    def _drenar(self, sessao: str) -> None:
+        from nossopainel.signals import _sincronizar_etiqueta_async
+
+        limitador = limitador_compartilhado(f"wpp:{sessao}", REQUISICOES_POR_SEGUNDO_SESSAO)
+        while True:
+            with self._lock:
+                proximo = self._proximo(sessao)
+                if proximo is None:
+                    self._drenos[sessao] -= 1
+                    if not self._pendentes.get(sessao) and not self._em_execucao[sessao]:
+                        self._pendentes.pop(sessao, None)
+                    self._ocioso.notify_all()
+                    return
+            cliente_pk, dados = proximo
+
+            inicio = time.monotonic()
+            sucesso = True
+            try:
+                limitador.aguardar()
+                _sincronizar_etiqueta_async(**dados)
+            except Exception as exc:
+                sucesso = False
+                logger.exception("Erro na sincronização de etiqueta | sessao=%s cliente=%s erro=%s", sessao, cliente_pk, exc)
+            finally:
+                close_old_connections()
+                with self._lock:
+                    self._em_execucao[sessao].discard(cliente_pk)
+                    self._stats["processados" if sucesso else "falhas"] += 1
+                    self._stats["duracao_total"] += time.monotonic() - inicio
+                    # Alteração do mesmo cliente que chegou durante a execução
+                    self._agendar(sessao)
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até a fila esvaziar (uso em comandos/testes). Retorna False no timeout."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while any(self._drenos.values()):
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._ocioso.wait(restante)
+        return True
+
+    def metricas(self) -> dict:
+        """Profundidade da fila por sessão, execuções em andamento e contadores do processo."""
+        from wpp.api_connection import metricas_cache_labels
+
+        with self._lock:
+            stats = dict(self._stats)
+            sessoes = {
+                sessao: {
+                    "pendentes": len(self._pendentes.get(sessao, ())),
+                    "em_execucao": len(self._em_execucao[sessao]),
+                }
+                for sessao in set(self._pendentes) | {s for s, ativos in self._em_execucao.items() if ativos}
+            }
+        finalizados = stats["processados"] + stats["falhas"]
+        duracao_total = stats.pop("duracao_total")
+        return {
+            **stats,
+            "pendentes": sum(s["pendentes"] for s in sessoes.values()),
+            "em_execucao": sum(s["em_execucao"] for s in sessoes.values()),
+            "duracao_media_s": round(duracao_total / finalizados, 2) if finalizados else None,
+            "max_workers": self.max_workers,
+            "max_por_sessao": self.max_por_sessao,
+            "sessoes": sessoes,
+            "cache_labels": metricas_cache_labels(),
+        }
+
+
+# Instância compartilhada pelo processo
+sincronizador_etiquetas = SincronizadorEtiquetas()
@@ -0,0 +1,212 @@
+"""
+Processamento dos webhooks de pagamento PIX (FastDePix), executado pela fila de webhooks.
+
+A view ``webhook_pagamento_pix`` apenas registra a requisição e enfileira o payload;
+``processar_evento_pix`` aplica o evento na ``CobrancaPix`` (``mark_as_paid`` e os signals
+da mensalidade, ``mark_as_expired``, ``mark_as_cancelled``). Os três caminhos são
+idempotentes: cobranças que já saíram de 'pending' não são alteradas de novo.
+
+Uso:
+    from nossopainel.services.webhook_pix import extrair_dados_webhook
+
+    data, transaction_id, event_type, status_str = extrair_dados_webhook(payload)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Tuple
+
+from django.utils import timezone
+
+from nossopainel.models import CobrancaPix
+
+# Logger específico para webhook FastDePix
+fdpx_logger = logging.getLogger('fastdepix.webhook')
+
+
+def extrair_dados_webhook(payload) -> Tuple[dict, str, str, str]:
+    """
+    Extrai os campos usados do payload (com estrutura ``{data: {...}}`` ou direta).
+
+    Returns:
+        tuple: ``(data, transaction_id, event_type, status)``.
+    """
+    data = payload.get('data', payload) if isinstance(payload, dict) else payload
+    transaction_id = str(data.get('id', data.get('transaction_id', '')))
+    event_type = payload.get('event', '')
+    status_str = (data.get('status') or '').lower()
+    return data, transaction_id, event_type, status_str
+
+
+def id_evento_pix(transaction_id: str, event_type: str, status_str: str) -> str:
+    """Identificador de deduplicação: reenvios do mesmo evento da mesma transação."""
+    return f"{transaction_id}:{event_type or '-'}:{status_str or '-'}"
+
+
+def _para_decimal(valor):
+    if not valor:
+        return None
+    try:
+        return Decimal(str(valor))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _processar_pagamento(cobranca: CobrancaPix, data: dict, payload, transaction_id: str) -> None:
+    """Marca a cobrança como paga, buscando taxas/pagador na API quando não vierem no webhook."""
+    from nossopainel.services.payment_integrations import get_payment_integration
+
+    payer = data.get('payer', {})
+    payer_name = payer.get('name') if isinstance(payer, dict) else None
+    payer_doc = payer.get('cpf_cnpj') if isinstance(payer, dict) else None
+
+    fdpx_logger.info(f"  Pagador Nome: {payer_name}")
+    fdpx_logger.info(f"  Pagador Documento: {payer_doc}")
+
+    # Extrair data de pagamento
+    paid_at = None
+    if data.get('paid_at'):
+        try:
+            paid_at = timezone.datetime.fromisoformat(data['paid_at'].replace('Z', '+00:00'))
+            fdpx_logger.info(f"  Data Pagamento (API): {paid_at}")
+        except (ValueError, AttributeError):
+            paid_at = None
+    data_informada = paid_at is not None
+    if not data_informada:
+        paid_at = timezone.now()
+        fdpx_logger.info(f"  Data Pagamento (now): {paid_at}")
+
+    # FastDePix envia no webhook apenas dados básicos (amount, status, transaction_id);
+    # os dados de taxa (commission_amount, fee) geralmente vêm só nos detalhes via API
+    amount = data.get('amount')
+    amount_received = data.get('commission_amount') or data.get('amount_received') or data.get('net_amount')
+    fee = data.get('fee') or data.get('tax')
+    fdpx_logger.info(f"  Valor Cobrado (webhook): {amount}")
+    fdpx_logger.info(f"  Valor Recebido (webhook): {amount_received}")
+    fdpx_logger.info(f"  Taxa (webhook): {fee}")
+
+    if not amount_received and not fee:
+        fdpx_logger.info("  Dados de taxa não encontrados no webhook, buscando via API...")
+        try:
+            integration = get_payment_integration(cobranca.conta_bancaria)
+            if integration:
+                details = integration.get_charge_details(transaction_id)
+                fdpx_logger.info(f"  Detalhes da API: {details}")
+
+                amount_received = (
+                    details.get('commission_amount') or
+                    details.get('amount_received') or
+                    details.get('net_amount')
+                )
+                fee = details.get('fee') or details.get('tax')
+
+                if not payer_name:
+                    api_payer = details.get('payer', {})
+                    if isinstance(api_payer, dict):
+                        payer_name = api_payer.get('name')
+                        payer_doc = api_payer.get('cpf_cnpj')
+
+                if not data_informada and details.get('paid_at'):
+                    try:
+                        paid_at = timezone.datetime.fromisoformat(details['paid_at'].replace('Z', '+00:00'))
+                    except (ValueError, AttributeError):
+                        pass
+
+                fdpx_logger.info(f"  Valor Recebido (API): {amount_received}")
+                fdpx_logger.info(f"  Taxa (API): {fee}")
+        except Exception as e:
+            fdpx_logger.warning(f"  Erro ao buscar detalhes via API: {e}")
+
+    valor_recebido = _para_decimal(amount_received)
+    valor_taxa = _para_decimal(fee)
+
+    # Se não veio taxa explícita mas temos amount e valor_recebido, calcular
+    if valor_taxa is None and amount and valor_recebido:
+        valor_cobrado = _para_decimal(amount)
+        if valor_cobrado is not None:
+            valor_taxa = valor_cobrado - valor_recebido
+            fdpx_logger.info(f"  Taxa calculada: {valor_taxa}")
+
+    fdpx_logger.info(f"  Valor Recebido Final: {valor_recebido}")
+    fdpx_logger.info(f"  Taxa Final: {valor_taxa}")
+
+    fdpx_logger.info("  Executando mark_as_paid()...")
+    cobranca.mark_as_paid(
+        paid_at=paid_at,
+        payer_name=payer_name,
+        payer_document=payer_doc,
+        webhook_data=payload,
+        valor_recebido=valor_recebido,
+        valor_taxa=valor_taxa,
+    )
+
+    fdpx_logger.info(f"  ✓ Cobrança {transaction_id} marcada como PAGA")
+    if cobranca.mensalidade:
+        fdpx_logger.info(f"  ✓ Mensalidade atualizada: pgto={cobranca.mensalidade.pgto}")
+
+
+def processar_evento_pix(evento) -> bool:
+    """
+    Aplica um evento de webhook PIX enfileirado.
+
+    Args:
+        evento: ``EventoWebhook`` com o payload já validado pela view.
+
+    Returns:
+        bool: False quando a cobrança não existe ou o evento não altera nada.
+    """
+    payload = evento.payload
+    data, transaction_id, event_type, status_str = extrair_dados_webhook(payload)
+
+    fdpx_logger.info("=" * 80)
+    fdpx_logger.info(f"WEBHOOK PIX - PROCESSAMENTO | evento={evento.id} tentativa={evento.tentativas + 1}")
+    fdpx_logger.info(f"  Transaction ID: {transaction_id}")
+    fdpx_logger.info(f"  Event Type: {event_type}")
+    fdpx_logger.info(f"  Status: {status_str}")
+
+    cobranca = CobrancaPix.objects.select_related(
+        'conta_bancaria', 'conta_bancaria__instituicao', 'mensalidade', 'cliente'
+    ).filter(transaction_id=transaction_id).first()
+
+    if not cobranca:
+        fdpx_logger.warning(f"COBRANÇA NÃO ENCONTRADA: {transaction_id}")
+        fdpx_logger.info("=" * 80)
+        return False
+
+    fdpx_logger.info(f"  Cobrança: {cobranca.id} | Status atual: {cobranca.status} | Valor: R$ {cobranca.valor}")
+    if cobranca.conta_bancaria:
+        signature = (evento.headers or {}).get('X-Webhook-Signature', '')
+        fdpx_logger.info(f"  Assinatura recebida: {signature if signature else '(nenhuma)'}")
+        fdpx_logger.info(f"  Webhook Secret configurado: {'Sim' if cobranca.conta_bancaria.webhook_secret else 'Não'}")
+
+    alterado = True
+    if event_type == 'transaction.paid' or status_str == 'paid':
+        fdpx_logger.info("  Tipo: PAGAMENTO CONFIRMADO")
+        if cobranca.status != 'paid':
+            _processar_pagamento(cobranca, data, payload, transaction_id)
+        else:
+            fdpx_logger.info("  Cobrança já estava paga, ignorando")
+            alterado = False
+
+    elif event_type == 'transaction.expired' or status_str == 'expired':
+        fdpx_logger.info("  Tipo: EXPIRAÇÃO")
+        alterado = cobranca.status == 'pending'
+        cobranca.mark_as_expired()
+        fdpx_logger.info(f"  ✓ Cobrança {transaction_id} com status {cobranca.status}")
+
+    elif event_type == 'transaction.cancelled' or status_str in ['cancelled', 'canceled']:
+        fdpx_logger.info("  Tipo: CANCELAMENTO")
+        alterado = cobranca.status == 'pending'
+        cobranca.mark_as_cancelled()
+        fdpx_logger.info(f"  ✓ Cobrança {transaction_id} com status {cobranca.status}")
+
+    else:
+        fdpx_logger.info(f"  Tipo: EVENTO DESCONHECIDO (event={event_type}, status={status_str})")
+        alterado = False
+
+    fdpx_logger.info(json.dumps({'cobranca_id': str(cobranca.id), 'new_status': cobranca.status}))
+    fdpx_logger.info("=" * 80)
+    return alterado
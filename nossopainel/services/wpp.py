@@ -7,11 +7,14 @@ import random
 import time
 import logging
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 
 import requests
 from django.utils.timezone import localtime
 
+if TYPE_CHECKING:
+    from nossopainel.services.clientes_http import ClienteHTTP
+
 logger = logging.getLogger(__name__)
 
 
@@ -99,6 +102,10 @@ class MessageSendConfig:
     retry_wait: Tuple[float, float] = (5.0, 10.0)
     audit_callback: Optional[AuditCallback] = None
     audit_base_payload: Optional[JsonDict] = None
+    image_filename: Optional[str] = None
+    image_data_uri: Optional[str] = None
+    http_session: Optional[ClienteHTTP] = None
+    timeout: Optional[float] = None
 
     def build_audit_payload(self) -> JsonDict:
         """
@@ -151,22 +158,36 @@ def send_raw_message(
     mensagem: str,
     *,
     is_group: bool = False,
+    image_filename: Optional[str] = None,
+    image_data_uri: Optional[str] = None,
+    session: Optional[ClienteHTTP] = None,
+    timeout: Optional[float] = None,
 ) -> Tuple[int, Any]:
     """
     Envia a mensagem diretamente à API do WhatsApp e retorna status/resposta.
 
+    Quando ``image_data_uri`` é informado, usa o endpoint ``send-image`` e a mensagem
+    vira a legenda. ``session`` (ex.: ``obter_cliente_wpp()``) reaproveita as conexões do pool HTTP.
+
     Retorna:
         Tupla contendo o código HTTP e o JSON/texto devolvido pela API.
     """
-    url = f"{_get_base_url()}/{usuario}/send-message"
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
         "Authorization": f"Bearer {token}",
     }
-    body = {"phone": telefone, "message": mensagem, "isGroup": is_group}
-
-    response = requests.post(url, headers=headers, json=body)
+    if image_data_uri:
+        url = f"{_get_base_url()}/{usuario}/send-image"
+        body = {"phone": telefone, "isGroup": is_group, "filename": image_filename or "imagem.png", "base64": image_data_uri}
+        if mensagem:
+            body["caption"] = mensagem
+    else:
+        url = f"{_get_base_url()}/{usuario}/send-message"
+        body = {"phone": telefone, "message": mensagem, "isGroup": is_group}
+
+    client = session or requests
+    response = client.post(url, headers=headers, json=body, timeout=timeout)
     try:
         payload = response.json()
     except ValueError:
@@ -224,6 +245,10 @@ def send_message(config: MessageSendConfig) -> MessageSendResult:
                 config.telefone,
                 config.mensagem,
                 is_group=config.is_group,
+                image_filename=config.image_filename,
+                image_data_uri=config.image_data_uri,
+                session=config.http_session,
+                timeout=config.timeout,
             )
             last_status = status_code
             last_response = response_payload
@@ -0,0 +1,473 @@
+"""
+Motor de envio WhatsApp com fila persistente e controle de ritmo por sessão.
+
+Os fluxos em massa (vencimentos, atrasos, cancelados, grupos, alertas de DNS) apenas
+enfileiram registros em ``FilaEnvioWpp``. Um único worker consome a fila intercalando
+as sessões: cada sessão possui um token bucket de capacidade 1 cuja reposição ocorre
+após um intervalo aleatório (mesmo espaçamento anti-ban usado antes com ``time.sleep``).
+Assim, o tempo total passa a ser limitado pela sessão mais lenta, e não pela soma delas.
+Envios que não saem dentro da validade (``valido_ate``) são descartados, não enviados atrasados.
+
+Uso:
+    from nossopainel.services.wpp_send_engine import enfileirar_envio, MotorEnvioWpp
+
+    enfileirar_envio(sessao="revenda1", destino="5583999999999", mensagem="Olá",
+                     tipo_envio="à vencer 2 dias", origem="obter_mensalidades_a_vencer")
+    MotorEnvioWpp(montar_config).executar()
+"""
+
+from __future__ import annotations
+
+import base64
+import logging
+import mimetypes
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from django.db.models import F, Min
+from django.utils import timezone
+
+from nossopainel.services.clientes_http import ClienteHTTP
+from nossopainel.services.wpp import MessageSendConfig, MessageSendResult, send_message
+from wpp.api_connection import obter_cliente_wpp
+
+if TYPE_CHECKING:
+    from nossopainel.models import FilaEnvioWpp
+
+logger = logging.getLogger(__name__)
+
+Intervalo = Tuple[float, float]
+MontadorConfig = Callable[["FilaEnvioWpp", str], MessageSendConfig]
+
+INTERVALO_PADRAO: Intervalo = (30.0, 60.0)
+MAX_WORKERS_PADRAO = 4
+TIMEOUT_ENVIO = 30
+TEMPO_MAXIMO_PROCESSANDO = timedelta(minutes=15)
+TEMPO_MAXIMO_RESERVA = 600  # segundos; protege contra reservas nunca liberadas
+VALIDADE_PADRAO = timedelta(hours=6)  # mensagens citam datas/prazos do dia em que foram geradas
+
+
+##################################################
+##### TOKEN BUCKET POR SESSÃO (ANTI-BAN)     #####
+##################################################
+
+class LimitadorSessaoWpp:
+    """
+    Token bucket por sessão com capacidade 1 e reposição em intervalo aleatório.
+
+    ``reservar`` consome o token (a sessão fica ocupada até ``registrar_envio``),
+    garantindo no máximo um envio por vez por sessão mesmo entre threads diferentes.
+    ``registrar_envio`` agenda a reposição do token para ``agora + uniform(min, max)``.
+    Uma reserva não liberada expira após ``TEMPO_MAXIMO_RESERVA`` segundos.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._proximo: Dict[str, float] = {}
+
+    def reservar(self, sessao: str) -> float:
+        """
+        Tenta consumir o token da sessão.
+
+        Returns:
+            float: 0 se o token foi reservado; caso contrário, segundos até a reposição.
+        """
+        with self._lock:
+            restante = self._proximo.get(sessao, 0.0) - time.monotonic()
+            if restante > 0:
+                return restante
+            self._proximo[sessao] = time.monotonic() + TEMPO_MAXIMO_RESERVA
+            return 0.0
+
+    def registrar_envio(self, sessao: str, intervalo: Intervalo) -> float:
+        """
+        Libera a sessão e agenda a reposição do token com jitter.
+
+        Returns:
+            float: Intervalo sorteado (segundos).
+        """
+        minimo, maximo = intervalo
+        espera = random.uniform(minimo, maximo) if maximo > 0 else 0.0
+        with self._lock:
+            self._proximo[sessao] = time.monotonic() + espera
+        return espera
+
+    def aguardar(self, sessao: str) -> None:
+        """Bloqueia até reservar o token da sessão (uso em fluxos síncronos)."""
+        while True:
+            restante = self.reservar(sessao)
+            if restante <= 0:
+                return
+            time.sleep(min(restante, 1.0))
+
+
+# Instância compartilhada pelo processo (scheduler), usada pelo worker e pelos
+# envios síncronos de tarefas para que ambos respeitem o mesmo ritmo por sessão.
+limitador_sessoes = LimitadorSessaoWpp()
+
+
+##################################################
+##### TRANSPORTE HTTP COMPARTILHADO          #####
+##################################################
+
+def obter_http_session() -> ClienteHTTP:
+    """
+    Retorna o cliente HTTP ``wppconnect`` do processo (pool de conexões, retry e histograma).
+
+    É o mesmo cliente de ``wpp.api_connection``: o motor, os envios síncronos e as demais
+    chamadas à API WPPConnect compartilham conexões e métricas de latência.
+    """
+    return obter_cliente_wpp()
+
+
+def carregar_imagem_data_uri(caminho: str) -> Optional[Tuple[str, str]]:
+    """
+    Lê a imagem do disco e retorna ``(filename, data_uri)`` para o endpoint ``send-image``.
+
+    Returns:
+        Tupla com nome do arquivo e data URI em base64, ou None se o arquivo não existir.
+    """
+    if not caminho or not os.path.isfile(caminho):
+        return None
+    mime = mimetypes.guess_type(caminho)[0] or "image/png"
+    with open(caminho, "rb") as arquivo:
+        conteudo = base64.b64encode(arquivo.read()).decode("utf-8")
+    return os.path.basename(caminho), f"data:{mime};base64,{conteudo}"
+
+
+##################################################
+##### FILA PERSISTENTE                       #####
+##################################################
+
+def enfileirar_envio(
+    *,
+    sessao: str,
+    destino: str,
+    mensagem: str,
+    tipo_envio: str,
+    origem: str,
+    usuario=None,
+    is_group: bool = False,
+    imagem_path: str = "",
+    cliente_nome: str = "",
+    intervalo: Intervalo = INTERVALO_PADRAO,
+    validade: Optional[timedelta] = VALIDADE_PADRAO,
+    lote: str = "",
+    exige_envio_no_lote: bool = False,
+):
+    """
+    Registra um envio na fila persistente.
+
+    Args:
+        sessao: Nome da sessão no WPPConnect.
+        destino: Telefone ou ID do grupo.
+        mensagem: Texto (ou legenda, quando houver imagem).
+        tipo_envio: Rótulo usado nos logs/auditoria.
+        origem: Função que enfileirou (define templates de log no worker).
+        usuario: Usuário Django dono do envio (opcional).
+        is_group: True quando o destino é um grupo.
+        imagem_path: Caminho da imagem (opcional).
+        cliente_nome: Nome do cliente/grupo para logs.
+        intervalo: Espera (min, max) em segundos antes do próximo envio da mesma sessão.
+        validade: Prazo para o envio sair; depois disso o worker o descarta (None = sem prazo).
+        lote: Identificador que agrupa envios relacionados da mesma sessão.
+        exige_envio_no_lote: Descarta o envio se nenhum item anterior do lote foi enviado.
+
+    Returns:
+        FilaEnvioWpp: Registro criado.
+    """
+    from nossopainel.models import FilaEnvioWpp  # Import local para evitar ciclo.
+
+    return FilaEnvioWpp.objects.create(
+        sessao=str(sessao),
+        usuario=usuario,
+        destino=destino or "",
+        is_group=is_group,
+        mensagem=mensagem or "",
+        imagem_path=imagem_path or "",
+        tipo_envio=tipo_envio,
+        cliente_nome=cliente_nome or "",
+        origem=origem,
+        intervalo_min=intervalo[0],
+        intervalo_max=intervalo[1],
+        valido_ate=timezone.now() + validade if validade else None,
+        lote=lote,
+        exige_envio_no_lote=exige_envio_no_lote,
+    )
+
+
+##################################################
+##### WORKER                                 #####
+##################################################
+
+class MotorEnvioWpp:
+    """
+    Consome ``FilaEnvioWpp`` intercalando sessões com no máximo um envio por sessão em voo.
+
+    O acesso ao banco fica todo na thread coordenadora; as threads do pool apenas
+    executam ``send_message`` (HTTP), o que mantém o worker seguro para SQLite.
+
+    Args:
+        montar_config: Callable ``(item, token) -> MessageSendConfig`` com templates/log da origem.
+        max_workers: Quantidade máxima de envios simultâneos (sessões diferentes).
+        limitador: Token bucket compartilhado (padrão: ``limitador_sessoes``).
+    """
+
+    def __init__(
+        self,
+        montar_config: MontadorConfig,
+        max_workers: int = MAX_WORKERS_PADRAO,
+        limitador: Optional[LimitadorSessaoWpp] = None,
+    ) -> None:
+        self.montar_config = montar_config
+        self.max_workers = max_workers
+        self.limitador = limitador or limitador_sessoes
+        self._tokens: Dict[str, Optional[str]] = {}
+        self.stats = {"enviados": 0, "falhas": 0, "descartados": 0, "sessoes": set()}
+
+    def _token(self, sessao: str) -> Optional[str]:
+        """Resolve (memoizado) o token da sessão, priorizando a sessão ativa."""
+        if sessao not in self._tokens:
+            from nossopainel.models import SessaoWpp
+
+            registro = (
+                SessaoWpp.objects.filter(usuario=sessao)
+                .order_by("-is_active")
+                .only("token")
+                .first()
+            )
+            self._tokens[sessao] = registro.token if registro else None
+        return self._tokens[sessao]
+
+    def _recuperar_travados(self) -> None:
+        """Marca como falha itens presos em 'processando' (worker interrompido)."""
+        from nossopainel.models import FilaEnvioWpp
+
+        limite = timezone.now() - TEMPO_MAXIMO_PROCESSANDO
+        travados = FilaEnvioWpp.objects.filter(
+            status=FilaEnvioWpp.STATUS_PROCESSANDO,
+            reservado_em__lt=limite,
+        ).update(
+            status=FilaEnvioWpp.STATUS_FALHA,
+            erro="Processamento interrompido (worker reiniciado)",
+            processado_em=timezone.now(),
+        )
+        if travados:
+            logger.warning("Itens da fila WPP travados marcados como falha | quantidade=%d", travados)
+
+    def _descartar_expirados(self) -> None:
+        """Descarta itens pendentes cuja validade já passou (não serão mais enviados)."""
+        from nossopainel.models import FilaEnvioWpp
+
+        agora = timezone.now()
+        expirados = FilaEnvioWpp.objects.filter(
+            status=FilaEnvioWpp.STATUS_PENDENTE,
+            valido_ate__lte=agora,
+        ).update(
+            status=FilaEnvioWpp.STATUS_DESCARTADO,
+            erro="Envio expirado antes de ser processado",
+            processado_em=agora,
+        )
+        if expirados:
+            self.stats["descartados"] += expirados
+            logger.warning("Itens da fila WPP expirados descartados | quantidade=%d", expirados)
+
+    def _proximos_por_sessao(self, ocupadas: set) -> list:
+        """Retorna o item pendente mais antigo de cada sessão livre."""
+        from nossopainel.models import FilaEnvioWpp
+
+        primeiros = (
+            FilaEnvioWpp.objects.filter(
+                status=FilaEnvioWpp.STATUS_PENDENTE,
+                disponivel_em__lte=timezone.now(),
+            )
+            .exclude(sessao__in=ocupadas)
+            .values("sessao")
+            .annotate(primeiro_id=Min("id"))
+        )
+        ids = [linha["primeiro_id"] for linha in primeiros]
+        if not ids:
+            return []
+        return list(FilaEnvioWpp.objects.filter(id__in=ids).order_by("id"))
+
+    def _reivindicar(self, item) -> bool:
+        """Reserva o item atomicamente (protege contra outro worker/processo)."""
+        from nossopainel.models import FilaEnvioWpp
+
+        return bool(
+            FilaEnvioWpp.objects.filter(id=item.id, status=FilaEnvioWpp.STATUS_PENDENTE).update(
+                status=FilaEnvioWpp.STATUS_PROCESSANDO,
+                reservado_em=timezone.now(),
+                tentativas=F("tentativas") + 1,
+            )
+        )
+
+    def _enviar(self, item, config: MessageSendConfig) -> MessageSendResult:
+        """Executado nas threads do pool: apenas I/O de arquivo e HTTP."""
+        try:
+            if item.imagem_path:
+                imagem = carregar_imagem_data_uri(item.imagem_path)
+                if not imagem:
+                    return MessageSendResult(
+                        success=False,
+                        status_code=None,
+                        response=None,
+                        attempts=0,
+                        error=f"Imagem não encontrada: {item.imagem_path}",
+                        reason="missing_image",
+                    )
+                config.image_filename, config.image_data_uri = imagem
+            return send_message(config)
+        finally:
+            self.limitador.registrar_envio(item.sessao, (item.intervalo_min, item.intervalo_max))
+
+    def _lote_sem_envio(self, item) -> bool:
+        """
+        Indica se nenhum item anterior do lote foi enviado.
+
+        A sessão processa um item por vez em ordem de id, então os itens anteriores do
+        lote (mesma sessão) já estão finalizados quando este é reivindicado.
+        """
+        from nossopainel.models import FilaEnvioWpp
+
+        return not FilaEnvioWpp.objects.filter(
+            lote=item.lote,
+            id__lt=item.id,
+            status=FilaEnvioWpp.STATUS_ENVIADO,
+        ).exists()
+
+    def _descartar(self, item, motivo: str) -> None:
+        """Encerra o item reivindicado sem enviá-lo."""
+        from nossopainel.models import FilaEnvioWpp
+
+        FilaEnvioWpp.objects.filter(id=item.id).update(
+            status=FilaEnvioWpp.STATUS_DESCARTADO,
+            erro=motivo,
+            processado_em=timezone.now(),
+        )
+        self.stats["descartados"] += 1
+        logger.info("Envio da fila WPP descartado | fila_id=%s motivo=%s", item.id, motivo)
+
+    def _finalizar(self, item, resultado: Optional[MessageSendResult], erro: Optional[str] = None) -> None:
+        """Persiste o resultado do envio na fila."""
+        from nossopainel.models import FilaEnvioWpp
+
+        sucesso = bool(resultado and resultado.success)
+        if resultado and not erro:
+            erro = resultado.error or resultado.reason or ""
+        FilaEnvioWpp.objects.filter(id=item.id).update(
+            status=FilaEnvioWpp.STATUS_ENVIADO if sucesso else FilaEnvioWpp.STATUS_FALHA,
+            http_status=resultado.status_code if resultado else None,
+            erro="" if sucesso else (erro or "")[:1000],
+            processado_em=timezone.now(),
+        )
+        self.stats["enviados" if sucesso else "falhas"] += 1
+
+    def executar(self) -> dict:
+        """
+        Processa a fila até esvaziá-la.
+
+        Returns:
+            dict: Estatísticas da execução (enviados, falhas, descartados, sessões, duração em segundos).
+        """
+        inicio = time.monotonic()
+        self._recuperar_travados()
+        self._descartar_expirados()
+        http_session = obter_http_session()
+        em_voo: Dict[Future, object] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="FilaWpp") as executor:
+            while True:
+                espera = 1.0
+                candidatos = []
+                if len(em_voo) < self.max_workers:
+                    ocupadas = {item.sessao for item in em_voo.values()}
+                    candidatos = self._proximos_por_sessao(ocupadas)
+
+                for item in candidatos:
+                    if len(em_voo) >= self.max_workers:
+                        break
+                    restante = self.limitador.reservar(item.sessao)
+                    if restante > 0:
+                        espera = min(espera, restante)
+                        continue
+                    if not self._reivindicar(item):
+                        self.limitador.registrar_envio(item.sessao, (0, 0))
+                        continue
+
+                    if item.valido_ate and item.valido_ate <= timezone.now():
+                        # Expirou enquanto a fila drenava: não enviar mensagem obsoleta
+                        self.limitador.registrar_envio(item.sessao, (0, 0))
+                        self._descartar(item, "Envio expirado antes de ser processado")
+                        continue
+
+                    if item.exige_envio_no_lote and self._lote_sem_envio(item):
+                        self.limitador.registrar_envio(item.sessao, (0, 0))
+                        self._descartar(item, "Nenhum envio anterior do lote foi concluído")
+                        continue
+
+                    token = self._token(item.sessao)
+                    if not token:
+                        self.limitador.registrar_envio(item.sessao, (0, 0))
+                        self._finalizar(item, None, erro="Sessão/token WPP ausente")
+                        continue
+
+                    config = self.montar_config(item, token)
+                    config.http_session = http_session
+                    config.timeout = config.timeout or TIMEOUT_ENVIO
+                    em_voo[executor.submit(self._enviar, item, config)] = item
+                    self.stats["sessoes"].add(item.sessao)
+
+                if not em_voo and not candidatos:
+                    break
+
+                if em_voo:
+                    concluidos, _ = wait(list(em_voo), timeout=espera, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        item = em_voo.pop(futuro)
+                        try:
+                            self._finalizar(item, futuro.result())
+                        except Exception as exc:
+                            logger.exception("Erro no envio da fila WPP | fila_id=%s erro=%s", item.id, exc)
+                            self._finalizar(item, None, erro=str(exc))
+                else:
+                    time.sleep(espera)
+
+        duracao = time.monotonic() - inicio
+        resumo = {
+            "enviados": self.stats["enviados"],
+            "falhas": self.stats["falhas"],
+            "descartados": self.stats["descartados"],
+            "sessoes": len(self.stats["sessoes"]),
+            "duracao": round(duracao, 2),
+        }
+        if resumo["enviados"] or resumo["falhas"] or resumo["descartados"]:
+            logger.info(
+                "Fila WPP processada | enviados=%d falhas=%d descartados=%d sessoes=%d duracao=%.2fs",
+                resumo["enviados"], resumo["falhas"], resumo["descartados"], resumo["sessoes"], duracao,
+            )
+        return resumo
+
+
+_execucao_lock = threading.Lock()
+
+
+def executar_fila_com_lock(montar_config: MontadorConfig, **kwargs) -> Optional[dict]:
+    """
+    Executa o worker garantindo uma única instância por processo.
+
+    Returns:
+        dict com as estatísticas, ou None se já havia um worker em execução.
+    """
+    if not _execucao_lock.acquire(blocking=False):
+        logger.debug("Worker da fila WPP já em execução | acao=ignorado")
+        return None
+    try:
+        return MotorEnvioWpp(montar_config, **kwargs).executar()
+    finally:
+        _execucao_lock.release()
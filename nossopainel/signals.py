@@ -5,16 +5,16 @@ além de orquestrar a sincronização de labels do WhatsApp após alterações.
 """
 
 import logging
-import threading
 import time
 from datetime import timedelta
 
 from dateutil.relativedelta import relativedelta
-from django.db.models.signals import post_save, pre_save, post_delete
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
 from .models import Cliente, Mensalidade, SessaoWpp, UserProfile, AssinaturaCliente
+from nossopainel.services.sincronizacao_etiquetas import sincronizador_etiquetas
 from wpp.api_connection import (
     add_or_remove_label_contact,
     criar_label_se_nao_existir,
@@ -296,7 +296,7 @@ def _sincronizar_etiqueta_async(
     whatsapp_lid,
     usuario_pk,
 ):
-    """Executa toda a comunicação com o WPPConnect em thread daemon.
+    """Executa toda a comunicação com o WPPConnect (threads do pool de sincronização).
 
     Recebe apenas valores escalares (strings, int) para evitar dependências
     de ORM ou conexões de banco de dados em threads de background.
@@ -686,17 +686,19 @@ def cliente_post_save(sender, instance, created, **kwargs):
         label_desejada = instance.servidor.nome
 
     # Resolve cor da etiqueta: campo do servidor tem prioridade sobre o dicionário fixo.
-    # Calculado aqui (com acesso ao ORM) antes de entrar na thread daemon.
+    # Calculado aqui (com acesso ao ORM) antes de entrar no pool de sincronização.
     if not cliente_foi_cancelado and instance.servidor and instance.servidor.cor_etiqueta:
         hex_color = instance.servidor.cor_etiqueta
     else:
         hex_color = LABELS_CORES_FIXAS.get(label_desejada.upper())
 
-    # Despacha toda a comunicação com o WPPConnect para thread daemon,
-    # evitando bloquear o worker HTTP durante as chamadas à API.
-    threading.Thread(
-        target=_sincronizar_etiqueta_async,
-        kwargs={
+    # Despacha toda a comunicação com o WPPConnect para o pool de sincronização,
+    # evitando bloquear o worker HTTP durante as chamadas à API. Alterações ainda
+    # pendentes do mesmo cliente são coalescidas no estado final.
+    sincronizador_etiquetas.enfileirar(
+        sessao=str(token),
+        cliente_pk=instance.pk,
+        dados={
             "chat_id": chat_id,
             "label_desejada": label_desejada,
             "hex_color": hex_color,
@@ -709,16 +711,55 @@ def cliente_post_save(sender, instance, created, **kwargs):
             "whatsapp_lid": instance.whatsapp_lid or "",
             "usuario_pk": instance.usuario_id,
         },
-        daemon=True,
-        name=f"LabelSync-{instance.pk}",
-    ).start()
+    )
 
     logger.debug(
         f"[LABEL_DEBUG] POST_SAVE cliente ID={instance.pk} ({instance.nome}): "
-        f"Thread de sincronização disparada (label='{label_desejada}')."
+        f"Sincronização enfileirada (label='{label_desejada}')."
     )
 
 
+def sincronizar_etiquetas_clientes_novos(clientes, token):
+    """
+    Enfileira no pool de sincronização as etiquetas de clientes criados via ``bulk_create``.
+
+    ``bulk_create`` não dispara ``post_save``; a importação em lote chama esta função
+    uma vez com todos os clientes criados.
+
+    Args:
+        clientes: Clientes recém-criados (com ``servidor`` carregado).
+        token: ``SessaoWpp`` ativa do usuário.
+
+    Returns:
+        int: Quantidade de clientes enfileirados.
+    """
+    enfileirados = 0
+    for cliente in clientes:
+        if not cliente.servidor:
+            continue
+        label_desejada = cliente.servidor.nome
+        hex_color = cliente.servidor.cor_etiqueta or LABELS_CORES_FIXAS.get(label_desejada.upper())
+        sincronizador_etiquetas.enfileirar(
+            sessao=str(token),
+            cliente_pk=cliente.pk,
+            dados={
+                "chat_id": str(cliente.telefone),
+                "label_desejada": label_desejada,
+                "hex_color": hex_color,
+                "token_str": token.token,
+                "sessao_usuario": str(token),
+                "telefone_anterior": None,
+                "cliente_pk": cliente.pk,
+                "cliente_nome": cliente.nome,
+                "cliente_usuario": cliente.usuario,
+                "whatsapp_lid": cliente.whatsapp_lid or "",
+                "usuario_pk": cliente.usuario_id,
+            },
+        )
+        enfileirados += 1
+    return enfileirados
+
+
 # ============================================================================
 # SIGNALS PARA DESCONTO PROGRESSIVO POR INDICAÇÃO
 # ============================================================================
@@ -1507,3 +1548,201 @@ def verificar_limites_contas_cliente(cliente, impacto_valor):
                 )
             except Exception as e:
                 logger.error(f"[LIMITE] Erro ao criar notificação de alerta: {e}")
+
+
+# ============================================================================
+# SNAPSHOT DE MÉTRICAS DO DASHBOARD
+# ============================================================================
+
+@receiver(pre_save, sender=Mensalidade)
+@receiver(pre_delete, sender=Mensalidade)
+def registrar_metricas_anteriores_mensalidade(sender, instance, **kwargs):
+    """Guarda o estado gravado da mensalidade para aplicar só o delta no snapshot."""
+    from nossopainel.services.dashboard_metrics import estado_mensalidade
+
+    try:
+        instance._metricas_anterior = estado_mensalidade(instance.pk)
+    except Exception as e:
+        instance._metricas_anterior = None
+        logger.error(f"[DASHBOARD] Erro ao ler estado anterior da mensalidade: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Mensalidade)
+@receiver(post_delete, sender=Mensalidade)
+def atualizar_snapshot_dashboard_mensalidade(sender, instance, **kwargs):
+    """Aplica no snapshot do dashboard a diferença causada pela mensalidade salva/excluída."""
+    from nossopainel.services.dashboard_metrics import (
+        aplicar_delta_mensalidade,
+        estado_mensalidade,
+        invalidar_metricas_dashboard,
+    )
+
+    try:
+        atual = estado_mensalidade(instance.pk) if kwargs.get('signal') is post_save else None
+        aplicar_delta_mensalidade(getattr(instance, '_metricas_anterior', None), atual)
+    except Exception as e:
+        logger.error(f"[DASHBOARD] Erro ao atualizar snapshot de métricas: {e}", exc_info=True)
+        invalidar_metricas_dashboard(instance.usuario_id)
+
+
+@receiver(pre_save, sender=Cliente)
+@receiver(pre_delete, sender=Cliente)
+def registrar_metricas_anteriores_cliente(sender, instance, **kwargs):
+    """Guarda o estado gravado do cliente para aplicar só o delta no snapshot."""
+    from nossopainel.services.dashboard_metrics import estado_cliente
+
+    try:
+        instance._metricas_anterior = estado_cliente(instance.pk)
+    except Exception as e:
+        instance._metricas_anterior = None
+        logger.error(f"[DASHBOARD] Erro ao ler estado anterior do cliente: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def atualizar_snapshot_dashboard_cliente(sender, instance, **kwargs):
+    """Aplica no snapshot do dashboard a diferença causada pelo cliente salvo/excluído."""
+    from nossopainel.services.dashboard_metrics import (
+        aplicar_delta_cliente,
+        estado_cliente,
+        invalidar_metricas_dashboard,
+    )
+
+    try:
+        atual = estado_cliente(instance.pk) if kwargs.get('signal') is post_save else None
+        aplicar_delta_cliente(instance.pk, getattr(instance, '_metricas_anterior', None), atual)
+    except Exception as e:
+        logger.error(f"[DASHBOARD] Erro ao atualizar snapshot de métricas: {e}", exc_info=True)
+        invalidar_metricas_dashboard(instance.usuario_id)
+
+
+@receiver(pre_save, sender='nossopainel.ClientePlanoHistorico')
+@receiver(pre_delete, sender='nossopainel.ClientePlanoHistorico')
+def registrar_reativacoes_anteriores(sender, instance, **kwargs):
+    """Guarda se os clientes afetados contavam como reativados no mês antes do evento."""
+    from nossopainel.services.dashboard_metrics import estado_reativacoes, pares_reativacao
+
+    try:
+        instance._pares_reativacao = pares_reativacao(instance)
+        instance._reativacoes_anteriores = estado_reativacoes(instance._pares_reativacao)
+    except Exception as e:
+        instance._pares_reativacao = set()
+        logger.error(f"[DASHBOARD] Erro ao ler reativações anteriores: {e}", exc_info=True)
+
+
+@receiver(post_save, sender='nossopainel.ClientePlanoHistorico')
+@receiver(post_delete, sender='nossopainel.ClientePlanoHistorico')
+def atualizar_snapshot_dashboard_reativacoes(sender, instance, **kwargs):
+    """Aplica no snapshot a diferença de ``clientes_reativados_qtd`` do histórico salvo/excluído."""
+    from nossopainel.services.dashboard_metrics import aplicar_delta_reativacoes, estado_reativacoes
+
+    pares = getattr(instance, '_pares_reativacao', None)
+    if not pares:
+        return
+    try:
+        aplicar_delta_reativacoes(instance._reativacoes_anteriores, estado_reativacoes(pares))
+    except Exception as e:
+        logger.error(f"[DASHBOARD] Erro ao atualizar snapshot de métricas: {e}", exc_info=True)
+
+
+@receiver(post_save, sender='nossopainel.Plano')
+@receiver(post_delete, sender='nossopainel.Plano')
+def invalidar_snapshot_dashboard(sender, instance, **kwargs):
+    """
+    Marca como desatualizado o snapshot de métricas do dashboard do dono do plano.
+
+    Renomear o plano ou mudar as telas afeta ``planos_adesao`` e ``total_telas_ativas``
+    de todos os clientes do plano; o recálculo acontece no próximo acesso ao dashboard
+    (ver ``nossopainel.services.dashboard_metrics``).
+    """
+    from nossopainel.services.dashboard_metrics import invalidar_metricas_dashboard
+
+    try:
+        invalidar_metricas_dashboard(instance.usuario_id)
+    except Exception as e:
+        logger.error(f"[DASHBOARD] Erro ao invalidar snapshot de métricas: {e}", exc_info=True)
+
+
+# ============================================================================
+# CACHE DE FUNCIONALIDADES DA ASSINATURA DE PLATAFORMA
+# ============================================================================
+
+@receiver(post_save, sender='nossopainel.FuncionalidadePlano')
+@receiver(post_delete, sender='nossopainel.FuncionalidadePlano')
+@receiver(post_save, sender='nossopainel.AssinaturaPlataforma')
+def invalidar_cache_funcionalidades_plano(sender, instance, **kwargs):
+    """Descarta o cache de processo das funcionalidades do plano afetado."""
+    from nossopainel.utils import invalidar_cache_funcionalidades
+
+    invalidar_cache_funcionalidades(instance.plano_id)
+
+
+# ============================================================================
+# RESUMO DE NOTIFICAÇÕES (SINO DO CABEÇALHO)
+# ============================================================================
+
+@receiver(post_save, sender=Mensalidade)
+@receiver(post_delete, sender=Mensalidade)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender='nossopainel.NotificacaoSistema')
+@receiver(post_delete, sender='nossopainel.NotificacaoSistema')
+@receiver(post_save, sender='nossopainel.NotificationRead')
+@receiver(post_delete, sender='nossopainel.NotificationRead')
+def invalidar_resumo_notificacoes_owner(sender, instance, **kwargs):
+    """Descarta o resumo de notificações em cache do dono do registro."""
+    from nossopainel.services.resumo_notificacoes import invalidar_resumo_notificacoes
+
+    try:
+        if sender._meta.model_name == 'notificationread':
+            # NotificationRead.usuario é o leitor; o dono vem da mensalidade
+            owner_id = Mensalidade.objects.filter(
+                pk=instance.mensalidade_id
+            ).values_list('usuario_id', flat=True).first()
+        else:
+            owner_id = instance.usuario_id
+        invalidar_resumo_notificacoes(owner_id)
+    except Exception as e:
+        logger.error(f"[NOTIFICACOES] Erro ao invalidar resumo de notificações: {e}", exc_info=True)
+
+
+# ============================================================================
+# PATRIMÔNIO MENSAL MATERIALIZADO
+# ============================================================================
+
+@receiver(pre_save, sender='nossopainel.ClientePlanoHistorico')
+def registrar_periodo_anterior_historico(sender, instance, **kwargs):
+    """Guarda o período/valor anterior do histórico para aplicar só o delta no post_save."""
+    instance._periodo_anterior = None
+    if instance.pk:
+        instance._periodo_anterior = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list('usuario_id', 'inicio', 'fim', 'valor_plano')
+            .first()
+        )
+
+
+@receiver(post_save, sender='nossopainel.ClientePlanoHistorico')
+def atualizar_patrimonio_historico_salvo(sender, instance, **kwargs):
+    """Ajusta os meses materializados de PatrimonioMensal afetados pelo período salvo."""
+    from nossopainel.services.patrimonio import aplicar_periodo
+
+    try:
+        anterior = getattr(instance, '_periodo_anterior', None)
+        if anterior:
+            usuario_id, inicio, fim, valor = anterior
+            aplicar_periodo(usuario_id, (inicio, fim), valor, -1)
+        aplicar_periodo(instance.usuario_id, (instance.inicio, instance.fim), instance.valor_plano, 1)
+    except Exception as e:
+        logger.error(f"[PATRIMONIO] Erro ao atualizar patrimônio mensal: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender='nossopainel.ClientePlanoHistorico')
+def atualizar_patrimonio_historico_removido(sender, instance, **kwargs):
+    """Remove a contribuição do período excluído dos meses materializados."""
+    from nossopainel.services.patrimonio import aplicar_periodo
+
+    try:
+        aplicar_periodo(instance.usuario_id, (instance.inicio, instance.fim), instance.valor_plano, -1)
+    except Exception as e:
+        logger.error(f"[PATRIMONIO] Erro ao atualizar patrimônio mensal: {e}", exc_info=True)
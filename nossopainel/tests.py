@@ -0,0 +1,506 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from nossopainel.models import (
+    Cliente,
+    DadosBancarios,
+    Mensalidade,
+    Plano,
+    SessaoWpp,
+    Tipos_pgto,
+)
+
+
+class ResolvedorCandidatosMensalidadeTests(TestCase):
+    """Consultas da etapa de candidatos de envio de mensalidades (scripts/mensagens_wpp.py)."""
+
+    MENSALIDADES = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = timezone.localdate()
+        cls.admin = admin = User.objects.create(username='admin-1')
+        SessaoWpp.objects.create(usuario=admin.username, user=admin, token='token', dt_inicio=timezone.now())
+        DadosBancarios.objects.create(
+            usuario=admin, beneficiario='Beneficiario', instituicao='Banco', tipo_chave='CPF', chave='00000000000'
+        )
+        plano = Plano.objects.create(nome='Mensal', telas=1, valor=30, usuario=admin)
+
+        # PIX legado (fallback em DadosBancarios), boleto e cartao (descartado)
+        formas = [
+            Tipos_pgto.objects.create(nome=Tipos_pgto.PIX, usuario=admin),
+            Tipos_pgto.objects.create(nome=Tipos_pgto.BOLETO, usuario=admin),
+            Tipos_pgto.objects.create(nome=Tipos_pgto.CARTAO, usuario=admin),
+        ]
+
+        clientes = []
+        for indice in range(cls.MENSALIDADES):
+            forma = formas[indice % len(formas)]
+            cliente = Cliente(
+                nome=f'Cliente {indice}',
+                telefone=f'+55839{indice:08d}',
+                usuario=admin,
+                forma_pgto=forma,
+                plano=plano,
+                data_adesao=cls.hoje - timedelta(days=30),
+            )
+            cliente.preencher_campos_derivados()
+            clientes.append(cliente)
+        Cliente.objects.bulk_create(clientes)
+        clientes = list(Cliente.objects.order_by('id'))  # IDs também em bancos sem RETURNING (MySQL)
+
+        Mensalidade.objects.bulk_create([
+            Mensalidade(cliente=cliente, usuario=cliente.usuario, valor=30, dt_vencimento=cls.hoje)
+            for cliente in clientes
+        ])
+
+    def setUp(self):
+        from scripts import mensagens_wpp
+
+        self.mensagens_wpp = mensagens_wpp
+        # A auditoria grava em arquivo; aqui interessa apenas o banco
+        patcher = mock.patch.object(mensagens_wpp, 'registrar_log_auditoria')
+        self.auditoria = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _resolver(self):
+        resolvedor = self.mensagens_wpp.ResolvedorCandidatosMensalidade('teste')
+        mensalidades = resolvedor.carregar_mensalidades(self.admin, self.hoje)
+        return mensalidades, list(resolvedor.resolver(mensalidades, 'vence hoje'))
+
+    def test_consultas_nao_crescem_com_as_mensalidades(self):
+        # Carga das mensalidades (select_related) + sessao WPP + DadosBancarios de fallback
+        with self.assertNumQueries(3):
+            mensalidades, jobs = self._resolver()
+
+        self.assertEqual(len(mensalidades), self.MENSALIDADES)
+        descartadas = sum(1 for m in mensalidades if m.cliente.forma_pgto.nome == Tipos_pgto.CARTAO)
+        self.assertEqual(len(jobs), self.MENSALIDADES - descartadas)
+        self.assertEqual(self.auditoria.call_count, descartadas)
+        self.assertTrue(all(job.dados_pix for job in jobs if job.cliente.forma_pgto.nome == Tipos_pgto.PIX))
+
+
+class PlanosConsultasMensalidadeTests(TestCase):
+    """As consultas quentes de Mensalidade usam os índices esperados (EXPLAIN, sem full table scan)."""
+
+    MENSALIDADES = 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins = [User.objects.create(username=f'admin-planos-{indice}') for indice in range(4)]
+        hoje = timezone.localdate()
+        clientes = []
+        for indice in range(cls.MENSALIDADES // 10):
+            admin = cls.admins[indice % len(cls.admins)]
+            cliente = Cliente(nome=f'Cliente {indice}', telefone=f'+55849{indice:08d}', usuario=admin, data_adesao=hoje)
+            cliente.preencher_campos_derivados()
+            clientes.append(cliente)
+        Cliente.objects.bulk_create(clientes)
+        clientes = list(Cliente.objects.order_by('id'))  # IDs também em bancos sem RETURNING (MySQL)
+
+        # Histórico de 10 meses por cliente: a maior parte paga, a fração recente em aberto
+        mensalidades = []
+        for cliente in clientes:
+            for meses in range(10):
+                vencimento = hoje - timedelta(days=30 * meses)
+                pago = meses > 1
+                mensalidades.append(Mensalidade(
+                    cliente=cliente,
+                    usuario=cliente.usuario,
+                    valor=30,
+                    dt_vencimento=vencimento,
+                    dt_pagamento=vencimento if pago else None,
+                    pgto=pago,
+                ))
+        Mensalidade.objects.bulk_create(mensalidades)
+
+        if connection.vendor == 'mysql':
+            # Estatísticas atualizadas: sem elas o otimizador prefere full scan em tabelas recém-populadas
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE TABLE {Mensalidade._meta.db_table}')
+
+    def test_consultas_quentes_usam_indices_esperados(self):
+        from nossopainel.management.commands.verificar_planos_mensalidade import (
+            INDICES_ESPERADOS,
+            _full_scan_mysql,
+            _full_scan_sqlite,
+            _indices_mysql,
+            _indices_sqlite,
+            consultas_mensalidade,
+        )
+
+        if connection.vendor not in ('sqlite', 'mysql'):
+            self.skipTest(f'EXPLAIN não verificado para {connection.vendor}')
+
+        for nome, queryset in consultas_mensalidade(self.admins[0]):
+            with self.subTest(consulta=nome):
+                if connection.vendor == 'mysql':
+                    plano = queryset.explain(format='json')
+                    scans = _full_scan_mysql(plano)
+                    indices = _indices_mysql(plano)
+                else:
+                    plano = queryset.explain()
+                    scans = _full_scan_sqlite(plano)
+                    indices = _indices_sqlite(plano)
+                self.assertEqual(scans, [], plano)
+                self.assertTrue(
+                    any(indice.startswith(INDICES_ESPERADOS[nome]) for indice in indices),
+                    f'{nome}: esperado {INDICES_ESPERADOS[nome]}, usado {indices}\n{plano}',
+                )
+
+    def test_sem_indices_compostos_a_verificacao_falha(self):
+        """Sem os índices compostos o planner cai em outro índice e a verificação acusa."""
+        from nossopainel.management.commands.verificar_planos_mensalidade import (
+            _indices_sqlite,
+            consultas_mensalidade,
+            indice_inesperado,
+        )
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('Remoção temporária de índice verificada apenas no SQLite')
+
+        # DDL transacional no SQLite: o rollback do TestCase recria os índices
+        with connection.cursor() as cursor:
+            for indice in Mensalidade._meta.indexes:
+                cursor.execute(f'DROP INDEX {indice.name}')
+
+            for nome, queryset in consultas_mensalidade(self.admins[0]):
+                if nome == 'relatorio_pagamentos_manuais':
+                    continue
+                # SQL com espaço extra: o cache de statements do sqlite3 guardaria o plano anterior ao DROP
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql} ', params)
+                plano = '\n'.join(linha[-1] for linha in cursor.fetchall())
+                with self.subTest(consulta=nome):
+                    self.assertTrue(indice_inesperado(nome, _indices_sqlite(plano)), plano)
+
+
+class SnapshotMetricasDashboardTests(TestCase):
+    """Os deltas aplicados pelos signals mantêm o snapshot igual ao recálculo completo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hoje = timezone.localdate()
+        cls.admin = User.objects.create(username='admin-dashboard')
+        cls.mensal = Plano.objects.create(nome='Mensal', telas=1, valor=30, usuario=cls.admin)
+        cls.anual = Plano.objects.create(nome='Anual', telas=3, valor=300, usuario=cls.admin)
+        cls.pix = Tipos_pgto.objects.create(nome=Tipos_pgto.PIX, usuario=cls.admin)
+
+    def setUp(self):
+        from nossopainel.services.dashboard_metrics import calcular_metricas_dashboard, obter_metricas_dashboard
+
+        self.calcular = lambda: calcular_metricas_dashboard(self.admin, self.hoje)
+        self.obter = lambda: obter_metricas_dashboard(self.admin, self.hoje)
+        self.cliente = self._cliente('Cliente base', forma_pgto=self.pix)
+
+    def _cliente(self, nome, **campos):
+        campos.setdefault('data_adesao', self.hoje)
+        campos.setdefault('plano', self.mensal)
+        return Cliente.objects.create(nome=nome, telefone=f'+55839{Cliente.objects.count():08d}', usuario=self.admin, **campos)
+
+    def _mensalidade(self, cliente, **campos):
+        return Mensalidade.objects.create(cliente=cliente, usuario=self.admin, valor=30, **campos)
+
+    def _snapshot(self):
+        from nossopainel.models import DashboardMetrics
+
+        snapshot = DashboardMetrics.objects.get(usuario=self.admin)
+        self.assertTrue(snapshot.valido_para(self.hoje))
+        return self.obter()
+
+    def test_eventos_aplicam_delta_sem_recalculo(self):
+        self.obter()  # cria o snapshot
+        antigo = self._cliente('Cliente antigo', data_adesao=self.hoje - timedelta(days=800))
+        vencida = self._mensalidade(self.cliente, dt_vencimento=self.hoje - timedelta(days=3))
+        aberta = self._mensalidade(antigo, dt_vencimento=self.hoje)
+
+        vencida.pgto = True
+        vencida.dt_pagamento = self.hoje
+        vencida.save()
+        self._mensalidade(antigo, dt_vencimento=self.hoje - timedelta(days=40))
+
+        antigo.plano = self.anual
+        antigo.forma_pgto = None
+        antigo.save()
+        self.cliente.cancelado = True
+        self.cliente.data_cancelamento = self.hoje
+        self.cliente.save()
+        aberta.delete()
+        removido = self._cliente('Cliente removido', data_adesao=self.hoje - timedelta(days=1200))
+
+        with mock.patch(
+            'nossopainel.services.dashboard_metrics.calcular_metricas_dashboard',
+            side_effect=AssertionError('snapshot recalculado'),
+        ):
+            self.assertEqual(self._snapshot(), self.calcular())
+
+        removido.delete()  # único do ano: sai de anos_adesao
+        self.assertEqual(self._snapshot(), self.calcular())
+
+    def test_reativacao_no_historico(self):
+        from nossopainel.models import ClientePlanoHistorico
+
+        self.obter()
+        historico = ClientePlanoHistorico.objects.create(
+            cliente=self.cliente, usuario=self.admin, plano=self.mensal, plano_nome='Mensal',
+            valor_plano=30, inicio=self.hoje, motivo=ClientePlanoHistorico.MOTIVO_REACTIVATE,
+        )
+        self.assertEqual(self._snapshot()['clientes_reativados_qtd'], 1)
+
+        historico.delete()
+        self.assertEqual(self._snapshot(), self.calcular())
+
+    def test_plano_alterado_marca_desatualizado(self):
+        self.obter()
+        self.mensal.telas = 2
+        self.mensal.save()
+        self.assertEqual(self.obter(), self.calcular())
+
+
+class ImportacoesInterrompidasTests(TestCase):
+    """Tarefas de importação sem progresso são encerradas com erro."""
+
+    def test_tarefa_parada_vira_erro(self):
+        from nossopainel.models import TarefaImportacaoClientes
+        from nossopainel.services.importacao_clientes import TEMPO_MAXIMO_SEM_PROGRESSO, marcar_importacoes_interrompidas
+
+        usuario = User.objects.create(username='admin-importacao')
+        parada = TarefaImportacaoClientes.objects.create(usuario=usuario, status=TarefaImportacaoClientes.STATUS_EM_ANDAMENTO)
+        ativa = TarefaImportacaoClientes.objects.create(usuario=usuario, status=TarefaImportacaoClientes.STATUS_EM_ANDAMENTO)
+        # update() não aciona o auto_now de atualizada_em
+        TarefaImportacaoClientes.objects.filter(pk=parada.pk).update(
+            atualizada_em=timezone.now() - TEMPO_MAXIMO_SEM_PROGRESSO - timedelta(minutes=1)
+        )
+
+        self.assertEqual(marcar_importacoes_interrompidas(usuario), 1)
+        parada.refresh_from_db()
+        ativa.refresh_from_db()
+        self.assertEqual(parada.status, TarefaImportacaoClientes.STATUS_ERRO)
+        self.assertTrue(parada.esta_concluida())
+        self.assertEqual(ativa.status, TarefaImportacaoClientes.STATUS_EM_ANDAMENTO)
+
+
+class ValidadeFilaEnvioWppTests(TestCase):
+    """Envios da fila WPP obsoletos (validade vencida ou lote sem envio) são descartados, não enviados."""
+
+    def _executar_motor(self):
+        from nossopainel.services.wpp import MessageSendResult
+        from nossopainel.services.wpp_send_engine import LimitadorSessaoWpp, MotorEnvioWpp
+
+        montar_config = lambda item, token: mock.Mock(timeout=None)
+        enviado = MessageSendResult(success=True, status_code=200, response=None, attempts=1)
+        motor = MotorEnvioWpp(montar_config, limitador=LimitadorSessaoWpp())
+        with mock.patch.object(MotorEnvioWpp, '_token', return_value='token'), \
+                mock.patch('nossopainel.services.wpp_send_engine.send_message', return_value=enviado) as envio:
+            resumo = motor.executar()
+        return resumo, envio
+
+    def test_enfileirar_define_validade(self):
+        from nossopainel.services.wpp_send_engine import VALIDADE_PADRAO, enfileirar_envio
+
+        antes = timezone.now()
+        item = enfileirar_envio(sessao='revenda', destino='5583999999999', mensagem='Olá', tipo_envio='teste', origem='teste')
+        sem_prazo = enfileirar_envio(
+            sessao='revenda', destino='5583999999999', mensagem='Olá', tipo_envio='teste', origem='teste', validade=None,
+        )
+
+        self.assertGreaterEqual(item.valido_ate, antes + VALIDADE_PADRAO)
+        self.assertIsNone(sem_prazo.valido_ate)
+
+    def test_item_expirado_e_descartado(self):
+        from nossopainel.models import FilaEnvioWpp
+        from nossopainel.services.wpp_send_engine import enfileirar_envio
+
+        expirado = enfileirar_envio(
+            sessao='revenda', destino='5583999999991', mensagem='Vence amanhã', tipo_envio='teste',
+            origem='teste', intervalo=(0, 0),
+        )
+        valido = enfileirar_envio(
+            sessao='outra', destino='5583999999992', mensagem='Vence amanhã', tipo_envio='teste',
+            origem='teste', intervalo=(0, 0),
+        )
+        FilaEnvioWpp.objects.filter(pk=expirado.pk).update(valido_ate=timezone.now() - timedelta(minutes=1))
+
+        resumo, envio = self._executar_motor()
+
+        expirado.refresh_from_db()
+        valido.refresh_from_db()
+        self.assertEqual(expirado.status, FilaEnvioWpp.STATUS_DESCARTADO)
+        self.assertEqual(valido.status, FilaEnvioWpp.STATUS_ENVIADO)
+        self.assertEqual(envio.call_count, 1)
+        self.assertEqual((resumo['enviados'], resumo['descartados']), (1, 1))
+
+    def test_texto_final_descartado_se_nenhuma_imagem_do_lote_foi_enviada(self):
+        import tempfile
+
+        from nossopainel.models import FilaEnvioWpp
+        from nossopainel.services.wpp_send_engine import enfileirar_envio
+
+        with tempfile.NamedTemporaryFile(suffix='.png') as imagem:
+            textos = {}
+            for sessao, imagem_path in (('sem-imagem', '/inexistente/banner.png'), ('com-imagem', imagem.name)):
+                dados = dict(sessao=sessao, destino='123@g.us', tipo_envio='grupo_futebol', origem='teste', lote=sessao)
+                enfileirar_envio(mensagem='', imagem_path=imagem_path, intervalo=(0, 0), **dados)
+                textos[sessao] = enfileirar_envio(mensagem='Jogos de hoje', intervalo=(0, 0), exige_envio_no_lote=True, **dados)
+
+            self._executar_motor()
+
+        for texto in textos.values():
+            texto.refresh_from_db()
+        self.assertEqual(textos['sem-imagem'].status, FilaEnvioWpp.STATUS_DESCARTADO)
+        self.assertEqual(textos['com-imagem'].status, FilaEnvioWpp.STATUS_ENVIADO)
+
+
+class FilaWebhooksTests(TestCase):
+    """Fila de webhooks: deduplicação, ordem por chave e backoff após erro do handler."""
+
+    def _enfileirar(self, evento_id, chave):
+        from nossopainel.models import EventoWebhook
+        from nossopainel.services.fila_webhooks import enfileirar_evento
+
+        return enfileirar_evento(
+            origem=EventoWebhook.ORIGEM_PIX, evento_id=evento_id, tipo='transaction.paid',
+            chave_ordenacao=chave, payload={'id': evento_id},
+        )
+
+    def _executar(self, handler):
+        from nossopainel.models import EventoWebhook
+        from nossopainel.services.fila_webhooks import MotorWebhooks
+
+        return MotorWebhooks(handlers={EventoWebhook.ORIGEM_PIX: handler}).executar()
+
+    def test_reenvio_do_mesmo_evento_e_descartado(self):
+        from nossopainel.models import EventoWebhook
+
+        evento, criado = self._enfileirar('transaction.paid:1:paid', '1')
+        repetido, criado_de_novo = self._enfileirar('transaction.paid:1:paid', '1')
+
+        self.assertTrue(criado)
+        self.assertFalse(criado_de_novo)
+        self.assertEqual(repetido.pk, evento.pk)
+        self.assertEqual(EventoWebhook.objects.count(), 1)
+
+    def test_eventos_da_mesma_chave_em_ordem_e_um_por_vez(self):
+        import threading
+        import time
+
+        from nossopainel.models import EventoWebhook
+
+        self._enfileirar('a1', 'A')
+        self._enfileirar('b1', 'B')
+        self._enfileirar('a2', 'A')
+        self._enfileirar('a3', 'A')
+        trava = threading.Lock()
+        linha_do_tempo = []
+        em_voo = {}
+
+        def handler(evento):
+            with trava:
+                em_voo[evento.chave_ordenacao] = em_voo.get(evento.chave_ordenacao, 0) + 1
+                linha_do_tempo.append(('inicio', evento.evento_id, em_voo[evento.chave_ordenacao]))
+            time.sleep(0.05)
+            with trava:
+                em_voo[evento.chave_ordenacao] -= 1
+            return True
+
+        resumo = self._executar(handler)
+
+        self.assertEqual(resumo['processados'], 4)
+        self.assertEqual([e for _, e, _ in linha_do_tempo if e.startswith('a')], ['a1', 'a2', 'a3'])
+        self.assertTrue(all(simultaneos == 1 for _, _, simultaneos in linha_do_tempo))
+        self.assertFalse(EventoWebhook.objects.exclude(status=EventoWebhook.STATUS_PROCESSADO).exists())
+
+    def test_erro_no_handler_reagenda_com_backoff_e_segura_a_chave(self):
+        from nossopainel.models import EventoWebhook
+        from nossopainel.services.fila_webhooks import BACKOFF_BASE
+
+        falho, _ = self._enfileirar('a1', 'A')
+        seguinte, _ = self._enfileirar('a2', 'A')
+        chamadas = []
+
+        def handler(evento):
+            chamadas.append(evento.evento_id)
+            if evento.evento_id == 'a1' and chamadas.count('a1') == 1:
+                raise RuntimeError('API indisponível')
+            return True
+
+        antes = timezone.now()
+        resumo = self._executar(handler)
+
+        falho.refresh_from_db()
+        seguinte.refresh_from_db()
+        self.assertEqual(resumo['repetidos'], 1)
+        self.assertEqual(chamadas, ['a1'])
+        self.assertEqual((falho.status, falho.tentativas), (EventoWebhook.STATUS_PENDENTE, 1))
+        self.assertIn('API indisponível', falho.erro)
+        self.assertGreaterEqual(falho.disponivel_em, antes + timedelta(seconds=BACKOFF_BASE))
+        self.assertEqual(seguinte.status, EventoWebhook.STATUS_PENDENTE)
+
+        # Backoff vencido: o evento é repetido e libera o seguinte da chave
+        EventoWebhook.objects.filter(pk=falho.pk).update(disponivel_em=timezone.now())
+        resumo = self._executar(handler)
+
+        self.assertEqual(resumo['processados'], 2)
+        self.assertEqual(chamadas, ['a1', 'a1', 'a2'])
+
+
+class ChaveTelefoneTests(TestCase):
+    """Chave canônica de telefone (``telefone_normalizado``) e vínculo de LIDs por ela."""
+
+    def test_chave_telefone(self):
+        from nossopainel.models import chave_telefone
+
+        casos = {
+            '+55 (83) 99623-9140': '+558396239140',  # formatação e 9º dígito
+            '558396239140': '+558396239140',
+            '5583996239140@c.us': '+558396239140',
+            '+55558396239140': '+558396239140',  # DDI duplicado (5555)
+            '+555583996239140': '+558396239140',  # DDI duplicado e 9º dígito
+            '+558332221100': '+558332221100',  # fixo: sem 9º dígito
+            '+33751085604': '+33751085604',  # fora do Brasil: apenas dígitos
+            '+1 (415) 555-2671': '+14155552671',
+            '': '',
+            None: '',
+            '---': '',
+        }
+        for telefone, esperado in casos.items():
+            with self.subTest(telefone=telefone):
+                self.assertEqual(chave_telefone(telefone), esperado)
+
+    def test_chaves_sem_ddi(self):
+        from nossopainel.models import chave_telefone, chaves_telefone_sem_ddi
+
+        self.assertEqual(chaves_telefone_sem_ddi('+558396239140'), ['+8396239140', '+83996239140'])
+        self.assertIn(chave_telefone('83996239140'), chaves_telefone_sem_ddi(chave_telefone('+5583996239140')))
+        self.assertEqual(chaves_telefone_sem_ddi('+33751085604'), [])
+        self.assertEqual(chaves_telefone_sem_ddi(''), [])
+
+    def test_lid_vincula_cliente_cadastrado_sem_ddi(self):
+        from nossopainel.models import FilaSincronizacaoLid
+        from nossopainel.services.lid_sync_service import LidSyncService
+
+        admin = User.objects.create(username='admin-lid')
+        SessaoWpp.objects.create(usuario='sessao-lid', user=admin, token='token', dt_inicio=timezone.now())
+        cliente = Cliente(nome='Sem DDI', telefone='83996239140', usuario=admin, data_adesao=timezone.localdate())
+        cliente.preencher_campos_derivados()
+        Cliente.objects.bulk_create([cliente])  # sem signals de criação (plano/assinatura)
+        cliente = Cliente.objects.get(usuario=admin)
+        item = FilaSincronizacaoLid.objects.create(
+            lid='277742767599622@lid', sessao='sessao-lid', telefone='558396239140',
+            status=FilaSincronizacaoLid.STATUS_RESOLVIDO,
+        )
+
+        servico = LidSyncService()
+        servico._initialize()
+        servico._apply_batch([item])
+
+        item.refresh_from_db()
+        cliente.refresh_from_db()
+        self.assertEqual(item.status, FilaSincronizacaoLid.STATUS_RESOLVIDO)
+        self.assertEqual(item.cliente_id, cliente.pk)
+        self.assertEqual(cliente.whatsapp_lid, '277742767599622@lid')
@@ -31,6 +31,7 @@ from .views import (
     regenerate_backup_codes,
     get_2fa_qr_code,
     exportar_clientes_excel,
+    exportar_clientes_download,
     conectar_wpp,
     edit_profile,
     edit_customer,
@@ -45,6 +46,7 @@ from .views import (
     cancel_customer,
     pay_monthly_fee,
     import_customers,
+    importar_clientes_progresso,
     LogFilesListView,
     ModalDNSJsonView,
     secret_token_api,
@@ -243,6 +245,7 @@ urlpatterns = [
     path("perfil/2fa/regenerate-codes/", regenerate_backup_codes, name="regenerate-backup-codes"),
     path("perfil/2fa/qr-code/", get_2fa_qr_code, name="get-2fa-qr-code"),
     path("perfil/exportar-clientes/", exportar_clientes_excel, name="exportar_clientes_excel"),
+    path("perfil/exportar-clientes/download/<str:nome_arquivo>/", exportar_clientes_download, name="exportar_clientes_download"),
 
     ############ List and Dashboard ###########
     path("dashboard/", TabelaDashboard.as_view(), name="dashboard"),
@@ -280,6 +283,7 @@ urlpatterns = [
     path("cadastro-servidor/", create_server, name="cadastro-servidor"),
     path("cadastro-aplicativo/", create_app, name="cadastro-aplicativo"),
     path("importar-clientes/", import_customers, name="importar-clientes"),
+    path("importar-clientes/progresso/<int:tarefa_id>/", importar_clientes_progresso, name="importar-clientes-progresso"),
     path("cadastro-dispositivo/", create_device, name="cadastro-dispositivo"),
     path("cadastro-app-conta/", create_app_account, name="cadastro-app-conta"),
     path("cadastro-plano-adesao/", create_payment_plan, name="cadastro-plano-adesao"),
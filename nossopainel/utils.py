@@ -7,10 +7,10 @@ from pathlib import Path
 import logging
 import os
 import re
+import threading
 import time
 
 from dateutil.relativedelta import relativedelta
-from django.db.models import Q
 from django.utils import timezone
 from django.utils.timezone import localtime, now
 from .models import (
@@ -25,6 +25,7 @@ from .models import (
     Servidor,
     SessaoWpp,
     UserActionLog,
+    chave_telefone,
 )
 from nossopainel.services.logging import append_line
 from nossopainel.services.wpp import (
@@ -187,21 +188,78 @@ GRUPOS_FUNCIONALIDADES = [
 ]
 
 
+# Cache de processo das funcionalidades por plano (invalidado pelos signals de
+# FuncionalidadePlano/AssinaturaPlataforma; o TTL cobre os demais workers).
+FUNCIONALIDADES_CACHE_TTL = 300
+_funcionalidades_por_plano = {}
+_funcionalidades_geracao = 0
+_funcionalidades_lock = threading.Lock()
+
+
+def invalidar_cache_funcionalidades(plano_id=None):
+    """
+    Descarta o cache de funcionalidades de um plano (ou de todos, se ``plano_id`` for None).
+    """
+    global _funcionalidades_geracao
+    with _funcionalidades_lock:
+        _funcionalidades_geracao += 1
+        if plano_id is None:
+            _funcionalidades_por_plano.clear()
+        else:
+            _funcionalidades_por_plano.pop(plano_id, None)
+
+
+def get_funcionalidades_plano(plano_id):
+    """
+    Retorna frozenset das chaves ativas de um PlanoAssinatura, com cache TTL por processo.
+    """
+    agora = time.monotonic()
+    with _funcionalidades_lock:
+        item = _funcionalidades_por_plano.get(plano_id)
+        geracao = _funcionalidades_geracao
+    if item and item[0] > agora:
+        return item[1]
+
+    from nossopainel.models import FuncionalidadePlano
+    chaves = frozenset(
+        FuncionalidadePlano.objects.filter(
+            plano_id=plano_id,
+            ativo=True,
+        ).values_list('chave', flat=True)
+    )
+
+    with _funcionalidades_lock:
+        # Não grava se houve invalidação durante a consulta
+        if geracao == _funcionalidades_geracao:
+            _funcionalidades_por_plano[plano_id] = (agora + FUNCIONALIDADES_CACHE_TTL, chaves)
+    return chaves
+
+
 def get_ou_criar_assinatura_plataforma(user):
     """
     Retorna a AssinaturaPlataforma do usuário, criando se não existir.
     Ao criar, define trial_fim = date_joined + 30 dias.
+
+    A assinatura (com o plano) fica no cache da instância do usuário, então as
+    chamadas seguintes no mesmo request não voltam ao banco.
     """
+    from django.contrib.auth.models import User
     from nossopainel.models import AssinaturaPlataforma
-    try:
-        return user.assinatura_plataforma
-    except AssinaturaPlataforma.DoesNotExist:
+
+    relacao = User.assinatura_plataforma.related
+    if relacao.is_cached(user):
+        assinatura = relacao.get_cached_value(user)
+    else:
+        assinatura = AssinaturaPlataforma.objects.select_related('plano').filter(usuario=user).first()
+
+    if assinatura is None:
         trial_fim = user.date_joined.date() + timedelta(days=30)
         assinatura, _ = AssinaturaPlataforma.objects.get_or_create(
             usuario=user,
             defaults={'status': 'trial', 'trial_fim': trial_fim},
         )
-        return assinatura
+    user.assinatura_plataforma = assinatura
+    return assinatura
 
 
 def get_funcionalidades_usuario(user):
@@ -211,6 +269,9 @@ def get_funcionalidades_usuario(user):
     - Trial ativo: todas as funcionalidades (acesso completo durante trial).
     - Plano ativo: apenas as habilitadas no plano.
     - Sem acesso válido: conjunto vazio.
+
+    O resultado é memorizado na instância do usuário (escopo do request), atrelado ao
+    estado da assinatura; as chaves do plano vêm de ``get_funcionalidades_plano``.
     """
     if user.is_superuser:
         return TODAS_FUNCIONALIDADES
@@ -220,23 +281,24 @@ def get_funcionalidades_usuario(user):
     except Exception:
         return frozenset()
 
-    if not assinatura.is_acesso_valido:
-        return frozenset()
-
-    # Trial ativo: acesso completo
-    if assinatura.status == 'trial':
-        return TODAS_FUNCIONALIDADES
+    estado = (assinatura.pk, assinatura.status, assinatura.plano_id, assinatura.is_acesso_valido)
+    memo = getattr(user, '_funcionalidades_memo', None)
+    if memo is not None and memo[0] == estado:
+        return memo[1]
 
-    # Assinatura ativa: funcionalidades habilitadas no plano
-    if assinatura.plano:
-        from nossopainel.models import FuncionalidadePlano
-        chaves = FuncionalidadePlano.objects.filter(
-            plano=assinatura.plano,
-            ativo=True,
-        ).values_list('chave', flat=True)
-        return frozenset(chaves)
+    if not assinatura.is_acesso_valido:
+        funcionalidades = frozenset()
+    elif assinatura.status == 'trial':
+        # Trial ativo: acesso completo
+        funcionalidades = TODAS_FUNCIONALIDADES
+    elif assinatura.plano_id:
+        # Assinatura ativa: funcionalidades habilitadas no plano
+        funcionalidades = get_funcionalidades_plano(assinatura.plano_id)
+    else:
+        funcionalidades = frozenset()
 
-    return frozenset()
+    user._funcionalidades_memo = (estado, funcionalidades)
+    return funcionalidades
 
 
 def usuario_tem_funcionalidade(user, chave):
@@ -1269,13 +1331,17 @@ def gerar_variacoes_telefone(telefone: str) -> set:
 
 
 def existe_cliente_variacoes(telefone_variacoes, user):
-    """Confere se alguma variação pertence a clientes cadastrados do usuário."""
-    q = Q()
-    for var in telefone_variacoes:
-        telefone_formatado = var if str(var).startswith('+') else f'+{str(var)}'
-        q |= Q(telefone=telefone_formatado)
-    
-    cliente = Cliente.objects.filter(q, usuario=user).first()
+    """
+    Confere se alguma variação pertence a clientes cadastrados do usuário.
+
+    As variações de ``gerar_variacoes_telefone`` compartilham a mesma chave canônica,
+    então a busca é uma igualdade no índice (usuario, telefone_normalizado).
+    """
+    chaves = {chave_telefone(str(var)) for var in telefone_variacoes} - {''}
+    if not chaves:
+        return None
+
+    cliente = Cliente.objects.filter(usuario=user, telefone_normalizado__in=chaves).first()
     if cliente:
         cliente_telefone = cliente.telefone
     else:
@@ -2,6 +2,18 @@
 
 import base64
 from .services.wpp import _sanitize_response
+from .services.exportacao_clientes import (
+    CONTENT_TYPE_XLSX,
+    caminho_exportacao,
+    iniciar_exportacao_segundo_plano,
+    iterar_linhas_csv,
+    iterar_xlsx_em_blocos,
+)
+from .services.dashboard_metrics import montar_alertas_fastdepix, montar_planos_resumo, obter_metricas_dashboard
+from .services.mapa_estados import montar_features_json
+from .services.importacao_clientes import iniciar_importacao_segundo_plano, ler_planilha, marcar_importacoes_interrompidas
+from .services.patrimonio import obter_serie_patrimonio
+from .services.resumo_notificacoes import ResumoNotificacoes, invalidar_resumo_notificacoes
 from .email_utils import (
     send_profile_change_notification,
     send_password_change_notification,
@@ -20,9 +32,11 @@ import requests
 import threading
 import time
 import unicodedata
+from collections import defaultdict
 from pathlib import Path
 from django.db.models import Sum, Q, Count, F, ExpressionWrapper, DurationField, Exists, OuterRef, Min, Prefetch
-from django.db.models.functions import Upper, Coalesce, ExtractDay, Trim
+from django.db.models.functions import ExtractDay
+from django.core.files.storage import default_storage
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.cache import cache_page, never_cache
@@ -37,7 +51,6 @@ from django.views.decorators.vary import vary_on_cookie
 from django.views.decorators.http import require_POST
 from django.db.models.deletion import ProtectedError
 from django.views.decorators.csrf import csrf_exempt
-from django.core.validators import validate_email
 from django.utils.timezone import localtime, now
 from django.contrib.auth.views import LoginView
 from django.views.generic.list import ListView
@@ -56,21 +69,21 @@ from django.conf import settings
 import matplotlib.pyplot as plt
 from plotly.offline import plot
 from django.views import View
-from .models import DDD_UF_MAP, extrair_pais_do_telefone
+from .models import DDD_UF_MAP, chave_telefone, extrair_pais_do_telefone
 from .forms import LoginForm
 from typing import Optional
 import plotly.express as px
-import geopandas as gpd
-import pandas as pd
 import calendar
 import warnings
 import inspect
 
 from django.http import (
+    FileResponse,
     HttpResponseBadRequest,
     HttpResponseNotFound,
     HttpResponse, JsonResponse,
-    Http404
+    Http404,
+    StreamingHttpResponse,
 )
 from .models import (
     Cliente, Servidor, Dispositivo,
@@ -83,6 +96,7 @@ from .models import (
     UserActionLog, ClientePlanoHistorico,
     ContaReseller, TarefaMigracaoDNS,
     DispositivoMigracaoDNS, AssinaturaCliente,
+    TarefaImportacaoClientes,
     # Integração Bancária
     InstituicaoBancaria,
     ContaBancaria,
@@ -124,7 +138,6 @@ from .utils import (
     normalizar_servidor,
     get_or_create_dispositivo,
     get_or_create_aplicativo,
-    get_or_create_servidor,
     enroll_client_in_campaign_if_eligible,
     get_data_owner,
     requer_permissao_atendente,
@@ -1047,8 +1060,10 @@ class TabelaDashboard(LoginRequiredMixin, ListView):
         proxima_semana = hoje + timedelta(days=7)
         dt_inicio = str(self.request.user.date_joined)
         context = super().get_context_data(**kwargs)
-        total_clientes = self.get_queryset().count()
-        mes_atual = timezone.localtime().date().month
+        # Reaproveita a contagem do paginator (mesma queryset da listagem)
+        paginator = context.get("paginator")
+        total_clientes = paginator.count if paginator else self.object_list.count()
+        sort_field, sort_order = self.get_sort_params()
 
         # Variáveis para context do modal de edição do cadastro do cliente
         indicadores = Cliente.objects.filter(usuario=owner).order_by('nome')
@@ -1068,120 +1083,11 @@ class TabelaDashboard(LoginRequiredMixin, ListView):
             for a in aplicativos
         ]
 
-        clientes_em_atraso = Cliente.objects.filter(
-            cancelado=False,
-            mensalidade__cancelado=False,
-            mensalidade__dt_pagamento=None,
-            mensalidade__pgto=False,
-            mensalidade__dt_vencimento__lt=hoje,
-            usuario=owner,
-        ).count()
-
-        valor_total_pago = (
-            Mensalidade.objects.filter(
-                cancelado=False,
-                dt_pagamento__year=ano_atual,
-                dt_pagamento__month=mes_atual,
-                usuario=owner,
-                pgto=True,
-            ).aggregate(valor_total=Sum("valor"))["valor_total"]
-            or 0
-        )
-        valor_total_pago = format_currency(valor_total_pago, moeda)
-
-        total_pago_qtd = Mensalidade.objects.filter(
-            cancelado=False,
-            dt_pagamento__year=ano_atual,
-            dt_pagamento__month=mes_atual,
-            usuario=owner,
-            pgto=True,
-        ).count()
-
-        valor_total_receber = (
-            Mensalidade.objects.filter(
-                cancelado=False,
-                dt_vencimento__year=ano_atual,
-                dt_vencimento__month=mes_atual,
-                usuario=owner,
-                pgto=False,
-            ).aggregate(valor_total=Sum("valor"))["valor_total"]
-            or 0
-        )
-        valor_total_receber = format_currency(valor_total_receber, moeda)
-
-        total_receber_qtd = Mensalidade.objects.filter(
-            cancelado=False,
-            dt_vencimento__year=ano_atual,
-            dt_vencimento__month=mes_atual,
-            dt_vencimento__day__gte=hoje.day,
-            usuario=owner,
-            pgto=False,
-        ).count()
-
-        novos_clientes_qtd = (
-            Cliente.objects.filter(
-                cancelado=False,
-                data_adesao__year=ano_atual,
-                data_adesao__month=mes_atual,
-                usuario=owner,
-            )
-        ).count()
-
-        clientes_cancelados_qtd = Cliente.objects.filter(
-            cancelado=True,
-            data_cancelamento__year=ano_atual,
-            data_cancelamento__month=mes_atual,
-            usuario=owner,
-        ).count()
-
-        # Clientes reativados no mês (usando histórico de planos)
-        clientes_reativados_qtd = ClientePlanoHistorico.objects.filter(
-            usuario=owner,
-            motivo=ClientePlanoHistorico.MOTIVO_REACTIVATE,
-            inicio__year=ano_atual,
-            inicio__month=mes_atual,
-            cliente__cancelado=False,
-        ).values('cliente').distinct().count()
-
-        anos_adesao = (
-            Cliente.objects.filter(usuario=owner)
-            .annotate(ano=ExtractYear('data_adesao'))
-            .values_list('ano', flat=True)
-            .distinct()
-            .order_by('-ano')
-        )
-
-        # Resumo dos planos de adesão
-        planos_adesao = (
-            Cliente.objects
-            .filter(usuario=owner, cancelado=False)
-            .annotate(nome_norm=Upper(Trim(F('plano__nome'))))
-            .values('nome_norm')
-            .annotate(qtd_adesoes=Count('id'))
-            .order_by('nome_norm')
-        )
-        planos_cadastrados_norm = list(
-            Plano.objects.filter(usuario=owner)
-            .annotate(nome_norm=Upper(Trim(F('nome'))))
-            .values_list('nome_norm', flat=True)
-            .distinct()
-        )
-        contagens = {row['nome_norm']: int(row['qtd_adesoes']) for row in planos_adesao}
-        ordem_norm = ['MENSAL', 'TRIMESTRAL', 'SEMESTRAL', 'ANUAL']
-        planos_ordenados_norm = sorted(
-            set(planos_cadastrados_norm),
-            key=lambda n: (ordem_norm.index(n) if n in ordem_norm else len(ordem_norm), n)
-        )
-        def label(n):
-            mapa = {'MENSAL': 'Mensal', 'TRIMESTRAL': 'Trimestral', 'SEMESTRAL': 'Semestral', 'ANUAL': 'Anual'}
-            return mapa.get(n, n.title())
-        total = int(total_clientes) if total_clientes else 0
-        planos_resumo = []
-        for nome_norm in planos_ordenados_norm:
-            qtd = contagens.get(nome_norm, 0)
-            pct = (qtd / total * 100) if total else 0
-            planos_resumo.append({'nome': label(nome_norm), 'qtd': qtd, 'pct': pct})
-        # Fim resumo dos planos de adesão
+        # Métricas agregadas: lidas do snapshot por dono (recalculado sob demanda)
+        metricas = obter_metricas_dashboard(owner, hoje)
+        valor_total_pago = format_currency(metricas["valor_total_pago"], moeda)
+        valor_total_receber = format_currency(metricas["valor_total_receber"], moeda)
+        planos_resumo = montar_planos_resumo(metricas["planos_adesao"], total_clientes)
 
         lista_meses = [
             (1, 'Jan'), (2, 'Fev'), (3, 'Mar'), (4, 'Abr'), (5, 'Mai'), (6, 'Jun'),
@@ -1190,79 +1096,10 @@ class TabelaDashboard(LoginRequiredMixin, ListView):
 
         data_atual = timezone.localtime().date()
 
-        query_telas = (
-            Cliente.objects
-            .filter(usuario=owner, cancelado=False, plano__usuario=owner)
-            .select_related("plano")
-            .only("id", "plano__telas", "plano__nome")
-        )
-        total_telas = query_telas.aggregate(
-            total=Coalesce(Sum("plano__telas"), 0)
-        )["total"]
-
         range_num = range(1,32)
 
-        # Contar clientes ativos sem forma de pagamento
-        clientes_sem_forma_pgto = Cliente.objects.filter(
-            usuario=owner,
-            cancelado=False,
-            forma_pgto__isnull=True
-        ).count()
-
-        # ============================================================
-        # ALERTAS FASTDEPIX - Planos sem link ou com valor divergente
-        # ============================================================
-        alertas_fastdepix = {
-            'planos_sem_link': [],
-            'planos_valor_divergente': [],
-            'tem_alertas': False
-        }
-
-        # Verificar se usuário tem conta FastDePix com link_fastdepix
-        contas_fastdepix = ContaBancaria.objects.filter(
-            usuario=owner,
-            instituicao__tipo_integracao='fastdepix',
-            tipo_cobranca_fastdepix='link_fastdepix',
-            ativo=True
-        ).select_related('instituicao')
-
-        if contas_fastdepix.exists():
-            planos_usuario = Plano.objects.filter(usuario=owner)
-
-            for conta in contas_fastdepix:
-                # Buscar links existentes para esta conta
-                links_conta = PlanoLinkPagamento.objects.filter(
-                    conta_bancaria=conta
-                ).select_related('plano')
-                planos_com_link = {link.plano_id for link in links_conta}
-
-                # Planos sem link
-                for plano in planos_usuario:
-                    if plano.id not in planos_com_link:
-                        alertas_fastdepix['planos_sem_link'].append({
-                            'plano_id': plano.id,
-                            'plano_nome': f"{plano.nome} ({plano.telas} tela(s))",
-                            'plano_valor': float(plano.valor),
-                            'conta_id': conta.id,
-                            'conta_nome': conta.nome_identificacao
-                        })
-
-                # Planos com valor divergente
-                for link in links_conta:
-                    if link.valor_divergente:
-                        alertas_fastdepix['planos_valor_divergente'].append({
-                            'plano_id': link.plano.id,
-                            'plano_nome': f"{link.plano.nome} ({link.plano.telas} tela(s))",
-                            'valor_atual': float(link.plano.valor),
-                            'valor_configurado': float(link.valor_configurado),
-                            'conta_id': conta.id,
-                            'conta_nome': conta.nome_identificacao
-                        })
-
-            alertas_fastdepix['tem_alertas'] = (
-                len(alertas_fastdepix['planos_sem_link']) > 0 or
-                len(alertas_fastdepix['planos_valor_divergente']) > 0
-            )
+        # Alertas FastDePix - Planos sem link ou com valor divergente
+        alertas_fastdepix = montar_alertas_fastdepix(owner)
 
         # ============================================================
         # VERIFICAÇÃO SESSÃO WHATSAPP - Alerta no dashboard
@@ -1289,15 +1126,15 @@ class TabelaDashboard(LoginRequiredMixin, ListView):
                 "data_criacao_user": dt_inicio,
                 "total_clientes": total_clientes,
                 "valor_total_pago": valor_total_pago,
-                "novos_clientes_qtd": novos_clientes_qtd,
-                "clientes_em_atraso": clientes_em_atraso,
+                "novos_clientes_qtd": metricas["novos_clientes_qtd"],
+                "clientes_em_atraso": metricas["clientes_em_atraso"],
                 "valor_total_receber": valor_total_receber,
-                "valor_total_pago_qtd": total_pago_qtd,
-                "valor_total_receber_qtd": total_receber_qtd,
-                "clientes_cancelados_qtd": clientes_cancelados_qtd,
-                "clientes_reativados_qtd": clientes_reativados_qtd,
-                "clientes_sem_forma_pgto": clientes_sem_forma_pgto,
-                "total_telas_ativas": int(total_telas),
+                "valor_total_pago_qtd": metricas["valor_total_pago_qtd"],
+                "valor_total_receber_qtd": metricas["valor_total_receber_qtd"],
+                "clientes_cancelados_qtd": metricas["clientes_cancelados_qtd"],
+                "clientes_reativados_qtd": metricas["clientes_reativados_qtd"],
+                "clientes_sem_forma_pgto": metricas["clientes_sem_forma_pgto"],
+                "total_telas_ativas": metricas["total_telas_ativas"],
                 'planos_resumo': planos_resumo,
                 ## alertas FastDePix
                 "alertas_fastdepix": alertas_fastdepix,
@@ -1312,16 +1149,16 @@ class TabelaDashboard(LoginRequiredMixin, ListView):
                 "dispositivos_json": json.dumps(dispositivos_json),
                 "aplicativos_json": json.dumps(aplicativos_json),
                 ## context para o gráfico de adesões e cancelamentos
-                "anos_adesao": anos_adesao,
+                "anos_adesao": metricas["anos_adesao"],
                 "lista_meses": lista_meses,
                 "anuo_atual": ano_atual,
                 "data_atual": data_atual,
                 ## context para paginação configurável
                 "pagination_options": PAGINATION_OPTIONS,
-                "current_per_page": self.get_paginate_by(self.get_queryset()),
+                "current_per_page": self.get_paginate_by(self.object_list),
                 ## context para ordenação server-side
-                "current_sort": self.get_sort_params()[0],
-                "current_order": self.get_sort_params()[1],
+                "current_sort": sort_field,
+                "current_order": sort_order,
             }
         )
 
@@ -1511,130 +1348,50 @@ def profile_page(request):
 @login_required
 @requer_funcionalidade('clientes_exportacao')
 def exportar_clientes_excel(request):
-    """Exporta clientes do usuário para Excel (.xlsx)"""
-    import io
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from django.db.models import Prefetch
+    """
+    Exporta clientes do usuário para Excel (.xlsx) ou CSV, em streaming.
 
+    Parâmetros GET:
+      - formato=csv: CSV gerado linha a linha (padrão: xlsx)
+      - segundo_plano=1: gera o XLSX em background, grava no storage e notifica o usuário
+    """
     usuario = request.user
-    clientes = Cliente.objects.filter(usuario=usuario).select_related(
-        'servidor', 'dispositivo', 'sistema', 'plano', 'forma_pgto', 'indicado_por'
-    ).prefetch_related(
-        Prefetch('conta_aplicativo', queryset=ContaDoAplicativo.objects.select_related('app', 'dispositivo'))
-    )
-
-    # Criar workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Clientes"
-
-    # Estilos
-    header_font = Font(bold=True, size=14)
-    subheader_font = Font(bold=True, size=11)
-    table_header_font = Font(bold=True, color="FFFFFF")
-    table_header_fill = PatternFill(start_color="4A90D9", end_color="4A90D9", fill_type="solid")
-    font_verde = Font(color="008000")  # Verde para Ativo
-    font_vermelha = Font(color="FF0000")  # Vermelho para Cancelado
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # === CABEÇALHO DO USUÁRIO ===
-    dados_bancarios = DadosBancarios.objects.filter(usuario=usuario).first()
-    telefone_user = dados_bancarios.wpp if dados_bancarios else ""
-
-    ws['A1'] = "RELATÓRIO DE CLIENTES"
-    ws['A1'].font = header_font
-
-    ws['A2'] = f"Nome: {usuario.first_name} {usuario.last_name}"
-    ws['A3'] = f"Usuário: {usuario.username}"
-    ws['A4'] = f"Telefone: {telefone_user}"
-    ws['A5'] = f"Total de Clientes: {clientes.count()}"
 
-    # === CABEÇALHO DA TABELA (linha 7) ===
-    colunas = [
-        'Servidor', 'Dispositivo', 'Aplicativo', 'Device ID', 'Email', 'Device Key',
-        'Nome', 'Telefone', 'Indicado Por', 'Data Vencimento', 'Forma Pgto',
-        'Tipo Plano', 'Plano Valor', 'Qtd. Telas', 'Data Adesão', 'Status'
-    ]
-
-    for col, titulo in enumerate(colunas, 1):
-        cell = ws.cell(row=7, column=col, value=titulo)
-        cell.font = table_header_font
-        cell.fill = table_header_fill
-        cell.alignment = Alignment(horizontal='center')
-        cell.border = thin_border
-
-    # === DADOS DOS CLIENTES ===
-    linha = 8
-    for cliente in clientes:
-        contas = cliente.conta_aplicativo.all()
-
-        if contas.exists():
-            # Concatenar dados de múltiplas contas (incluindo o nome do app)
-            aplicativos = " - ".join([c.app.nome for c in contas if c.app])
-            device_ids = " - ".join([c.device_id for c in contas if c.device_id])
-            emails = " - ".join([c.email for c in contas if c.email])
-            device_keys = " - ".join([c.device_key for c in contas if c.device_key])
-        else:
-            aplicativos = cliente.sistema.nome if cliente.sistema else ""
-            device_ids = ""
-            emails = ""
-            device_keys = ""
-
-        dados = [
-            cliente.servidor.nome if cliente.servidor else "",
-            cliente.dispositivo.nome if cliente.dispositivo else "",
-            aplicativos,
-            device_ids,
-            emails,
-            device_keys,
-            cliente.nome,
-            cliente.telefone,
-            cliente.indicado_por.nome if cliente.indicado_por else "",
-            cliente.data_vencimento.strftime('%d/%m/%Y') if cliente.data_vencimento else "",
-            cliente.forma_pgto.nome if cliente.forma_pgto else "",
-            cliente.plano.nome if cliente.plano else "",
-            float(cliente.plano.valor) if cliente.plano else 0,
-            cliente.plano.telas if cliente.plano else 0,
-            cliente.data_adesao.strftime('%d/%m/%Y') if cliente.data_adesao else "",
-            "Cancelado" if cliente.cancelado else "Ativo",
-        ]
-
-        for col, valor in enumerate(dados, 1):
-            cell = ws.cell(row=linha, column=col, value=valor)
-            cell.border = thin_border
-
-        # Aplicar cor na coluna Status
-        status_col = len(colunas)
-        status_cell = ws.cell(row=linha, column=status_col)
-        if cliente.cancelado:
-            status_cell.font = font_vermelha
-        else:
-            status_cell.font = font_verde
+    if request.GET.get('segundo_plano') == '1':
+        iniciar_exportacao_segundo_plano(usuario)
+        messages.success(
+            request,
+            "A exportação foi iniciada. Você será notificado quando a planilha estiver pronta para download."
+        )
+        return redirect('perfil')
 
-        linha += 1
+    if request.GET.get('formato') == 'csv':
+        response = StreamingHttpResponse(iterar_linhas_csv(usuario), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="clientes_{usuario.username}.csv"'
+        return response
 
-    # Ajustar largura das colunas
-    for col in range(1, len(colunas) + 1):
-        ws.column_dimensions[ws.cell(row=7, column=col).column_letter].width = 15
+    response = StreamingHttpResponse(iterar_xlsx_em_blocos(usuario), content_type=CONTENT_TYPE_XLSX)
+    response['Content-Disposition'] = f'attachment; filename="clientes_{usuario.username}.xlsx"'
+    return response
 
-    # Salvar em bytes
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
 
-    # Retornar resposta
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+@login_required
+@requer_funcionalidade('clientes_exportacao')
+def exportar_clientes_download(request, nome_arquivo):
+    """Entrega uma planilha gerada em segundo plano (apenas do próprio usuário)."""
+    if not re.fullmatch(r"clientes_[\w-]+\.xlsx", nome_arquivo):
+        raise Http404("Arquivo não encontrado.")
+
+    caminho = caminho_exportacao(request.user.id, nome_arquivo)
+    if not default_storage.exists(caminho):
+        raise Http404("Arquivo não encontrado.")
+
+    return FileResponse(
+        default_storage.open(caminho, 'rb'),
+        as_attachment=True,
+        filename=f"clientes_{request.user.username}.xlsx",
+        content_type=CONTENT_TYPE_XLSX,
     )
-    response['Content-Disposition'] = f'attachment; filename="clientes_{usuario.username}.xlsx"'
-    return response
 
 
 @login_required
@@ -2352,80 +2109,31 @@ def cache_page_by_user(timeout):
 def mapa_clientes_data(request):
     usuario = get_data_owner(request)
 
-    dados = dict(
+    # Uma única agregação por (UF, país); o restante é derivado em memória
+    agregados = list(
         Cliente.objects.filter(cancelado=False, usuario=usuario)
-        .values("uf")
+        .values("uf", "pais")
         .annotate(total=Count("id"))
-        .values_list("uf", "total")
-    )
-
-    total_geral = sum(dados.values())
-    clientes_internacionais = Cliente.objects.filter(cancelado=False, usuario=usuario, uf__isnull=True).count()
-
-    mapa = gpd.read_file("archives/brasil_estados.geojson")
-
-    def _normalizar_estado(nome):
-        if not isinstance(nome, str):
-            return ""
-        return unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii").lower()
-
-    siglas = {
-        "acre": "AC",
-        "alagoas": "AL",
-        "amapa": "AP",
-        "amazonas": "AM",
-        "bahia": "BA",
-        "ceara": "CE",
-        "distrito federal": "DF",
-        "espirito santo": "ES",
-        "goias": "GO",
-        "maranhao": "MA",
-        "mato grosso": "MT",
-        "mato grosso do sul": "MS",
-        "minas gerais": "MG",
-        "para": "PA",
-        "paraiba": "PB",
-        "parana": "PR",
-        "pernambuco": "PE",
-        "piaui": "PI",
-        "rio de janeiro": "RJ",
-        "rio grande do norte": "RN",
-        "rio grande do sul": "RS",
-        "rondonia": "RO",
-        "roraima": "RR",
-        "santa catarina": "SC",
-        "sao paulo": "SP",
-        "sergipe": "SE",
-        "tocantins": "TO",
-    }
-
-    mapa["sigla"] = mapa["name"].apply(lambda nome: siglas.get(_normalizar_estado(nome)))
-    mapa = mapa.dropna(subset=["sigla"])
-    mapa["clientes"] = mapa["sigla"].apply(lambda uf: dados.get(uf, 0))
-    mapa["porcentagem"] = mapa["clientes"].apply(
-        lambda x: round((x / total_geral) * 100, 1) if total_geral > 0 else 0
+        .order_by()
     )
 
-    mapa = mapa.drop(columns=["created_at", "updated_at"], errors="ignore")
-    geojson_data = json.loads(mapa.to_json())
+    dados = defaultdict(int)
+    totais_pais = defaultdict(int)
+    for item in agregados:
+        dados[item["uf"]] += item["total"]
+        if item["pais"] and item["pais"] != "BR":
+            totais_pais[item["pais"]] += item["total"]
 
-    for feature in geojson_data.get("features", []):
-        props = feature.get("properties", {})
-        props["clientes"] = int(props.get("clientes", 0) or 0)
-        props["porcentagem"] = float(props.get("porcentagem", 0) or 0)
-        feature["properties"] = props
+    total_geral = sum(dados.values())
+    clientes_internacionais = dados.get(None, 0)
 
-    max_clientes = int(max(mapa["clientes"]) if mapa["clientes"].any() else 0)
+    features_json, max_clientes = montar_features_json(dados, total_geral)
 
     # Conta clientes por país (excluindo Brasil)
-    clientes_por_pais = list(
-        Cliente.objects.filter(cancelado=False, usuario=usuario)
-        .exclude(pais='BR')
-        .exclude(pais__isnull=True)
-        .values('pais')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
+    clientes_por_pais = [
+        {"pais": pais, "total": total}
+        for pais, total in sorted(totais_pais.items(), key=lambda par: (-par[1], par[0]))
+    ]
 
     # Mapa de códigos de país para nomes legíveis
     PAIS_NOMES = {
@@ -2465,30 +2173,29 @@ def mapa_clientes_data(request):
         'SP': 'São Paulo', 'SE': 'Sergipe', 'TO': 'Tocantins',
     }
 
-    clientes_por_estado = list(
-        Cliente.objects.filter(cancelado=False, usuario=usuario, uf__isnull=False)
-        .values('uf')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
+    clientes_por_estado = [
+        {'uf': uf, 'total': total}
+        for uf, total in sorted(
+            ((uf, total) for uf, total in dados.items() if uf is not None),
+            key=lambda par: (-par[1], par[0]),
+        )
+    ]
 
     # Adiciona nome legível e percentual a cada estado
     for item in clientes_por_estado:
         item['nome'] = UF_NOMES.get(item['uf'], item['uf'])
         item['percentual'] = round((item['total'] / total_geral) * 100, 1) if total_geral > 0 else 0
 
-    return JsonResponse(
-        {
-            "features": geojson_data.get("features", []),
-            "summary": {
-                "total_geral": int(total_geral),
-                "fora_pais": int(clientes_internacionais),
-                "max_clientes": max_clientes,
-                "por_pais": clientes_por_pais,
-                "por_estado": clientes_por_estado,
-            },
-        }
-    )
+    summary = {
+        "total_geral": int(total_geral),
+        "fora_pais": int(clientes_internacionais),
+        "max_clientes": max_clientes,
+        "por_pais": clientes_por_pais,
+        "por_estado": clientes_por_estado,
+    }
+    # As features já chegam serializadas do template geográfico
+    conteudo = '{"features":' + features_json + ',"summary":' + json.dumps(summary) + '}'
+    return HttpResponse(conteudo, content_type="application/json")
 
 
 @login_required
@@ -2561,41 +2268,14 @@ def clientes_servidor_data(request):
 @login_required
 @never_cache
 def notifications_dropdown(request):
-    hoje = timezone.localdate()
     owner = get_data_owner(request)
-    tipos = [Tipos_pgto.CARTAO, Tipos_pgto.BOLETO]
-
-    # Mensalidades vencidas
-    mensalidades_vencidas = (
-        Mensalidade.objects.select_related("cliente", "cliente__forma_pgto", "cliente__plano")
-        .filter(
-            usuario=owner,
-            pgto=False,
-            cancelado=False,
-            cliente__cancelado=False,
-            cliente__forma_pgto__nome__in=tipos,
-            dt_vencimento__lt=hoje,
-        )
-        .exclude(notifications_read__usuario=request.user)
-        .annotate(
-            dias_atraso=ExpressionWrapper(
-                hoje - F("dt_vencimento"), output_field=DurationField()
-            )
-        )
-        .order_by("dt_vencimento")
-    )
-
-    # Notificações do sistema (limite MEI, mudança de plano, etc.)
-    notificacoes_sistema = NotificacaoSistema.objects.filter(
-        usuario=owner,
-        lida=False
-    ).order_by('-criada_em')[:10]
+    resumo = ResumoNotificacoes(owner, request.user)
 
-    itens = list(mensalidades_vencidas[:15])
     context = {
-        "notif_items": itens,
-        "notif_count": mensalidades_vencidas.count() + notificacoes_sistema.count(),
-        "notificacoes_sistema": notificacoes_sistema,
+        "notif_items": resumo.itens(15),
+        "notif_count": resumo.contagem(),
+        # Notificações do sistema (limite MEI, mudança de plano, etc.)
+        "notificacoes_sistema": resumo.notificacoes_sistema(),
     }
     return render(request, "notificacoes/dropdown.html", context)
 
@@ -2628,6 +2308,8 @@ def notifications_mark_all_read(request):
     ).update(lida=True, data_leitura=timezone.now())
 
     request.session.pop("notif_read_ids", None)
+    # bulk_create/update não disparam signals
+    invalidar_resumo_notificacoes(owner.pk)
 
     return JsonResponse({"ok": True, "cleared": len(ids), "sistema_cleared": notif_sistema_marcadas})
 
@@ -2677,31 +2359,8 @@ class NotificationsModalView(LoginRequiredMixin, ListView):
 
 @login_required
 def notifications_count(request):
-    hoje = timezone.localdate()
     owner = get_data_owner(request)
-    tipos = [Tipos_pgto.CARTAO, Tipos_pgto.BOLETO]
-
-    # Contagem de mensalidades vencidas
-    count_mensalidades = (
-        Mensalidade.objects
-        .filter(
-            usuario=owner,
-            pgto=False, cancelado=False,
-            cliente__cancelado=False,
-            cliente__forma_pgto__nome__in=tipos,
-            dt_vencimento__lt=hoje,
-        )
-        .exclude(notifications_read__usuario=request.user)
-        .count()
-    )
-
-    # Contagem de notificações do sistema
-    count_sistema = NotificacaoSistema.objects.filter(
-        usuario=owner,
-        lida=False
-    ).count()
-
-    return JsonResponse({"count": count_mensalidades + count_sistema})
+    return JsonResponse({"count": ResumoNotificacoes(owner, request.user).contagem()})
 
 class MensalidadeDetailView(LoginRequiredMixin, DetailView):
     model = Mensalidade
@@ -3351,8 +3010,8 @@ def edit_customer(request, cliente_id):
             if cliente_existe_telefone:
                 # Garante que não é o próprio cliente que está editando
                 cliente_existente = Cliente.objects.filter(
-                    telefone=cliente_existe_telefone,
-                    usuario=user
+                    usuario=user,
+                    telefone_normalizado=chave_telefone(cliente_existe_telefone),
                 ).exclude(pk=cliente_id).first()
                 if cliente_existente:
                     logger.warning(
@@ -5483,58 +5142,32 @@ def create_app_account(request):
 @requer_funcionalidade('clientes_importacao_lote')
 @requer_pagina_ativa('importar_clientes')
 def import_customers(request):
-    timestamp = localtime().strftime('%d-%m-%Y %H:%M:%S')
-    func_name = inspect.currentframe().f_code.co_name
     usuario = request.user
     token = SessaoWpp.objects.filter(usuario=usuario, is_active=True).first()
     page_group = 'clientes'
     page = 'importar-clientes'
-    success, fail, clientes_existentes, clientes_invalidos_whatsapp, erros_importacao, clientes_criados = 0, 0, [], [], [], {}
     error_message = None
 
-    def clean_cell(row, key):
-        valor = row.get(key, None)
-        return "" if pd.isnull(valor) or valor is None else str(valor).strip()
-
     if request.method == "POST" and 'importar' in request.POST:
         logger.info("[IMPORT] [%s] Iniciando importação de clientes", usuario)
         arquivo = request.FILES.get('arquivo')
+        registros = None
         if not arquivo:
             error_message = "Nenhum arquivo enviado."
+        elif os.path.splitext(arquivo.name)[1].lower() != '.xlsx':
+            error_message = "Apenas arquivos .xlsx são suportados."
+        elif not token:
+            # Verifica se o usuário tem uma sessão ativa do WhatsApp
+            error_message = (
+                "Você precisa conectar sua conta ao WhatsApp antes de importar clientes. "
+                "Vá até a tela de integração com o WhatsApp e faça a conexão para prosseguir."
+            )
         else:
-            ext = os.path.splitext(arquivo.name)[1].lower()
-            if ext != '.xlsx':
-                error_message = "Apenas arquivos .xlsx são suportados."
-            else:
-                try:
-                    dados = pd.read_excel(
-                        arquivo,
-                        engine='openpyxl',
-                        header=2,
-                        dtype={
-                            "servidor": str,
-                            "dispositivo": str,
-                            "sistema": str,
-                            "device_id": str,
-                            "email": str,
-                            "device_key": str,
-                            "nome": str,
-                            "telefone": str,
-                            "indicado_por": str,
-                            "data_vencimento": str,
-                            "forma_pgto": str,
-                            "tipo_plano": str,
-                            "plano_valor": float,
-                            "telas": int,
-                            "data_adesao": str
-                        }
-                    )
-                    if "data_adesao" in dados.columns:
-                        dados["data_adesao"] = pd.to_datetime(dados["data_adesao"], errors="coerce")
-                        dados = dados.sort_values("data_adesao", ascending=True)
-                except Exception as e:
-                    logger.error("Erro lendo planilha: %s", e, exc_info=True)
-                    error_message = "Erro ao ler a planilha. Verifique o arquivo."
+            try:
+                registros = ler_planilha(arquivo)
+            except Exception as e:
+                logger.error("Erro lendo planilha: %s", e, exc_info=True)
+                error_message = "Erro ao ler a planilha. Verifique o arquivo."
 
         if error_message:
             return render(request, "pages/importar-cliente.html", {
@@ -5542,253 +5175,21 @@ def import_customers(request):
                 "page_group": page_group, "page": page
             })
 
-        registros = dados.to_dict('records')
-        with transaction.atomic():
-
-            # Verifica se o usuário tem uma sessão ativa do WhatsApp
-            if not token:
-                error_message = (
-                    "Você precisa conectar sua conta ao WhatsApp antes de importar clientes. "
-                    "Vá até a tela de integração com o WhatsApp e faça a conexão para prosseguir."
-                )
-                return render(request, "pages/importar-cliente.html", {
-                    "error_message": error_message,
-                    "page_group": page_group,
-                    "page": page,
-                })
-            
-            # 1º loop: salva todos os clientes sem indicado_por
-            for idx, row in enumerate(registros, 1):
-                try:
-                    logger.debug("[%s] [%s] [%s] [IMPORT] Processando linha %d - dados: %s", timestamp, func_name, usuario, idx, row)
-                    # Normaliza nomes de servidor, dispositivo e sistema
-                    servidor_nome = normalizar_servidor(clean_cell(row, 'servidor'))
-                    dispositivo_nome = normalizar_dispositivo(clean_cell(row, 'dispositivo'))
-                    sistema_nome = normalizar_aplicativo(clean_cell(row, 'sistema'))
-                    device_id = clean_cell(row, 'device_id')
-                    email = clean_cell(row, 'email')
-                    senha = clean_cell(row, 'device_key')
-                    nome = clean_cell(row, 'nome')
-                    telefone = clean_cell(row, 'telefone')
-                    data_vencimento_str = clean_cell(row, 'data_vencimento')
-                    forma_pgto_nome = clean_cell(row, 'forma_pgto')
-                    plano_nome = clean_cell(row, 'tipo_plano')
-                    plano_valor = clean_cell(row, 'plano_valor')
-                    plano_telas = clean_cell(row, 'telas')
-                    data_adesao_str = clean_cell(row, 'data_adesao')
-
-                    # Valida obrigatórios
-                    if not all([servidor_nome, dispositivo_nome, sistema_nome, nome, telefone, data_vencimento_str, forma_pgto_nome, plano_nome, plano_valor, plano_telas, data_adesao_str]):
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: campos obrigatórios em branco")
-                        continue
-
-                    # 1. Validação de telefone
-                    resultado_telefone = validar_tel_whatsapp(telefone, token.token, request.user)
-                    if not resultado_telefone.get("wpp"):
-                        fail += 1
-                        clientes_invalidos_whatsapp.append(f"Linha {idx}: {telefone} (número não existe no WhatsApp)")
-                        continue
-                    if not resultado_telefone.get("telefone_validado_wpp"):
-                        fail += 1
-                        clientes_invalidos_whatsapp.append(f"Linha {idx}: {telefone} (não foi possível validar o telefone para WhatsApp)")
-                        continue
-                    if resultado_telefone.get("cliente_existe_telefone"):
-                        fail += 1
-                        clientes_existentes.append(f"Linha {idx}: {telefone} (já existe cliente com esse telefone)")
-                        continue
-                    if resultado_telefone.get("telefone_validado_wpp"):
-                        telefone = resultado_telefone.get("telefone_validado_wpp")
-
-                    # Valida se o plano informado é um dos permitidos
-                    planos_validos = [plano[0] for plano in Plano.CHOICES]
-                    # Normaliza o nome do plano (ex: "mensal" -> "Mensal", "MENSAL" -> "Mensal")
-                    plano_nome = plano_nome.strip().title()
-                    if plano_nome not in planos_validos:
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: plano '{plano_nome}' inválido. Deve ser um dos: {', '.join(planos_validos)}.")
-                        continue
-
-                    # Parse plano_valor
-                    try:
-                        plano_valor = float(str(plano_valor).replace(",", "."))
-                    except Exception:
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: valor do plano inválido.")
-                        continue
-
-                    # Parse de plano_telas
-                    try:
-                        plano_telas = int(plano_telas)
-                    except Exception:
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: quantidade de telas inválida.")
-                        continue
-
-                    # Parse datas
-                    data_vencimento = None
-                    if data_vencimento_str:
-                        try:
-                            if len(data_vencimento_str) > 10:
-                                data_vencimento = datetime.strptime(data_vencimento_str, "%Y-%m-%d %H:%M:%S").date()
-                            else:
-                                data_vencimento = datetime.strptime(data_vencimento_str, "%Y-%m-%d").date()
-                        except Exception:
-                            fail += 1
-                            erros_importacao.append(f"Linha {idx}: data de vencimento inválida.")
-                            continue
-                    try:
-                        if len(data_adesao_str) > 10:
-                            data_adesao = datetime.strptime(data_adesao_str, "%Y-%m-%d %H:%M:%S").date()
-                        else:
-                            data_adesao = datetime.strptime(data_adesao_str, "%Y-%m-%d").date()
-                    except Exception:
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: data de adesão inválida.")
-                        continue
-
-                    # Validar e-mail
-                    try:
-                        if email:
-                            validate_email(email)
-                    except ValidationError:
-                        fail += 1
-                        erros_importacao.append(f"Linha {idx}: E-mail inválido.")
-                        continue
-
-                    # Objetos relacionados - usar filter().first() para evitar MultipleObjectsReturned
-                    plano = Plano.objects.filter(nome=plano_nome, telas=plano_telas, valor=plano_valor, usuario=usuario).first()
-                    if not plano:
-                        plano = Plano.objects.create(nome=plano_nome, telas=plano_telas, valor=plano_valor, usuario=usuario)
-
-                    # Usa funções helper com busca case-insensitive e normalização
-                    sistema, _ = get_or_create_aplicativo(sistema_nome, usuario)
-                    servidor, _ = get_or_create_servidor(servidor_nome, usuario)
-                    dispositivo, _ = get_or_create_dispositivo(dispositivo_nome, usuario)
-
-                    forma_pgto = Tipos_pgto.objects.filter(nome__iexact=forma_pgto_nome, usuario=usuario).first()
-                    if not forma_pgto:
-                        forma_pgto = Tipos_pgto.objects.create(nome=forma_pgto_nome, usuario=usuario)
-
-                    # Salva cliente sem indicado_por
-                    cliente = Cliente(
-                        nome=nome,
-                        telefone=telefone,
-                        dispositivo=dispositivo,
-                        sistema=sistema,
-                        servidor=servidor,
-                        forma_pgto=forma_pgto,
-                        plano=plano,
-                        data_vencimento=data_vencimento,
-                        data_adesao=data_adesao,
-                        usuario=usuario,
-                    )
-                    cliente.save()
-                    clientes_criados[telefone] = cliente
-
-                    # Remove lead se existir (telefone virou cliente)
-                    # Normaliza para formato do lead (+DIGITOS)
-                    telefone_lead = telefone if telefone.startswith('+') else '+' + re.sub(r'\D', '', telefone)
-                    TelefoneLeads.objects.filter(telefone=telefone_lead, usuario=usuario).delete()
-
-                    # Conta do App se aplicável
-                    conta_criada = False
-                    if device_id or email:
-                        device_id = re.sub(r'[^A-Fa-f0-9]', '', device_id or '')
-                        if device_id:
-                            ContaDoAplicativo.objects.create(
-                                device_id=device_id,
-                                email=email,
-                                device_key=senha,
-                                app=sistema,
-                                cliente=cliente,
-                                usuario=usuario,
-                            )
-                            conta_criada = True
-
-                    # Atualiza contador de dispositivos na AssinaturaCliente
-                    if conta_criada:
-                        try:
-                            assinatura = cliente.assinatura
-                            assinatura.dispositivos_usados = 1
-                            assinatura.save(update_fields=['dispositivos_usados'])
-                        except Exception as e:
-                            logger.warning("[IMPORT] [%s] Erro ao atualizar contador de dispositivos para cliente %s: %s", usuario, nome, e)
-
-                    # Cria mensalidade com marcação de dados importados
-                    try:
-                        Mensalidade.objects.create(
-                            cliente=cliente,
-                            valor=plano_valor,
-                            dt_vencimento=data_vencimento,
-                            usuario=usuario,
-                            dados_historicos_verificados=False,
-                            valor_base_plano=plano_valor,
-                        )
-                    except Exception as e:
-                        logger.error("[IMPORT] [%s] Erro ao criar mensalidade para cliente %s: %s", usuario, nome, e, exc_info=True)
-
-                    # Cria histórico de plano para rastreabilidade
-                    try:
-                        historico_iniciar(cliente, plano=plano, inicio=data_adesao, motivo='create')
-                    except Exception as e:
-                        logger.warning("[IMPORT] [%s] Erro ao criar histórico de plano para cliente %s: %s", usuario, nome, e)
-
-                    success += 1
-                    logger.info("[IMPORT] [%s] Cliente importado com sucesso: %s (%s)", usuario, nome, telefone)
-                except Exception as e:
-                    fail += 1
-                    logger.error("[IMPORT] [%s] Falha ao importar linha %d: %s", usuario, idx, e, exc_info=True)
-                    erros_importacao.append(f"Linha {idx}: {e}")
-
-            # 2º loop: associa indicador
-            for idx, row in enumerate(registros, 1):
-                telefone_raw = clean_cell(row, 'telefone')
-                indicador_raw = clean_cell(row, 'indicado_por')
-                try:
-                    if indicador_raw:
-                        # Formata telefone do indicador para busca (com ou sem +)
-                        indicador_formatado = indicador_raw if indicador_raw.startswith('+') else f'+{indicador_raw}'
-                        # Busca primeiro nos clientes recém-criados, depois no banco
-                        indicador = clientes_criados.get(indicador_formatado) or Cliente.objects.filter(telefone=indicador_formatado, usuario=usuario).first()
-                        if indicador:
-                            # Busca o cliente pelo telefone já formatado no dicionário
-                            telefone_formatado = telefone_raw if telefone_raw.startswith('+') else f'+{telefone_raw}'
-                            cliente = clientes_criados.get(telefone_formatado)
-                            if cliente:
-                                cliente.indicado_por = indicador
-                                cliente.save(update_fields=['indicado_por'])
-                            else:
-                                Cliente.objects.filter(telefone=telefone_formatado, usuario=usuario).update(indicado_por=indicador)
-                except Exception as e:
-                    fail += 1
-                    erros_importacao.append(f"Linha {idx}: Não foi possível associar o Indicador ({indicador_raw}) ao Cliente ({telefone_raw}).")
-                    continue
-
-        logger.info(
-            "[IMPORT] [%s] Importação concluída - Sucesso: %d | Falhas: %d | Existentes: %d | WhatsApp inválido: %d",
-            usuario, success, fail, len(clientes_existentes), len(clientes_invalidos_whatsapp)
-        )
+        # Validação no WhatsApp e gravação seguem em segundo plano; a página acompanha por polling
+        tarefa = iniciar_importacao_segundo_plano(usuario, token, registros, arquivo.name)
         log_user_action(
             request=request,
             action=UserActionLog.ACTION_IMPORT,
             entity="Cliente",
-            message="Importação de clientes concluída.",
+            message="Importação de clientes iniciada.",
             extra={
-                "sucesso": success,
-                "falhas": fail,
-                "clientes_existentes": len(clientes_existentes),
-                "clientes_invalidos_whatsapp": len(clientes_invalidos_whatsapp),
-                "erros_registrados": len(erros_importacao),
+                "tarefa_id": tarefa.pk,
+                "arquivo": arquivo.name,
+                "linhas": len(registros),
             },
         )
         return render(request, "pages/importar-cliente.html", {
-            "success_message": "Importação concluída!",
-            "num_linhas_importadas": success,
-            "num_linhas_nao_importadas": fail,
-            "nomes_clientes_existentes": clientes_existentes,
-            "nomes_clientes_erro_importacao": erros_importacao,
-            "clientes_invalidos_whatsapp": clientes_invalidos_whatsapp,
+            "tarefa_importacao_id": tarefa.pk,
             "page_group": page_group,
             "page": page,
         })
@@ -5796,6 +5197,41 @@ def import_customers(request):
     return render(request, "pages/importar-cliente.html", {"page_group": page_group, "page": page})
 
 
+@login_required
+@require_GET
+def importar_clientes_progresso(request, tarefa_id):
+    """
+    Consulta o andamento de uma importação de clientes (polling da tela de importação).
+
+    Returns:
+        JSON com status, etapa, contadores, percentual e, ao final, as listas de
+        clientes existentes, números inválidos no WhatsApp e erros por linha.
+    """
+    marcar_importacoes_interrompidas(request.user)
+    tarefa = TarefaImportacaoClientes.objects.filter(id=tarefa_id, usuario=request.user).first()
+    if not tarefa:
+        return JsonResponse({
+            'success': False,
+            'error': 'Tarefa não encontrada ou você não tem permissão para acessá-la.'
+        }, status=404)
+
+    concluida = tarefa.esta_concluida()
+    return JsonResponse({
+        'success': True,
+        'status': tarefa.status,
+        'etapa_atual': tarefa.etapa_atual,
+        'mensagem_progresso': tarefa.mensagem_progresso,
+        'total_linhas': tarefa.total_linhas,
+        'processados': tarefa.processados,
+        'sucessos': tarefa.sucessos,
+        'falhas': tarefa.falhas,
+        'progresso_percentual': tarefa.get_progresso_percentual(),
+        'concluida': concluida,
+        'erro_geral': tarefa.erro_geral,
+        'resultado': tarefa.resultado if concluida else {},
+    })
+
+
 # AÇÃO PARA CRIAR NOVO CLIENTE ATRAVÉS DO FORMULÁRIO
 @login_required
 def create_customer(request):
@@ -5866,7 +5302,7 @@ def create_customer(request):
             cliente_existente = None
 
             try:
-                cliente_existente = Cliente.objects.filter(telefone=telefone, usuario=usuario).first()
+                cliente_existente = Cliente.objects.filter(usuario=usuario, telefone_normalizado=chave_telefone(telefone)).first()
                 if cliente_existente:
                     logger.warning(
                         f"[ERRO][CADASTRO CLIENTE] Já existe cliente para telefone {cliente_existente.telefone} (ID: {cliente_existente.id})"
@@ -6177,7 +5613,7 @@ def cadastrar_cliente_basico(request):
             # Verificar duplicidade
             if resultado_wpp.get("cliente_existe_telefone"):
                 telefone_existente = resultado_wpp.get("cliente_existe_telefone")
-                cliente_existente = Cliente.objects.filter(telefone=telefone_existente, usuario=usuario).first()
+                cliente_existente = Cliente.objects.filter(usuario=usuario, telefone_normalizado=chave_telefone(telefone_existente)).first()
                 if cliente_existente:
                     return render(request, "pages/cadastro-cliente.html", {
                         "error_message": (
@@ -6363,7 +5799,7 @@ def cadastrar_assinatura(request):
 
                     if resultado_wpp.get("cliente_existe_telefone"):
                         telefone_existente = resultado_wpp.get("cliente_existe_telefone")
-                        cliente_existente = Cliente.objects.filter(telefone=telefone_existente, usuario=usuario).first()
+                        cliente_existente = Cliente.objects.filter(usuario=usuario, telefone_normalizado=chave_telefone(telefone_existente)).first()
                         if cliente_existente:
                             context['error_message'] = f"Já existe cliente com este telefone: {cliente_existente.nome}"
                             return render(request, "pages/cadastro-assinatura.html", context)
@@ -6879,60 +6315,8 @@ def create_payment_method_admin(request):
             forma_pgto__isnull=True
         ).count()
 
-        # ============================================================
-        # ALERTAS FASTDEPIX - Planos sem link ou com valor divergente
-        # ============================================================
-        alertas_fastdepix = {
-            'planos_sem_link': [],
-            'planos_valor_divergente': [],
-            'tem_alertas': False
-        }
-
-        # Verificar se usuário tem conta FastDePix com link_fastdepix
-        contas_fastdepix_alerta = ContaBancaria.objects.filter(
-            usuario=usuario,
-            instituicao__tipo_integracao='fastdepix',
-            tipo_cobranca_fastdepix='link_fastdepix',
-            ativo=True
-        ).select_related('instituicao')
-
-        if contas_fastdepix_alerta.exists():
-            planos_usuario = Plano.objects.filter(usuario=usuario)
-
-            for conta in contas_fastdepix_alerta:
-                # Buscar links existentes para esta conta
-                links_conta = PlanoLinkPagamento.objects.filter(
-                    conta_bancaria=conta
-                ).select_related('plano')
-                planos_com_link = {link.plano_id for link in links_conta}
-
-                # Planos sem link
-                for plano in planos_usuario:
-                    if plano.id not in planos_com_link:
-                        alertas_fastdepix['planos_sem_link'].append({
-                            'plano_id': plano.id,
-                            'plano_nome': f"{plano.nome} ({plano.telas} tela(s))",
-                            'plano_valor': float(plano.valor),
-                            'conta_id': conta.id,
-                            'conta_nome': conta.nome_identificacao
-                        })
-
-                # Planos com valor divergente
-                for link in links_conta:
-                    if link.valor_divergente:
-                        alertas_fastdepix['planos_valor_divergente'].append({
-                            'plano_id': link.plano.id,
-                            'plano_nome': f"{link.plano.nome} ({link.plano.telas} tela(s))",
-                            'valor_atual': float(link.plano.valor),
-                            'valor_configurado': float(link.valor_configurado),
-                            'conta_id': conta.id,
-                            'conta_nome': conta.nome_identificacao
-                        })
-
-            alertas_fastdepix['tem_alertas'] = (
-                len(alertas_fastdepix['planos_sem_link']) > 0 or
-                len(alertas_fastdepix['planos_valor_divergente']) > 0
-            )
+        # Alertas FastDePix - Planos sem link ou com valor divergente
+        alertas_fastdepix = montar_alertas_fastdepix(usuario)
 
         ctx = {
             'formas_pgto': formas_pgto,
@@ -8188,6 +7572,7 @@ def api_notificacoes_marcar_todas_lidas(request):
             usuario=request.user,
             lida=False
         ).update(lida=True, data_leitura=timezone.now())
+        invalidar_resumo_notificacoes(request.user.pk)
 
         return JsonResponse({
             'success': True,
@@ -8553,21 +7938,24 @@ def webhook_pagamento_pix(request):
 
     POST /api/pix/webhook/
 
+    O evento é apenas validado e gravado na fila de webhooks (deduplicado por
+    transação/evento/status); o processamento fica com ``processar_evento_pix``.
+
     Headers esperados:
         - X-Webhook-Signature: Assinatura HMAC-SHA256 (FastDePix)
         - X-Integration: Identificador da integração (opcional)
     """
     import logging
-    from nossopainel.services.payment_integrations import (
-        FastDePixIntegration, PaymentStatus, get_payment_integration
-    )
+    from nossopainel.models import EventoWebhook
+    from nossopainel.services.fila_webhooks import disparar_processamento, enfileirar_evento
+    from nossopainel.services.webhook_pix import extrair_dados_webhook, id_evento_pix
 
     # Logger específico para webhook FastDePix
     fdpx_logger = logging.getLogger('fastdepix.webhook')
 
     # ========== LOG INICIAL: Request recebido ==========
     fdpx_logger.info("=" * 80)
-    fdpx_logger.info("WEBHOOK RECEBIDO - INÍCIO DO PROCESSAMENTO")
+    fdpx_logger.info("WEBHOOK RECEBIDO")
     fdpx_logger.info("=" * 80)
 
     # Log de informações da requisição
@@ -8611,16 +7999,13 @@ def webhook_pagamento_pix(request):
             fdpx_logger.info("=" * 80)
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
-        fdpx_logger.info("-" * 40)
-        fdpx_logger.info("PAYLOAD (parsed JSON):")
-        fdpx_logger.info(json.dumps(payload, indent=2, ensure_ascii=False, default=str))
+        if not isinstance(payload, dict):
+            fdpx_logger.error("ERRO: payload não é um objeto JSON")
+            fdpx_logger.info("=" * 80)
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
 
         # ========== EXTRAIR DADOS DO PAYLOAD ==========
-        # O payload pode vir com estrutura {data: {...}} ou diretamente como {...}
-        data = payload.get('data', payload) if isinstance(payload, dict) else payload
-        transaction_id = str(data.get('id', data.get('transaction_id', '')))
-        event_type = payload.get('event', '')
-        status_str = data.get('status', '').lower()
+        _, transaction_id, event_type, status_str = extrair_dados_webhook(payload)
 
         fdpx_logger.info("-" * 40)
         fdpx_logger.info("DADOS EXTRAÍDOS:")
@@ -8633,192 +8018,27 @@ def webhook_pagamento_pix(request):
             fdpx_logger.info("=" * 80)
             return JsonResponse({'error': 'Transaction ID not found'}, status=400)
 
-        # ========== BUSCAR COBRANÇA ==========
-        fdpx_logger.info("-" * 40)
-        fdpx_logger.info(f"Buscando CobrancaPix com transaction_id: {transaction_id}")
-
-        try:
-            cobranca = CobrancaPix.objects.select_related(
-                'conta_bancaria', 'conta_bancaria__instituicao', 'mensalidade', 'cliente'
-            ).get(transaction_id=transaction_id)
-
-            fdpx_logger.info("COBRANÇA ENCONTRADA:")
-            fdpx_logger.info(f"  ID: {cobranca.id}")
-            fdpx_logger.info(f"  Status atual: {cobranca.status}")
-            fdpx_logger.info(f"  Valor: R$ {cobranca.valor}")
-            fdpx_logger.info(f"  Criada em: {cobranca.criado_em}")
-            fdpx_logger.info(f"  Expira em: {cobranca.expira_em}")
-            fdpx_logger.info(f"  Integração: {cobranca.integracao}")
-            if cobranca.mensalidade:
-                fdpx_logger.info(f"  Mensalidade ID: {cobranca.mensalidade.id}")
-                fdpx_logger.info(f"  Mensalidade Vencimento: {cobranca.mensalidade.dt_vencimento}")
-            if cobranca.cliente:
-                fdpx_logger.info(f"  Cliente: {cobranca.cliente.nome} (ID: {cobranca.cliente.id})")
-            if cobranca.conta_bancaria:
-                fdpx_logger.info(f"  Conta Bancária: {cobranca.conta_bancaria.nome_identificacao}")
-
-        except CobrancaPix.DoesNotExist:
-            fdpx_logger.warning(f"COBRANÇA NÃO ENCONTRADA: {transaction_id}")
-            fdpx_logger.info("Retornando 200 OK (para não reenviar webhook)")
-            fdpx_logger.info("=" * 80)
-            return JsonResponse({'status': 'ignored', 'reason': 'Charge not found'})
-
-        # ========== VALIDAR ASSINATURA ==========
-        signature = request.headers.get('X-Webhook-Signature', '')
-        fdpx_logger.info("-" * 40)
-        fdpx_logger.info("VALIDAÇÃO DE ASSINATURA:")
-        fdpx_logger.info(f"  Assinatura recebida: {signature if signature else '(nenhuma)'}")
-        fdpx_logger.info(f"  Webhook Secret configurado: {'Sim' if cobranca.conta_bancaria.webhook_secret else 'Não'}")
-
-        # ========== PROCESSAR EVENTO ==========
-        fdpx_logger.info("-" * 40)
-        fdpx_logger.info("PROCESSAMENTO DO EVENTO:")
-
-        if event_type == 'transaction.paid' or status_str == 'paid':
-            fdpx_logger.info(f"  Tipo: PAGAMENTO CONFIRMADO")
-
-            if cobranca.status != 'paid':
-                # Extrair dados do pagador
-                payer = data.get('payer', {})
-                payer_name = payer.get('name') if isinstance(payer, dict) else None
-                payer_doc = payer.get('cpf_cnpj') if isinstance(payer, dict) else None
-
-                fdpx_logger.info(f"  Pagador Nome: {payer_name}")
-                fdpx_logger.info(f"  Pagador Documento: {payer_doc}")
-
-                # Extrair data de pagamento
-                paid_at = None
-                if data.get('paid_at'):
-                    try:
-                        paid_at = timezone.datetime.fromisoformat(
-                            data['paid_at'].replace('Z', '+00:00')
-                        )
-                        fdpx_logger.info(f"  Data Pagamento (API): {paid_at}")
-                    except (ValueError, AttributeError):
-                        paid_at = timezone.now()
-                        fdpx_logger.info(f"  Data Pagamento (fallback now): {paid_at}")
-                else:
-                    paid_at = timezone.now()
-                    fdpx_logger.info(f"  Data Pagamento (now): {paid_at}")
-
-                # Extrair valores financeiros
-                # FastDePix envia no webhook apenas dados básicos (amount, status, transaction_id)
-                # Os dados de taxa (commission_amount, fee) geralmente NÃO vêm no webhook
-                # Por isso, buscamos os detalhes completos via API
-                amount = data.get('amount')
-                amount_received = data.get('commission_amount') or data.get('amount_received') or data.get('net_amount')
-                fee = data.get('fee') or data.get('tax')
-                fdpx_logger.info(f"  Valor Cobrado (webhook): {amount}")
-                fdpx_logger.info(f"  Valor Recebido (webhook): {amount_received}")
-                fdpx_logger.info(f"  Taxa (webhook): {fee}")
-
-                # Se não veio dados de taxa no webhook, buscar detalhes completos via API
-                if not amount_received and not fee:
-                    fdpx_logger.info("  Dados de taxa não encontrados no webhook, buscando via API...")
-                    try:
-                        integration = get_payment_integration(cobranca.conta_bancaria)
-                        if integration:
-                            details = integration.get_charge_details(transaction_id)
-                            fdpx_logger.info(f"  Detalhes da API: {details}")
-
-                            # Extrair dados do retorno da API
-                            amount_received = (
-                                details.get('commission_amount') or
-                                details.get('amount_received') or
-                                details.get('net_amount')
-                            )
-                            fee = details.get('fee') or details.get('tax')
-
-                            # Atualizar dados do pagador se não vieram no webhook
-                            if not payer_name:
-                                api_payer = details.get('payer', {})
-                                if isinstance(api_payer, dict):
-                                    payer_name = api_payer.get('name')
-                                    payer_doc = api_payer.get('cpf_cnpj')
-
-                            # Atualizar data de pagamento se disponível
-                            if not paid_at or paid_at == timezone.now():
-                                if details.get('paid_at'):
-                                    try:
-                                        paid_at = timezone.datetime.fromisoformat(
-                                            details['paid_at'].replace('Z', '+00:00')
-                                        )
-                                    except (ValueError, AttributeError):
-                                        pass
-
-                            fdpx_logger.info(f"  Valor Recebido (API): {amount_received}")
-                            fdpx_logger.info(f"  Taxa (API): {fee}")
-                    except Exception as e:
-                        fdpx_logger.warning(f"  Erro ao buscar detalhes via API: {e}")
-
-                # Converter valores para Decimal se existirem
-                valor_recebido = None
-                valor_taxa = None
-                if amount_received:
-                    try:
-                        valor_recebido = Decimal(str(amount_received))
-                    except:
-                        pass
-                if fee:
-                    try:
-                        valor_taxa = Decimal(str(fee))
-                    except:
-                        pass
-
-                # Se não veio taxa explícita mas temos amount e valor_recebido, calcular
-                if valor_taxa is None and amount and valor_recebido:
-                    try:
-                        valor_taxa = Decimal(str(amount)) - valor_recebido
-                        fdpx_logger.info(f"  Taxa calculada: {valor_taxa}")
-                    except:
-                        pass
-
-                fdpx_logger.info(f"  Valor Recebido Final: {valor_recebido}")
-                fdpx_logger.info(f"  Taxa Final: {valor_taxa}")
-
-                # Marcar como pago
-                fdpx_logger.info("  Executando mark_as_paid()...")
-                cobranca.mark_as_paid(
-                    paid_at=paid_at,
-                    payer_name=payer_name,
-                    payer_document=payer_doc,
-                    webhook_data=payload,
-                    valor_recebido=valor_recebido,
-                    valor_taxa=valor_taxa,
-                )
-
-                fdpx_logger.info(f"  ✓ Cobrança {transaction_id} marcada como PAGA")
-                if cobranca.mensalidade:
-                    fdpx_logger.info(f"  ✓ Mensalidade atualizada: pgto={cobranca.mensalidade.pgto}")
-            else:
-                fdpx_logger.info(f"  Cobrança já estava paga, ignorando")
-
-        elif event_type == 'transaction.expired' or status_str == 'expired':
-            fdpx_logger.info(f"  Tipo: EXPIRAÇÃO")
-            cobranca.mark_as_expired()
-            fdpx_logger.info(f"  ✓ Cobrança {transaction_id} marcada como EXPIRADA")
-
-        elif event_type == 'transaction.cancelled' or status_str in ['cancelled', 'canceled']:
-            fdpx_logger.info(f"  Tipo: CANCELAMENTO")
-            cobranca.mark_as_cancelled()
-            fdpx_logger.info(f"  ✓ Cobrança {transaction_id} marcada como CANCELADA")
-
-        else:
-            fdpx_logger.info(f"  Tipo: EVENTO DESCONHECIDO (event={event_type}, status={status_str})")
+        # ========== ENFILEIRAR ==========
+        evento, criado = enfileirar_evento(
+            origem=EventoWebhook.ORIGEM_PIX,
+            evento_id=id_evento_pix(transaction_id, event_type, status_str),
+            tipo=event_type or status_str,
+            chave_ordenacao=transaction_id,
+            payload=payload,
+            headers={
+                'X-Webhook-Signature': request.headers.get('X-Webhook-Signature', ''),
+                'X-Integration': request.headers.get('X-Integration', ''),
+            },
+        )
+        if criado:
+            disparar_processamento()
 
-        # ========== RESPOSTA ==========
         response_data = {
-            'status': 'processed',
-            'cobranca_id': str(cobranca.id),
-            'new_status': cobranca.status,
+            'status': 'queued' if criado else 'duplicate',
+            'evento_id': evento.id if evento else None,
         }
-
-        fdpx_logger.info("-" * 40)
-        fdpx_logger.info("RESPOSTA:")
-        fdpx_logger.info(json.dumps(response_data, indent=2))
+        fdpx_logger.info(f"RESPOSTA: {json.dumps(response_data)}")
         fdpx_logger.info("=" * 80)
-        fdpx_logger.info("")
-
         return JsonResponse(response_data)
 
     except Exception as e:
@@ -9266,11 +8486,6 @@ def get_location_from_ip(ip):
 # API: Evolução do Patrimônio (JSON)
 ############################################
 
-def _last_day_of_month(d: date) -> date:
-    _, last = calendar.monthrange(d.year, d.month)
-    return date(d.year, d.month, last)
-
-
 @login_required
 @requer_funcionalidade('relatorio_evolucao_patrimonio', api=True)
 @require_GET
@@ -9293,7 +8508,8 @@ def evolucao_patrimonio(request):
     today_month = timezone.localdate().replace(day=1)
     months_list = []
 
-    historico_qs = ClientePlanoHistorico.objects.filter(usuario=get_data_owner(request))
+    owner = get_data_owner(request)
+    historico_qs = ClientePlanoHistorico.objects.filter(usuario=owner)
 
     if months_value is None:
         first_inicio = historico_qs.aggregate(Min('inicio'))['inicio__min']
@@ -9324,25 +8540,8 @@ def evolucao_patrimonio(request):
     if not months_list:
         months_list = [today_month]
 
-    categorias = []
-    patrim = []
-
-    for m in months_list:
-        ref = _last_day_of_month(m)
-        # ativos (sem fim) até a data de referência
-        ativos = historico_qs.filter(
-            inicio__lte=ref,
-            fim__isnull=True,
-        ).values_list('valor_plano', flat=True)
-        # encerrados mas ainda ativos na data de referência (fim >= ref)
-        encerrados = historico_qs.filter(
-            inicio__lte=ref,
-            fim__gte=ref,
-        ).values_list('valor_plano', flat=True)
-
-        total = sum((v or 0) for v in list(ativos) + list(encerrados))
-        patrim.append(float(total))
-        categorias.append(f"{m.month:02d}/{str(m.year)[2:]}")
+    categorias = [f"{m.month:02d}/{str(m.year)[2:]}" for m in months_list]
+    patrim = [float(total) for total in obter_serie_patrimonio(owner, months_list)]
 
     evol = []
     prev = None
@@ -10707,8 +9906,12 @@ def listar_dominios_api(request):
     """
     API para listar domínios únicos de todos os dispositivos do reseller account.
 
+    Lê do índice de dispositivos da conta (``services.indice_reseller``), que só consulta
+    a API quando expirado.
+
     GET Params:
         aplicativo_id: ID do aplicativo
+        atualizar: '1' para ignorar o TTL do índice e consultar todas as playlists
 
     Returns:
         JSON:
@@ -10752,18 +9955,15 @@ def listar_dominios_api(request):
                 'error': 'JWT não encontrado na sessão. Faça login novamente.'
             }, status=400)
 
-        # Inicializar API client
         from nossopainel.services.lib.dream_tv_api import DreamTVAPI
-        from nossopainel.utils import extrair_dominio_de_url
         from nossopainel.services.api_raw_logger import get_api_raw_logger
-        from collections import Counter
+        from nossopainel.services.indice_reseller import obter_indice_dispositivos, resumir_dominios
         import time
 
-        api = DreamTVAPI(jwt=jwt)
-
         # Inicializar logger RAW para registrar dados completos da API
         api_raw_logger = get_api_raw_logger()
         collection_start_time = time.time()
+        devices_completos = []
 
         # Log RAW: Início da coleta
         api_raw_logger.log_collection_start(
@@ -10772,114 +9972,27 @@ def listar_dominios_api(request):
             total_devices=0  # Será atualizado conforme dispositivos são processados
         )
 
-        # v2.0: Coletar devices completos + domínios
-        dominios_counter = Counter()
-        devices_completos = []  # NOVO: armazena devices com playlists
-        page = 1
-        limit = 100
-
         logger.info(f"[listar_dominios_api] Iniciando coleta de devices completos para user={request.user.username}, app={aplicativo.nome}")
 
-        while True:
-            try:
-                # Listar dispositivos
-                devices_data = api.list_devices(page=page, limit=limit)
-                devices = devices_data.get('rows', [])
-
-                if not devices:
-                    break  # Sem mais dispositivos
-
-                logger.debug(f"[listar_dominios_api] Página {page}: {len(devices)} dispositivos")
-
-                # Para cada dispositivo, listar playlists
-                for device in devices:
-                    device_id = device.get('id')  # ID numérico (usado para API)
-                    device_mac = device.get('mac')  # MAC address real (usado no cache)
-
-                    # Extrair nome do dispositivo (campo pode variar: comment, name, id)
-                    nome_dispositivo = (
-                        device.get('reseller_activation', {}).get('comment') or
-                        device.get('comment') or
-                        device.get('name') or
-                        device_mac or
-                        str(device_id)
-                    )
-
-                    # Log RAW: Device completo
-                    api_raw_logger.log_device_raw(
-                        device_id=device_id,
-                        device_mac=device_mac or str(device_id),
-                        device_name=nome_dispositivo,
-                        raw_data=device  # JSON completo do device
-                    )
-
-                    try:
-                        playlists = api.list_playlists(device_id=device_id)
-
-                        # NOVO: Estruturar playlists com domínio extraído
-                        playlists_estruturadas = []
-                        for playlist in playlists:
-                            url = playlist.get('url', '')
-                            dominio = extrair_dominio_de_url(url) if url else None
-
-                            # Log RAW: Playlist completa
-                            api_raw_logger.log_playlist_raw(
-                                device_id=device_id,
-                                playlist_id=playlist.get('id'),
-                                playlist_name=playlist.get('name', 'Sem nome'),
-                                raw_data=playlist  # JSON completo da playlist
-                            )
-
-                            playlists_estruturadas.append({
-                                'id': playlist.get('id'),
-                                'name': playlist.get('name', 'Sem nome'),
-                                'url': url,
-                                'dominio': dominio,
-                                'is_selected': playlist.get('is_selected', False),
-                                'deviceId': playlist.get('deviceId')  # Preservar deviceId numérico para updates
-                            })
-
-                            # Contar domínios para lista de domínios únicos
-                            if dominio:
-                                dominios_counter[dominio] += 1
-
-                        # NOVO: Adicionar device completo ao array
-                        devices_completos.append({
-                            'device_id': device_mac,  # MAC real (ex: 00:1A:79:XX:XX:XX)
-                            'nome_dispositivo': nome_dispositivo,
-                            'playlists': playlists_estruturadas
-                        })
-
-                    except Exception as e:
-                        logger.warning(f"[listar_dominios_api] Erro ao buscar playlists do device {device_mac}: {e}")
-                        # NOVO: Mesmo com erro, adicionar device sem playlists
-                        devices_completos.append({
-                            'device_id': device_mac,  # MAC real (ex: 00:1A:79:XX:XX:XX)
-                            'nome_dispositivo': nome_dispositivo,
-                            'playlists': []
-                        })
-                        continue
-
-                    # Delay para evitar rate limiting da API (429) - reduzido de 0.2 para 0.05
-                    import time
-                    time.sleep(0.05)  # 50ms entre cada requisição (economia de ~26s para 175 devices)
-
-                # Verificar se há mais páginas
-                total = devices_data.get('count', 0)
-                if page * limit >= total:
-                    break
-
-                page += 1
-
-            except Exception as e:
-                logger.error(f"[listar_dominios_api] Erro ao listar devices na página {page}: {e}")
-                break
+        # Índice de dispositivos/playlists da conta: servido do banco dentro do TTL e
+        # atualizado incrementalmente (varredura concorrente) quando expirado.
+        # ?atualizar=1 força nova consulta das playlists de todos os dispositivos.
+        entradas = obter_indice_dispositivos(
+            conta_reseller,
+            lambda: DreamTVAPI(jwt=jwt),
+            forcar=request.GET.get('atualizar') == '1',
+            raw_logger=api_raw_logger,
+        )
 
-        # Formatar resultado (ordenar por count DESC)
-        dominios_list = [
-            {'dominio': dominio, 'count': count}
-            for dominio, count in dominios_counter.most_common()
+        devices_completos = [
+            {
+                'device_id': entrada.mac,  # MAC real (ex: 00:1A:79:XX:XX:XX)
+                'nome_dispositivo': entrada.nome_dispositivo,
+                'playlists': entrada.playlists,
+            }
+            for entrada in entradas
         ]
+        dominios_list = resumir_dominios(entradas)
 
         logger.info(f"[listar_dominios_api] Coleta finalizada: {len(devices_completos)} dispositivos, {len(dominios_list)} domínios únicos")
 
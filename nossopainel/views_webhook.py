@@ -1,51 +1,93 @@
 """Views para receber webhooks do WPPConnect."""
 
+import hashlib
 import json
 import logging
-import threading
 import time
 import time as time_module
-from collections import defaultdict
+from datetime import timedelta
 
 from django.http import JsonResponse
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from nossopainel.models import SessaoWpp
+from nossopainel.models import EventoWebhook, SessaoWpp
+from nossopainel.services.fila_webhooks import disparar_processamento, enfileirar_evento
 from nossopainel.services.logging_config import get_logger
 
 # Configuração do logger com rotação automática
 logger = get_logger(__name__, log_file="logs/WhatsApp/webhook_wpp.log")
 
+# Eventos enfileirados para processamento; os demais são respondidos e descartados
+EVENTOS_TRATADOS = {
+    'status-find',
+    'session-logged', 'onconnected',
+    'session-closed', 'ondisconnected',
+    'qrcode',
+    'onmessage',
+    'incomingcall',
+}
+
+# Eventos sem ID na origem são deduplicados pelo corpo dentro desta janela (segundos)
+JANELA_DEDUP_SEM_ID = 300
+
 # =============================================================================
 # RATE LIMITING PARA CHAMADAS RECEBIDAS
 # =============================================================================
-_call_timestamps = defaultdict(list)  # {session: [timestamps]}
 CALL_RATE_LIMIT = 3  # máx 3 chamadas/minuto por sessão
 CALL_RATE_WINDOW = 60  # janela de 60 segundos
 
 
 def _check_call_rate_limit(session: str) -> bool:
-    """Verifica se sessão está dentro do rate limit de chamadas."""
-    now = time_module.time()
-
-    # Limpar timestamps antigos (fora da janela)
-    _call_timestamps[session] = [
-        t for t in _call_timestamps[session]
-        if now - t < CALL_RATE_WINDOW
-    ]
+    """
+    Verifica se sessão está dentro do rate limit de chamadas.
 
-    if len(_call_timestamps[session]) >= CALL_RATE_LIMIT:
+    A contagem usa as chamadas já processadas na fila de webhooks, então vale para
+    todos os workers (os eventos de uma sessão são processados em sequência).
+    """
+    desde = timezone.now() - timedelta(seconds=CALL_RATE_WINDOW)
+    count = EventoWebhook.objects.filter(
+        origem=EventoWebhook.ORIGEM_WPPCONNECT,
+        tipo='incomingcall',
+        chave_ordenacao=session,
+        status=EventoWebhook.STATUS_PROCESSADO,
+        processado_em__gte=desde,
+    ).count()
+
+    if count >= CALL_RATE_LIMIT:
         logger.warning(
             "Rate limit de chamadas atingido | session=%s count=%d limit=%d",
-            session, len(_call_timestamps[session]), CALL_RATE_LIMIT
+            session, count, CALL_RATE_LIMIT
         )
         return False
 
-    _call_timestamps[session].append(now)
     return True
 
 
+def _id_evento(payload: dict, corpo: bytes) -> str:
+    """
+    Identificador do evento para deduplicação de reenvios.
+
+    Usa o ID da origem (chamada/mensagem) quando existir; senão, o hash do corpo
+    dentro de uma janela de ``JANELA_DEDUP_SEM_ID`` segundos.
+    """
+    event = payload.get('event', '')
+    data = payload.get('data') if isinstance(payload.get('data'), dict) else {}
+    identificador = payload.get('id') or data.get('id')
+    if isinstance(identificador, dict):
+        identificador = identificador.get('_serialized') or identificador.get('id')
+
+    if identificador:
+        evento_id = f"{event}:{identificador}"
+        if len(evento_id) <= 128:
+            return evento_id
+        return f"{event}:{hashlib.sha1(str(identificador).encode()).hexdigest()}"
+
+    janela = int(time_module.time() // JANELA_DEDUP_SEM_ID)
+    return f"{event}:{hashlib.sha1(corpo).hexdigest()}:{janela}"
+
+
 @csrf_exempt
 @require_POST
 def webhook_wppconnect(request):
@@ -53,7 +95,9 @@ def webhook_wppconnect(request):
     Endpoint para receber eventos do WPPConnect.
 
     Este endpoint recebe notificações push da API WPPConnect sobre mudanças
-    de estado das sessões do WhatsApp.
+    de estado das sessões do WhatsApp. O evento é apenas gravado na fila de
+    webhooks (deduplicado pelo ID da origem) e processado por
+    ``processar_evento_wppconnect``, em ordem de chegada por sessão.
 
     Eventos tratados:
     - status-find: Mudança de status da sessão (CONNECTED, QRCODE, CLOSED, etc.)
@@ -98,6 +142,50 @@ def webhook_wppconnect(request):
         logger.warning("[WEBHOOK] Sem session | event=%s ip=%s", event, client_ip)
         return JsonResponse({"error": "Session not provided"}, status=400)
 
+    if event not in EVENTOS_TRATADOS:
+        # Inclui os eventos que eram apenas para SSE/Chat (onack, onmessage-sent, onsendmessage)
+        logger.debug(
+            "[WEBHOOK] Evento não tratado | event=%s session=%s",
+            event,
+            session
+        )
+        return JsonResponse({"status": "ok"})
+
+    _, criado = enfileirar_evento(
+        origem=EventoWebhook.ORIGEM_WPPCONNECT,
+        evento_id=_id_evento(payload, request.body),
+        tipo=event,
+        chave_ordenacao=session,
+        payload=payload,
+    )
+    if criado:
+        disparar_processamento()
+
+    # Log de tempo de recebimento
+    elapsed = time_module.time() - start_time
+    if elapsed > 1.0:  # Logar apenas se demorar mais de 1 segundo
+        logger.warning(
+            "[WEBHOOK] Enfileiramento lento | event=%s session=%s elapsed=%.3fs",
+            event, session, elapsed
+        )
+
+    return JsonResponse({"status": "ok" if criado else "duplicate"})
+
+
+def processar_evento_wppconnect(evento: EventoWebhook) -> bool:
+    """
+    Processa um evento do WPPConnect retirado da fila de webhooks.
+
+    Args:
+        evento: Evento enfileirado por ``webhook_wppconnect``.
+
+    Returns:
+        bool: False quando o evento foi descartado (sem sessão ativa, rate limit).
+    """
+    payload = evento.payload
+    event = evento.tipo
+    session = evento.chave_ordenacao
+
     # Buscar sessão no banco
     sessao = SessaoWpp.objects.filter(usuario=session, is_active=True).first()
 
@@ -118,15 +206,7 @@ def webhook_wppconnect(request):
         _handle_message(payload, session)
 
     elif event == 'incomingcall':
-        _handle_incoming_call(payload, sessao, session)
-
-    # Eventos ignorados (eram apenas para SSE/Chat em tempo real - REMOVIDO)
-    elif event in ('onack', 'onmessage-sent', 'onsendmessage'):
-        logger.debug(
-            "[WEBHOOK] Evento SSE ignorado | event=%s session=%s",
-            event,
-            session
-        )
+        return _handle_incoming_call(payload, sessao, session)
 
     else:
         logger.debug(
@@ -134,16 +214,9 @@ def webhook_wppconnect(request):
             event,
             session
         )
+        return False
 
-    # Log de tempo de processamento
-    elapsed = time_module.time() - start_time
-    if elapsed > 1.0:  # Logar apenas se demorar mais de 1 segundo
-        logger.warning(
-            "[WEBHOOK] Processamento lento | event=%s session=%s elapsed=%.3fs",
-            event, session, elapsed
-        )
-
-    return JsonResponse({"status": "ok"})
+    return True
 
 
 def _handle_status_find(payload: dict, sessao, session: str):
@@ -255,11 +328,12 @@ def _should_reject_call(sessao) -> bool:
         return agora >= inicio or agora <= fim
 
 
-def _handle_incoming_call(payload: dict, sessao, session: str):
+def _handle_incoming_call(payload: dict, sessao, session: str) -> bool:
     """
     Trata evento de chamada recebida.
 
-    Inclui rate limiting para evitar sobrecarga da API.
+    Inclui rate limiting para evitar sobrecarga da API. Roda no worker da fila:
+    as esperas abaixo seguram apenas os eventos da mesma sessão.
 
     Fluxo para GRUPOS:
     1. Rejeita a chamada (sem mensagem, sem marcar não lido)
@@ -270,6 +344,9 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
     3. Envia mensagem informando que não atendemos chamadas
     4. Aguarda 10 segundos
     5. Marca a conversa como não lida
+
+    Returns:
+        bool: False se a chamada foi descartada (sem sessão ativa ou rate limit).
     """
     from wpp import api_connection
 
@@ -282,7 +359,7 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
             "[WEBHOOK] incomingcall sem sessão ativa | session=%s",
             session
         )
-        return
+        return False
 
     # ========== RATE LIMITING ==========
     # Evita sobrecarga da API em caso de muitas chamadas
@@ -292,7 +369,7 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
             session,
             caller
         )
-        return
+        return False
 
     # Verificar se deve rejeitar chamada (configuração + horário)
     if not _should_reject_call(sessao):
@@ -301,7 +378,7 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
             session,
             caller
         )
-        return
+        return True
 
     token = sessao.token
 
@@ -330,7 +407,7 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
             session,
             caller
         )
-        return
+        return True
 
     # Se for @lid, tentar obter número real via endpoint pn-lid
     if "@lid" in caller:
@@ -359,9 +436,10 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
                 lid_status
             )
             # Não conseguiu resolver - não enviar mensagem
-            return
+            return True
 
-    # 2. Contato direto: executar envio + marcação em thread separada
+    # 2. Contato direto: executar envio + marcação (falhas só são registradas em log,
+    #    para que uma nova tentativa do evento não rejeite/envie de novo)
     def _processo_pos_rejeicao():
         try:
             phone = caller
@@ -432,13 +510,14 @@ def _handle_incoming_call(payload: dict, sessao, session: str):
                 str(e)
             )
 
-    threading.Thread(target=_processo_pos_rejeicao, daemon=True).start()
+    _processo_pos_rejeicao()
 
     logger.info(
         "[WEBHOOK] Chamada rejeitada com sucesso | session=%s caller=%s",
         session,
         caller
     )
+    return True
 
 
 def _enqueue_lid_for_sync(lid: str, session: str):
@@ -450,23 +529,13 @@ def _enqueue_lid_for_sync(lid: str, session: str):
         session: Nome da sessão WhatsApp
     """
     try:
-        # Buscar token da sessão
-        sessao = SessaoWpp.objects.filter(usuario=session, is_active=True).first()
-        if not sessao:
-            logger.debug(
-                "LID não enfileirado - sessão não encontrada | session=%s lid=%s",
-                session,
-                lid
-            )
-            return
-
-        # Enfileirar para processamento
+        # Enfileirar para processamento (fila persistente; o token da sessão é
+        # obtido pelo worker no momento da consulta)
         from nossopainel.services.lid_sync_service import lid_sync_service
 
         enqueued = lid_sync_service.enqueue(
             lid=lid,
-            session=session,
-            token=sessao.token
+            session=session
         )
 
         if enqueued:
@@ -5,3 +5,6 @@ class PainelClienteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'painel_cliente'
     verbose_name = 'Painel do Cliente'
+
+    def ready(self):
+        import painel_cliente.signals  # noqa: F401
@@ -0,0 +1,70 @@
+"""Management command para medir o roteamento de subdominios do painel com e sem cache."""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from painel_cliente.middleware import (
+    SubdomainRoutingMiddleware,
+    invalidar_cache_subdominios,
+    metricas_cache_subdominios,
+)
+from painel_cliente.models import SubdominioPainelCliente
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara requisições/s do SubdomainRoutingMiddleware com e sem o cache de "
+        "subdomínios (subdomínio existente e host desconhecido)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=5000, help='Requisições por cenário (padrão: 5000)')
+        parser.add_argument('--subdominio', help='Subdomínio ativo usado no teste (padrão: o primeiro ativo)')
+
+    def handle(self, *args, **options):
+        subdominio = options['subdominio']
+        if not subdominio:
+            primeiro = SubdominioPainelCliente.objects.filter(ativo=True).first()
+            if not primeiro:
+                raise CommandError("Nenhum subdomínio ativo. Informe --subdominio ou crie um no admin.")
+            subdominio = primeiro.subdominio
+
+        n = options['requisicoes']
+        cenarios = [
+            ('existente', f'{subdominio}.pagar.cc'),
+            ('desconhecido', 'nao-existe-benchmark.pagar.cc'),
+        ]
+        fabrica = RequestFactory()
+        ttl_original = SubdomainRoutingMiddleware.CACHE_TTL
+
+        self.stdout.write(f"Subdomínio: {subdominio} | {n} requisições por cenário (apenas o middleware)")
+        try:
+            with override_settings(ALLOWED_HOSTS=['*'], DEBUG=True):
+                for nome, host in cenarios:
+                    for ttl in (0, ttl_original or 30):
+                        SubdomainRoutingMiddleware.CACHE_TTL = ttl
+                        invalidar_cache_subdominios()
+                        middleware = SubdomainRoutingMiddleware(lambda request: HttpResponse('ok'))
+                        requests = [fabrica.get('/pix/status/', HTTP_HOST=host) for _ in range(n)]
+
+                        with CaptureQueriesContext(connection) as consultas:
+                            inicio = time.perf_counter()
+                            for request in requests:
+                                middleware(request)
+                            duracao = time.perf_counter() - inicio
+
+                        self.stdout.write(
+                            f"  - {nome:<12} | {'com cache' if ttl else 'sem cache':<9} | "
+                            f"{n / duracao:>9.0f} req/s | {duracao / n * 1e6:>8.1f} µs/req | "
+                            f"consultas: {len(consultas)}"
+                        )
+        finally:
+            SubdomainRoutingMiddleware.CACHE_TTL = ttl_original
+            invalidar_cache_subdominios()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Concluído | cache: {metricas_cache_subdominios()}"))
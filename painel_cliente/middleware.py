@@ -5,20 +5,55 @@ Este middleware identifica requisicoes vindas de *.pagar.cc e
 roteia para as views do painel_cliente usando request.urlconf.
 """
 
+import copy
 import logging
+import threading
+import time
+
 from django.http import HttpResponseNotFound
 from django.shortcuts import render
 
 logger = logging.getLogger(__name__)
 
 
+# ============================================================
+# Cache de resolucao subdominio -> configuracao (por processo)
+# ============================================================
+# Entradas: subdominio -> (expira_em, config ou None). None = subdominio inexistente ou
+# inativo (cache negativo). Save/delete de SubdominioPainelCliente (e de ContaBancaria)
+# limpa o cache deste processo via signals; nos demais processos vale o TTL.
+_cache_subdominios = {}
+_cache_subdominios_lock = threading.Lock()
+_cache_subdominios_stats = {'acertos': 0, 'consultas': 0}
+
+
+def invalidar_cache_subdominios(subdominio=None):
+    """
+    Descarta a configuracao em cache de um subdominio (ou de todos).
+
+    Args:
+        subdominio: Nome do subdominio; None limpa o cache inteiro.
+    """
+    with _cache_subdominios_lock:
+        if subdominio is None:
+            _cache_subdominios.clear()
+        else:
+            _cache_subdominios.pop(subdominio, None)
+
+
+def metricas_cache_subdominios():
+    """Acertos/consultas ao banco do cache de subdominios neste processo."""
+    with _cache_subdominios_lock:
+        return {**_cache_subdominios_stats, 'entradas': len(_cache_subdominios)}
+
+
 class SubdomainRoutingMiddleware:
     """
     Identifica subdominio e roteia para views do painel_cliente.
 
     Para requisicoes em *.pagar.cc:
     - Extrai o nome do subdominio
-    - Busca a configuracao no banco de dados
+    - Busca a configuracao (cache em memoria com TTL curto; banco apenas no miss)
     - Injeta dados em request.painel_config
     - Define request.urlconf para usar painel_cliente.urls
 
@@ -34,11 +69,55 @@ class SubdomainRoutingMiddleware:
         'local.pagar.cc:8003',
     }
 
+    # Validade (segundos) da configuracao em cache; 0 desativa o cache
+    CACHE_TTL = 30
+
     def __init__(self, get_response):
         self.get_response = get_response
         # Dominio base do painel (pode ser configurado via settings)
         self.dominio_painel = '.pagar.cc'
 
+    def _buscar_config(self, subdomain):
+        """
+        Retorna a configuracao ativa do subdominio, usando o cache quando valido.
+
+        Cada requisicao recebe uma copia profunda da instancia em cache, pois algumas
+        views alteram e salvam request.painel_config (e os relacionados carregados por
+        select_related, que uma copia rasa compartilharia entre as requisicoes).
+
+        Args:
+            subdomain: Nome do subdominio (ex: meunegocio)
+
+        Returns:
+            SubdominioPainelCliente ou None se nao existir/estiver inativo
+        """
+        from .models import SubdominioPainelCliente
+
+        agora = time.monotonic()
+        if self.CACHE_TTL > 0:
+            with _cache_subdominios_lock:
+                item = _cache_subdominios.get(subdomain)
+                if item and item[0] > agora:
+                    _cache_subdominios_stats['acertos'] += 1
+                    return copy.deepcopy(item[1]) if item[1] is not None else None
+
+        config = SubdominioPainelCliente.objects.select_related(
+            'admin_responsavel',
+            'conta_bancaria',
+            'conta_bancaria__instituicao'
+        ).filter(
+            subdominio=subdomain,
+            ativo=True
+        ).first()
+
+        if self.CACHE_TTL > 0:
+            with _cache_subdominios_lock:
+                _cache_subdominios_stats['consultas'] += 1
+                _cache_subdominios[subdomain] = (agora + self.CACHE_TTL, config)
+            if config is not None:
+                return copy.deepcopy(config)
+        return config
+
     def __call__(self, request):
         # Extrai o host completo (com porta) para verificar dev
         host_with_port = request.get_host().lower()
@@ -74,9 +153,6 @@ class SubdomainRoutingMiddleware:
         Returns:
             HttpResponse
         """
-        # Importa aqui para evitar importacao circular
-        from .models import SubdominioPainelCliente
-
         # Extrai nome do subdominio
         subdomain = host.replace(self.dominio_painel, '')
         logger.debug(f"[PainelCliente Routing] Subdominio extraido: '{subdomain}'")
@@ -86,32 +162,23 @@ class SubdomainRoutingMiddleware:
             logger.debug("[PainelCliente Routing] Subdominio vazio ou www - retornando 404")
             return self._render_painel_not_found(request)
 
-        try:
-            # Busca configuracao do subdominio
-            config = SubdominioPainelCliente.objects.select_related(
-                'admin_responsavel',
-                'conta_bancaria',
-                'conta_bancaria__instituicao'
-            ).get(
-                subdominio=subdomain,
-                ativo=True
-            )
-
-            logger.debug(f"[PainelCliente Routing] Subdominio encontrado: {config.nome_exibicao}, Admin: {config.admin_responsavel}")
+        # Busca configuracao do subdominio (cache com TTL, inclusive negativo)
+        config = self._buscar_config(subdomain)
+        if config is None:
+            logger.debug(f"[PainelCliente Routing] Subdominio '{subdomain}' nao encontrado ou inativo")
+            return self._render_painel_not_found(request)
 
-            # Injeta dados na requisicao
-            request.is_painel_cliente = True
-            request.painel_config = config
+        logger.debug(f"[PainelCliente Routing] Subdominio encontrado: {config.nome_exibicao}, Admin: {config.admin_responsavel}")
 
-            # Define urlconf para usar as URLs do painel_cliente
-            request.urlconf = 'painel_cliente.urls_root'
+        # Injeta dados na requisicao
+        request.is_painel_cliente = True
+        request.painel_config = config
 
-            # Continua o fluxo normal (outros middlewares serao executados)
-            return self.get_response(request)
+        # Define urlconf para usar as URLs do painel_cliente
+        request.urlconf = 'painel_cliente.urls_root'
 
-        except SubdominioPainelCliente.DoesNotExist:
-            logger.debug(f"[PainelCliente Routing] Subdominio '{subdomain}' nao encontrado ou inativo")
-            return self._render_painel_not_found(request)
+        # Continua o fluxo normal (outros middlewares serao executados)
+        return self.get_response(request)
 
     def _handle_dev_request(self, request):
         """
@@ -140,17 +207,10 @@ class SubdomainRoutingMiddleware:
 
         if subdomain:
             # Busca pelo nome especificado
-            try:
-                config = SubdominioPainelCliente.objects.select_related(
-                    'admin_responsavel',
-                    'conta_bancaria',
-                    'conta_bancaria__instituicao'
-                ).get(
-                    subdominio=subdomain,
-                    ativo=True
-                )
+            config = self._buscar_config(subdomain)
+            if config is not None:
                 logger.debug(f"[PainelCliente Routing] DEV: Usando subdominio '{subdomain}'")
-            except SubdominioPainelCliente.DoesNotExist:
+            else:
                 logger.debug(f"[PainelCliente Routing] DEV: Subdominio '{subdomain}' nao encontrado")
                 return self._render_painel_not_found(
                     request,
@@ -278,9 +338,9 @@ class PainelClienteSessionMiddleware:
 
             if sessao.is_valid():
                 request.cliente_sessao = sessao
-                # Renova sessao a cada acesso
-                sessao.renovar()
-                logger.debug("[PainelCliente Auth] Resultado: SESSAO VALIDA - Renovada")
+                # Renova sessao (grava apenas apos FRACAO_RENOVACAO; demais acessos em lote)
+                renovada = sessao.renovar()
+                logger.debug(f"[PainelCliente Auth] Resultado: SESSAO VALIDA - Renovada={renovada}")
             else:
                 request.cliente_sessao = None
                 request._delete_painel_cookie = True  # Marcar para deletar cookie
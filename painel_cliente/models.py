@@ -7,8 +7,11 @@ realizem pagamentos via PIX e gerenciem seus dados cadastrais.
 
 import uuid
 import secrets
+import threading
+import time
 from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
 from django.utils import timezone
@@ -161,6 +164,12 @@ class SubdominioPainelCliente(models.Model):
         return None
 
 
+# Ultimos acessos ainda nao gravados (sessao_id -> datetime), por processo
+_acessos_pendentes = {}
+_acessos_lock = threading.Lock()
+_acessos_ultimo_flush = [time.monotonic()]
+
+
 class SessaoCliente(models.Model):
     """
     Sessao de autenticacao do cliente (sem senha).
@@ -168,11 +177,22 @@ class SessaoCliente(models.Model):
     O cliente faz login via telefone (lookup direto).
     A sessao e permanente ate que o cliente faca logout.
     Opcionalmente, pode expirar apos 90 dias de inatividade.
+
+    A renovacao (``renovar``) so grava no banco quando ja passou uma fracao do periodo
+    de inatividade desde o ultimo acesso gravado; os demais acessos ficam em memoria
+    e sao gravados em lote (``gravar_acessos_pendentes``).
     """
 
     # Configuracao de inatividade (dias)
     DIAS_INATIVIDADE_MAX = 90
 
+    # Fracao de DIAS_INATIVIDADE_MAX apos a qual a renovacao grava no banco
+    # (settings.PAINEL_CLIENTE_SESSAO_FRACAO_RENOVACAO; 0.01 de 90 dias ~ 21,6h)
+    FRACAO_RENOVACAO = 0.01
+    # Gravacao em lote dos ultimos acessos mantidos em memoria
+    INTERVALO_GRAVACAO_ACESSOS = 300  # segundos
+    LOTE_GRAVACAO_ACESSOS = 500
+
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -288,9 +308,53 @@ class SessaoCliente(models.Model):
         self.ativo = False
         self.save(update_fields=['ativo'])
 
-    def renovar(self):
-        """Alias para atualizar_acesso() - mantem compatibilidade."""
-        self.atualizar_acesso()
+    def renovar(self, agora=None):
+        """
+        Renova a sessao com escrita limitada.
+
+        Grava ``ultimo_acesso`` apenas quando ja passou ``FRACAO_RENOVACAO`` do periodo
+        de inatividade desde o valor gravado; caso contrario, registra o acesso em
+        memoria para a proxima gravacao em lote.
+
+        Returns:
+            bool: True se gravou no banco nesta chamada.
+        """
+        agora = agora or timezone.now()
+        fracao = getattr(settings, 'PAINEL_CLIENTE_SESSAO_FRACAO_RENOVACAO', self.FRACAO_RENOVACAO)
+        intervalo = timedelta(days=self.DIAS_INATIVIDADE_MAX) * fracao
+
+        if self.ultimo_acesso is None or agora - self.ultimo_acesso >= intervalo:
+            with _acessos_lock:
+                _acessos_pendentes.pop(self.pk, None)
+            self.atualizar_acesso()
+            return True
+
+        with _acessos_lock:
+            _acessos_pendentes[self.pk] = agora
+            pendentes = len(_acessos_pendentes)
+            vencido = time.monotonic() - _acessos_ultimo_flush[0] >= self.INTERVALO_GRAVACAO_ACESSOS
+        if vencido or pendentes >= self.LOTE_GRAVACAO_ACESSOS:
+            self.gravar_acessos_pendentes()
+        return False
+
+    @classmethod
+    def gravar_acessos_pendentes(cls):
+        """
+        Grava em lote os ultimos acessos mantidos em memoria.
+
+        Returns:
+            int: Quantidade de sessoes atualizadas.
+        """
+        with _acessos_lock:
+            pendentes = dict(_acessos_pendentes)
+            _acessos_pendentes.clear()
+            _acessos_ultimo_flush[0] = time.monotonic()
+        if not pendentes:
+            return 0
+
+        sessoes = [cls(pk=pk, ultimo_acesso=acesso) for pk, acesso in pendentes.items()]
+        cls.objects.bulk_update(sessoes, ['ultimo_acesso'], batch_size=cls.LOTE_GRAVACAO_ACESSOS)
+        return len(sessoes)
 
     @classmethod
     def criar_sessao(cls, cliente, subdominio, ip_address, user_agent, metodo_auth='telefone'):
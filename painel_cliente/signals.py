@@ -0,0 +1,28 @@
+"""
+Signals do Painel do Cliente.
+
+Mantem o cache de roteamento de subdominios (SubdomainRoutingMiddleware) coerente
+com o banco: qualquer alteracao de subdominio ou da conta vinculada limpa o cache.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from nossopainel.models import ContaBancaria
+
+from .middleware import invalidar_cache_subdominios
+from .models import SubdominioPainelCliente
+
+
+@receiver(post_save, sender=SubdominioPainelCliente)
+@receiver(post_delete, sender=SubdominioPainelCliente)
+def subdominio_alterado(sender, instance, **kwargs):
+    """Limpa o cache inteiro: o nome do subdominio pode ter sido alterado."""
+    invalidar_cache_subdominios()
+
+
+@receiver(post_save, sender=ContaBancaria)
+@receiver(post_delete, sender=ContaBancaria)
+def conta_bancaria_alterada(sender, instance, **kwargs):
+    """A configuracao em cache carrega a conta FastDePix vinculada (select_related)."""
+    invalidar_cache_subdominios()
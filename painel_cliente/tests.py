@@ -1,3 +1,112 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from nossopainel.models import Cliente, Plano, Servidor, Tipos_pgto
+
+from . import models as painel_models
+from .middleware import PainelClienteSessionMiddleware, SubdomainRoutingMiddleware, invalidar_cache_subdominios
+from .models import SessaoCliente, SubdominioPainelCliente
+
+
+@override_settings(PAINEL_CLIENTE_SESSAO_FRACAO_RENOVACAO=SessaoCliente.FRACAO_RENOVACAO)
+class RenovacaoSessaoClienteTests(TestCase):
+    """Escritas de ``SessaoCliente.renovar`` em uma rajada de requisicoes pelo middleware."""
+
+    REQUISICOES = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create(username='admin-painel')
+        cliente = Cliente.objects.create(
+            nome='Cliente Painel',
+            telefone='+5583999990000',
+            usuario=admin,
+            servidor=Servidor.objects.create(nome='Servidor', usuario=admin),
+            forma_pgto=Tipos_pgto.objects.create(nome='PIX', usuario=admin),
+            plano=Plano.objects.create(nome='Mensal', telas=1, valor=30, usuario=admin),
+            data_adesao=timezone.localdate(),
+        )
+        cls.subdominio = SubdominioPainelCliente.objects.create(
+            subdominio='teste',
+            dominio_completo='teste.pagar.cc',
+            admin_responsavel=admin,
+            nome_exibicao='Teste',
+        )
+        cls.sessao = SessaoCliente.criar_sessao(cliente, cls.subdominio, '127.0.0.1', 'tests')
+
+    def setUp(self):
+        # Buffer em memoria do processo: cada teste comeca sem acessos pendentes
+        painel_models._acessos_pendentes.clear()
+        painel_models._acessos_ultimo_flush[0] = painel_models.time.monotonic()
+        self.middleware = PainelClienteSessionMiddleware(lambda request: HttpResponse('ok'))
+        self.fabrica = RequestFactory()
+
+    def _rajada(self):
+        """Envia REQUISICOES pelo middleware e retorna os UPDATEs na tabela de sessoes."""
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(self.REQUISICOES):
+                request = self.fabrica.get('/pix/status/')
+                request.COOKIES[PainelClienteSessionMiddleware.COOKIE_NAME] = self.sessao.token
+                request.is_painel_cliente = True
+                request.painel_config = self.subdominio
+                self.middleware(request)
+                self.assertEqual(request.cliente_sessao.pk, self.sessao.pk)
+        return [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if consulta['sql'].startswith('UPDATE') and SessaoCliente._meta.db_table in consulta['sql']
+        ]
+
+    def test_rajada_dentro_da_janela_nao_grava(self):
+        self.assertEqual(self._rajada(), [])
+        self.assertIn(self.sessao.pk, painel_models._acessos_pendentes)
+
+    def test_rajada_apos_fracao_de_renovacao_grava_uma_vez(self):
+        intervalo = timedelta(days=SessaoCliente.DIAS_INATIVIDADE_MAX) * SessaoCliente.FRACAO_RENOVACAO
+        antigo = timezone.now() - intervalo - timedelta(minutes=1)
+        # update() nao aciona o auto_now de ultimo_acesso
+        SessaoCliente.objects.filter(pk=self.sessao.pk).update(ultimo_acesso=antigo)
+
+        self.assertEqual(len(self._rajada()), 1)
+        self.sessao.refresh_from_db()
+        self.assertGreater(self.sessao.ultimo_acesso, antigo)
+
+    def test_acessos_pendentes_gravados_em_um_bulk_update(self):
+        self._rajada()
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(SessaoCliente.gravar_acessos_pendentes(), 1)
+        self.assertEqual(len(consultas), 1)
+
+
+class CacheConfigSubdominioTests(TestCase):
+    """Copias da configuracao em cache entregues a cada requisicao."""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create(username='admin-cache', first_name='Original')
+        SubdominioPainelCliente.objects.create(
+            subdominio='cache',
+            dominio_completo='cache.pagar.cc',
+            admin_responsavel=admin,
+            nome_exibicao='Cache',
+        )
+
+    def setUp(self):
+        invalidar_cache_subdominios()
+        self.addCleanup(invalidar_cache_subdominios)
+        self.middleware = SubdomainRoutingMiddleware(lambda request: HttpResponse('ok'))
+
+    def test_alteracoes_nos_relacionados_nao_vazam_entre_requisicoes(self):
+        primeira = self.middleware._buscar_config('cache')
+        primeira.nome_exibicao = 'Alterado'
+        primeira.admin_responsavel.first_name = 'Alterado'
+
+        with self.assertNumQueries(0):
+            segunda = self.middleware._buscar_config('cache')
+        self.assertEqual(segunda.nome_exibicao, 'Cache')
+        self.assertEqual(segunda.admin_responsavel.first_name, 'Original')
@@ -26,7 +26,7 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
 from ipware import get_client_ip
 
-from nossopainel.models import Cliente, Mensalidade, CobrancaPix
+from nossopainel.models import Cliente, Mensalidade, CobrancaPix, chave_telefone
 from nossopainel.services.payment_integrations import (
     get_payment_integration,
     PaymentIntegrationError,
@@ -190,73 +190,29 @@ class LoginView(View):
         """
         Busca cliente por telefone.
 
-        Para telefones brasileiros (+55), tenta com e sem o 9 adicional.
+        Usa a chave canônica do telefone (``Cliente.telefone_normalizado``), que já
+        equipara os números brasileiros (+55) com e sem o 9 adicional: uma única
+        consulta no índice (usuario, telefone_normalizado).
         O cliente deve pertencer ao admin_responsavel do subdominio.
 
         IMPORTANTE: O telefone deve vir com DDI do frontend (intl-tel-input).
         """
-        # Normaliza: mantém + e dígitos
-        telefone_normalizado = ''.join(c for c in telefone if c.isdigit() or c == '+')
+        chave = chave_telefone(telefone)
+        if not chave:
+            return None
 
-        # Garante que tenha o prefixo +
-        if not telefone_normalizado.startswith('+'):
-            telefone_normalizado = '+' + telefone_normalizado
+        logger.debug(f"[PainelCliente LOGIN] Telefone normalizado: {chave}")
 
-        logger.debug(f"[PainelCliente LOGIN] Telefone normalizado: {telefone_normalizado}")
-
-        # Primeira tentativa: busca exata
         cliente = Cliente.objects.select_related('plano').filter(
-            telefone=telefone_normalizado,
-            usuario=config.admin_responsavel
+            usuario=config.admin_responsavel,
+            telefone_normalizado=chave,
         ).first()
 
         if cliente:
-            logger.debug("[PainelCliente LOGIN] Cliente encontrado na busca exata")
-            return cliente
-
-        # Se for brasileiro (+55), tenta variação com/sem 9
-        if telefone_normalizado.startswith('+55'):
-            variacao = self._gerar_variacao_brasileira(telefone_normalizado)
-            if variacao:
-                logger.debug(f"[PainelCliente LOGIN] Tentando variacao brasileira")
-                cliente = Cliente.objects.select_related('plano').filter(
-                    telefone=variacao,
-                    usuario=config.admin_responsavel
-                ).first()
-                if cliente:
-                    logger.debug("[PainelCliente LOGIN] Cliente encontrado com variacao")
+            logger.debug("[PainelCliente LOGIN] Cliente encontrado")
 
         return cliente
 
-    def _gerar_variacao_brasileira(self, telefone):
-        """
-        Gera variação do telefone brasileiro com/sem o 9 adicional.
-
-        +5511999999999 (13 dígitos) -> +551199999999 (12 dígitos) sem o 9
-        +551199999999 (12 dígitos) -> +5511999999999 (13 dígitos) com o 9
-
-        Retorna None se não for possível gerar variação.
-        """
-        digitos = telefone.replace('+', '')  # Remove +
-
-        # Formato: 55 (DDI) + DDD (2) + número (8 ou 9)
-        if len(digitos) == 13:  # Com 9: 55 + 11 + 999999999
-            # Remove o 9 (5º dígito após 55, que é o primeiro do número)
-            ddd = digitos[2:4]
-            primeiro_digito_numero = digitos[4]
-            # Só remove se o 5º dígito for 9
-            if primeiro_digito_numero == '9':
-                numero_sem_9 = digitos[5:]
-                return '+55' + ddd + numero_sem_9
-
-        elif len(digitos) == 12:  # Sem 9: 55 + 11 + 99999999
-            # Adiciona o 9 após DDD
-            ddd = digitos[2:4]
-            numero = digitos[4:]
-            return '+55' + ddd + '9' + numero
-
-        return None
-
     def _get_client_ip(self, request):
         """
         Retorna IP do cliente usando django-ipware.
@@ -17,13 +17,15 @@ from mensagens_wpp import (
     obter_mensalidades_canceladas,
     executar_envios_agendados_com_lock,
     run_scheduled_tasks_from_db,
-    backup_db_sh,
+    processar_fila_envios_wpp,
+    backup_db_sqlite,
 )
 from upload_status_wpp import executar_upload_image_from_telegram_com_lock
 from integracoes.telegram_connection import telegram_connection
 from jampabet_live_matches import run_check_and_poll as jampabet_check_live_matches
 from jampabet_daily_sync import run_daily_sync as jampabet_daily_sync
 from sync_pagamentos_pix import sincronizar_pagamentos_pix_pendentes
+from nossopainel.services.fila_webhooks import processar_fila_webhooks
 
 ################################################
 ##### PROTEÇÃO CONTRA MÚLTIPLAS INSTÂNCIAS #####
@@ -265,7 +267,7 @@ schedule.every().day.at(horario_upload_telegram).do(
 
 # Jobs em frequência curta:
 schedule.every(60).minutes.do(
-    run_threaded_sync, job_wrapper, "backup_db", backup_db_sh
+    run_threaded_sync, job_wrapper, "backup_db", backup_db_sqlite
 ).tag("backup_db")
 
 schedule.every(1).minutes.do(
@@ -276,6 +278,16 @@ schedule.every(1).minutes.do(
     run_threaded_sync_nolog, job_wrapper, "tarefas_envio_db", run_scheduled_tasks_from_db
 ).tag("tarefas_envio_db")
 
+# Worker da fila de envios WPP (intercala sessões; ignora se já estiver rodando)
+schedule.every(1).minutes.do(
+    run_threaded_sync_nolog, job_wrapper, "fila_envios_wpp", processar_fila_envios_wpp
+).tag("fila_envios_wpp")
+
+# Worker da fila de webhooks (novas tentativas e eventos não drenados pelo processo web)
+schedule.every(1).minutes.do(
+    run_threaded_sync_nolog, job_wrapper, "fila_webhooks", processar_fila_webhooks
+).tag("fila_webhooks")
+
 # JampaBet - Verificacao de partidas ao vivo (a cada 1 minuto) - SEM wrapper, job será removido
 schedule.every(1).minutes.do(run_threaded_sync_nolog, jampabet_check_live_matches).tag("jampabet_live")
 
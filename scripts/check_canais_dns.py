@@ -1,11 +1,15 @@
 import os
 import sys
 import json
+import math
 import time
 import django
 import random
 import requests
 import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from django.utils.timezone import localtime
 from wpp.api_connection import get_all_groups, get_ids_grupos_envio
 
@@ -14,13 +18,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'setup.settings')
 django.setup()
 
-from nossopainel.models import DominiosDNS, SessaoWpp, User
+from nossopainel.models import DominiosDNS, MedicaoDominioDNS, SessaoWpp, User
 from nossopainel.services.logging_config import get_dns_logger
+from nossopainel.services.wpp_send_engine import enfileirar_envio
+from scripts.mensagens_wpp import processar_fila_envios_wpp
 
 # Configuração do logger com rotação automática
 logger = get_dns_logger()
 
-__version__ = "2.2.0"
+__version__ = "2.3.0"
 
 # --- Constantes globais ---
 TIMEOUT = 15
@@ -30,6 +36,13 @@ MAX_TS_CANAIS_QTD = 5
 EXTRA_CANAIS_NOME = "Premiere Clubes"
 PARAMS_URL = "type=m3u_plus&output=m3u8"
 
+# Varredura concorrente: domínios verificados em paralelo, limitados por servidor
+# (mesmas credenciais) para não disparar bloqueios do provedor.
+MAX_WORKERS_VERIFICACAO = 8
+MAX_VERIFICACOES_POR_SERVIDOR = 2
+INTERVALO_TENTATIVAS = (2, 5)  # segundos entre tentativas do mesmo domínio
+RETENCAO_MEDICOES_DIAS = 90
+
 USERNAME = json.loads(os.getenv("USERNAME_M3U8"))
 PASSWORD = json.loads(os.getenv("PASSWORD_M3U8"))
 API_WPP_URL_PROD = os.getenv("API_WPP_URL_PROD")
@@ -65,22 +78,25 @@ HEADERS = {
 
 # --- Envio de mensagens via WPPConnect ---
 def enviar_mensagem(telefone, mensagem, usuario, token, is_group=False):
-    url = f"{API_WPP_URL_PROD}/{usuario}/send-message"
-    headers_envio = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'Authorization': f'Bearer {token}'
-    }
-    body = {'phone': telefone, 'message': mensagem, 'isGroup': is_group}
-    delay_envio = random.randint(5, 15)
-
+    """
+    Enfileira o alerta na fila WPP; o envio ocorre ao final da varredura.
+    O token é resolvido pelo worker a partir da sessão.
+    """
     try:
-        time.sleep(delay_envio)
-        response = requests.post(url, json=body, headers=headers_envio, timeout=30)
-        response.raise_for_status()
-        logger.info("Mensagem enviada | telefone=%s is_group=%s", telefone, is_group)
+        enfileirar_envio(
+            sessao=usuario,
+            usuario=USER_ADMIN,
+            destino=telefone,
+            mensagem=mensagem,
+            tipo_envio="alerta dns",
+            origem="check_dns_canais",
+            is_group=is_group,
+            intervalo=(5.0, 15.0),
+            validade=timedelta(hours=1),
+        )
+        logger.info("Mensagem enfileirada | telefone=%s is_group=%s", telefone, is_group)
     except Exception as e:
-        logger.error("Envio falhou | telefone=%s erro=%s", telefone, str(e))
+        logger.error("Falha ao enfileirar | telefone=%s erro=%s", telefone, str(e))
 
 
 # --- Gera um snapshot de status atual dos domínios ---
@@ -126,6 +142,31 @@ def dividir_mensagem_em_blocos(mensagem, max_tamanho=3900):
     return blocos
 
 
+# --- Percentis de latência das tentativas ---
+def calcular_percentis(tempos):
+    """
+    Calcula mínimo, p50, p90, p95 e máximo (em ms, nearest-rank) das tentativas
+    que obtiveram resposta. Tentativas sem resposta (None) são ignoradas.
+
+    Retorna:
+        dict: {min, p50, p90, p95, max} (valores None se não houver amostras)
+    """
+    amostras = sorted(t * 1000 for t in tempos if t is not None)
+    if not amostras:
+        return dict.fromkeys(("min", "p50", "p90", "p95", "max"))
+
+    def percentil(p):
+        return round(amostras[max(0, math.ceil(p / 100 * len(amostras)) - 1)], 1)
+
+    return {
+        "min": round(amostras[0], 1),
+        "p50": percentil(50),
+        "p90": percentil(90),
+        "p95": percentil(95),
+        "max": round(amostras[-1], 1),
+    }
+
+
 ############################################################
 #################### FUNÇÕES OPERACIONAIS ##################
 ############################################################
@@ -147,9 +188,14 @@ def validar_dominio(dominio, nome_servidor):
             'tempos': [...],
             'status_codes': [...],
             'tentativas': int,
+            'tentativas_realizadas': int,
+            'tentativas_ok': int,
             'url_testada': str,
             'erro': str (se houver)
         }
+
+    As tentativas param assim que o resultado está decidido: ao atingir o mínimo de
+    respostas válidas ou quando as tentativas restantes já não permitem atingi-lo.
     """
 
     erro = None
@@ -168,8 +214,14 @@ def validar_dominio(dominio, nome_servidor):
     logger.info("Iniciando validação | dominio=%s servidor=%s", dominio, nome_servidor)
 
     tempo_inicio = time.time()
+    tentativas_realizadas = 0
     for i in range(tentativas):
-        time.sleep(random.randint(5, 10))
+        # Encerramento antecipado: resultado já decidido (online ou offline)
+        if respostas_ok >= respostas_ok_min or respostas_ok + (tentativas - i) < respostas_ok_min:
+            break
+        if i > 0:
+            time.sleep(random.uniform(*INTERVALO_TENTATIVAS))
+        tentativas_realizadas += 1
         inicio = time.time()
         encontrou_extinf = False
         linhas_lidas = 0
@@ -197,6 +249,7 @@ def validar_dominio(dominio, nome_servidor):
 
             if r.status_code == 200 and encontrou_extinf and tempo < resposta_tempo_max:
                 respostas_ok += 1
+            r.close()
 
         except requests.exceptions.ConnectTimeout:
             tempos.append(None)
@@ -245,7 +298,7 @@ def validar_dominio(dominio, nome_servidor):
             "Domínio ONLINE | dominio=%s tentativas_ok=%d/%d tempo_total=%.2fs",
             dominio,
             respostas_ok,
-            tentativas,
+            tentativas_realizadas,
             tempo_total
         )
     else:
@@ -253,10 +306,9 @@ def validar_dominio(dominio, nome_servidor):
             "Domínio OFFLINE | dominio=%s tentativas_ok=%d/%d tempo_total=%.2fs",
             dominio,
             respostas_ok,
-            tentativas,
+            tentativas_realizadas,
             tempo_total
         )
-    time.sleep(random.randint(10, 20))
 
     return {
         "success": online,
@@ -264,6 +316,8 @@ def validar_dominio(dominio, nome_servidor):
         "tempos": tempos,
         "status_codes": status_codes,
         "tentativas": tentativas,
+        "tentativas_realizadas": tentativas_realizadas,
+        "tentativas_ok": respostas_ok,
         "error": erro,
         "servidor": nome_servidor_padrao,
         "username": username,
@@ -272,6 +326,89 @@ def validar_dominio(dominio, nome_servidor):
     }
 
 
+# --- Valida todos os domínios em paralelo ---
+def verificar_dominios(dominios):
+    """
+    Executa validar_dominio() para todos os domínios em um pool de threads.
+
+    A concorrência por servidor é limitada a MAX_VERIFICACOES_POR_SERVIDOR (as
+    tentativas usam as mesmas credenciais) e os domínios são intercalados entre
+    servidores para não ocupar o pool com domínios de um único servidor.
+
+    Retorna:
+        dict: Mapeia dominio.pk => resultado de validar_dominio() acrescido de
+        'verificado_em' (ou None se a verificação falhou inesperadamente).
+    """
+    semaforos = {d.servidor_id: threading.Semaphore(MAX_VERIFICACOES_POR_SERVIDOR) for d in dominios}
+
+    por_servidor = defaultdict(list)
+    for dominio in dominios:
+        por_servidor[dominio.servidor_id].append(dominio)
+    filas = list(por_servidor.values())
+    intercalados = [fila[i] for i in range(max(map(len, filas), default=0)) for fila in filas if i < len(fila)]
+
+    def verificar(dominio):
+        with semaforos[dominio.servidor_id]:
+            try:
+                resultado = validar_dominio(dominio.dominio, dominio.servidor.nome)
+            except Exception as e:
+                logger.exception("Falha inesperada na verificação | dominio=%s erro=%s", dominio.dominio, e)
+                return dominio.pk, None
+        resultado["verificado_em"] = localtime()
+        return dominio.pk, resultado
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_VERIFICACAO, thread_name_prefix="CheckDNS") as executor:
+        return dict(executor.map(verificar, intercalados))
+
+
+# --- Monta a medição (série temporal) de uma verificação ---
+def montar_medicao(dominio, resultado):
+    """Cria (sem salvar) o MedicaoDominioDNS com os percentis de latência das tentativas."""
+    percentis = calcular_percentis(resultado.get("tempos", []))
+    return MedicaoDominioDNS(
+        dominio=dominio,
+        verificado_em=resultado["verificado_em"],
+        online=resultado.get("online", False),
+        tentativas_realizadas=resultado.get("tentativas_realizadas", 0),
+        tentativas_ok=resultado.get("tentativas_ok", 0),
+        latencia_min_ms=percentis["min"],
+        latencia_p50_ms=percentis["p50"],
+        latencia_p90_ms=percentis["p90"],
+        latencia_p95_ms=percentis["p95"],
+        latencia_max_ms=percentis["max"],
+        duracao_total_s=resultado.get("tempo_total", 0),
+        status_codes=[str(c) for c in resultado.get("status_codes", [])],
+    )
+
+
+# --- Enfileira os alertas da varredura em lote ---
+def enfileirar_alertas(mensagens, tipo, grupos_envio):
+    """
+    Junta os alertas de um tipo em uma única mensagem (dividida em blocos se
+    necessário) e a enfileira para os grupos e o contato privado.
+    """
+    if not mensagens:
+        return
+
+    blocos = dividir_mensagem_em_blocos("\n\n".join(mensagens))
+    for bloco in blocos:
+        if grupos_envio:
+            # Envia notificação para grupos no WPP, se houver ID válido obtido;
+            for group_id, group_name in grupos_envio:
+                enviar_mensagem(group_id, bloco, WPP_USER, WPP_TOKEN, is_group=True)
+        if WPP_TELEFONE:
+            # Envia mensagem para contato privado no WPP, se houver número definido;
+            enviar_mensagem(WPP_TELEFONE, bloco, WPP_USER, WPP_TOKEN, is_group=False)
+
+    logger.warning(
+        "Alertas enfileirados | tipo=%s dominios=%d blocos=%d grupos=%d",
+        tipo,
+        len(mensagens),
+        len(blocos),
+        len(grupos_envio or [])
+    )
+
+
 ##################################################
 #################### PRINCIPAIS ##################
 ##################################################
@@ -287,52 +424,37 @@ def check_dns_canais():
     grupos_envio = get_ids_grupos_envio(grupos, ADM_ENVIA_ALERTAS, None)
 
     # Pega todos os domínios do sistema (online e offline) ordenados por Servidor
-    dominios = DominiosDNS.objects.filter(monitorado=True).order_by("servidor")
+    dominios = list(DominiosDNS.objects.filter(monitorado=True).select_related("servidor").order_by("servidor"))
+
+    # 1. Validação de status dos domínios (em paralelo)
+    # - Verifica status de acesso à lista e aos canais através do domínio válido;
+    resultados = verificar_dominios(dominios)
+
+    alertas = {"online": [], "offline": []}
+    medicoes = []
     for dominio in dominios:
-        hora_now = localtime()
+        lista_dict = resultados.get(dominio.pk)
+        if lista_dict is None:
+            # Falha inesperada na verificação: mantém o status atual
+            continue
+
+        hora_now = lista_dict["verificado_em"]
         status_anterior = dominio.status
         dominio.data_ultima_verificacao = hora_now
-        
-        # 1. Validação de status do domínio
-        # - Verifica status de acesso à lista e aos canais através do domínio válido;
-        lista_dict = validar_dominio(dominio.dominio, dominio.servidor.nome)
-        success = lista_dict.get("success", True)
+        medicoes.append(montar_medicao(dominio, lista_dict))
+
         dominio_online = lista_dict.get("online", True)
-        tempos = lista_dict.get("tempos", "N/A")
-        status_codes = lista_dict.get("status_codes", "N/A")
-        tentativas = lista_dict.get("tentativas", "N/A")
-        error_msg = lista_dict.get("error", "Erro não informado")
-        servidor = lista_dict.get("servidor", "N/A")
-        username = lista_dict.get("username", "N/A")
-        password = lista_dict.get("password", "N/A")
 
         if dominio_online:
-            # 2. Verifica see mudou de status OFFLINE para ONLINE agora:
+            # 2. Verifica se mudou de status OFFLINE para ONLINE agora:
             if status_anterior == "offline":
-                mensagem = (
+                alertas["online"].append(
                     f"✅ *DNS ONLINE*\n"
                     f"🌐 *Domínio:*\n`{dominio.dominio}`\n"
                     f"🕓 *Horário:* {hora_now.strftime('%d/%m %Hh%M')}\n"
                     f"📺 *Servidor:* {dominio.servidor}\n\n"
                     f"🔔 _O domínio voltou a responder normalmente!_"
                 )
-                if grupos_envio:
-                    # Envia notificação para grupos no WPP, se houver ID válido obtido;
-                    for group_id, group_name in grupos_envio:
-                        enviar_mensagem(group_id, mensagem, WPP_USER, WPP_TOKEN, is_group=True)
-                        logger.info(
-                            "Alerta enviado para grupo | tipo=DNS_ONLINE grupo=%s dominio=%s",
-                            group_name,
-                            dominio.dominio
-                        )
-
-                if WPP_TELEFONE:
-                    # Envia mensagem para contato privado no WPP, se houver número definido;
-                    enviar_mensagem(WPP_TELEFONE, mensagem, WPP_USER, WPP_TOKEN, is_group=False)
-                    logger.info(
-                        "Alerta enviado (privado) | tipo=DNS_ONLINE dominio=%s",
-                        dominio.dominio
-                    )
 
                 # Atualiza status para online;
                 dominio.status = "online"
@@ -348,29 +470,13 @@ def check_dns_canais():
         else:
             # 3. Se mudou de status ONLINE para OFFLINE agora:
             if status_anterior == "online":
-                mensagem = (
+                alertas["offline"].append(
                     f"❌ *DNS OFFLINE*\n"
                     f"🌐 *Domínio:*\n`{dominio.dominio}`\n"
-                    f"🕓 *Horário:* {localtime().strftime('%d/%m %Hh%M')}\n"
+                    f"🕓 *Horário:* {hora_now.strftime('%d/%m %Hh%M')}\n"
                     f"📺 *Servidor:* {dominio.servidor}\n\n"
                     f"⚠️ _O domínio parou de responder._\n⚠️ _Caso esteja em uso, alguns clientes poderão ficar sem acesso temporariamente!_"
                 )
-                
-                if grupos_envio:
-                    for group_id, group_name in grupos_envio:
-                        enviar_mensagem(group_id, mensagem, WPP_USER, WPP_TOKEN, is_group=True)
-                        logger.warning(
-                            "Alerta enviado para grupo | tipo=DNS_OFFLINE grupo=%s dominio=%s",
-                            group_name,
-                            dominio.dominio
-                        )
-
-                if WPP_TELEFONE:
-                    enviar_mensagem(WPP_TELEFONE, mensagem, WPP_USER, WPP_TOKEN, is_group=False)
-                    logger.warning(
-                        "Alerta enviado (privado) | tipo=DNS_OFFLINE dominio=%s",
-                        dominio.dominio
-                    )
 
                 # Atualiza status para offline
                 dominio.status = "offline"
@@ -387,18 +493,37 @@ def check_dns_canais():
             logger.debug(
                 "Detalhes da validação | success=%s dominio=%s servidor=%s username=%s "
                 "tempos=%s status_codes=%s tentativas=%s erro=%s",
-                success,
+                lista_dict.get("success"),
                 dominio.dominio,
-                servidor,
-                username,
-                tempos,
-                status_codes,
-                tentativas,
-                error_msg
+                lista_dict.get("servidor", "N/A"),
+                lista_dict.get("username", "N/A"),
+                lista_dict.get("tempos", "N/A"),
+                lista_dict.get("status_codes", "N/A"),
+                lista_dict.get("tentativas_realizadas", "N/A"),
+                lista_dict.get("error") or "Erro não informado"
             )
 
+    # 4. Série temporal de latência e limpeza das medições antigas
+    MedicaoDominioDNS.objects.bulk_create(medicoes)
+    MedicaoDominioDNS.objects.filter(
+        verificado_em__lt=localtime() - timedelta(days=RETENCAO_MEDICOES_DIAS)
+    ).delete()
+
+    # 5. Alertas agrupados: uma mensagem por tipo com todos os domínios que mudaram
+    enfileirar_alertas(alertas["offline"], "DNS_OFFLINE", grupos_envio)
+    enfileirar_alertas(alertas["online"], "DNS_ONLINE", grupos_envio)
+
     fim_global = time.time()
-    logger.info("Checagem de DNS concluída | duracao=%.2fs", fim_global - inicio_global)
+    logger.info(
+        "Checagem de DNS concluída | duracao=%.2fs dominios=%d online=%d offline=%d",
+        fim_global - inicio_global,
+        len(medicoes),
+        sum(1 for m in medicoes if m.online),
+        sum(1 for m in medicoes if not m.online)
+    )
+
+    # Envia os alertas enfileirados durante a varredura
+    processar_fila_envios_wpp()
 
 ##################################################################################
 ##### LOCK PARA EVITAR EXECUÇÃO SIMULTÂNEA DA FUNÇÃO PROCESSAR_NOVOS_TITULOS #####
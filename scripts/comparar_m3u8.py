@@ -1,7 +1,9 @@
 import os
 import django
+import hashlib
 import threading
 import requests
+import numpy as np
 from datetime import datetime
 from django.utils.timezone import now, localtime
 
@@ -18,74 +20,134 @@ logger = get_m3u8_logger()
 
 # Variáveis de ambiente e caminhos de arquivos
 URL_M3U8 = os.getenv("URL_M3U8")
-LISTA_ATUAL = "archives/M3U8/lista_atual.m3u8"
-LISTA_ANTERIOR = "archives/M3U8/lista_anterior.m3u8"
+LISTA_ANTERIOR = "archives/M3U8/lista_anterior.m3u8"  # formato antigo (apenas para migração)
 LISTA_NOVOS = "archives/M3U8/novos.txt"
+HASHES_ANTERIORES = "archives/M3U8/extinf_hashes.u64"
 
-# Criar diretórios necessários para salvar os arquivos (se ainda não existirem)
-os.makedirs(os.path.dirname(LISTA_ATUAL), exist_ok=True)
+# Linhas processadas por lote na busca vetorizada contra os hashes anteriores
+TAMANHO_LOTE = 10000
 
-# Função para baixar a lista M3U8 da URL configurada
-def baixar_lista():
+# Criar diretórios necessários para salvar os arquivos (se ainda não existirem)
+os.makedirs(os.path.dirname(LISTA_NOVOS), exist_ok=True)
+
+# Função para gerar o hash de 64 bits de uma linha "#EXTINF"
+def hash_linha(linha):
+    return int.from_bytes(hashlib.blake2b(linha.encode("utf-8"), digest_size=8).digest(), "little")
+
+# Função para carregar os hashes da lista anterior (array ordenado mapeado em memória)
+def carregar_hashes_anteriores():
+    """
+    Retorna os hashes (uint64 ordenados) das linhas "#EXTINF" da lista anterior,
+    ou None se ainda não houver referência. O arquivo é mapeado em memória
+    (np.memmap), sem ser carregado por inteiro.
+    """
+    if not os.path.exists(HASHES_ANTERIORES):
+        if os.path.exists(LISTA_ANTERIOR):
+            # Migração do formato antigo: gera os hashes a partir da lista salva
+            with open(LISTA_ANTERIOR, encoding="utf-8") as f:
+                hashes = np.fromiter(
+                    (hash_linha(linha.strip()) for linha in f if linha.startswith("#EXTINF")),
+                    dtype=np.uint64
+                )
+            gravar_hashes(np.unique(hashes))
+            os.remove(LISTA_ANTERIOR)
+            logger.info("Lista anterior convertida para hashes | quantidade=%d", len(hashes))
+        else:
+            return None
+
+    if os.path.getsize(HASHES_ANTERIORES) == 0:
+        return np.empty(0, dtype=np.uint64)
+    return np.memmap(HASHES_ANTERIORES, dtype="<u8", mode="r")
+
+# Função para gravar os hashes da lista atual (substituição atômica)
+def gravar_hashes(hashes):
+    temporario = HASHES_ANTERIORES + ".tmp"
+    hashes.astype("<u8").tofile(temporario)
+    os.replace(temporario, HASHES_ANTERIORES)
+
+# Função para ler as linhas "#EXTINF" da lista M3U8 direto da resposta HTTP
+def iterar_extinf_remoto():
     headers = {"User-Agent": "Mozilla/5.0"}
-    try:
-        response = requests.get(URL_M3U8, headers=headers, timeout=30)
+    with requests.get(URL_M3U8, headers=headers, timeout=30, stream=True) as response:
         response.raise_for_status()
+        for linha in response.iter_lines():
+            if linha.startswith(b"#EXTINF"):
+                yield linha.decode("utf-8", errors="replace").strip()
+
+# Função geradora que emite as linhas "#EXTINF" ausentes da lista anterior
+def iterar_novos_titulos(linhas, anteriores, hashes_atuais):
+    """
+    Compara as linhas com os hashes anteriores em lotes (np.searchsorted) e emite as
+    novas, sem repetir. Os hashes de todas as linhas lidas são acumulados em
+    ``hashes_atuais`` (lista de arrays) para gravar a nova referência ao final.
+    """
+    emitidos = set()
+
+    def processar_lote(lote):
+        hashes = np.fromiter((hash_linha(linha) for linha in lote), dtype=np.uint64, count=len(lote))
+        hashes_atuais.append(hashes)
+        if anteriores is None or len(anteriores) == 0:
+            presentes = np.zeros(len(lote), dtype=bool)
+        else:
+            posicoes = np.searchsorted(anteriores, hashes)
+            presentes = anteriores[np.minimum(posicoes, len(anteriores) - 1)] == hashes
+        for linha, valor, presente in zip(lote, hashes.tolist(), presentes.tolist()):
+            if not presente and valor not in emitidos:
+                emitidos.add(valor)
+                yield linha
+
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE:
+            yield from processar_lote(lote)
+            lote = []
+    if lote:
+        yield from processar_lote(lote)
+
+# Função para comparar a lista atual com a anterior e detectar conteúdos novos
+def comparar_listas():
+    anteriores = carregar_hashes_anteriores()
+    primeira_execucao = anteriores is None
+    hashes_atuais = []
+    novos = 0
+    temporario = LISTA_NOVOS + ".tmp"
 
-        # Salva a lista baixada
-        with open(LISTA_ATUAL, "w", encoding="utf-8") as f:
-            f.write(response.text)
-
-        logger.info("Lista M3U8 baixada com sucesso")
-        return True
-
+    try:
+        with open(temporario, "w", encoding="utf-8") as f:
+            for linha in iterar_novos_titulos(iterar_extinf_remoto(), anteriores, hashes_atuais):
+                if not primeira_execucao:
+                    f.write(linha + "\n")
+                    novos += 1
     except Exception as e:
         logger.error("Falha ao baixar lista M3U8 | erro=%s", str(e))
-        return False
-
-# Função auxiliar para extrair linhas com "#EXTINF" da lista M3U8
-def extrair_extinf(arquivo):
-    with open(arquivo, encoding="utf-8") as f:
-        return set(linha.strip() for linha in f if linha.startswith("#EXTINF"))
-
-# Função para comparar listas atual e anterior e detectar conteúdos novos
-def comparar_listas():
-    if not os.path.exists(LISTA_ANTERIOR):
-        # Primeira execução: não há lista anterior para comparar
-        logger.info("Nenhuma lista anterior encontrada | acao=criando_referencia_inicial")
-        os.rename(LISTA_ATUAL, LISTA_ANTERIOR)
+        if os.path.exists(temporario):
+            os.remove(temporario)
         return
 
-    atual = extrair_extinf(LISTA_ATUAL)
-    anterior = extrair_extinf(LISTA_ANTERIOR)
+    total = sum(len(h) for h in hashes_atuais)
+    logger.info("Lista M3U8 baixada com sucesso | linhas_extinf=%d", total)
 
-    novos = atual - anterior
+    # Atualiza a referência com a lista atual
+    del anteriores
+    gravar_hashes(np.unique(np.concatenate(hashes_atuais)) if hashes_atuais else np.empty(0, dtype=np.uint64))
 
     if novos:
-        # Conteúdos novos foram detectados
-        logger.info("Novos conteúdos identificados | quantidade=%d", len(novos))
-
         # Salva os novos conteúdos detectados
-        with open(LISTA_NOVOS, "w", encoding="utf-8") as f:
-            for item in novos:
-                f.write(item + "\n")
-
-        # Atualiza a lista anterior
-        os.remove(LISTA_ANTERIOR)
-        os.rename(LISTA_ATUAL, LISTA_ANTERIOR)
-
-        logger.info("Lista anterior substituída com a nova")
-
+        os.replace(temporario, LISTA_NOVOS)
+        logger.info("Novos conteúdos identificados | quantidade=%d", novos)
     else:
-        # Nenhuma mudança detectada
-        logger.info("Nenhum conteúdo novo encontrado")
-        os.remove(LISTA_ATUAL)
+        os.remove(temporario)
+        if primeira_execucao:
+            # Primeira execução: não há lista anterior para comparar
+            logger.info("Nenhuma lista anterior encontrada | acao=criando_referencia_inicial")
+        else:
+            logger.info("Nenhum conteúdo novo encontrado")
 
 # Função principal para baixar e comparar a lista
 def executar_comparar_lista_m3u8():
     logger.info("Iniciando comparação de listas M3U8")
-    if baixar_lista():
-        comparar_listas()
+    comparar_listas()
 
 #######################################################################################
 ##### LOCK PARA EVITAR EXECUÇÃO SIMULTÂNEA DA FUNÇÃO EXECUTAR_COMPARAR_LISTA_M3U8 #####
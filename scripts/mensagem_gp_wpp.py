@@ -1,10 +1,7 @@
 import os
 import sys
-import json
-import time
+import uuid
 import django
-import random
-import requests
 from datetime import datetime, timedelta
 from django.utils.timezone import localtime
 from typing import List, Optional, Tuple
@@ -38,12 +35,14 @@ from nossopainel.models import (
     ConfiguracaoAgendamento,
 )
 
+from nossopainel.services.wpp_send_engine import enfileirar_envio
 from scripts.mensagens_wpp import (
-    obter_img_base64,
+    processar_fila_envios_wpp,
 )
 
 API_WPP_URL_PROD = os.getenv("API_WPP_URL_PROD")
 LOG_GRUPOS = "logs/Envios grupos/envios.log"
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'images')
 TEMPLATE_LOG_MSG_GRUPO = os.getenv("TEMPLATE_LOG_MSG_GRUPO")
 TEMPLATE_LOG_MSG_GRUPO_FALHOU = os.getenv("TEMPLATE_LOG_MSG_GRUPO_FALHOU")
 
@@ -93,15 +92,6 @@ def _listar_imagens(sub_directory: str) -> List[str]:
     imgs = [f for f in os.listdir(base_dir) if os.path.splitext(f)[1].lower() in exts]
     return sorted(imgs)
 
-def _mime_from_ext(filename: str) -> str:
-    ext = os.path.splitext(filename)[1].lower()
-    return {
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.webp': 'image/webp',
-    }.get(ext, 'image/png')
-
 def _subdir_futebol(data_envio: Optional[str]) -> Tuple[str, str, str, List[str]]:
     """
     Resolve o subdiretório (relativo a /images) onde estão os banners de futebol,
@@ -170,13 +160,13 @@ def enviar_mensagem_grupos(
     grupo_nome: str,
     mensagem: str,
     usuario: str,
-    token: str,
     tipo_envio: str,
     image_name: Optional[str] = None,
     data_envio: Optional[str] = None,   # << novo: permite testar datas passadas (DD-MM-YYYY)
-) -> None:
+    intervalo: Tuple[float, float] = (10.0, 20.0),
+) -> int:
     """
-    Envia mensagens/imagens para grupos conforme o tipo_envio:
+    Enfileira mensagens/imagens para grupos conforme o tipo_envio:
 
     - 'grupo_vendas':
         * Envia 1 imagem (de 'gp_vendas') com legenda = `mensagem`.
@@ -184,44 +174,19 @@ def enviar_mensagem_grupos(
 
     - 'grupo_futebol':
         * Envia TODAS as imagens existentes em 'images/telegram_banners/DD-MM-YYYY', SEM legenda.
-        * Ao final, envia APENAS um texto com `mensagem` **SE e somente SE ao menos uma imagem foi enviada**.
+        * Ao final, envia APENAS um texto com `mensagem` **SE e somente SE ao menos uma imagem foi enviada**
+          (o worker descarta o texto se todas as imagens do lote falharem).
 
     Observações:
         - `grupo_id` deve ser o id do grupo (ex.: '12345-67890@g.us').
         - `usuario` é o identificador da sessão no WPPConnect usado na URL.
-        - `token` é o Bearer Token da sessão.
         - `data_envio` opcional no formato 'DD-MM-YYYY' para testar datas passadas.
-    """
-    url_base = f"{API_WPP_URL_PROD}/{usuario}"
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json',
-        'Authorization': f'Bearer {token}',
-    }
-
-    def _post_json(url: str, payload: dict, tentativa: int) -> Tuple[bool, str, int]:
-        try:
-            r = requests.post(url, headers=headers, json=payload)
-            if r.status_code in (200, 201):
-                return True, "", r.status_code
-            # tenta extrair mensagem de erro da API
-            try:
-                msg = r.json().get('message', r.text)
-            except json.JSONDecodeError:
-                msg = r.text
-            return False, msg, r.status_code
-        except requests.RequestException as e:
-            return False, str(e), -1
-
-    def _log_ok():
-        log = TEMPLATE_LOG_MSG_GRUPO.format(
-            localtime().strftime('%d-%m-%Y %H:%M:%S'),
-            tipo_envio.upper(),
-            usuario,
-            grupo_nome,
-        )
-        registrar_log(log, LOG_GRUPOS)
+        - `intervalo` (min, max) é a espera antes do próximo grupo na mesma sessão.
+        - O envio em si (tentativas, logs OK/FALHA) é feito pelo worker da fila WPP.
 
+    Returns:
+        int: Quantidade de itens enfileirados.
+    """
     def _log_fail(tentativa: int, status_code: int, erro: str):
         log = TEMPLATE_LOG_MSG_GRUPO_FALHOU.format(
             localtime().strftime('%d-%m-%Y %H:%M:%S'),
@@ -234,55 +199,53 @@ def enviar_mensagem_grupos(
         )
         registrar_log(log, LOG_GRUPOS)
 
+    lote = uuid.uuid4().hex
+
+    def _enfileirar(
+        texto: str,
+        imagem_path: str = "",
+        espera: Tuple[float, float] = intervalo,
+        exige_envio_no_lote: bool = False,
+    ) -> None:
+        enfileirar_envio(
+            sessao=usuario,
+            destino=grupo_id,
+            mensagem=texto,
+            tipo_envio=tipo_envio,
+            origem="mensagem_gp_wpp",
+            is_group=True,
+            imagem_path=imagem_path,
+            cliente_nome=grupo_nome,
+            intervalo=espera,
+            lote=lote,
+            exige_envio_no_lote=exige_envio_no_lote,
+        )
+
     # --------- fluxo GRUPO VENDAS ---------
     if tipo_envio == 'grupo_vendas':
         if not image_name:
             logger.error("Imagem não informada para grupo_vendas | grupo=%s", grupo_nome)
             _log_fail(1, -1, "Imagem não informada para grupo_vendas.")
-            return
+            return 0
 
-        img_b64 = obter_img_base64(image_name, 'gp_vendas')
-        if not img_b64:
+        image_path = os.path.join(IMAGES_DIR, 'gp_vendas', image_name)
+        if not os.path.isfile(image_path):
             logger.error(
-                "Falha ao converter imagem em base64 | imagem=%s grupo=%s",
+                "Imagem não encontrada | imagem=%s grupo=%s",
                 image_name,
                 grupo_nome
             )
-            _log_fail(1, -1, f"Falha ao converter imagem '{image_name}' em base64 (gp_vendas).")
-            return
+            _log_fail(1, -1, f"Imagem '{image_name}' não encontrada (gp_vendas).")
+            return 0
 
-        mime = _mime_from_ext(image_name)
-        payload = {
-            'phone': grupo_id,
-            'isGroup': True,
-            'filename': image_name,
-            'caption': mensagem,
-            'base64': f'data:{mime};base64,{img_b64}',
-        }
-        url = f"{url_base}/send-image"
-
-        for tentativa in range(1, 3):
-            ok, err, status = _post_json(url, payload, tentativa)
-            if ok:
-                logger.info(
-                    "Mensagem enviada com sucesso | tipo=%s grupo=%s imagem=%s",
-                    tipo_envio,
-                    grupo_nome,
-                    image_name
-                )
-                _log_ok()
-                break
-            logger.warning(
-                "Falha ao enviar mensagem | tipo=%s grupo=%s tentativa=%d status=%s erro=%s",
-                tipo_envio,
-                grupo_nome,
-                tentativa,
-                status,
-                err
-            )
-            _log_fail(tentativa, status, err)
-            time.sleep(random.uniform(20, 30))
-        return
+        _enfileirar(mensagem, image_path)
+        logger.info(
+            "Mensagem enfileirada | tipo=%s grupo=%s imagem=%s",
+            tipo_envio,
+            grupo_nome,
+            image_name
+        )
+        return 1
 
     # --------- fluxo GRUPO FUTEBOL ---------
     if tipo_envio == 'grupo_futebol':
@@ -303,14 +266,12 @@ def enviar_mensagem_grupos(
             )
 
         logger.info(
-            "Enviando imagens de futebol | grupo=%s quantidade=%d data=%s",
+            "Enfileirando imagens de futebol | grupo=%s quantidade=%d data=%s",
             grupo_nome,
             len(imagens),
             data_resolvida
         )
 
-        imagens_enviadas = 0
-
         if not imagens:
             logger.warning(
                 "Nenhuma imagem encontrada | pasta=%s grupo=%s",
@@ -318,73 +279,24 @@ def enviar_mensagem_grupos(
                 grupo_nome
             )
             _log_fail(1, -1, f"Nenhuma imagem encontrada em /images/{subdir_dia}. Texto final será ignorado.")
-        else:
-            # 1) Envia TODAS as imagens do dia, SEM legenda
-            for img in imagens:
-                img_b64 = obter_img_base64(img, subdir_dia)
-                if not img_b64:
-                    _log_fail(1, -1, f"Falha ao converter '{img}' em base64 ({subdir_dia}). Pulando arquivo.")
-                    continue
-
-                mime = _mime_from_ext(img)
-                payload_img = {
-                    'phone': grupo_id,
-                    'isGroup': True,
-                    'filename': img,
-                    'base64': f'data:{mime};base64,{img_b64}',
-                }
-                url_img = f"{url_base}/send-image"
-
-                enviado_essa = False
-                for tentativa in range(1, 3):
-                    ok, err, status = _post_json(url_img, payload_img, tentativa)
-                    if ok:
-                        _log_ok()
-                        enviado_essa = True
-                        break
-                    _log_fail(tentativa, status, err)
-                    time.sleep(random.uniform(20, 30))
-
-                if enviado_essa:
-                    imagens_enviadas += 1
-
-        # 2) Envia o texto final **apenas se ao menos 1 imagem foi enviada**
-        if imagens_enviadas > 0 and mensagem:
-            logger.info(
-                "Enviando texto final | grupo=%s imagens_enviadas=%d",
-                grupo_nome,
-                imagens_enviadas
-            )
-            payload_txt = {
-                'phone': grupo_id,
-                'isGroup': True,
-                'message': mensagem,
-            }
-            url_txt = f"{url_base}/send-message"
-
-            for tentativa in range(1, 3):
-                ok, err, status = _post_json(url_txt, payload_txt, tentativa)
-                if ok:
-                    logger.info(
-                        "Envio de futebol concluído | grupo=%s imagens=%d",
-                        grupo_nome,
-                        imagens_enviadas
-                    )
-                    _log_ok()
-                    break
-                _log_fail(tentativa, status, err)
-                time.sleep(random.uniform(20, 30))
-        elif imagens_enviadas == 0:
-            logger.warning(
-                "Nenhuma imagem enviada com sucesso | pasta=%s grupo=%s",
-                subdir_dia,
-                grupo_nome
-            )
-            _log_fail(1, -1, f"Nenhuma imagem enviada com sucesso em /images/{subdir_dia}. Texto final não será enviado.")
-        return
+            return 0
+
+        # 1) Enfileira TODAS as imagens do dia, SEM legenda e sem espera entre elas
+        imagens_enfileiradas = 0
+        for img in imagens:
+            _enfileirar("", os.path.join(IMAGES_DIR, subdir_dia, img), espera=(0.0, 0.0))
+            imagens_enfileiradas += 1
+
+        # 2) Texto final por último, só enviado se alguma imagem do lote for enviada;
+        #    a espera entre grupos é aplicada após ele
+        if mensagem:
+            _enfileirar(mensagem, exige_envio_no_lote=True)
+            return imagens_enfileiradas + 1
+        return imagens_enfileiradas
 
     # --------- tipo_envio inválido ---------
     _log_fail(1, -1, f"tipo_envio inválido: {tipo_envio}. Use 'grupo_vendas' ou 'grupo_futebol'.")
+    return 0
 ##### FIM #####
 
 ######################################################
@@ -435,7 +347,7 @@ def mensagem_gp_wpp(
         mensagem: legenda (vendas) OU texto final (futebol)
         image_name: (opcional) nome do arquivo a usar em 'gp_vendas';
                     se None, escolhe a mais recente da pasta
-        atraso_min_s / atraso_max_s: jitter entre envios para reduzir rate limit
+        atraso_min_s / atraso_max_s: jitter entre grupos (aplicado pelo token bucket da sessão)
         data_envio: (opcional) 'DD-MM-YYYY' para buscar imagens em telegram_banners/data
     """
     ts = localtime().strftime('%d-%m-%Y %H:%M:%S')
@@ -443,6 +355,7 @@ def mensagem_gp_wpp(
     django_user = User.objects.get(id=1)
     sessao = get_object_or_404(SessaoWpp, usuario=django_user)
     token = sessao.token
+    total_enfileirado = 0
 
     api_user = getattr(django_user, "username", str(django_user))
 
@@ -517,15 +430,15 @@ def mensagem_gp_wpp(
 
     for group_id, group_name in grupos_encontrados:
         try:
-            enviar_mensagem_grupos(
+            total_enfileirado += enviar_mensagem_grupos(
                 grupo_id=group_id,
                 grupo_nome=group_name,
                 mensagem=mensagem,
                 usuario=api_user,
-                token=token,
                 tipo_envio=tipo_envio,
                 image_name=vendas_img if tipo_envio == "grupo_vendas" else None,
                 data_envio=data_envio,  # << propaga data override para futebol
+                intervalo=(atraso_min_s, atraso_max_s),
             )
         except Exception as e:
             registrar_log(
@@ -541,7 +454,12 @@ def mensagem_gp_wpp(
                 LOG_GRUPOS,
             )
 
-        time.sleep(random.uniform(atraso_min_s, atraso_max_s))
+    logger.info(
+        "Envios para grupos enfileirados | tipo=%s itens=%d",
+        tipo_envio,
+        total_enfileirado
+    )
+    processar_fila_envios_wpp()
 ##### FIM #####
 
 # Exemplo de chamadas
@@ -4,9 +4,10 @@ import json
 import django
 import calendar
 import requests
-import subprocess
 import threading
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 from django.db.models import Q
 from django.utils import timezone
 from urllib3.util.retry import Retry
@@ -52,11 +53,18 @@ from nossopainel.services.wpp import (
     send_message,
     _sanitize_response,
 )
+from nossopainel.services.wpp_send_engine import (
+    enfileirar_envio,
+    executar_fila_com_lock,
+    limitador_sessoes,
+)
 from wpp.api_connection import (
     check_number_status,
     check_connection,
+    obter_cliente_wpp,
+    registrar_log as registrar_log_arquivo,
 )
-from integracoes.openai_chat import consultar_chatgpt
+from nossopainel.services.pool_parafrases import pool_parafrases
 
 from nossopainel.models import (
     Mensalidade, SessaoWpp, MensagemEnviadaWpp,
@@ -64,6 +72,7 @@ from nossopainel.models import (
     MensagensLeads, TelefoneLeads, OfertaPromocionalEnviada,
     TarefaEnvio, HistoricoExecucaoTarefa,
     ConfiguracaoAgendamento, ConfiguracaoEnvio,
+    FilaEnvioWpp,
 )
 
 API_WPP_URL_PROD = os.getenv("API_WPP_URL_PROD")
@@ -72,6 +81,9 @@ DIR_LOGS_INDICACOES = os.getenv("DIR_LOGS_INDICACOES")
 TEMPLATE_LOG_MSG_SUCESSO = os.getenv("TEMPLATE_LOG_MSG_SUCESSO")
 TEMPLATE_LOG_MSG_FALHOU = os.getenv("TEMPLATE_LOG_MSG_FALHOU")
 TEMPLATE_LOG_TELEFONE_INVALIDO = os.getenv("TEMPLATE_LOG_TELEFONE_INVALIDO")
+TEMPLATE_LOG_MSG_GRUPO = os.getenv("TEMPLATE_LOG_MSG_GRUPO")
+TEMPLATE_LOG_MSG_GRUPO_FALHOU = os.getenv("TEMPLATE_LOG_MSG_GRUPO_FALHOU")
+LOG_GRUPOS = "logs/Envios grupos/envios.log"
 AUDIT_LOG_PATH = Path("logs/Audit/envios_wpp.log")
 
 
@@ -218,11 +230,116 @@ def enviar_mensagem_agendada(telefone: str, mensagem: str, usuario: str, token:
 ##### FIM #####
 
 
+###################################################################
+##### FILA DE ENVIOS WPP (MOTOR DE ENVIO COM RITMO POR SESSÃO) #####
+###################################################################
+
+# Origens que representam notificações de Vencimentos/Atrasos (têm prioridade sobre tarefas)
+ORIGENS_NOTIFICACAO = ("obter_mensalidades_a_vencer", "obter_mensalidades_vencidas")
+
+
+def enfileirar_mensagem_agendada(
+    telefone: str,
+    mensagem: str,
+    usuario: User,
+    cliente: str,
+    tipo_envio: str,
+    origem: str,
+    intervalo: tuple = (30.0, 60.0),
+):
+    """
+    Enfileira uma mensagem para o worker da fila WPP.
+
+    Substitui a dupla ``enviar_mensagem_agendada`` + ``time.sleep(random.uniform(...))``:
+    o intervalo informado é aplicado pelo token bucket da sessão após o envio.
+
+    Args:
+        telefone: Telefone do destinatário.
+        mensagem: Texto da mensagem.
+        usuario: Usuário dono da sessão (o username é o nome da sessão no WPPConnect).
+        cliente: Nome do cliente para logs.
+        tipo_envio: Rótulo do envio para logs/auditoria.
+        origem: Função que originou o envio.
+        intervalo: Espera (min, max) em segundos antes do próximo envio da sessão.
+    """
+    return enfileirar_envio(
+        sessao=str(usuario),
+        usuario=usuario if isinstance(usuario, User) else None,
+        destino=telefone,
+        mensagem=mensagem,
+        tipo_envio=tipo_envio,
+        origem=origem,
+        cliente_nome=cliente,
+        intervalo=intervalo,
+    )
+
+
+def _montar_config_fila(item: FilaEnvioWpp, token: str) -> MessageSendConfig:
+    """
+    Monta a configuração de envio de um item da fila conforme a origem.
+
+    Envios para grupos usam o log e os templates de grupos; os demais mantêm o log
+    por usuário em DIR_LOGS_AGENDADOS.
+    """
+    if item.origem == "mensagem_gp_wpp":
+        log_writer = lambda log: registrar_log_arquivo(log, LOG_GRUPOS)
+        templates = LogTemplates(
+            success=TEMPLATE_LOG_MSG_GRUPO,
+            failure=TEMPLATE_LOG_MSG_GRUPO_FALHOU,
+            invalid=TEMPLATE_LOG_MSG_GRUPO_FALHOU,
+        )
+    else:
+        log_writer = lambda log: registrar_log(log, item.sessao, DIR_LOGS_AGENDADOS)
+        templates = LogTemplates(
+            success=TEMPLATE_LOG_MSG_SUCESSO,
+            failure=TEMPLATE_LOG_MSG_FALHOU,
+            invalid=TEMPLATE_LOG_TELEFONE_INVALIDO,
+        )
+
+    request_payload = {
+        "phone": item.destino,
+        "message": item.mensagem,
+        "isGroup": item.is_group,
+    }
+    if item.imagem_path:
+        request_payload["arquivo_imagem"] = item.imagem_path
+
+    return MessageSendConfig(
+        usuario=item.sessao,
+        token=token,
+        telefone=item.destino,
+        mensagem=item.mensagem,
+        tipo_envio=item.tipo_envio,
+        cliente=item.cliente_nome or item.destino,
+        log_writer=log_writer,
+        log_templates=templates,
+        is_group=item.is_group,
+        retry_wait=(20.0, 30.0),
+        audit_callback=registrar_log_auditoria,
+        audit_base_payload={
+            "funcao": item.origem,
+            "fila_id": item.id,
+            "payload": request_payload,
+        },
+    )
+
+
+def processar_fila_envios_wpp():
+    """
+    Processa a fila de envios WPP até esvaziá-la, intercalando as sessões.
+
+    Seguro para ser chamado de vários pontos: apenas um worker roda por processo
+    e cada item é reservado atomicamente no banco.
+    """
+    return executar_fila_com_lock(_montar_config_fila)
+##### FIM #####
+
+
 ##########################################################################
 ##### FUNÇÃO AUXILIAR PARA VALIDAR FORMA DE PAGAMENTO DO CLIENTE #####
 ##########################################################################
 
-def validar_forma_pagamento_cliente(cliente):
+def validar_forma_pagamento_cliente(cliente, obter_dados_bancarios=None):
     """
     Valida se o cliente tem forma de pagamento válida para receber notificações.
 
@@ -231,6 +348,11 @@ def validar_forma_pagamento_cliente(cliente):
     2. Se a forma tem API (PIX automático), está válido
     3. Se for PIX sem API, verifica se os dados estão completos
 
+    Args:
+        cliente: Cliente a validar.
+        obter_dados_bancarios: Callable opcional que retorna os DadosBancarios de
+            fallback do usuário (permite reaproveitar a consulta entre clientes).
+
     Returns:
         tuple: (valido, motivo, dados_pix)
         - valido: bool - Se pode enviar notificação
@@ -280,9 +402,12 @@ def validar_forma_pagamento_cliente(cliente):
 
         # Fallback: buscar DadosBancarios diretamente pelo usuário do cliente
         # (para formas de pagamento antigas que ainda não foram editadas na nova interface)
-        dados_bancarios_usuario = DadosBancarios.objects.filter(
-            usuario=cliente.usuario
-        ).first()
+        if obter_dados_bancarios is not None:
+            dados_bancarios_usuario = obter_dados_bancarios()
+        else:
+            dados_bancarios_usuario = DadosBancarios.objects.filter(
+                usuario=cliente.usuario
+            ).first()
         if dados_bancarios_usuario:
             db = dados_bancarios_usuario
             if all([db.instituicao, db.beneficiario, db.tipo_chave, db.chave]):
@@ -387,122 +512,206 @@ def get_template_mensagem(nome_job: str, chave_template: str, texto_padrao: str)
 
 
 #####################################################################
-##### FUNÇÃO PARA FILTRAR AS MENSALIDADES DOS CLIENTES A VENCER #####
+##### RESOLUÇÃO EM LOTE DOS CANDIDATOS DE ENVIO DE MENSALIDADES #####
 #####################################################################
 
-def obter_mensalidades_a_vencer(usuario_query):
-    dias_envio = (
-        (1, "à vencer 1 dias"),
-        (0, "vence hoje"),
-    )
+@dataclass
+class JobEnvioMensalidade:
+    """Envio de mensalidade já validado e com todos os dados necessários para a mensagem."""
 
-    for dias, tipo_mensagem in dias_envio:
-        data_referencia = localtime().date() + timedelta(days=dias)
+    mensalidade: Mensalidade
+    cliente: Cliente
+    usuario: User
+    telefone: str
+    tipo_integracao: Optional[str]
+    dados_pix: Optional[dict]
+    url_painel: Optional[str]
+    sessao: SessaoWpp
 
-        mensalidades = Mensalidade.objects.filter(
-            usuario=usuario_query,
-            dt_vencimento=data_referencia,
-            cliente__nao_enviar_msgs=False,
-            pgto=False,
-            cancelado=False
-        )
 
-        logger.info(
-            "Mensalidades a vencer | tipo=%s quantidade=%d data_ref=%s usuario=%s",
-            tipo_mensagem.upper(),
-            mensalidades.count(),
-            data_referencia.strftime('%d-%m-%Y'),
-            usuario_query
+class ResolvedorCandidatosMensalidade:
+    """
+    Resolve, em uma única passada, os candidatos de envio das mensalidades.
+
+    Carrega as mensalidades com cliente, plano e forma de pagamento via select_related
+    e memoriza, durante a execução, as consultas que se repetem entre clientes do mesmo
+    usuário: sessão WPP, URL do painel do cliente, DadosBancarios de fallback e o
+    resultado da validação/tipo de integração de cada forma de pagamento.
+
+    Os motivos de descarte são registrados na auditoria com os mesmos status usados
+    anteriormente no loop por mensalidade.
+    """
+
+    SELECT_RELATED = (
+        'usuario',
+        'cliente__plano',
+        'cliente__forma_pgto__conta_bancaria__instituicao',
+        'cliente__forma_pgto__dados_bancarios',
+    )
+
+    def __init__(self, funcao: str):
+        self.funcao = funcao
+        self._sessoes = {}
+        self._urls_painel = {}
+        self._dados_bancarios = {}
+        self._formas_pgto = {}
+
+    def carregar_mensalidades(self, usuario_query, data_referencia):
+        """Retorna a lista de mensalidades em aberto da data, com relacionamentos carregados."""
+        return list(
+            Mensalidade.objects.filter(
+                usuario=usuario_query,
+                dt_vencimento=data_referencia,
+                cliente__nao_enviar_msgs=False,
+                pgto=False,
+                cancelado=False
+            ).select_related(*self.SELECT_RELATED)
         )
 
+    def obter_sessao(self, usuario):
+        """Sessão WPP ativa do usuário (uma consulta por usuário na execução)."""
+        if usuario.id not in self._sessoes:
+            self._sessoes[usuario.id] = SessaoWpp.objects.filter(usuario=usuario, is_active=True).first()
+        return self._sessoes[usuario.id]
+
+    def obter_url_painel(self, usuario):
+        """URL do painel do cliente do usuário (uma consulta por usuário na execução)."""
+        if usuario.id not in self._urls_painel:
+            self._urls_painel[usuario.id] = get_url_painel_cliente(usuario)
+        return self._urls_painel[usuario.id]
+
+    def _obter_dados_bancarios_usuario(self, usuario_id):
+        if usuario_id not in self._dados_bancarios:
+            self._dados_bancarios[usuario_id] = DadosBancarios.objects.filter(
+                usuario_id=usuario_id
+            ).first()
+        return self._dados_bancarios[usuario_id]
+
+    def avaliar_forma_pagamento(self, cliente):
+        """
+        Retorna (tipo_integracao, valido, motivo, dados_pix) memorizado por forma de pagamento.
+
+        Para formas PIX legadas sem conta/dados bancários, o fallback de DadosBancarios
+        depende do usuário do cliente, por isso ele também compõe a chave.
+        """
+        chave = (cliente.forma_pgto_id, cliente.usuario_id)
+        if chave not in self._formas_pgto:
+            tipo_integracao = obter_tipo_integracao_cliente(cliente)
+            valido, motivo, dados_pix = validar_forma_pagamento_cliente(
+                cliente,
+                obter_dados_bancarios=lambda: self._obter_dados_bancarios_usuario(cliente.usuario_id),
+            )
+            self._formas_pgto[chave] = (tipo_integracao, valido, motivo, dados_pix)
+        return self._formas_pgto[chave]
+
+    def _auditar_descarte(self, mensalidade, cliente, usuario, tipo_mensagem, status):
+        registrar_log_auditoria({
+            "funcao": self.funcao,
+            "status": status,
+            "usuario": str(usuario),
+            "cliente": cliente.nome,
+            "cliente_id": cliente.id,
+            "tipo_envio": tipo_mensagem,
+            "mensalidade_id": mensalidade.id,
+        })
+
+    def resolver(self, mensalidades, tipo_mensagem: str, exigir_url_painel: bool = True):
+        """
+        Gera um JobEnvioMensalidade para cada mensalidade apta ao envio.
+
+        Args:
+            mensalidades: Mensalidades carregadas por carregar_mensalidades().
+            tipo_mensagem: Tipo do envio (usado na auditoria).
+            exigir_url_painel: Se True, clientes FastDePix precisam de painel configurado.
+        """
         for mensalidade in mensalidades:
             cliente = mensalidade.cliente
             usuario = mensalidade.usuario
             telefone = str(cliente.telefone).strip()
             if not telefone:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_a_vencer",
-                    "status": "cancelado_sem_telefone",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
+                self._auditar_descarte(mensalidade, cliente, usuario, tipo_mensagem, "cancelado_sem_telefone")
                 continue
 
-            # Obter tipo de integração do cliente
-            tipo_integracao = obter_tipo_integracao_cliente(cliente)
+            tipo_integracao, valido, motivo, dados_pix = self.avaliar_forma_pagamento(cliente)
 
             # Não enviar para clientes com Cartão de Crédito
             if tipo_integracao == 'cartao':
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_a_vencer",
-                    "status": "ignorado_cartao_credito",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
+                self._auditar_descarte(mensalidade, cliente, usuario, tipo_mensagem, "ignorado_cartao_credito")
                 continue
 
             # Não enviar para clientes com Mercado Pago ou EfiBank (APIs pendentes)
             if tipo_integracao in ('mercado_pago', 'efi_bank'):
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_a_vencer",
-                    "status": f"ignorado_api_pendente_{tipo_integracao}",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
+                self._auditar_descarte(
+                    mensalidade, cliente, usuario, tipo_mensagem, f"ignorado_api_pendente_{tipo_integracao}"
+                )
                 continue
 
-            # Validar forma de pagamento do cliente
-            valido, motivo, dados_pix = validar_forma_pagamento_cliente(cliente)
             if not valido:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_a_vencer",
-                    "status": f"forma_pgto_invalida_{motivo}",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
+                self._auditar_descarte(mensalidade, cliente, usuario, tipo_mensagem, f"forma_pgto_invalida_{motivo}")
                 continue
 
             # Para FastDePix, obter URL do painel
             url_painel = None
-            if tipo_integracao == 'fastdepix':
-                url_painel = get_url_painel_cliente(usuario)
+            if tipo_integracao == 'fastdepix' and exigir_url_painel:
+                url_painel = self.obter_url_painel(usuario)
                 if not url_painel:
-                    registrar_log_auditoria({
-                        "funcao": "obter_mensalidades_a_vencer",
-                        "status": "fastdepix_sem_painel_configurado",
-                        "usuario": str(usuario),
-                        "cliente": cliente.nome,
-                        "cliente_id": cliente.id,
-                        "tipo_envio": tipo_mensagem,
-                        "mensalidade_id": mensalidade.id,
-                    })
+                    self._auditar_descarte(
+                        mensalidade, cliente, usuario, tipo_mensagem, "fastdepix_sem_painel_configurado"
+                    )
                     continue
 
-            sessao = SessaoWpp.objects.filter(usuario=usuario, is_active=True).first()
+            sessao = self.obter_sessao(usuario)
             if not sessao:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_a_vencer",
-                    "status": "sessao_indisponivel",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
+                self._auditar_descarte(mensalidade, cliente, usuario, tipo_mensagem, "sessao_indisponivel")
                 continue
 
+            yield JobEnvioMensalidade(
+                mensalidade=mensalidade,
+                cliente=cliente,
+                usuario=usuario,
+                telefone=telefone,
+                tipo_integracao=tipo_integracao,
+                dados_pix=dados_pix,
+                url_painel=url_painel,
+                sessao=sessao,
+            )
+##### FIM #####
+
+
+#####################################################################
+##### FUNÇÃO PARA FILTRAR AS MENSALIDADES DOS CLIENTES A VENCER #####
+#####################################################################
+
+def obter_mensalidades_a_vencer(usuario_query):
+    dias_envio = (
+        (1, "à vencer 1 dias"),
+        (0, "vence hoje"),
+    )
+    resolvedor = ResolvedorCandidatosMensalidade("obter_mensalidades_a_vencer")
+    mensagem_observacao = None
+
+    for dias, tipo_mensagem in dias_envio:
+        data_referencia = localtime().date() + timedelta(days=dias)
+
+        mensalidades = resolvedor.carregar_mensalidades(usuario_query, data_referencia)
+
+        logger.info(
+            "Mensalidades a vencer | tipo=%s quantidade=%d data_ref=%s usuario=%s",
+            tipo_mensagem.upper(),
+            len(mensalidades),
+            data_referencia.strftime('%d-%m-%Y'),
+            usuario_query
+        )
+
+        for job in resolvedor.resolver(mensalidades, tipo_mensagem):
+            mensalidade = job.mensalidade
+            cliente = job.cliente
+            usuario = job.usuario
+            telefone = job.telefone
+            tipo_integracao = job.tipo_integracao
+            dados_pix = job.dados_pix
+            url_painel = job.url_painel
+
             primeiro_nome = cliente.nome.split()[0].upper()
             dt_formatada = mensalidade.dt_vencimento.strftime("%d/%m")
             plano_nome = cliente.plano.nome.upper()
@@ -603,53 +812,53 @@ def obter_mensalidades_a_vencer(usuario_query):
                 })
                 continue
 
-            # Envio
-            enviar_mensagem_agendada(
+            # Enviar mensagem de observação para FastDePix apenas no "à vencer 1 dias"
+            enviar_observacao = tipo_integracao == 'fastdepix' and tipo_mensagem == "à vencer 1 dias"
+
+            # Envio (a observação sai 10 segundos após a mensagem principal)
+            enfileirar_mensagem_agendada(
                 telefone=telefone,
                 mensagem=mensagem,
                 usuario=usuario,
-                token=sessao.token,
                 cliente=cliente.nome,
-                tipo_envio=tipo_mensagem
+                tipo_envio=tipo_mensagem,
+                origem="obter_mensalidades_a_vencer",
+                intervalo=(10.0, 10.0) if enviar_observacao else (30.0, 60.0),
             )
 
-            # Enviar mensagem de observação para FastDePix apenas no "à vencer 1 dias"
-            if tipo_integracao == 'fastdepix' and tipo_mensagem == "à vencer 1 dias":
-                time.sleep(10)  # Aguarda 10 segundos antes de enviar a observação
-
-                # Busca template do banco de dados, com fallback para texto padrão
-                texto_padrao_observacao = (
-                    "OBSERVAÇÃO: Estamos mudando a forma como os clientes devem fazer seus pagamentos "
-                    "e não aceitaremos mais pagamento enviados na chave pix anterior. Você precisa acessar "
-                    "o link do nosso Painel do Cliente, acessar com seu número de telefone e realizar o "
-                    "pagamento da mensalidade que estará em aberto na tela inicial."
-                )
-                mensagem_observacao = get_template_mensagem(
-                    nome_job='envios_vencimento',
-                    chave_template='observacao_fastdepix',
-                    texto_padrao=texto_padrao_observacao
-                )
+            if enviar_observacao:
+                # Busca template do banco de dados (uma vez por execução), com fallback para texto padrão
+                if mensagem_observacao is None:
+                    texto_padrao_observacao = (
+                        "OBSERVAÇÃO: Estamos mudando a forma como os clientes devem fazer seus pagamentos "
+                        "e não aceitaremos mais pagamento enviados na chave pix anterior. Você precisa acessar "
+                        "o link do nosso Painel do Cliente, acessar com seu número de telefone e realizar o "
+                        "pagamento da mensalidade que estará em aberto na tela inicial."
+                    )
+                    mensagem_observacao = get_template_mensagem(
+                        nome_job='envios_vencimento',
+                        chave_template='observacao_fastdepix',
+                        texto_padrao=texto_padrao_observacao
+                    )
 
-                enviar_mensagem_agendada(
+                enfileirar_mensagem_agendada(
                     telefone=telefone,
                     mensagem=mensagem_observacao,
                     usuario=usuario,
-                    token=sessao.token,
                     cliente=cliente.nome,
-                    tipo_envio="observação fastdepix"
+                    tipo_envio="observação fastdepix",
+                    origem="obter_mensalidades_a_vencer",
                 )
 
                 registrar_log_auditoria({
                     "funcao": "obter_mensalidades_a_vencer",
-                    "status": "observacao_fastdepix_enviada",
+                    "status": "observacao_fastdepix_enfileirada",
                     "usuario": str(usuario),
                     "cliente": cliente.nome,
                     "cliente_id": cliente.id,
                     "tipo_envio": tipo_mensagem,
                     "mensalidade_id": mensalidade.id,
                 })
-
-            time.sleep(random.uniform(30, 60))
 ##### FIM #####
 
 
@@ -662,113 +871,34 @@ def obter_mensalidades_vencidas(usuario_query):
         2: "lembrete atraso",
         3: "suspensao"
     }
+    resolvedor = ResolvedorCandidatosMensalidade("obter_mensalidades_vencidas")
 
     for dias, tipo_mensagem in dias_atraso.items():
         data_referencia = localtime().date() - timedelta(days=dias)
-        mensalidades = Mensalidade.objects.filter(
-            usuario=usuario_query,
-            dt_vencimento=data_referencia,
-            cliente__nao_enviar_msgs=False,
-            pgto=False,
-            cancelado=False
-        )
+        mensalidades = resolvedor.carregar_mensalidades(usuario_query, data_referencia)
 
         logger.info(
             "Mensalidades vencidas | tipo=%s quantidade=%d dias_atraso=%d data_ref=%s usuario=%s",
             tipo_mensagem.upper(),
-            mensalidades.count(),
+            len(mensalidades),
             dias,
             data_referencia.strftime('%d-%m-%Y'),
             usuario_query
         )
 
-        for mensalidade in mensalidades:
-            cliente = mensalidade.cliente
-            usuario = mensalidade.usuario
-            telefone = str(cliente.telefone).strip()
-            if not telefone:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_vencidas",
-                    "status": "cancelado_sem_telefone",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
-                continue
-
-            # Obter tipo de integração do cliente
-            tipo_integracao = obter_tipo_integracao_cliente(cliente)
-
-            # Não enviar para clientes com Cartão de Crédito
-            if tipo_integracao == 'cartao':
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_vencidas",
-                    "status": "ignorado_cartao_credito",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
-                continue
-
-            # Não enviar para clientes com Mercado Pago ou EfiBank (APIs pendentes)
-            if tipo_integracao in ('mercado_pago', 'efi_bank'):
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_vencidas",
-                    "status": f"ignorado_api_pendente_{tipo_integracao}",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
-                continue
-
-            # Validar forma de pagamento do cliente
-            valido, motivo, _ = validar_forma_pagamento_cliente(cliente)
-            if not valido:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_vencidas",
-                    "status": f"forma_pgto_invalida_{motivo}",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
-                continue
-
-            # Para FastDePix no lembrete de atraso, obter URL do painel
-            url_painel = None
-            if tipo_integracao == 'fastdepix' and tipo_mensagem == "lembrete atraso":
-                url_painel = get_url_painel_cliente(usuario)
-                if not url_painel:
-                    registrar_log_auditoria({
-                        "funcao": "obter_mensalidades_vencidas",
-                        "status": "fastdepix_sem_painel_configurado",
-                        "usuario": str(usuario),
-                        "cliente": cliente.nome,
-                        "cliente_id": cliente.id,
-                        "tipo_envio": tipo_mensagem,
-                        "mensalidade_id": mensalidade.id,
-                    })
-                    continue
-
-            sessao = SessaoWpp.objects.filter(usuario=usuario, is_active=True).first()
-            if not sessao:
-                registrar_log_auditoria({
-                    "funcao": "obter_mensalidades_vencidas",
-                    "status": "sessao_indisponivel",
-                    "usuario": str(usuario),
-                    "cliente": cliente.nome,
-                    "cliente_id": cliente.id,
-                    "tipo_envio": tipo_mensagem,
-                    "mensalidade_id": mensalidade.id,
-                })
-                continue
+        # URL do painel só é necessária para FastDePix no lembrete de atraso
+        jobs = resolvedor.resolver(
+            mensalidades,
+            tipo_mensagem,
+            exigir_url_painel=(tipo_mensagem == "lembrete atraso"),
+        )
+        for job in jobs:
+            mensalidade = job.mensalidade
+            cliente = job.cliente
+            usuario = job.usuario
+            telefone = job.telefone
+            tipo_integracao = job.tipo_integracao
+            url_painel = job.url_painel
 
             primeiro_nome = cliente.nome.split()[0]
             saudacao = get_saudacao_por_hora(localtime().time())
@@ -817,16 +947,14 @@ def obter_mensalidades_vencidas(usuario_query):
                 })
                 continue
 
-            enviar_mensagem_agendada(
+            enfileirar_mensagem_agendada(
                 telefone=telefone,
                 mensagem=mensagem,
                 usuario=usuario,
-                token=sessao.token,
                 cliente=cliente.nome,
-                tipo_envio=f"Atraso {dias}d"
+                tipo_envio=f"Atraso {dias}d",
+                origem="obter_mensalidades_vencidas",
             )
-
-            time.sleep(random.uniform(30, 60))
 ##### FIM #####
 
 
@@ -940,6 +1068,9 @@ def obter_mensalidades_canceladas():
     for oferta_config in ofertas_config:
         _processar_oferta_promocional(admin, oferta_config)
 
+    # Envia o que foi enfileirado (respeitando o intervalo por sessão)
+    processar_fila_envios_wpp()
+
 
 def _processar_feedback(admin, config):
     """Processa envio de feedback para clientes cancelados há 20 dias."""
@@ -974,7 +1105,6 @@ def _processar_feedback(admin, config):
             qtd_dias=qtd_dias,
             tipo_envio="Feedback 20d"
         )
-        time.sleep(random.uniform(30, 60))
 
 
 def _processar_oferta_promocional(admin, oferta_config):
@@ -1085,8 +1215,6 @@ def _processar_oferta_promocional(admin, oferta_config):
                 "total_ofertas_apos_envio": total_ofertas_recebidas + 1,
             })
 
-        time.sleep(random.uniform(30, 60))
-
     logger.info(
         "Processamento oferta concluído | numero_oferta=%d dias=%d enviados=%d ignorados=%d",
         numero_oferta,
@@ -1098,14 +1226,14 @@ def _processar_oferta_promocional(admin, oferta_config):
 
 def _enviar_mensagem_cliente(cliente, admin, mensagem_template, qtd_dias, tipo_envio):
     """
-    Envia mensagem para um cliente específico.
+    Enfileira mensagem para um cliente específico (enviada pelo worker da fila WPP).
 
     Placeholders suportados no template:
         {saudacao} - Saudação conforme horário (Bom dia, Boa tarde, Boa noite)
         {nome} - Primeiro nome do cliente
 
     Returns:
-        bool: True se enviou com sucesso, False caso contrário
+        bool: True se o envio foi enfileirado, False caso contrário
     """
     primeiro_nome = cliente.nome.split(' ')[0]
     saudacao = get_saudacao_por_hora()
@@ -1127,13 +1255,13 @@ def _enviar_mensagem_cliente(cliente, admin, mensagem_template, qtd_dias, tipo_e
         return False
 
     try:
-        enviar_mensagem_agendada(
+        enfileirar_mensagem_agendada(
             telefone=cliente.telefone,
             mensagem=mensagem,
             usuario=admin,
-            token=sessao.token,
             cliente=cliente.nome,
-            tipo_envio=tipo_envio
+            tipo_envio=tipo_envio,
+            origem="obter_mensalidades_canceladas",
         )
         return True
     except Exception as e:
@@ -1161,6 +1289,69 @@ def _enviar_mensagem_cliente(cliente, admin, mensagem_template, qtd_dias, tipo_e
 ##### BLOCO PARA ENVIO DE MENSAGENS AOS CLIENTES ATIVOS, CANCELADOS E FUTUROS CLIENTES (AVULSO) #####
 #####################################################################################################
 
+class ControleDuplicidadeEnvios:
+    """
+    Conjunto em memória dos telefones que já receberam envio no período.
+
+    Substitui as consultas ``MensagemEnviadaWpp...exists()`` por destinatário: os envios
+    do mês (da tarefa ou legados) são carregados uma única vez, via índice
+    ``msg_wpp_dedup_periodo_idx``, e atualizados a cada novo envio registrado.
+    Se a execução atravessar a virada do mês, o conjunto é recarregado.
+
+    É a única checagem de duplicidade do envio personalizado. O banco não tem constraint
+    única em ``MensagemEnviadaWpp`` (removida na migração 0114, quando o controle passou a
+    ser por tarefa/mês); entre processos, o que impede duas execuções da mesma tarefa ao
+    mesmo tempo é o lock da ``TarefaEnvio`` (``select_for_update`` + ``em_execucao``) em
+    ``run_scheduled_tasks_from_db``, único chamador de ``envia_mensagem_personalizada``.
+
+    Args:
+        usuario: Usuário dono dos envios.
+        tarefa_id: ID da TarefaEnvio (None para envios legados).
+    """
+
+    def __init__(self, usuario, tarefa_id=None):
+        self.usuario = usuario
+        self.tarefa_id = tarefa_id
+        self._periodo = None
+        self._envios = {}  # telefone -> set de datas de envio no mês
+
+    def _carregar(self, hoje):
+        periodo = (hoje.year, hoje.month)
+        if self._periodo == periodo:
+            return
+        inicio_mes = hoje.replace(day=1)
+        ultimo_dia = calendar.monthrange(hoje.year, hoje.month)[1]
+        registros = MensagemEnviadaWpp.objects.filter(
+            usuario=self.usuario,
+            data_envio__gte=inicio_mes,
+            data_envio__lte=hoje.replace(day=ultimo_dia),
+        )
+        if self.tarefa_id:
+            registros = registros.filter(tarefa_id=self.tarefa_id)
+        else:
+            registros = registros.filter(tarefa_id__isnull=True)
+
+        self._envios = {}
+        for telefone, data_envio in registros.values_list('telefone', 'data_envio'):
+            self._envios.setdefault(telefone, set()).add(data_envio)
+        self._periodo = periodo
+
+    def ja_enviado_mes(self, telefone, hoje) -> bool:
+        """True se o telefone já recebeu envio (desta tarefa ou legado) no mês de ``hoje``."""
+        self._carregar(hoje)
+        return telefone in self._envios
+
+    def ja_enviado_hoje(self, telefone, hoje) -> bool:
+        """True se o telefone já recebeu envio (desta tarefa ou legado) na data de ``hoje``."""
+        self._carregar(hoje)
+        return hoje in self._envios.get(telefone, ())
+
+    def registrar(self, telefone, hoje) -> None:
+        """Inclui um envio recém-registrado no conjunto."""
+        self._carregar(hoje)
+        self._envios.setdefault(telefone, set()).add(hoje)
+
+
 def envia_mensagem_personalizada(
     tipo_envio: str,
     image_name: str = None,
@@ -1329,6 +1520,14 @@ def envia_mensagem_personalizada(
         usuario.username
     )
 
+    # Envios já realizados no período (uma consulta por execução)
+    controle_duplicidade = ControleDuplicidadeEnvios(usuario, tarefa_id)
+
+    # Pool de paráfrases gerado antes do loop (uma geração por texto, não por destinatário)
+    tarefa = TarefaEnvio.objects.filter(id=tarefa_id).first() if tarefa_id else None
+    if mensagem_direta and destinatarios:
+        pool_parafrases.aquecer(mensagem_direta, usuario, tarefa=tarefa)
+
     for destinatario in destinatarios:
         telefone = destinatario["telefone"]
         cliente_nome = destinatario.get("cliente_nome")
@@ -1354,13 +1553,7 @@ def envia_mensagem_personalizada(
 
         if tarefa_id:
             # MODO TAREFA: Verifica se já enviou ESTA TAREFA para este telefone ESTE MÊS
-            if MensagemEnviadaWpp.objects.filter(
-                usuario=usuario,
-                telefone=telefone,
-                tarefa_id=tarefa_id,
-                data_envio__year=hoje.year,
-                data_envio__month=hoje.month
-            ).exists():
+            if controle_duplicidade.ja_enviado_mes(telefone, hoje.date()):
                 logger.debug(
                     "Envio ignorado (já enviado esta tarefa este mês) | telefone=%s tarefa_id=%s usuario=%s",
                     telefone,
@@ -1383,12 +1576,7 @@ def envia_mensagem_personalizada(
         else:
             # MODO LEGADO (sem tarefa): Mantém comportamento original
             # Ignora se já enviado hoje
-            if MensagemEnviadaWpp.objects.filter(
-                usuario=usuario,
-                telefone=telefone,
-                tarefa_id__isnull=True,
-                data_envio=hoje.date()
-            ).exists():
+            if controle_duplicidade.ja_enviado_hoje(telefone, hoje.date()):
                 registrar_log(f"[{datetime.now().strftime('%d-%m-%Y %H:%M:%S')}] {telefone} - ⚠️ Já foi feito envio hoje!", usuario, DIR_LOGS_AGENDADOS)
                 registrar_log_auditoria({
                     "funcao": "envia_mensagem_personalizada",
@@ -1404,13 +1592,7 @@ def envia_mensagem_personalizada(
 
             # Ignora se já enviado neste mês (modo legado)
             if tipo_envio in ["avulso", "ativos", "cancelados"]:
-                if MensagemEnviadaWpp.objects.filter(
-                    usuario=usuario,
-                    telefone=telefone,
-                    tarefa_id__isnull=True,
-                    data_envio__year=hoje.year,
-                    data_envio__month=hoje.month
-                ).exists():
+                if controle_duplicidade.ja_enviado_mes(telefone, hoje.date()):
                     logger.debug(
                         "Envio ignorado (já enviado este mês) | telefone=%s tipo=%s usuario=%s",
                         telefone,
@@ -1486,9 +1668,11 @@ def envia_mensagem_personalizada(
             continue
 
         # Obter mensagem: usa mensagem_direta (TarefaEnvio) ou template (legado)
-        # Ambos os modos agora usam ChatGPT para variar a mensagem e evitar detecção de spam
+        # Ambos os modos sorteiam do pool de paráfrases (ChatGPT apenas na geração do pool)
         if mensagem_direta:
-            message = variar_mensagem_chatgpt(mensagem_original=mensagem_direta, usuario=usuario)
+            message = variar_mensagem_chatgpt(
+                mensagem_original=mensagem_direta, usuario=usuario, tarefa=tarefa, nome=cliente_nome
+            )
         else:
             message = obter_mensagem_personalizada(nome=nome_msg, tipo=tipo_envio, usuario=usuario)
         if not message:
@@ -1532,143 +1716,156 @@ def envia_mensagem_personalizada(
         audit_payload["tem_base64"] = bool(payload.get('base64'))
         audit_payload["arquivo_imagem"] = image_path or image_name
 
-        for tentativa in range(1, 4):
-            response = None
-            response_payload = None
-            status_code = None
-            error_message = None
-            timestamp = localtime().strftime('%d-%m-%Y %H:%M:%S')
+        # Aguarda o token da sessão (respeita o ritmo de envios da fila WPP)
+        limitador_sessoes.aguardar(str(usuario))
 
-            try:
-                response = requests.post(
-                    url_envio,
-                    headers={
-                        'Content-Type': 'application/json',
-                        'Accept': 'application/json',
-                        'Authorization': f'Bearer {token}'
-                    },
-                    json=payload,
-                    timeout=30  # Timeout de 30 segundos para evitar travamentos
-                )
-                status_code = response.status_code
+        try:
+            for tentativa in range(1, 4):
+                response = None
+                response_payload = None
+                status_code = None
+                error_message = None
+                timestamp = localtime().strftime('%d-%m-%Y %H:%M:%S')
 
                 try:
-                    response_payload = response.json()
-                except json.JSONDecodeError:
-                    # Sanitiza para evitar registrar HTML de páginas de erro
-                    response_payload = _sanitize_response(response.text)
-
-                if status_code in (200, 201):
-                    registrar_log(
-                        TEMPLATE_LOG_MSG_SUCESSO.format(timestamp, tipo_envio.upper(), usuario, telefone),
-                        usuario,
-                        DIR_LOGS_AGENDADOS
+                    response = obter_cliente_wpp().post(
+                        url_envio,
+                        headers={
+                            'Content-Type': 'application/json',
+                            'Accept': 'application/json',
+                            'Authorization': f'Bearer {token}'
+                        },
+                        json=payload,
+                        timeout=30  # Timeout de 30 segundos para evitar travamentos
                     )
-                    # Registra envio - usa try/except para tratar IntegrityError em race condition
-                    # (campo data_envio usa auto_now_add=True, então get_or_create não funciona bem)
-                    try:
-                        registro_envio = MensagemEnviadaWpp.objects.create(
-                            usuario=usuario,
-                            telefone=telefone,
-                            tarefa_id=tarefa_id  # None para envios legados
-                        )
-                        registro_criado = True
-                    except IntegrityError:
-                        # Registro já existe (criado por outra instância paralela)
-                        registro_envio = MensagemEnviadaWpp.objects.filter(
-                            usuario=usuario,
-                            telefone=telefone,
-                            data_envio=localtime().date()
-                        ).first()
-                        registro_criado = False
-                        logger.warning(
-                            "IntegrityError: Registro MensagemEnviadaWpp já existia (race condition) | telefone=%s usuario=%s",
-                            telefone,
-                            usuario.username
-                        )
-                        logger.debug(
-                            "Registro MensagemEnviadaWpp já existia (race condition tratada) | telefone=%s",
-                            telefone
-                        )
-                    registrar_log_auditoria({
-                        "funcao": "envia_mensagem_personalizada",
-                        "status": "sucesso" if registro_criado else "sucesso_registro_existente",
-                        "usuario": usuario.username,
-                        "tipo_envio": tipo_envio,
-                        "telefone": telefone,
-                        "cliente_nome": cliente_nome,
-                        "cliente_id": cliente_id,
-                        "tentativa": tentativa,
-                        "http_status": status_code,
-                        "mensagem": message,
-                        "payload": audit_payload,
-                        "response": response_payload,
-                        "registro_envio_id": registro_envio.id if registro_envio else None,
-                        "registro_criado": registro_criado,
-                    })
-                    total_enviados += 1
-                    resultado['enviados'] += 1
-                    break
-
-                error_message = (
-                    # Suporta tanto respostas da API quanto dicts sanitizados de HTML
-                    response_payload.get('message') or response_payload.get('mensagem', 'Erro desconhecido')
-                    if isinstance(response_payload, dict)
-                    else str(response_payload)
-                )
+                    status_code = response.status_code
 
-            except requests.RequestException as exc:
-                status_code = getattr(getattr(exc, "response", None), "status_code", None)
-                if getattr(exc, "response", None) is not None:
                     try:
-                        response_payload = exc.response.json()
-                    except (ValueError, AttributeError):
+                        response_payload = response.json()
+                    except json.JSONDecodeError:
                         # Sanitiza para evitar registrar HTML de páginas de erro
-                        response_payload = _sanitize_response(getattr(exc.response, "text", None))
-                error_message = str(exc)
+                        response_payload = _sanitize_response(response.text)
 
-            if status_code in (200, 201):
-                continue
+                    if status_code in (200, 201):
+                        registrar_log(
+                            TEMPLATE_LOG_MSG_SUCESSO.format(timestamp, tipo_envio.upper(), usuario, telefone),
+                            usuario,
+                            DIR_LOGS_AGENDADOS
+                        )
+                        # Registra envio - o try/except de IntegrityError é defensivo: a constraint única
+                        # foi removida na 0114 e a duplicidade é controlada por ControleDuplicidadeEnvios
+                        # (campo data_envio usa auto_now_add=True, então get_or_create não funciona bem)
+                        try:
+                            registro_envio = MensagemEnviadaWpp.objects.create(
+                                usuario=usuario,
+                                telefone=telefone,
+                                tarefa_id=tarefa_id  # None para envios legados
+                            )
+                            registro_criado = True
+                            controle_duplicidade.registrar(telefone, registro_envio.data_envio)
+                        except IntegrityError:
+                            # Registro já existe (criado por outra instância paralela)
+                            registro_envio = MensagemEnviadaWpp.objects.filter(
+                                usuario=usuario,
+                                telefone=telefone,
+                                data_envio=localtime().date()
+                            ).first()
+                            registro_criado = False
+                            controle_duplicidade.registrar(
+                                telefone, registro_envio.data_envio if registro_envio else localtime().date()
+                            )
+                            logger.warning(
+                                "IntegrityError: Registro MensagemEnviadaWpp já existia (race condition) | telefone=%s usuario=%s",
+                                telefone,
+                                usuario.username
+                            )
+                            logger.debug(
+                                "Registro MensagemEnviadaWpp já existia (race condition tratada) | telefone=%s",
+                                telefone
+                            )
+                        registrar_log_auditoria({
+                            "funcao": "envia_mensagem_personalizada",
+                            "status": "sucesso" if registro_criado else "sucesso_registro_existente",
+                            "usuario": usuario.username,
+                            "tipo_envio": tipo_envio,
+                            "telefone": telefone,
+                            "cliente_nome": cliente_nome,
+                            "cliente_id": cliente_id,
+                            "tentativa": tentativa,
+                            "http_status": status_code,
+                            "mensagem": message,
+                            "payload": audit_payload,
+                            "response": response_payload,
+                            "registro_envio_id": registro_envio.id if registro_envio else None,
+                            "registro_criado": registro_criado,
+                        })
+                        total_enviados += 1
+                        resultado['enviados'] += 1
+                        break
+
+                    error_message = (
+                        # Suporta tanto respostas da API quanto dicts sanitizados de HTML
+                        response_payload.get('message') or response_payload.get('mensagem', 'Erro desconhecido')
+                        if isinstance(response_payload, dict)
+                        else str(response_payload)
+                    )
 
-            if error_message is None:
-                error_message = "Erro desconhecido"
+                except requests.RequestException as exc:
+                    status_code = getattr(getattr(exc, "response", None), "status_code", None)
+                    if getattr(exc, "response", None) is not None:
+                        try:
+                            response_payload = exc.response.json()
+                        except (ValueError, AttributeError):
+                            # Sanitiza para evitar registrar HTML de páginas de erro
+                            response_payload = _sanitize_response(getattr(exc.response, "text", None))
+                    error_message = str(exc)
 
-            registrar_log(
-                TEMPLATE_LOG_MSG_FALHOU.format(timestamp, tipo_envio.upper(), usuario, telefone, status_code if status_code is not None else 'N/A', tentativa, error_message),
-                usuario, DIR_LOGS_AGENDADOS
-            )
-            registrar_log_auditoria({
-                "funcao": "envia_mensagem_personalizada",
-                "status": "falha",
-                "usuario": usuario.username,
-                "tipo_envio": tipo_envio,
-                "telefone": telefone,
-                "cliente_nome": cliente_nome,
-                "cliente_id": cliente_id,
-                "tentativa": tentativa,
-                "http_status": status_code,
-                "mensagem": message,
-                "erro": error_message,
-                "payload": audit_payload,
-                "response": response_payload,
-            })
-            time.sleep(random.uniform(10, 20))
-        else:
-            # Se saiu do loop sem sucesso (todas tentativas falharam)
-            resultado['erros'] += 1
-            resultado['detalhes'].append({
-                'telefone': telefone,
-                'cliente_nome': cliente_nome,
-                'cliente_id': cliente_id,
-                'motivo': f'Falha no envio após 3 tentativas: {error_message}',
-                'tipo': 'falha_envio',
-                'http_status': status_code,
-                'ultima_resposta': str(response_payload)[:200] if response_payload else None
-            })
+                if status_code in (200, 201):
+                    continue
 
-        # Usa intervalo configurado (min/max) para delay entre mensagens
-        intervalo_delay = random.uniform(config_envio.intervalo_minimo, config_envio.intervalo_maximo)
-        time.sleep(intervalo_delay)
+                if error_message is None:
+                    error_message = "Erro desconhecido"
+
+                registrar_log(
+                    TEMPLATE_LOG_MSG_FALHOU.format(timestamp, tipo_envio.upper(), usuario, telefone, status_code if status_code is not None else 'N/A', tentativa, error_message),
+                    usuario, DIR_LOGS_AGENDADOS
+                )
+                registrar_log_auditoria({
+                    "funcao": "envia_mensagem_personalizada",
+                    "status": "falha",
+                    "usuario": usuario.username,
+                    "tipo_envio": tipo_envio,
+                    "telefone": telefone,
+                    "cliente_nome": cliente_nome,
+                    "cliente_id": cliente_id,
+                    "tentativa": tentativa,
+                    "http_status": status_code,
+                    "mensagem": message,
+                    "erro": error_message,
+                    "payload": audit_payload,
+                    "response": response_payload,
+                })
+                time.sleep(random.uniform(10, 20))
+            else:
+                # Se saiu do loop sem sucesso (todas tentativas falharam)
+                resultado['erros'] += 1
+                resultado['detalhes'].append({
+                    'telefone': telefone,
+                    'cliente_nome': cliente_nome,
+                    'cliente_id': cliente_id,
+                    'motivo': f'Falha no envio após 3 tentativas: {error_message}',
+                    'tipo': 'falha_envio',
+                    'http_status': status_code,
+                    'ultima_resposta': str(response_payload)[:200] if response_payload else None
+                })
+        finally:
+            # Libera a sessão mesmo se o envio levantar exceção (senão o token fica
+            # reservado por TEMPO_MAXIMO_RESERVA). Usa intervalo configurado (min/max)
+            # para delay entre mensagens; o token bucket é compartilhado com o worker
+            # da fila, então envios de tarefas e notificações da mesma sessão nunca saem colados.
+            limitador_sessoes.registrar_envio(
+                str(usuario), (config_envio.intervalo_minimo, config_envio.intervalo_maximo)
+            )
 
         # ============================================================
         # VERIFICAÇÃO DE CONFLITO DURANTE EXECUÇÃO
@@ -1786,7 +1983,7 @@ def processa_telefones(usuario: User = None) -> str:
 
 def obter_mensagem_personalizada(nome: str, tipo: str, usuario: User = None) -> str:
     """
-    Obtém a mensagem do banco de dados (MensagensLeads) e gera uma versão personalizada via ChatGPT.
+    Obtém a mensagem do banco de dados (MensagensLeads) e sorteia uma versão do pool de paráfrases.
 
     Args:
         nome (str): Nome identificador da mensagem (ex: 'msg1', 'msg2-2', etc.).
@@ -1811,18 +2008,10 @@ def obter_mensagem_personalizada(nome: str, tipo: str, usuario: User = None) ->
             )
             return None
 
-        mensagem_original = mensagem_obj.mensagem
-
-        prompt = (
-            "Você é um redator especialista em marketing pelo WhatsApp. "
-            "Reescreva o texto abaixo mantendo a mesma intenção, "
-            "mas com frases diferentes, trocando palavras por sinônimos, mudando a ordem e emojis quando necessário, "
-            "deixando o texto natural, envolvente, mas atrativo e adequado para o WhatsApp.\n\n"
-            f"{mensagem_original}"
-        )
-
-        mensagem_reescrita = consultar_chatgpt(pergunta=prompt, user=usuario)
-        return mensagem_reescrita
+        # Sorteia do pool de paráfrases do template (gerado uma única vez via ChatGPT)
+        if not usuario:
+            return mensagem_obj.mensagem
+        return pool_parafrases.sortear(mensagem_obj.mensagem, usuario)
 
     except Exception as e:
         logger.error(
@@ -1835,54 +2024,39 @@ def obter_mensagem_personalizada(nome: str, tipo: str, usuario: User = None) ->
         return None
 
 
-def variar_mensagem_chatgpt(mensagem_original: str, usuario: User = None) -> str:
+def variar_mensagem_chatgpt(mensagem_original: str, usuario: User = None, tarefa=None, nome: str = None) -> str:
     """
-    Gera uma variação da mensagem usando ChatGPT para evitar detecção de spam.
+    Retorna uma variação da mensagem para evitar detecção de spam.
+
+    A variação é sorteada do pool de paráfrases do texto (gerado uma única vez via
+    ChatGPT e gravado em ParafraseMensagem), sem consulta à API por destinatário.
+    Os placeholders {saudacao} e {nome} são preenchidos localmente.
 
     Args:
         mensagem_original (str): Texto original da mensagem configurada na tarefa.
         usuario (User, opcional): Usuário responsável pelo envio.
+        tarefa (TarefaEnvio, opcional): Tarefa de origem do texto.
+        nome (str, opcional): Nome do destinatário (usa o primeiro nome).
 
     Returns:
-        str: Mensagem reescrita com variações, ou a mensagem original em caso de erro.
+        str: Mensagem variada, ou a mensagem original em caso de erro.
     """
-    if not mensagem_original or not mensagem_original.strip():
+    if not mensagem_original or not mensagem_original.strip() or not usuario:
         return mensagem_original
 
     try:
-        prompt = (
-            "Você é um redator especialista em marketing pelo WhatsApp. "
-            "Reescreva o texto abaixo mantendo a mesma intenção e informações, "
-            "mas com frases ligeiramente diferentes, trocando algumas palavras por sinônimos, "
-            "variando a ordem quando possível, e ajustando emojis se houver. "
-            "O texto deve parecer natural, envolvente e adequado para WhatsApp. "
-            "IMPORTANTE: Mantenha todos os dados importantes (valores, datas, nomes, links) exatamente como estão. "
-            "Responda APENAS com o texto reescrito, sem explicações.\n\n"
-            f"{mensagem_original}"
+        return pool_parafrases.sortear(
+            mensagem_original,
+            usuario,
+            tarefa=tarefa,
+            saudacao=get_saudacao_por_hora(),
+            nome=nome.split(' ')[0] if nome else None,
         )
-
-        mensagem_variada = consultar_chatgpt(pergunta=prompt, user=usuario)
-
-        if mensagem_variada and mensagem_variada.strip():
-            logger.info(
-                "Mensagem variada com sucesso via ChatGPT | usuario=%s | tamanho_original=%d | tamanho_variada=%d",
-                usuario.username if usuario else "N/A",
-                len(mensagem_original),
-                len(mensagem_variada)
-            )
-            return mensagem_variada
-        else:
-            logger.warning(
-                "ChatGPT retornou vazio, usando mensagem original | usuario=%s",
-                usuario.username if usuario else "N/A"
-            )
-            return mensagem_original
-
     except Exception as e:
         logger.error(
-            "Erro ao variar mensagem via ChatGPT, usando original | erro=%s | usuario=%s",
+            "Erro ao variar mensagem via pool de paráfrases, usando original | erro=%s | usuario=%s",
             str(e),
-            usuario.username if usuario else "N/A",
+            usuario.username,
             exc_info=True
         )
         return mensagem_original
@@ -1904,6 +2078,7 @@ def verificar_conflito_notificacoes(usuario_id: int) -> tuple:
     1. Se uma notificação está em execução → PAUSA
     2. Se faltam menos de 5 minutos para uma notificação → PAUSA
     3. Se notificação deveria ter executado hoje mas ainda não → PAUSA
+    4. Se ainda há notificações aguardando envio na fila WPP → PAUSA
 
     Args:
         usuario_id: ID do usuário da tarefa
@@ -1946,6 +2121,14 @@ def verificar_conflito_notificacoes(usuario_id: int) -> tuple:
             if hora_atual >= notif.horario:
                 return True, f"Notificação de {tipo_nome} pendente de execução"
 
+    # 4. Notificações já processadas mas ainda aguardando envio na fila WPP
+    if FilaEnvioWpp.objects.filter(
+        usuario_id=usuario_id,
+        origem__in=ORIGENS_NOTIFICACAO,
+        status__in=(FilaEnvioWpp.STATUS_PENDENTE, FilaEnvioWpp.STATUS_PROCESSANDO),
+    ).exists():
+        return True, "Notificações na fila de envio"
+
     return False, ""
 
 
@@ -2023,7 +2206,7 @@ def run_scheduled_tasks_from_db():
         tarefas = TarefaEnvio.objects.filter(
             ativo=True,
             horario__hour=hora_atual,
-        ).select_related('usuario')
+        ).select_related('usuario', 'usuario__assinatura_plataforma')
 
         # Filtra por minuto (dentro de janela de 5 minutos)
         tarefas_para_executar = []
@@ -2544,6 +2727,10 @@ def executar_envio_para_usuario(h_candidato, agora, hoje):
                 "thread": threading.current_thread().name,
             })
 
+    # Drena a fila fora do lock do usuário. Se outro worker já estiver rodando,
+    # retorna imediatamente e os itens deste usuário são intercalados por ele.
+    processar_fila_envios_wpp()
+
 
 def executar_envios_agendados():
     """
@@ -2611,7 +2798,7 @@ def executar_envios_agendados():
         horario__isnull=False
     ).filter(
         Q(ultimo_envio__isnull=True) | Q(ultimo_envio__lt=hoje)
-    )
+    ).select_related('usuario', 'usuario__assinatura_plataforma')
 
     threads_criadas = []
 
@@ -2675,25 +2862,25 @@ def executar_envios_agendados_com_lock():
 ##### FUNÇÃO PARA EXECUTAR O SCRIPT DE BACKUP DO "DB.SQLITE3" PARA O DIRETÓRIO DO DRIVE. #####
 ##############################################################################################
 
-def backup_db_sh():
+def backup_db_sqlite():
     """
-    Executa o script 'backup_db.sh' para realizar backup do banco SQLite.
+    Realiza o backup online do banco SQLite (API de backup do sqlite3, com integrity_check
+    e rotação de gerações). Substitui o antigo backup_db.sh (cp -f do arquivo em uso).
     """
-    # Caminho para o script de backup
-    caminho_arquivo_sh = 'backup_db.sh'
+    from nossopainel.services.backup_sqlite import BackupError, caminho_banco_padrao, executar_backup_sqlite
 
-    # Executar o script de backup
-    resultado = subprocess.run(['sh', caminho_arquivo_sh], capture_output=True, text=True)
+    if not caminho_banco_padrao():
+        logger.debug("Backup do DB ignorado - banco padrão não é SQLite")
+        return
 
-    # Verificar o resultado da execução do script
-    if resultado.returncode == 0:
-        logger.info("Backup do DB realizado com sucesso")
-    else:
-        logger.error(
-            "Falha durante backup do DB | returncode=%d stderr=%s",
-            resultado.returncode,
-            resultado.stderr
+    try:
+        resultado = executar_backup_sqlite()
+        logger.info(
+            "Backup do DB realizado com sucesso | bytes=%d duracao=%.3fs arquivo=%s",
+            resultado['bytes_copiados'],
+            resultado['duracao'],
+            resultado['arquivo']
         )
-
-    time.sleep(random.randint(10, 20))
+    except BackupError as exc:
+        logger.error("Falha durante backup do DB | erro=%s", exc)
 ##### FIM #####
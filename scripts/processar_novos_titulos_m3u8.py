@@ -5,6 +5,7 @@ import requests
 import re
 import difflib
 from datetime import datetime
+from django.db import transaction
 from django.utils.timezone import localtime
 
 # Configuração do ambiente Django
@@ -25,6 +26,7 @@ TMDB_LOG_FILE = "logs/TMDb/busca-capas.log"
 NOVOS_CONTEUDOS_LOG = "logs/M3U8/novos-conteudos.log"
 PROCESSAR_NOVOS_TITULOS_LOG = "logs/M3U8/processar_novos_titulos.log"
 THREAD_LOG = "logs/M3U8/processar_novos_titulos_thread.log"
+TAMANHO_LOTE_DB = 200  # títulos por consulta de deduplicação/bulk_create
 
 # Garantir que os diretórios de log e arquivos existam
 os.makedirs(os.path.dirname(TMDB_LOG_FILE), exist_ok=True)
@@ -129,6 +131,117 @@ def buscar_capa_por_titulo(titulo_original):
         )
     return None
 
+# --- Leitura em lotes e deduplicação no banco ---
+
+def iterar_titulos_validos(linhas):
+    """Gera os nomes (tvg-name) de filmes/séries das linhas "#EXTINF", sem repetir."""
+    vistos = set()
+    for linha in linhas:
+        linha = linha.strip()
+        nome_match = re.search(r'tvg-name="([^"]+)"', linha)
+        grupo_match = re.search(r'group-title="([^"]+)"', linha)
+
+        if not (nome_match and grupo_match):
+            continue
+
+        grupo = grupo_match.group(1).lower()
+        if any(x in grupo for x in ["canais", "[xxx]", "programas de tv", "cursos"]):
+            continue
+        if "filme" not in grupo and "serie" not in grupo:
+            continue
+
+        nome_m3u8 = nome_match.group(1)
+        if nome_m3u8 in vistos:
+            continue
+        vistos.add(nome_m3u8)
+        yield nome_m3u8
+
+def iterar_lotes(itens, tamanho):
+    lote = []
+    for item in itens:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def gravar_lote_conteudos(nomes_m3u8, usuario):
+    """
+    Busca os metadados de um lote de títulos e grava os ineditos com uma única
+    consulta de deduplicação e um bulk_create.
+
+    Títulos sem capa no TMDb são descartados (``capa`` é obrigatória). Se o
+    bulk_create falhar, o lote é gravado item a item para perder apenas as linhas
+    com erro, como fazia o ``create`` por título.
+
+    Retorna:
+        int: Quantidade de conteúdos criados.
+    """
+    candidatos = {}
+    for nome_m3u8 in nomes_m3u8:
+        try:
+            dados = buscar_capa_por_titulo(nome_m3u8)
+        except Exception as e:
+            registrar_log(f"[ERRO] {nome_m3u8} => {str(e)}", PROCESSAR_NOVOS_TITULOS_LOG)
+            continue
+        if not dados:
+            continue
+        if not dados.get("capa"):
+            registrar_log(f"[SEM CAPA] {nome_m3u8} => TMDb sem poster, título ignorado", PROCESSAR_NOVOS_TITULOS_LOG)
+            continue
+        chave = (dados["nome"], dados["capa"], dados.get("temporada"), dados.get("episodio"))
+        candidatos.setdefault(chave, dados)
+
+    if not candidatos:
+        return 0
+
+    existentes = set(
+        ConteudoM3U8.objects.filter(
+            usuario=usuario,
+            nome__in={chave[0] for chave in candidatos},
+        ).values_list("nome", "capa", "temporada", "episodio")
+    )
+    ineditos = [dados for chave, dados in candidatos.items() if chave not in existentes]
+    conteudos = [
+        ConteudoM3U8(
+            nome=dados["nome"],
+            capa=dados["capa"],
+            temporada=dados.get("temporada"),
+            episodio=dados.get("episodio"),
+            usuario=usuario
+        )
+        for dados in ineditos
+    ]
+
+    try:
+        with transaction.atomic():
+            ConteudoM3U8.objects.bulk_create(conteudos)
+        gravados = ineditos
+    except Exception as e:
+        registrar_log(
+            f"[ERRO] Falha ao gravar lote de {len(ineditos)} conteúdos => {str(e)} | gravando item a item",
+            PROCESSAR_NOVOS_TITULOS_LOG
+        )
+        gravados = []
+        for dados, conteudo in zip(ineditos, conteudos):
+            conteudo.pk = None
+            try:
+                with transaction.atomic():
+                    conteudo.save()
+                gravados.append(dados)
+            except Exception as e:
+                registrar_log(f"[ERRO] {dados['nome']} => {str(e)}", PROCESSAR_NOVOS_TITULOS_LOG)
+        registrar_log(
+            f"[LOTE] {len(gravados)} gravados | {len(ineditos) - len(gravados)} com falha",
+            PROCESSAR_NOVOS_TITULOS_LOG
+        )
+
+    with open(NOVOS_CONTEUDOS_LOG, "a", encoding="utf-8") as log_file:
+        for dados in gravados:
+            log_file.write(f"[{datetime.now()}] [NOVO] {dados['nome']} | T{dados.get('temporada')}E{dados.get('episodio')} | {dados['capa']}\n")
+    return len(gravados)
+
 # --- Função principal para processar os novos títulos ---
 
 def processar_novos_titulos():
@@ -148,56 +261,16 @@ def processar_novos_titulos():
         registrar_log(f"[ERRO] Usuário '{usuario_env}' não encontrado.", PROCESSAR_NOVOS_TITULOS_LOG)
         return
 
-    with open(LISTA_NOVOS, encoding="utf-8") as f:
-        linhas = [linha.strip() for linha in f if linha.strip()]
-
-    if not linhas:
-        registrar_log("[INFO] Arquivo 'novos.txt' está vazio.", PROCESSAR_NOVOS_TITULOS_LOG)
-        os.remove(LISTA_NOVOS)
-        return
-
     novos = 0
-    for linha in linhas:
-        nome_match = re.search(r'tvg-name="([^"]+)"', linha)
-        grupo_match = re.search(r'group-title="([^"]+)"', linha)
-
-        if not (nome_match and grupo_match):
-            continue
-
-        grupo = grupo_match.group(1).lower()
-        if any(x in grupo for x in ["canais", "[xxx]", "programas de tv", "cursos"]):
-            continue
-        if "filme" not in grupo and "serie" not in grupo:
-            continue
-
-        nome_m3u8 = nome_match.group(1)
-        try:
-            dados = buscar_capa_por_titulo(nome_m3u8)
-            if not dados:
-                continue
-
-            if not ConteudoM3U8.objects.filter(
-                nome=dados["nome"],
-                capa=dados["capa"],
-                temporada=dados.get("temporada"),
-                episodio=dados.get("episodio"),
-                usuario=usuario
-            ).exists():
-                ConteudoM3U8.objects.create(
-                    nome=dados["nome"],
-                    capa=dados["capa"],
-                    temporada=dados.get("temporada"),
-                    episodio=dados.get("episodio"),
-                    usuario=usuario
-                )
-                with open(NOVOS_CONTEUDOS_LOG, "a", encoding="utf-8") as log_file:
-                    log_file.write(f"[{datetime.now()}] [NOVO] {dados['nome']} | T{dados.get('temporada')}E{dados.get('episodio')} | {dados['capa']}\n")
-                novos += 1
+    lidas = 0
+    with open(LISTA_NOVOS, encoding="utf-8") as f:
+        for lote in iterar_lotes(iterar_titulos_validos(f), TAMANHO_LOTE_DB):
+            lidas += len(lote)
+            novos += gravar_lote_conteudos(lote, usuario)
 
-        except Exception as e:
-                registrar_log(f"[ERRO] {nome_m3u8} => {str(e)}", PROCESSAR_NOVOS_TITULOS_LOG)
+    if not lidas:
+        registrar_log("[INFO] Arquivo 'novos.txt' não possui títulos de filmes/séries.", PROCESSAR_NOVOS_TITULOS_LOG)
 
-    
     registrar_log(f"[TOTAL DE NOVOS CONTEÚDOS] {novos}", PROCESSAR_NOVOS_TITULOS_LOG)
 
     os.remove(LISTA_NOVOS)
@@ -11,6 +11,7 @@ Execução: A cada 30 minutos via scheduler
 import os
 import sys
 import logging
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 
@@ -42,7 +43,192 @@ if not logger.handlers:
     logger.addHandler(fh)
 
 
-def sincronizar_pagamentos_pix_pendentes():
+# Reconciliação em lote: transações por página e limite de páginas por conta
+TRANSACOES_POR_PAGINA = 100
+MAX_PAGINAS_POR_CONTA = 20
+
+
+def _extrair_valores_financeiros(details):
+    """Extrai (valor_recebido, valor_taxa) dos dados da transação do FastDePix."""
+    valor_recebido = None
+    valor_taxa = None
+
+    # Priorizar commission_amount do FastDePix
+    amount_received = (
+        details.get('commission_amount') or
+        details.get('amount_received') or
+        details.get('net_amount')
+    )
+    fee = details.get('fee') or details.get('tax')
+
+    if amount_received:
+        try:
+            valor_recebido = Decimal(str(amount_received))
+        except (ValueError, TypeError):
+            pass
+
+    if fee:
+        try:
+            valor_taxa = Decimal(str(fee))
+        except (ValueError, TypeError):
+            pass
+
+    # Se não veio taxa explícita, calcular a partir do valor bruto
+    if valor_taxa is None and details.get('amount') and valor_recebido:
+        try:
+            valor_taxa = Decimal(str(details['amount'])) - valor_recebido
+        except (ValueError, TypeError):
+            pass
+
+    return valor_recebido, valor_taxa
+
+
+def _sem_dados_taxa(transacao):
+    """Indica se a transação não traz valor recebido nem taxa (mesma regra do webhook)."""
+    amount_received = (
+        transacao.get('commission_amount') or
+        transacao.get('amount_received') or
+        transacao.get('net_amount')
+    )
+    fee = transacao.get('fee') or transacao.get('tax')
+    return not amount_received and not fee
+
+
+def _marcar_como_paga(cobranca, details):
+    """Marca a cobrança como paga com data, pagador e valores dos detalhes da transação."""
+    try:
+        paid_at = None
+        if details.get('paid_at'):
+            paid_at = parse_datetime(details['paid_at'].replace('Z', '+00:00'))
+
+        payer = details.get('payer', {})
+        valor_recebido, valor_taxa = _extrair_valores_financeiros(details)
+
+        cobranca.mark_as_paid(
+            paid_at=paid_at or timezone.now(),
+            payer_name=payer.get('name') if isinstance(payer, dict) else None,
+            payer_document=payer.get('cpf_cnpj') if isinstance(payer, dict) else None,
+            webhook_data={'source': 'sync_automatico', 'data': details},
+            valor_recebido=valor_recebido,
+            valor_taxa=valor_taxa,
+        )
+    except Exception:
+        cobranca.mark_as_paid(paid_at=timezone.now())
+
+
+def _aplicar_status(cobranca, status_api, details=None):
+    """
+    Aplica o status retornado pela API na cobrança.
+
+    Returns:
+        bool: True se a cobrança foi atualizada.
+    """
+    if status_api == PaymentStatus.PAID:
+        _marcar_como_paga(cobranca, details or {})
+        logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como PAGA")
+        return True
+
+    elif status_api == PaymentStatus.EXPIRED:
+        cobranca.mark_as_expired()
+        logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como EXPIRADA")
+        return True
+
+    elif status_api == PaymentStatus.CANCELLED:
+        cobranca.mark_as_cancelled()
+        logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como CANCELADA")
+        return True
+
+    return False
+
+
+def _sincronizar_individual(integration, cobranca, contador):
+    """Consulta o status de uma cobrança (e os detalhes, se paga) e aplica o resultado."""
+    contador['chamadas'] += 1
+    status_api = integration.get_charge_status(cobranca.transaction_id)
+
+    details = None
+    if status_api == PaymentStatus.PAID:
+        # Buscar detalhes para obter data de pagamento e valores financeiros
+        try:
+            contador['chamadas'] += 1
+            details = integration.get_charge_details(cobranca.transaction_id)
+        except Exception:
+            details = None
+
+    return _aplicar_status(cobranca, status_api, details)
+
+
+def _extrair_transacoes(response):
+    """Extrai a lista de transações da resposta paginada do list_transactions."""
+    data = response.get('data', response)
+    if isinstance(data, dict):
+        data = data.get('transactions') or data.get('items') or data.get('data') or []
+    return data if isinstance(data, list) else []
+
+
+def _reconciliar_conta(integration, cobrancas, desde, contador):
+    """
+    Reconcilia as cobranças de uma conta bancária via list_transactions.
+
+    Percorre as páginas de transações do período e casa localmente por
+    transaction_id, parando assim que todas as cobranças forem encontradas.
+
+    Se uma página falhar, a leitura para ali e o que já foi aplicado é mantido:
+    apenas as cobranças ainda não encontradas voltam para a consulta individual.
+
+    Returns:
+        tuple: (atualizadas, pendentes_sem_correspondencia)
+    """
+    pendentes = {str(c.transaction_id): c for c in cobrancas}
+    atualizadas = 0
+
+    for page in range(1, MAX_PAGINAS_POR_CONTA + 1):
+        contador['chamadas'] += 1
+        try:
+            transacoes = _extrair_transacoes(integration.list_transactions(
+                start_date=desde,
+                end_date=timezone.localtime(),
+                page=page,
+                per_page=TRANSACOES_POR_PAGINA,
+            ))
+        except Exception as e:
+            logger.warning(
+                f"[Sync PIX] Falha na reconciliação em lote da conta {cobrancas[0].conta_bancaria_id} (página {page}): {e} - "
+                f"{len(pendentes)} cobrança(s) seguem para consulta individual"
+            )
+            break
+
+        for transacao in transacoes:
+            cobranca = pendentes.pop(str(transacao.get('id', transacao.get('transaction_id', ''))), None)
+            if cobranca is None:
+                continue
+
+            try:
+                status_api = integration.map_status(transacao.get('status'))
+                details = transacao
+                if status_api == PaymentStatus.PAID and (
+                    not transacao.get('paid_at') or _sem_dados_taxa(transacao)
+                ):
+                    # Listagem sem data de pagamento ou sem taxa: buscar os detalhes da cobrança
+                    try:
+                        contador['chamadas'] += 1
+                        details = integration.get_charge_details(cobranca.transaction_id)
+                    except Exception:
+                        pass
+
+                if _aplicar_status(cobranca, status_api, details):
+                    atualizadas += 1
+            except Exception as e:
+                contador['erros'] += 1
+                logger.error(f"[Sync PIX] Erro ao sincronizar {cobranca.transaction_id}: {e}")
+
+        if not pendentes or len(transacoes) < TRANSACOES_POR_PAGINA:
+            break
+
+    return atualizadas, list(pendentes.values())
+
+
+def sincronizar_pagamentos_pix_pendentes(modo_lote=True):
     """
     Sincroniza pagamentos PIX pendentes com a API do FastDePix.
 
@@ -53,23 +239,30 @@ def sincronizar_pagamentos_pix_pendentes():
     - Criados nos últimos 7 dias
 
     A API do FastDePix informa o status real (paid/expired/cancelled).
+
+    No modo em lote (padrão) as cobranças são agrupadas por conta bancária: a
+    integração é criada uma vez por conta e as transações do período são lidas
+    em páginas (list_transactions) e casadas por transaction_id. Apenas as
+    cobranças não encontradas na listagem são consultadas individualmente.
+    Com modo_lote=False todas são consultadas uma a uma (comportamento anterior).
+
     Execução: A cada 30 minutos via scheduler.
     """
-    logger.info("[Sync PIX] Iniciando sincronização automática...")
+    logger.info(f"[Sync PIX] Iniciando sincronização automática (modo={'lote' if modo_lote else 'individual'})...")
 
     # Cobranças pendentes FastDePix criadas há mais de 5 min, nos últimos 7 dias
     desde = timezone.now() - timedelta(days=7)
     ate = timezone.now() - timedelta(minutes=5)
 
-    cobrancas = CobrancaPix.objects.filter(
+    cobrancas = list(CobrancaPix.objects.filter(
         integracao='fastdepix',
         status='pending',
         criado_em__gte=desde,
         criado_em__lte=ate
         # Sem filtro expira_em - a API informa o status real
-    ).select_related('conta_bancaria', 'conta_bancaria__instituicao')
+    ).select_related('conta_bancaria', 'conta_bancaria__instituicao'))
 
-    total_cobrancas = cobrancas.count()
+    total_cobrancas = len(cobrancas)
     logger.info(f"[Sync PIX] Encontradas {total_cobrancas} cobranças pendentes para verificar")
 
     if total_cobrancas == 0:
@@ -78,101 +271,60 @@ def sincronizar_pagamentos_pix_pendentes():
 
     total_verificadas = 0
     total_atualizadas = 0
-    total_erros = 0
+    total_individuais = 0
+    contador = {'chamadas': 0, 'erros': 0}
 
+    # Agrupar por conta bancária (uma integração por conta)
+    por_conta = defaultdict(list)
     for cobranca in cobrancas:
         # Verificar se a conta bancária tem integração válida
         if not cobranca.conta_bancaria or not cobranca.conta_bancaria.api_key:
             logger.warning(f"[Sync PIX] Cobrança {cobranca.transaction_id} sem conta bancária válida")
-            total_erros += 1
+            contador['erros'] += 1
             continue
+        por_conta[cobranca.conta_bancaria_id].append(cobranca)
 
-        integration = get_payment_integration(cobranca.conta_bancaria)
+    for cobrancas_conta in por_conta.values():
+        conta_bancaria = cobrancas_conta[0].conta_bancaria
+        integration = get_payment_integration(conta_bancaria)
         if not integration:
-            logger.warning(f"[Sync PIX] Falha ao obter integração para cobrança {cobranca.transaction_id}")
-            total_erros += 1
+            logger.warning(f"[Sync PIX] Falha ao obter integração para a conta bancária {conta_bancaria.pk}")
+            contador['erros'] += len(cobrancas_conta)
             continue
 
-        total_verificadas += 1
-        try:
-            status_api = integration.get_charge_status(cobranca.transaction_id)
-
-            if status_api == PaymentStatus.PAID:
-                # Buscar detalhes para obter data de pagamento e valores financeiros
-                try:
-                    details = integration.get_charge_details(cobranca.transaction_id)
-                    paid_at = None
-                    if details.get('paid_at'):
-                        paid_at = parse_datetime(details['paid_at'].replace('Z', '+00:00'))
-
-                    payer = details.get('payer', {})
-
-                    # Extrair valores financeiros - priorizar commission_amount do FastDePix
-                    valor_recebido = None
-                    valor_taxa = None
-
-                    amount_received = (
-                        details.get('commission_amount') or
-                        details.get('amount_received') or
-                        details.get('net_amount')
-                    )
-                    fee = details.get('fee') or details.get('tax')
-
-                    if amount_received:
-                        try:
-                            valor_recebido = Decimal(str(amount_received))
-                        except (ValueError, TypeError):
-                            pass
-
-                    if fee:
-                        try:
-                            valor_taxa = Decimal(str(fee))
-                        except (ValueError, TypeError):
-                            pass
-
-                    # Se não veio taxa explícita, calcular a partir do valor bruto
-                    if valor_taxa is None and details.get('amount') and valor_recebido:
-                        try:
-                            valor_taxa = Decimal(str(details['amount'])) - valor_recebido
-                        except (ValueError, TypeError):
-                            pass
-
-                    cobranca.mark_as_paid(
-                        paid_at=paid_at or timezone.now(),
-                        payer_name=payer.get('name') if isinstance(payer, dict) else None,
-                        payer_document=payer.get('cpf_cnpj') if isinstance(payer, dict) else None,
-                        webhook_data={'source': 'sync_automatico', 'data': details},
-                        valor_recebido=valor_recebido,
-                        valor_taxa=valor_taxa,
-                    )
-                except Exception:
-                    cobranca.mark_as_paid(paid_at=timezone.now())
-
-                total_atualizadas += 1
-                logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como PAGA")
-
-            elif status_api == PaymentStatus.EXPIRED:
-                cobranca.mark_as_expired()
-                total_atualizadas += 1
-                logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como EXPIRADA")
-
-            elif status_api == PaymentStatus.CANCELLED:
-                cobranca.mark_as_cancelled()
-                total_atualizadas += 1
-                logger.info(f"[Sync PIX] Cobrança {cobranca.transaction_id} marcada como CANCELADA")
+        total_verificadas += len(cobrancas_conta)
+        restantes = cobrancas_conta
 
-        except Exception as e:
-            total_erros += 1
-            logger.error(f"[Sync PIX] Erro ao sincronizar {cobranca.transaction_id}: {e}")
+        if modo_lote and hasattr(integration, 'list_transactions'):
+            inicio_periodo = timezone.localtime(min(c.criado_em for c in cobrancas_conta))
+            atualizadas, restantes = _reconciliar_conta(integration, cobrancas_conta, inicio_periodo, contador)
+            total_atualizadas += atualizadas
+
+        # Fallback: consulta individual das cobranças não encontradas na listagem
+        for cobranca in restantes:
+            total_individuais += 1
+            try:
+                if _sincronizar_individual(integration, cobranca, contador):
+                    total_atualizadas += 1
+            except Exception as e:
+                contador['erros'] += 1
+                logger.error(f"[Sync PIX] Erro ao sincronizar {cobranca.transaction_id}: {e}")
+
+    # Chamadas que o modo individual faria: status de cada cobrança + detalhes das pagas
+    pagas = CobrancaPix.objects.filter(pk__in=[c.pk for c in cobrancas], status='paid').count()
+    chamadas_individual = total_verificadas + pagas
 
     logger.info(
         f"[Sync PIX] Concluído - "
         f"Verificadas: {total_verificadas}, "
         f"Atualizadas: {total_atualizadas}, "
-        f"Erros: {total_erros}"
+        f"Consultas individuais: {total_individuais}, "
+        f"Erros: {contador['erros']}, "
+        f"Chamadas API: {contador['chamadas']}, "
+        f"Chamadas economizadas: {chamadas_individual - contador['chamadas']}"
     )
 
 
 if __name__ == "__main__":
-    # Execução manual para testes
-    sincronizar_pagamentos_pix_pendentes()
+    # Execução manual para testes (--individual: consulta cobrança a cobrança)
+    sincronizar_pagamentos_pix_pendentes(modo_lote="--individual" not in sys.argv)
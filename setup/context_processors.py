@@ -1,10 +1,13 @@
-from django.db.models import DurationField, ExpressionWrapper, F
-from django.utils import timezone
-
-from nossopainel.models import Mensalidade, Tipos_pgto, UserProfile, NotificacaoSistema
+from nossopainel.models import UserProfile
+from nossopainel.services.resumo_notificacoes import ResumoNotificacoes
 
 
 def notifications(request):
+    """
+    Disponibiliza o resumo de notificações do sino (notif_items, notif_count,
+    notificacoes_sistema). Os valores são avaliados sob demanda a partir do
+    resumo em cache (ver ``nossopainel.services.resumo_notificacoes``).
+    """
     # Verifica se request.user existe (pode nao existir em middlewares customizados)
     if not hasattr(request, 'user') or not request.user.is_authenticated:
         return {}
@@ -12,44 +15,7 @@ def notifications(request):
     # Se for atendente, mostra notificações do owner
     data_owner = getattr(request, 'data_owner', request.user)
 
-    hoje = timezone.localdate()
-    tipos = [Tipos_pgto.CARTAO, Tipos_pgto.BOLETO]
-
-    # Mensalidades vencidas
-    mensalidades_vencidas = (
-        Mensalidade.objects.select_related("cliente", "cliente__forma_pgto", "cliente__plano")
-        .filter(
-            usuario=data_owner,
-            pgto=False,
-            cancelado=False,
-            cliente__cancelado=False,
-            cliente__forma_pgto__nome__in=tipos,
-            dt_vencimento__lt=hoje,
-        )
-        .exclude(notifications_read__usuario=request.user)
-        .annotate(
-            dias_atraso=ExpressionWrapper(
-                hoje - F("dt_vencimento"),
-                output_field=DurationField(),
-            )
-        )
-        .order_by("dt_vencimento")
-    )
-
-    # Notificações do sistema não lidas
-    notificacoes_sistema = NotificacaoSistema.objects.filter(
-        usuario=data_owner,
-        lida=False
-    )
-
-    # Total = mensalidades vencidas + notificações do sistema
-    total_count = mensalidades_vencidas.count() + notificacoes_sistema.count()
-
-    return {
-        "notif_items": mensalidades_vencidas[:20],
-        "notif_count": total_count,
-        "notificacoes_sistema": notificacoes_sistema[:10],
-    }
+    return ResumoNotificacoes(data_owner, request.user).contexto()
 
 
 def user_profile(request):
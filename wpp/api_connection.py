@@ -6,6 +6,7 @@ import mimetypes
 import os
 import random
 import sys
+import threading
 import time
 from typing import Optional
 
@@ -15,6 +16,7 @@ from pathlib import Path
 # Adiciona o caminho para imports do sistema centralizado de logging
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from nossopainel.services.clientes_http import obter_cliente, rotulo_por_caminho
 from nossopainel.services.logging import append_line
 from nossopainel.services.logging_config import get_wpp_logger
 
@@ -28,6 +30,26 @@ REQUEST_TIMEOUT = 30
 # Necessário devido a limitações do WhatsApp Web que não permite operações simultâneas
 LABEL_OPERATION_DELAY = 2
 
+# Validade (s) do cache de get_all_labels por sessão, usado ao resolver o ID de uma label
+LABELS_CACHE_TTL = 300
+
+
+def _rotulo_endpoint_wpp(url):
+    """Rótulo do histograma sem o nome da sessão (ex.: ``/contact/{id}``)."""
+    if API_WPP_URL_PROD and url.startswith(API_WPP_URL_PROD):
+        url = url[len(API_WPP_URL_PROD):]
+    rotulo = rotulo_por_caminho(url)
+    return "/" + rotulo.strip("/").partition("/")[2]
+
+
+# Cliente HTTP compartilhado (keep-alive e pool por host) para a API WPPConnect
+_http = obter_cliente("wppconnect", rotulador=_rotulo_endpoint_wpp)
+
+
+def obter_cliente_wpp():
+    """Cliente HTTP compartilhado da API WPPConnect (pool de conexões, retry e histograma por endpoint)."""
+    return _http
+
 ##################################################################
 ################ FUNÇÕES AUXILIARES DE REQUISIÇÃO ################
 ##################################################################
@@ -61,9 +83,9 @@ def _make_request(method: str, url: str, headers: dict = None, json_data: dict =
     """
     try:
         if method.upper() == "GET":
-            response = requests.get(url, headers=headers, timeout=timeout)
+            response = _http.get(url, headers=headers, timeout=timeout)
         else:
-            response = requests.post(url, headers=headers, json=json_data, timeout=timeout)
+            response = _http.post(url, headers=headers, json=json_data, timeout=timeout)
         return _safe_json_response(response), response.status_code
     except requests.Timeout:
         return {"status": False, "error": "timeout", "message": "API não respondeu a tempo"}, 504
@@ -135,7 +157,7 @@ def get_qrcode(session: str, token: str):
     url = f"{API_WPP_URL_PROD}/{session}/qrcode-session"
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         return response.content, response.status_code
     except requests.Timeout:
         return b"", 504
@@ -201,7 +223,7 @@ def get_label_contact(telefone, token, user):
     )
 
     try:
-        response = requests.get(url, headers=headers, json=body, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, json=body, timeout=REQUEST_TIMEOUT)
 
         # DEBUG: Log da resposta completa
         logger.debug(
@@ -270,7 +292,7 @@ def get_label_contact_via_all_contacts(whatsapp_lid, token, user):
     )
 
     try:
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
         if response.status_code in [200, 201]:
             contacts = response.json().get('response', [])
@@ -344,7 +366,7 @@ def check_number_status(telefone, token, user):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
         if response.status_code in [200, 201]:
             response_data = response.json()
@@ -402,8 +424,40 @@ def check_number_status(telefone, token, user):
 
 
 # --- Função para obter todas as labels disponíveis para um contato ---
-def get_all_labels(token, user):
-    """Retorna todas as labels disponíveis na instância WPP do usuário."""
+_labels_cache = {}  # {sessao: (expira_em, labels)}
+_labels_cache_lock = threading.Lock()
+_labels_cache_stats = {"hits": 0, "misses": 0}
+
+
+def invalidar_cache_labels(user=None):
+    """Descarta o cache de labels da sessão (ou de todas, se ``user`` for None)."""
+    with _labels_cache_lock:
+        if user is None:
+            _labels_cache.clear()
+        else:
+            _labels_cache.pop(str(user), None)
+
+
+def metricas_cache_labels():
+    """Acertos/faltas do cache de labels e sessões em cache."""
+    with _labels_cache_lock:
+        return {**_labels_cache_stats, "sessoes": len(_labels_cache), "ttl": LABELS_CACHE_TTL}
+
+
+def get_all_labels(token, user, usar_cache=False):
+    """
+    Retorna todas as labels disponíveis na instância WPP do usuário.
+
+    Com ``usar_cache=True`` reaproveita a última lista da sessão por até
+    ``LABELS_CACHE_TTL`` segundos; toda consulta bem-sucedida atualiza o cache.
+    """
+    if usar_cache:
+        with _labels_cache_lock:
+            em_cache = _labels_cache.get(str(user))
+            if em_cache and em_cache[0] > time.monotonic():
+                _labels_cache_stats["hits"] += 1
+                return em_cache[1]
+            _labels_cache_stats["misses"] += 1
 
     url = f'{API_WPP_URL_PROD}/{user}/get-all-labels'
     headers = {
@@ -412,12 +466,14 @@ def get_all_labels(token, user):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
         if response.status_code in [200, 201]:
             response_data = response.json()
             labels = response_data.get('response', [])
             logger.info("[get_all_labels] %s | %s labels recuperadas.", user, len(labels))
+            with _labels_cache_lock:
+                _labels_cache[str(user)] = (time.monotonic() + LABELS_CACHE_TTL, labels)
             return labels
 
         logger.error(
@@ -502,7 +558,7 @@ def add_or_remove_label_contact(label_id_1, label_id_2, label_name, telefone, to
             }
 
             try:
-                response_remove = requests.post(url, headers=headers, json=body_remove, timeout=LABEL_TIMEOUT)
+                response_remove = _http.post(url, headers=headers, json=body_remove, timeout=LABEL_TIMEOUT)
                 logger.info(
                     "[add_or_remove_label_contact] %s | REMOVE [%d/%d] status=%s label=%s",
                     user,
@@ -542,7 +598,7 @@ def add_or_remove_label_contact(label_id_1, label_id_2, label_name, telefone, to
     }
 
     try:
-        response = requests.post(url, headers=headers, json=body_add, timeout=LABEL_TIMEOUT)
+        response = _http.post(url, headers=headers, json=body_add, timeout=LABEL_TIMEOUT)
         logger.info(
             "[add_or_remove_label_contact] %s | ADD status=%s body=%s",
             user,
@@ -604,7 +660,7 @@ def remover_todas_labels_contato(telefone, labels, token, user):
     LABEL_TIMEOUT = 60
 
     try:
-        response = requests.post(url, headers=headers, json=body, timeout=LABEL_TIMEOUT)
+        response = _http.post(url, headers=headers, json=body, timeout=LABEL_TIMEOUT)
         logger.info(
             "[remover_todas_labels_contato] %s | telefone=%s status=%s",
             user,
@@ -628,11 +684,17 @@ def remover_todas_labels_contato(telefone, labels, token, user):
 
 # --- Função para criar uma nova label se não existir ---
 def criar_label_se_nao_existir(nome_label, token, user, hex_color=None):
-    """Cria a label no WhatsApp caso ainda não exista e retorna o ID correspondente."""
+    """
+    Cria a label no WhatsApp caso ainda não exista e retorna o ID correspondente.
+
+    Consulta primeiro o cache de labels da sessão; se a label não estiver nele, a
+    lista é relida da API antes de criar (pode ter sido criada por outro processo).
+    """
 
-    labels = get_all_labels(token, user)
+    def buscar(labels):
+        return next((label for label in labels if label["name"].strip().lower() == nome_label.lower()), None)
 
-    label_existente = next((label for label in labels if label["name"].strip().lower() == nome_label.lower()), None)
+    label_existente = buscar(get_all_labels(token, user, usar_cache=True)) or buscar(get_all_labels(token, user))
     if label_existente:
         return label_existente.get("id")
 
@@ -653,7 +715,7 @@ def criar_label_se_nao_existir(nome_label, token, user, hex_color=None):
             logger.error("[criar_label_se_nao_existir] %s | Cor inválida '%s'.", user, hex_color)
 
     try:
-        response = requests.post(url, headers=headers, json=body, timeout=REQUEST_TIMEOUT)
+        response = _http.post(url, headers=headers, json=body, timeout=REQUEST_TIMEOUT)
     except requests.Timeout:
         logger.error("[criar_label_se_nao_existir] %s | Timeout ao criar label '%s'", user, nome_label)
         return None
@@ -697,7 +759,7 @@ def get_all_groups(token, user):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        response = _http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
 
         if response.status_code in [200, 201]:
             response_data = response.json()
@@ -797,7 +859,7 @@ def upload_status_sem_imagem(texto_status, usuario, token, log_path=None):
     body = {"text": texto_status}
 
     try:
-        resp = requests.post(url, json=body, headers=headers, timeout=30)
+        resp = _http.post(url, json=body, headers=headers, timeout=30)
         ctype = resp.headers.get("content-type", "")
         payload = resp.json() if "application/json" in ctype else resp.text
         ok = (200 <= resp.status_code < 300) and (
@@ -841,7 +903,7 @@ def upload_imagem_status(imagem, legenda, usuario, token, log_path=None):
         }
         body = {"path": path_param, "caption": (legenda or "")}
 
-        resp = requests.post(url, json=body, headers=headers, timeout=60)
+        resp = _http.post(url, json=body, headers=headers, timeout=60)
         ctype = resp.headers.get("content-type", "")
         payload = resp.json() if "application/json" in ctype else resp.text
 
@@ -1005,7 +1067,7 @@ def download_media(session: str, token: str, message_id: str):
     url = f"{API_WPP_URL_PROD}/{session}/get-media-by-message/{message_id}"
     headers = {"Authorization": f"Bearer {token}"}
     try:
-        response = requests.get(url, headers=headers, timeout=60)  # Timeout maior para mídia
+        response = _http.get(url, headers=headers, timeout=60)  # Timeout maior para mídia
 
         if response.status_code == 200:
             try: